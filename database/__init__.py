@@ -4,9 +4,11 @@ Database package per PCOS Care MCP Server
 
 from database.models import (
     SymptomEntry, SymptomResponse, SymptomSummary, SymptomType,
-    CycleEntry, CycleResponse, CycleSummary, FlowIntensity
+    CycleEntry, CycleResponse, CycleSummary, FlowIntensity,
+    SYMPTOM_ENTRY_LIST, CYCLE_ENTRY_LIST, validate_entries
 )
 from database.db_manager import DatabaseManager
+from database.series import SymptomSeries, CycleSeries
 from database.schema import SymptomRecord, CycleRecord
 from database.auth import User
 
@@ -21,10 +23,17 @@ __all__ = [
     'CycleResponse',
     'CycleSummary',
     'FlowIntensity',
+    # Bulk validation
+    'SYMPTOM_ENTRY_LIST',
+    'CYCLE_ENTRY_LIST',
+    'validate_entries',
     # Database
     'DatabaseManager',
     'SymptomRecord',
     'CycleRecord',
+    # Compact series
+    'SymptomSeries',
+    'CycleSeries',
     # Authentication
     'User'
 ]
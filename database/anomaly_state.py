@@ -0,0 +1,144 @@
+"""
+Anomaly State - Baseline EWMA dell'intensità per utente e tipo di sintomo
+Rileva al momento della scrittura le registrazioni insolitamente intense
+
+Per ogni (utente, tipo) si mantengono media e varianza a media mobile
+esponenziale. All'inizio il peso del nuovo valore è 1/(n+1) (media
+cumulativa), poi si stabilizza su EWMA_ALPHA: la baseline segue i
+cambiamenti lenti dello storico senza dipendere dalla prima registrazione.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database.schema import SymptomRecord, SymptomBaseline, user_filter, user_key
+
+EWMA_ALPHA = 0.1            # peso delle nuove registrazioni a regime
+ANOMALY_Z = 2.5             # soglia dello z-score per un'anomalia
+MIN_BASELINE_ENTRIES = 5    # registrazioni necessarie prima di segnalare anomalie
+MIN_STD = 1.0               # deviazione minima: intensità intere su scala 1-10
+
+
+def _ewma_update(baseline: SymptomBaseline, intensity: float) -> None:
+    """Aggiorna media e varianza EWMA con una nuova osservazione"""
+    count = baseline.count or 0
+    if count == 0:
+        baseline.mean, baseline.variance = float(intensity), 0.0
+    else:
+        alpha = max(EWMA_ALPHA, 1.0 / (count + 1))
+        diff = intensity - baseline.mean
+        increment = alpha * diff
+        baseline.mean += increment
+        baseline.variance = (1.0 - alpha) * (baseline.variance + diff * increment)
+    baseline.count = count + 1
+
+
+def assess(baseline: Optional[SymptomBaseline], intensity: int) -> Dict[str, Any]:
+    """
+    Confronta un'intensità con la baseline corrente (prima dell'aggiornamento).
+
+    Returns:
+        Dizionario con is_anomaly, direction, z_score, baseline_mean,
+        baseline_std e baseline_entries
+    """
+    count = baseline.count if baseline is not None else 0
+    if count < MIN_BASELINE_ENTRIES:
+        return {
+            "is_anomaly": False,
+            "direction": None,
+            "z_score": None,
+            "baseline_mean": round(baseline.mean, 2) if count else None,
+            "baseline_std": None,
+            "baseline_entries": count
+        }
+
+    std = max(math.sqrt(baseline.variance), MIN_STD)
+    z_score = (intensity - baseline.mean) / std
+    is_anomaly = abs(z_score) >= ANOMALY_Z
+
+    return {
+        "is_anomaly": is_anomaly,
+        "direction": ("higher" if z_score > 0 else "lower") if is_anomaly else None,
+        "z_score": round(z_score, 2),
+        "baseline_mean": round(baseline.mean, 2),
+        "baseline_std": round(math.sqrt(baseline.variance), 2),
+        "baseline_entries": count
+    }
+
+
+def observe(
+    session: Session,
+    user_id: Optional[int],
+    symptom_type: str,
+    intensity: int
+) -> Dict[str, Any]:
+    """
+    Valuta una nuova registrazione e aggiorna la baseline, in O(1).
+
+    Da chiamare nella stessa transazione dell'insert del sintomo.
+
+    Returns:
+        Esito di assess rispetto alla baseline precedente
+    """
+    key = user_key(user_id)
+    baseline = session.query(SymptomBaseline).filter(
+        SymptomBaseline.user_id == key,
+        SymptomBaseline.symptom_type == symptom_type
+    ).one_or_none()
+
+    result = assess(baseline, intensity)
+
+    if baseline is None:
+        baseline = SymptomBaseline(user_id=key, symptom_type=symptom_type, count=0)
+        session.add(baseline)
+    _ewma_update(baseline, intensity)
+
+    return result
+
+
+def rebuild(
+    session: Session,
+    user_id: Optional[int],
+    chunk_size: int = 10_000
+) -> None:
+    """
+    Ricostruisce le baseline di un utente rileggendo lo storico in ordine
+    cronologico. Usato per i database esistenti, dopo caricamenti bulk e
+    dopo cancellazioni (l'EWMA non è reversibile).
+    """
+    key = user_key(user_id)
+    session.query(SymptomBaseline).filter(
+        SymptomBaseline.user_id == key
+    ).delete(synchronize_session=False)
+
+    baselines: Dict[str, SymptomBaseline] = {}
+    last_key = None
+
+    while True:
+        query = session.query(
+            SymptomRecord.timestamp, SymptomRecord.id,
+            SymptomRecord.symptom_type, SymptomRecord.intensity
+        ).filter(user_filter(SymptomRecord.user_id, user_id))
+
+        if last_key is not None:
+            query = query.filter(
+                (SymptomRecord.timestamp > last_key[0])
+                | ((SymptomRecord.timestamp == last_key[0]) & (SymptomRecord.id > last_key[1]))
+            )
+
+        rows = query.order_by(SymptomRecord.timestamp, SymptomRecord.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_key = (rows[-1][0], rows[-1][1])
+
+        for _, _, stype, intensity in rows:
+            baseline = baselines.get(stype)
+            if baseline is None:
+                baseline = baselines[stype] = SymptomBaseline(
+                    user_id=key, symptom_type=stype, count=0
+                )
+            _ewma_update(baseline, intensity)
+
+    session.add_all(baselines.values())
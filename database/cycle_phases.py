@@ -0,0 +1,161 @@
+"""
+Cycle Phases - Etichettatura fase/giorno del ciclo
+Logica condivisa tra database layer (denormalizzazione) e pattern analyzer
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Fasi del ciclo (stesse etichette usate da PatternAnalyzer)
+PHASE_EARLY = "early"                  # giorni 1-6: mestruazione
+PHASE_MID = "mid"                      # giorni 7-15: follicolare/ovulazione
+PHASE_LATE = "late"                    # giorni 16+: luteale
+PHASE_PRE_MENSTRUAL = "pre_menstrual"  # ultimi 3 giorni prima del ciclo successivo
+
+CYCLE_PHASES = (PHASE_EARLY, PHASE_MID, PHASE_LATE, PHASE_PRE_MENSTRUAL)
+
+# Codici interi per l'etichettatura vettoriale (indice in CYCLE_PHASES)
+NO_PHASE = -1
+
+
+def label_phase(days_from_start: int, days_to_next: Optional[int]) -> str:
+    """
+    Determina la fase dati i giorni trascorsi dall'inizio del ciclo.
+
+    Args:
+        days_from_start: Giorni interi dall'inizio del ciclo (0 = primo giorno)
+        days_to_next: Giorni interi all'inizio del ciclo successivo (None se ultimo ciclo)
+
+    Returns:
+        Etichetta della fase
+    """
+    if days_from_start <= 5:
+        return PHASE_EARLY
+    if days_from_start <= 14:
+        return PHASE_MID
+    if days_to_next is not None and days_to_next <= 3:
+        return PHASE_PRE_MENSTRUAL
+    return PHASE_LATE
+
+
+def assign_cycle_phase(
+    date: datetime,
+    sorted_starts: List[datetime]
+) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Assegna fase e giorno del ciclo a una data.
+
+    Args:
+        date: Data da etichettare
+        sorted_starts: Date di inizio dei cicli in ordine crescente
+
+    Returns:
+        Tupla (fase, giorno del ciclo 1-based), (None, None) se la data
+        precede il primo ciclo registrato
+    """
+    idx = bisect_right(sorted_starts, date)
+    if idx == 0:
+        return None, None
+
+    start = sorted_starts[idx - 1]
+    next_start = sorted_starts[idx] if idx < len(sorted_starts) else None
+
+    days_from_start = (date - start).days
+    days_to_next = (next_start - date).days if next_start else None
+
+    return label_phase(days_from_start, days_to_next), days_from_start + 1
+
+
+def label_cycle_phases(
+    dates: Sequence[datetime],
+    starts: Sequence[datetime]
+) -> Tuple[List[Optional[str]], List[Optional[int]]]:
+    """
+    Etichetta in blocco fase e giorno del ciclo per molte date.
+
+    Gli inizi ciclo vengono ordinati una volta; ogni data è assegnata al
+    proprio ciclo con np.searchsorted e offset/fase sono calcolati con
+    aritmetica su array: O((S + C) log C) invece di un loop per data.
+    Risultati identici a assign_cycle_phase.
+
+    Args:
+        dates: Date da etichettare (qualsiasi ordine)
+        starts: Date di inizio dei cicli (qualsiasi ordine)
+
+    Returns:
+        Tupla (fasi, giorni del ciclo 1-based), None dove la data precede
+        il primo ciclo
+    """
+    if not NUMPY_AVAILABLE:
+        sorted_starts = sorted(starts)
+        labels = [assign_cycle_phase(date, sorted_starts) for date in dates]
+        return [p for p, _ in labels], [d for _, d in labels]
+
+    codes, days = label_cycle_phase_codes(
+        np.asarray(dates, dtype='datetime64[us]'),
+        np.asarray(starts, dtype='datetime64[us]')
+    )
+
+    phase_names = np.array(CYCLE_PHASES + (None,), dtype=object)
+    phases = phase_names[codes].tolist()  # NO_PHASE (-1) -> None
+    cycle_days = [int(d) if d > 0 else None for d in days.tolist()]
+
+    return phases, cycle_days
+
+
+def label_cycle_phase_codes(dates, starts):
+    """
+    Versione array di label_cycle_phases.
+
+    Args:
+        dates: np.ndarray datetime64 delle date
+        starts: np.ndarray datetime64 degli inizi ciclo (qualsiasi ordine)
+
+    Returns:
+        Tupla (codici fase int8 con NO_PHASE, giorni del ciclo int32 con 0
+        dove la data precede il primo ciclo)
+    """
+    one_day = np.timedelta64(1, 'D')
+    starts = np.sort(starts)
+
+    codes = np.full(len(dates), NO_PHASE, dtype=np.int8)
+    cycle_days = np.zeros(len(dates), dtype=np.int32)
+
+    if len(starts) == 0 or len(dates) == 0:
+        return codes, cycle_days
+
+    # Indice del primo inizio > data: il ciclo che contiene la data è idx - 1
+    idx = np.searchsorted(starts, dates, side='right')
+    valid = idx > 0
+    has_next = idx < len(starts)
+
+    current_start = starts[np.maximum(idx - 1, 0)]
+    next_start = starts[np.minimum(idx, len(starts) - 1)]
+
+    # Divisione intera come timedelta.days (floor)
+    days_from_start = (dates - current_start) // one_day
+    days_to_next = (next_start - dates) // one_day
+
+    phase = np.where(
+        days_from_start <= 5, CYCLE_PHASES.index(PHASE_EARLY),
+        np.where(
+            days_from_start <= 14, CYCLE_PHASES.index(PHASE_MID),
+            np.where(
+                has_next & (days_to_next <= 3),
+                CYCLE_PHASES.index(PHASE_PRE_MENSTRUAL),
+                CYCLE_PHASES.index(PHASE_LATE)
+            )
+        )
+    )
+
+    codes[valid] = phase[valid]
+    cycle_days[valid] = days_from_start[valid] + 1
+
+    return codes, cycle_days
@@ -0,0 +1,215 @@
+"""
+Cycle State - Statistiche correnti dei cicli per utente
+Analytics e predizione del prossimo ciclo senza rileggere lo storico
+
+Per ogni utente si mantengono le somme delle lunghezze dei cicli chiusi
+(count, somma, somma dei quadrati, min, max) e la media pesata recente
+degli intervalli tra inizi consecutivi. L'intervallo usa lo stesso schema
+delle baseline dei sintomi: peso 1/(n+1) all'inizio, poi INTERVAL_EWMA_ALPHA,
+così la predizione segue i cambiamenti recenti del ciclo.
+"""
+
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from database.schema import CycleRecord, CycleStatistics, user_filter, user_key
+
+INTERVAL_EWMA_ALPHA = 0.3     # peso dell'ultimo intervallo a regime
+
+
+def _length(start: datetime, end: datetime) -> int:
+    """Lunghezza del ciclo in giorni interi (come timedelta.days)"""
+    return (end - start).days
+
+
+def _interval_days(previous_start: datetime, start: datetime) -> float:
+    return (start - previous_start).total_seconds() / 86400
+
+
+def _get(session: Session, user_id: Optional[int]) -> Optional[CycleStatistics]:
+    return session.query(CycleStatistics).filter(
+        CycleStatistics.user_id == user_key(user_id)
+    ).one_or_none()
+
+
+def _new(user_id: Optional[int]) -> CycleStatistics:
+    return CycleStatistics(
+        user_id=user_key(user_id), cycle_count=0, closed_count=0,
+        length_sum=0.0, length_sumsq=0.0, interval_count=0
+    )
+
+
+def _add_interval(stats: CycleStatistics, interval: float) -> None:
+    count = stats.interval_count or 0
+    if count == 0:
+        stats.interval_ewma = interval
+    else:
+        alpha = max(INTERVAL_EWMA_ALPHA, 1.0 / (count + 1))
+        stats.interval_ewma += alpha * (interval - stats.interval_ewma)
+    stats.interval_count = count + 1
+
+
+def _add_start(stats: CycleStatistics, start: datetime) -> None:
+    """Nuovo inizio in coda allo storico (start >= last_start)"""
+    if stats.last_start is not None:
+        _add_interval(stats, _interval_days(stats.last_start, start))
+    stats.last_start = start
+    if stats.first_start is None or start < stats.first_start:
+        stats.first_start = start
+    stats.cycle_count = (stats.cycle_count or 0) + 1
+
+
+def _add_length(stats: CycleStatistics, start: datetime, end: datetime) -> None:
+    """Nuovo ciclo chiuso"""
+    length = _length(start, end)
+    stats.closed_count += 1
+    stats.length_sum += length
+    stats.length_sumsq += length * length
+    stats.min_length = length if stats.min_length is None else min(stats.min_length, length)
+    stats.max_length = length if stats.max_length is None else max(stats.max_length, length)
+
+    if stats.last_closed_start is None or start >= stats.last_closed_start:
+        stats.last_closed_start, stats.last_closed_end = start, end
+
+
+def cycle_added(
+    session: Session,
+    user_id: Optional[int],
+    start_date: datetime,
+    end_date: Optional[datetime]
+) -> None:
+    """
+    Aggiorna le statistiche per un nuovo ciclo, in O(1).
+
+    Da chiamare nella transazione dell'insert, dopo il flush del record.
+    Un inizio precedente all'ultimo (storico inserito a ritroso) cambia
+    gli intervalli tra inizi: in quel caso le statistiche si ricostruiscono.
+    """
+    stats = _get(session, user_id)
+    if stats is None:
+        stats = _new(user_id)
+        session.add(stats)
+    elif stats.last_start is not None and start_date < stats.last_start:
+        rebuild(session, user_id)
+        return
+
+    _add_start(stats, start_date)
+    if end_date is not None:
+        _add_length(stats, start_date, end_date)
+
+
+def cycle_end_changed(
+    session: Session,
+    user_id: Optional[int],
+    start_date: datetime,
+    old_end: Optional[datetime],
+    new_end: datetime
+) -> None:
+    """
+    Aggiorna le statistiche per una nuova data di fine.
+
+    Da chiamare nella transazione dell'update, dopo il flush. Somme e
+    conteggi si correggono in O(1); se la vecchia lunghezza era il minimo
+    o il massimo (non reversibili) le statistiche si ricostruiscono.
+    """
+    stats = _get(session, user_id)
+    if stats is None:
+        rebuild(session, user_id)
+        return
+
+    if old_end is not None:
+        old_length = _length(start_date, old_end)
+        if old_length in (stats.min_length, stats.max_length):
+            rebuild(session, user_id)
+            return
+        stats.closed_count -= 1
+        stats.length_sum -= old_length
+        stats.length_sumsq -= old_length * old_length
+
+    _add_length(stats, start_date, new_end)
+
+
+def rebuild(session: Session, user_id: Optional[int]) -> Optional[CycleStatistics]:
+    """
+    Ricostruisce da zero le statistiche di un utente in ordine di inizio.
+    Usato per i database esistenti, dopo caricamenti bulk e per gli
+    inserimenti fuori ordine.
+    """
+    session.query(CycleStatistics).filter(
+        CycleStatistics.user_id == user_key(user_id)
+    ).delete(synchronize_session=False)
+
+    rows = session.query(CycleRecord.start_date, CycleRecord.end_date).filter(
+        user_filter(CycleRecord.user_id, user_id)
+    ).order_by(CycleRecord.start_date, CycleRecord.id).all()
+
+    stats = from_rows(user_id, rows)
+    if stats is not None:
+        session.add(stats)
+    return stats
+
+
+def from_rows(user_id: Optional[int], rows) -> Optional[CycleStatistics]:
+    """
+    Statistiche non salvate da righe (start_date, end_date) ordinate per
+    inizio (usato da rebuild).
+    """
+    if not rows:
+        return None
+
+    stats = _new(user_id)
+    for start_date, end_date in rows:
+        _add_start(stats, start_date)
+        if end_date is not None:
+            _add_length(stats, start_date, end_date)
+    return stats
+
+
+def predict_next_start(stats: CycleStatistics) -> Optional[datetime]:
+    """
+    Prossimo inizio: ultimo inizio + media pesata recente degli intervalli.
+
+    Con un solo ciclo registrato (nessun intervallo) resta la stima
+    precedente: fine dell'ultimo ciclo chiuso + lunghezza media.
+    """
+    if stats.interval_count:
+        return stats.last_start + timedelta(days=round(stats.interval_ewma))
+    if stats.last_closed_end is not None and stats.closed_count:
+        return stats.last_closed_end + timedelta(days=int(stats.length_sum / stats.closed_count))
+    return None
+
+
+def summarize(stats: CycleStatistics) -> Dict[str, Any]:
+    """
+    Statistiche delle lunghezze dai soli contatori.
+
+    total_cycles conta i cicli chiusi (come il riepilogo originale); senza
+    cicli chiusi le lunghezze restano None ma intervallo e predizione,
+    che usano gli inizi, sono comunque riportati.
+
+    Returns:
+        Dizionario con total_cycles, average_cycle_length, shortest_cycle,
+        longest_cycle, regularity_score, average_interval e predicted_next_start
+    """
+    n = stats.closed_count
+    summary = {
+        "total_cycles": n,
+        "average_interval": round(stats.interval_ewma, 1) if stats.interval_count else None,
+        "predicted_next_start": predict_next_start(stats)
+    }
+    if not n:
+        return summary
+
+    mean = stats.length_sum / n
+    std = math.sqrt(max(stats.length_sumsq / n - mean * mean, 0.0))
+
+    summary.update({
+        "average_cycle_length": round(mean, 1),
+        "shortest_cycle": stats.min_length,
+        "longest_cycle": stats.max_length,
+        "regularity_score": round(max(0, 100 - (std * 10)), 1)
+    })
+    return summary
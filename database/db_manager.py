@@ -3,13 +3,22 @@ Database Manager - Business Logic Layer
 Gestisce tutte le operazioni database con error handling robusto
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 from datetime import datetime, timedelta
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, update, insert, and_, or_
+import hashlib
 import logging
 
-from database.schema import get_session_maker, SymptomRecord, CycleRecord
+from database.schema import (
+    get_session_maker, get_database_url, SymptomRecord, CycleRecord, PhaseSymptomCount,
+    SymptomBaseline, IntensitySketchRecord, CycleStatistics, CycleForecast, NoteEmbedding,
+    LOCAL_USER_KEY, user_key, user_from_key, user_filter, users_filter, dialect_insert
+)
+from database.cycle_phases import assign_cycle_phase, label_cycle_phases
+from database import anomaly_state, cycle_state, intensity_sketch, pattern_state
+from database.series import SymptomSeries, CycleSeries, to_epoch, to_epochs
 from database.models import (
     SymptomEntry, SymptomResponse, SymptomSummary,
     CycleEntry, CycleResponse, CycleSummary
@@ -32,7 +41,13 @@ class DatabaseManager:
         Args:
             db_url: Database URL (optional, default: local SQLite)
         """
-        self.SessionMaker = get_session_maker(db_url)
+        self.db_url = db_url or get_database_url()
+        self.SessionMaker = get_session_maker(self.db_url)
+        self._backfill_cycle_phases()
+        self._backfill_pattern_counters()
+        self._backfill_symptom_baselines()
+        self._backfill_intensity_sketches()
+        self._backfill_cycle_statistics()
         logger.info("Database Manager initialized")
 
     def get_session(self) -> Session:
@@ -44,12 +59,38 @@ class DatabaseManager:
         """
         return self.SessionMaker()
     
-    def add_symptom(self, symptom: SymptomEntry) -> SymptomResponse:
+    def get_user_ids(self) -> List[Optional[int]]:
+        """
+        Owner distinti di sintomi e cicli (None = storico locale).
+
+        Returns:
+            Lista di user_id, storico locale per primo se presente
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            owners = {row[0] for row in session.query(SymptomRecord.user_id).distinct()}
+            owners |= {row[0] for row in session.query(CycleRecord.user_id).distinct()}
+            return sorted(owners, key=lambda owner: -1 if owner is None else owner)
+
+        except Exception as e:
+            logger.error(f"Error retrieving user ids: {str(e)}")
+            return []
+
+        finally:
+            session.close()
+
+    def add_symptom(
+        self,
+        symptom: SymptomEntry,
+        user_id: Optional[int] = None
+    ) -> SymptomResponse:
         """
         Aggiunge un nuovo sintomo al database.
         
         Args:
             symptom: SymptomEntry validato con Pydantic
+            user_id: Owner del sintomo (None = storico locale)
             
         Returns:
             SymptomResponse con esito operazione
@@ -60,12 +101,34 @@ class DatabaseManager:
         session: Session = self.SessionMaker()
         
         try:
+            # Fase/giorno del ciclo denormalizzati al momento dell'insert
+            cycle_phase, cycle_day = self._phase_for_date(session, symptom.timestamp, user_id)
+
+            # Contatori dei pattern aggiornati nella stessa transazione
+            pattern_state.symptom_added(
+                session, user_id, symptom.timestamp,
+                symptom.symptom_type.value, cycle_phase
+            )
+
+            intensity_sketch.symptom_added(
+                session, user_id, symptom.timestamp,
+                symptom.symptom_type.value, symptom.intensity
+            )
+
+            # Confronto con la baseline EWMA e aggiornamento in O(1)
+            anomaly = anomaly_state.observe(
+                session, user_id, symptom.symptom_type.value, symptom.intensity
+            )
+
             # Crea record database
             record = SymptomRecord(
                 symptom_type=symptom.symptom_type.value,
                 intensity=symptom.intensity,
                 notes=symptom.notes,
-                timestamp=symptom.timestamp
+                timestamp=symptom.timestamp,
+                cycle_phase=cycle_phase,
+                cycle_day=cycle_day,
+                user_id=user_id
             )
             
             session.add(record)
@@ -78,7 +141,8 @@ class DatabaseManager:
                 success=True,
                 message=f"Sintomo '{symptom.symptom_type.value}' registrato con successo",
                 entry_id=record.id,
-                timestamp=record.timestamp
+                timestamp=record.timestamp,
+                anomaly=anomaly
             )
             
         except Exception as e:
@@ -99,7 +163,8 @@ class DatabaseManager:
         limit: int = 10,
         symptom_type: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Recupera sintomi dal database con filtri opzionali.
@@ -109,6 +174,7 @@ class DatabaseManager:
             symptom_type: Filtra per tipo di sintomo
             start_date: Filtra da questa data
             end_date: Filtra fino a questa data
+            user_id: Owner dei sintomi (None = storico locale)
             
         Returns:
             Lista di sintomi come dizionari
@@ -116,7 +182,9 @@ class DatabaseManager:
         session: Session = self.SessionMaker()
         
         try:
-            query = session.query(SymptomRecord)
+            query = session.query(SymptomRecord).filter(
+                user_filter(SymptomRecord.user_id, user_id)
+            )
             
             # Applica filtri
             if symptom_type:
@@ -145,15 +213,250 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def iter_symptom_chunks(
+        self,
+        chunk_size: int = 5000,
+        symptom_type: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Scorre tutti i sintomi del periodo in ordine cronologico, a blocchi.
+
+        Paginazione keyset su (timestamp, id): nessun limite al numero di righe,
+        memoria limitata a chunk_size record, una sessione breve per blocco.
+
+        Args:
+            chunk_size: Numero di record per blocco
+            symptom_type: Filtra per tipo di sintomo
+            start_date: Filtra da questa data
+            end_date: Filtra fino a questa data
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Yields:
+            Liste di sintomi come dizionari (al più chunk_size elementi)
+        """
+        for records in self._iter_symptom_pages(
+            (SymptomRecord,), chunk_size, symptom_type, start_date, end_date, user_id
+        ):
+            yield [record.to_dict() for (record,) in records]
+
+    def load_symptom_series(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        symptom_type: Optional[str] = None,
+        user_id: Optional[int] = None,
+        chunk_size: int = 20000,
+        with_notes: bool = False
+    ) -> SymptomSeries:
+        """
+        Carica i sintomi del periodo come SymptomSeries (array paralleli).
+
+        Le righe arrivano a blocchi keyset con sole colonne compatte e ogni
+        blocco viene copiato negli array della serie prima di leggere il
+        successivo: niente oggetti ORM, dizionari o righe dell'intero periodo
+        in memoria. L'epoch è calcolato in Python dai datetime letti, quindi
+        la query è la stessa su SQLite e PostgreSQL.
+
+        Args:
+            start_date: Filtra da questa data
+            end_date: Filtra fino a questa data
+            symptom_type: Filtra per tipo di sintomo
+            user_id: Owner dei sintomi (None = storico locale)
+            chunk_size: Numero di righe per blocco
+            with_notes: Carica anche le note nel buffer della serie
+
+        Returns:
+            SymptomSeries ordinata nel tempo
+        """
+        columns = (
+            SymptomRecord.timestamp,
+            SymptomRecord.symptom_type,
+            SymptomRecord.intensity,
+            SymptomRecord.cycle_day,
+            SymptomRecord.cycle_phase
+        )
+        if with_notes:
+            columns += (SymptomRecord.notes,)
+
+        return SymptomSeries.from_chunks(
+            (
+                _with_epochs(rows)
+                for rows in self._iter_symptom_pages(
+                    columns, chunk_size, symptom_type, start_date, end_date, user_id
+                )
+            ),
+            with_notes=with_notes
+        )
+
+    def load_cycle_series(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> CycleSeries:
+        """
+        Carica i cicli iniziati nel periodo come CycleSeries.
+
+        Args:
+            start_date: Cicli iniziati da questa data
+            end_date: Cicli iniziati fino a questa data
+            user_id: Owner dei cicli (None = storico locale)
+
+        Returns:
+            CycleSeries ordinata per data di inizio
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            query = session.query(
+                CycleRecord.start_date,
+                CycleRecord.end_date,
+                CycleRecord.flow_intensity
+            ).filter(user_filter(CycleRecord.user_id, user_id))
+
+            if start_date:
+                query = query.filter(CycleRecord.start_date >= start_date)
+
+            if end_date:
+                query = query.filter(CycleRecord.start_date <= end_date)
+
+            return CycleSeries.from_rows([
+                (to_epoch(start), None if end is None else to_epoch(end), flow)
+                for start, end, flow in query.order_by(CycleRecord.start_date, CycleRecord.id)
+            ])
+
+        finally:
+            session.close()
+
+    def _iter_symptom_pages(
+        self,
+        columns: tuple,
+        chunk_size: int,
+        symptom_type: Optional[str],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        user_id: Optional[int]
+    ) -> Iterator[List[tuple]]:
+        """
+        Paginazione keyset su (timestamp, id) con una sessione breve per blocco.
+
+        Ogni riga contiene le colonne richieste seguite da timestamp e id.
+        """
+        last_key = None
+
+        while True:
+            session: Session = self.SessionMaker()
+
+            try:
+                query = session.query(
+                    *columns, SymptomRecord.timestamp, SymptomRecord.id
+                ).filter(
+                    user_filter(SymptomRecord.user_id, user_id)
+                )
+
+                if symptom_type:
+                    query = query.filter(SymptomRecord.symptom_type == symptom_type)
+
+                if start_date:
+                    query = query.filter(SymptomRecord.timestamp >= start_date)
+
+                if end_date:
+                    query = query.filter(SymptomRecord.timestamp <= end_date)
+
+                if last_key is not None:
+                    last_timestamp, last_id = last_key
+                    query = query.filter(or_(
+                        SymptomRecord.timestamp > last_timestamp,
+                        and_(
+                            SymptomRecord.timestamp == last_timestamp,
+                            SymptomRecord.id > last_id
+                        )
+                    ))
+
+                rows = query.order_by(
+                    SymptomRecord.timestamp, SymptomRecord.id
+                ).limit(chunk_size).all()
+
+                if rows:
+                    last_key = (rows[-1][-2], rows[-1][-1])
+                    rows = [row[:len(columns)] for row in rows]
+
+            finally:
+                session.close()
+
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < chunk_size:
+                return
+
+    def get_symptom_days(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> List[tuple]:
+        """
+        Tipi di sintomo distinti per utente e giorno (GROUP BY in SQL).
+
+        Una riga per (utente, giorno, tipo) invece di una per sintomo: è
+        l'input compatto dell'analisi di co-occorrenza, anche per molti utenti.
+
+        Args:
+            start_date: Filtra da questa data
+            end_date: Filtra fino a questa data
+            user_ids: Owner da includere (None = tutti gli utenti)
+
+        Returns:
+            Lista di tuple (user_id, 'YYYY-MM-DD', symptom_type) ordinate
+            per utente e giorno
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            day = func.date(SymptomRecord.timestamp)
+            query = session.query(
+                SymptomRecord.user_id, day, SymptomRecord.symptom_type
+            )
+
+            if user_ids is not None:
+                query = query.filter(users_filter(SymptomRecord.user_id, user_ids))
+
+            if start_date:
+                query = query.filter(SymptomRecord.timestamp >= start_date)
+
+            if end_date:
+                query = query.filter(SymptomRecord.timestamp <= end_date)
+
+            rows = query.group_by(
+                SymptomRecord.user_id, day, SymptomRecord.symptom_type
+            ).order_by(SymptomRecord.user_id, day).all()
+
+            return [tuple(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Error retrieving symptom days: {str(e)}")
+            return []
+
+        finally:
+            session.close()
+
     def get_symptom_summary(
         self,
-        days: int = 30
+        days: int = 30,
+        user_id: Optional[int] = None
     ) -> SymptomSummary:
         """
         Genera un riepilogo statistico dei sintomi.
         
         Args:
             days: Numero di giorni da analizzare (default: 30)
+            user_id: Owner dei sintomi (None = storico locale)
             
         Returns:
             SymptomSummary con statistiche
@@ -167,6 +470,7 @@ class DatabaseManager:
             
             # Query per sintomi nel periodo
             query = session.query(SymptomRecord).filter(
+                user_filter(SymptomRecord.user_id, user_id),
                 SymptomRecord.timestamp >= start_date,
                 SymptomRecord.timestamp <= end_date
             )
@@ -187,6 +491,7 @@ class DatabaseManager:
                 SymptomRecord.symptom_type,
                 func.count(SymptomRecord.id).label('count')
             ).filter(
+                user_filter(SymptomRecord.user_id, user_id),
                 SymptomRecord.timestamp >= start_date,
                 SymptomRecord.timestamp <= end_date
             ).group_by(
@@ -199,16 +504,24 @@ class DatabaseManager:
             avg_intensity = session.query(
                 func.avg(SymptomRecord.intensity)
             ).filter(
+                user_filter(SymptomRecord.user_id, user_id),
                 SymptomRecord.timestamp >= start_date,
                 SymptomRecord.timestamp <= end_date
             ).scalar()
             
             logger.info(f"Generated summary: {total_entries} entries in last {days} days")
             
+            # Percentili per tipo dagli sketch (mesi interi) + bordi della finestra
+            sketches = intensity_sketch.read_sketches(session, [user_id], start_date, end_date)
+
             return SymptomSummary(
                 total_entries=total_entries,
                 most_common_symptom=most_common[0] if most_common else None,
                 average_intensity=round(float(avg_intensity), 2) if avg_intensity else None,
+                intensity_percentiles={
+                    stype: sketch.summary()
+                    for stype, sketch in sorted(sketches.get(user_id, {}).items())
+                },
                 date_range=(start_date, end_date)
             )
             
@@ -224,12 +537,14 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def delete_symptom(self, symptom_id: int) -> bool:
+    def delete_symptom(self, symptom_id: int, user_id: Optional[int] = None) -> bool:
         """
         Elimina un sintomo dal database.
 
         Args:
             symptom_id: ID del sintomo da eliminare
+            user_id: Owner del sintomo (None = storico locale); i sintomi di
+                     altri utenti non vengono toccati
 
         Returns:
             True se eliminato, False altrimenti
@@ -238,11 +553,24 @@ class DatabaseManager:
 
         try:
             record = session.query(SymptomRecord).filter(
-                SymptomRecord.id == symptom_id
+                SymptomRecord.id == symptom_id,
+                user_filter(SymptomRecord.user_id, user_id)
             ).first()
 
             if record:
+                removed = (record.user_id, record.timestamp,
+                           record.symptom_type, record.cycle_phase)
+                intensity_sketch.symptom_removed(
+                    session, record.user_id, record.timestamp,
+                    record.symptom_type, record.intensity
+                )
                 session.delete(record)
+                session.query(NoteEmbedding).filter(
+                    NoteEmbedding.source == "symptom",
+                    NoteEmbedding.record_id == symptom_id
+                ).delete(synchronize_session=False)
+                session.flush()
+                pattern_state.symptom_removed(session, *removed)
                 session.commit()
                 logger.info(f"Symptom deleted: ID={symptom_id}")
                 return True
@@ -258,175 +586,784 @@ class DatabaseManager:
         finally:
             session.close()
 
-    # ========================================================================
-    # FASE 3: Cycle Tracking Methods
-    # ========================================================================
-
-    def add_cycle(self, cycle: CycleEntry) -> CycleResponse:
+    def get_phase_statistics(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Aggiunge un nuovo ciclo mestruale al database.
+        Aggrega i sintomi per fase del ciclo e tipo (singola GROUP BY).
+
+        Usa la colonna denormalizzata cycle_phase: nessun ricalcolo delle fasi.
 
         Args:
-            cycle: CycleEntry validato con Pydantic
+            start_date: Filtra da questa data
+            end_date: Filtra fino a questa data
+            user_id: Owner dei sintomi (None = storico locale)
 
         Returns:
-            CycleResponse con esito operazione
+            Lista di righe {cycle_phase, symptom_type, count, avg_intensity}
         """
         session: Session = self.SessionMaker()
 
         try:
-            # Crea record database
-            record = CycleRecord(
-                start_date=cycle.start_date,
-                end_date=cycle.end_date,
-                flow_intensity=cycle.flow_intensity.value,
-                notes=cycle.notes
+            query = session.query(
+                SymptomRecord.cycle_phase,
+                SymptomRecord.symptom_type,
+                func.count(SymptomRecord.id),
+                func.avg(SymptomRecord.intensity)
+            ).filter(
+                user_filter(SymptomRecord.user_id, user_id),
+                SymptomRecord.cycle_phase.isnot(None)
             )
 
-            session.add(record)
-            session.commit()
-            session.refresh(record)
-
-            # Calcola lunghezza ciclo se end_date presente
-            cycle_length = None
-            if record.end_date:
-                cycle_length = (record.end_date - record.start_date).days
+            if start_date:
+                query = query.filter(SymptomRecord.timestamp >= start_date)
 
-            logger.info(f"Cycle added: ID={record.id}, start={record.start_date}")
+            if end_date:
+                query = query.filter(SymptomRecord.timestamp <= end_date)
 
-            return CycleResponse(
-                success=True,
-                message="Ciclo mestruale registrato con successo",
-                entry_id=record.id,
-                cycle_length=cycle_length,
-                timestamp=datetime.now()
-            )
+            rows = query.group_by(
+                SymptomRecord.cycle_phase,
+                SymptomRecord.symptom_type
+            ).all()
+
+            return [
+                {
+                    'cycle_phase': phase,
+                    'symptom_type': stype,
+                    'count': count,
+                    'avg_intensity': float(avg_intensity)
+                }
+                for phase, stype, count, avg_intensity in rows
+            ]
 
         except Exception as e:
-            session.rollback()
-            logger.error(f"Error adding cycle: {str(e)}")
-
-            return CycleResponse(
-                success=False,
-                message=f"Errore nel salvare il ciclo: {str(e)}",
-                timestamp=datetime.now()
-            )
+            logger.error(f"Error retrieving phase statistics: {str(e)}")
+            return []
 
         finally:
             session.close()
 
-    def get_cycles(
+    def get_phase_intensity_counts(
         self,
-        limit: int = 10,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> List[Tuple[str, str, int, int]]:
         """
-        Recupera cicli dal database con filtri opzionali.
+        Distribuzione delle intensità per fase e tipo (singola GROUP BY).
+
+        Le intensità sono interi 1-10: le righe sono al massimo
+        fasi × tipi × 10, qualunque sia la lunghezza dello storico, e
+        bastano per ricostruire i campioni dei test di permutazione.
 
         Args:
-            limit: Numero massimo di risultati
             start_date: Filtra da questa data
             end_date: Filtra fino a questa data
+            user_id: Owner dei sintomi (None = storico locale)
 
         Returns:
-            Lista di cicli come dizionari
+            Lista di tuple (cycle_phase, symptom_type, intensity, count)
         """
         session: Session = self.SessionMaker()
 
         try:
-            query = session.query(CycleRecord)
+            query = session.query(
+                SymptomRecord.cycle_phase,
+                SymptomRecord.symptom_type,
+                SymptomRecord.intensity,
+                func.count(SymptomRecord.id)
+            ).filter(
+                user_filter(SymptomRecord.user_id, user_id),
+                SymptomRecord.cycle_phase.isnot(None)
+            )
 
-            # Applica filtri
             if start_date:
-                query = query.filter(CycleRecord.start_date >= start_date)
+                query = query.filter(SymptomRecord.timestamp >= start_date)
 
             if end_date:
-                query = query.filter(CycleRecord.start_date <= end_date)
-
-            # Ordina per start_date discendente (più recenti prima)
-            query = query.order_by(desc(CycleRecord.start_date))
-
-            # Limita risultati
-            records = query.limit(limit).all()
-
-            logger.info(f"Retrieved {len(records)} cycle records")
+                query = query.filter(SymptomRecord.timestamp <= end_date)
 
-            # Converti in dizionari con calcolo cycle_length
-            result = []
-            for record in records:
-                cycle_dict = {
-                    'id': record.id,
-                    'start_date': record.start_date.isoformat(),
-                    'end_date': record.end_date.isoformat() if record.end_date else None,
-                    'flow_intensity': record.flow_intensity,
-                    'notes': record.notes,
-                    'created_at': record.created_at.isoformat(),
-                    'cycle_length': (record.end_date - record.start_date).days if record.end_date else None
-                }
-                result.append(cycle_dict)
+            rows = query.group_by(
+                SymptomRecord.cycle_phase,
+                SymptomRecord.symptom_type,
+                SymptomRecord.intensity
+            ).all()
 
-            return result
+            return [tuple(row) for row in rows]
 
         except Exception as e:
-            logger.error(f"Error retrieving cycles: {str(e)}")
+            logger.error(f"Error retrieving phase intensity counts: {str(e)}")
             return []
 
         finally:
             session.close()
 
-    def update_cycle_end_date(
+    def _phase_for_date(
         self,
-        cycle_id: int,
-        end_date: datetime
-    ) -> CycleResponse:
+        session: Session,
+        date: datetime,
+        user_id: Optional[int] = None
+    ):
         """
-        Aggiorna la data di fine di un ciclo esistente.
+        Calcola (cycle_phase, cycle_day) per una data dai cicli dell'utente.
+
+        Servono solo l'inizio del ciclo che contiene la data e quello successivo.
+        """
+        prev_start = session.query(func.max(CycleRecord.start_date)).filter(
+            user_filter(CycleRecord.user_id, user_id),
+            CycleRecord.start_date <= date
+        ).scalar()
+
+        if prev_start is None:
+            return None, None
+
+        next_start = session.query(func.min(CycleRecord.start_date)).filter(
+            user_filter(CycleRecord.user_id, user_id),
+            CycleRecord.start_date > date
+        ).scalar()
+
+        starts = [prev_start] + ([next_start] if next_start else [])
+        return assign_cycle_phase(date, starts)
+
+    def _relabel_cycle_span(
+        self,
+        session: Session,
+        new_start: datetime,
+        user_id: Optional[int] = None
+    ) -> int:
+        """
+        Ricalcola le fasi dopo l'inserimento di un ciclo che inizia in new_start.
+
+        Cambiano solo i sintomi tra l'inizio del ciclo precedente (la cui fase
+        pre-mestruale dipende dal nuovo inizio) e l'inizio del ciclo successivo.
+
+        Returns:
+            Numero di sintomi rietichettati
+        """
+        prev_start = session.query(func.max(CycleRecord.start_date)).filter(
+            user_filter(CycleRecord.user_id, user_id),
+            CycleRecord.start_date < new_start
+        ).scalar()
+
+        next_start = session.query(func.min(CycleRecord.start_date)).filter(
+            user_filter(CycleRecord.user_id, user_id),
+            CycleRecord.start_date > new_start
+        ).scalar()
+
+        starts = [s for s in (prev_start, new_start, next_start) if s is not None]
+
+        return self._relabel_symptoms(
+            session,
+            starts,
+            span_start=prev_start or new_start,
+            span_end=next_start,
+            user_id=user_id
+        )
+
+    def _relabel_symptoms(
+        self,
+        session: Session,
+        sorted_starts: List[datetime],
+        span_start: Optional[datetime] = None,
+        span_end: Optional[datetime] = None,
+        only_unlabeled: bool = False,
+        user_id: Optional[int] = None,
+        update_counters: bool = True
+    ) -> int:
+        """
+        Aggiorna in blocco cycle_phase/cycle_day dei sintomi in [span_start, span_end).
 
         Args:
-            cycle_id: ID del ciclo da aggiornare
-            end_date: Nuova data di fine
+            session: Sessione attiva (commit a carico del chiamante)
+            sorted_starts: Inizi ciclo rilevanti, in ordine crescente
+            span_start: Limite inferiore incluso (None = nessun limite)
+            span_end: Limite superiore escluso (None = nessun limite)
+            only_unlabeled: Considera solo i sintomi senza cycle_day
+            user_id: Owner dei sintomi (None = storico locale)
+            update_counters: Sposta anche i contatori fase × sintomo
 
         Returns:
-            CycleResponse con esito operazione
+            Numero di sintomi aggiornati
         """
-        session: Session = self.SessionMaker()
+        query = session.query(
+            SymptomRecord.id, SymptomRecord.timestamp,
+            SymptomRecord.symptom_type, SymptomRecord.cycle_phase
+        ).filter(
+            user_filter(SymptomRecord.user_id, user_id)
+        )
 
-        try:
-            record = session.query(CycleRecord).filter(
-                CycleRecord.id == cycle_id
-            ).first()
+        if span_start is not None:
+            query = query.filter(SymptomRecord.timestamp >= span_start)
 
-            if not record:
-                return CycleResponse(
-                    success=False,
-                    message=f"Ciclo con ID {cycle_id} non trovato",
-                    timestamp=datetime.now()
-                )
+        if span_end is not None:
+            query = query.filter(SymptomRecord.timestamp < span_end)
 
-            # Valida che end_date sia dopo start_date
-            if end_date < record.start_date:
-                return CycleResponse(
-                    success=False,
-                    message="La data di fine deve essere dopo la data di inizio",
-                    timestamp=datetime.now()
-                )
+        if only_unlabeled:
+            query = query.filter(SymptomRecord.cycle_day.is_(None))
 
-            record.end_date = end_date
-            session.commit()
-            session.refresh(record)
+        rows = query.all()
+        phases, cycle_days = label_cycle_phases(
+            [timestamp for _, timestamp, _, _ in rows],
+            sorted_starts
+        )
 
-            cycle_length = (record.end_date - record.start_date).days
+        updates = [
+            {'id': symptom_id, 'cycle_phase': cycle_phase, 'cycle_day': cycle_day}
+            for (symptom_id, _, _, _), cycle_phase, cycle_day in zip(rows, phases, cycle_days)
+        ]
 
-            logger.info(f"Cycle updated: ID={cycle_id}, end_date={end_date}")
+        if updates:
+            session.execute(update(SymptomRecord), updates)
 
-            return CycleResponse(
-                success=True,
-                message="Data di fine ciclo aggiornata con successo",
-                entry_id=record.id,
-                cycle_length=cycle_length,
-                timestamp=datetime.now()
-            )
+        if update_counters:
+            pattern_state.phases_changed(session, user_id, [
+                (timestamp, stype, old_phase, new_phase)
+                for (_, timestamp, stype, old_phase), new_phase in zip(rows, phases)
+            ])
+
+        return len(updates)
+
+    def _backfill_cycle_phases(self) -> None:
+        """
+        Etichetta i sintomi salvati prima dell'introduzione di cycle_phase.
+
+        Query indicizzata: tocca solo i sintomi non etichettati successivi
+        al primo ciclo registrato di ciascun utente.
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            starts_by_user = defaultdict(list)
+            for owner, start in session.query(
+                CycleRecord.user_id, CycleRecord.start_date
+            ).order_by(CycleRecord.start_date).all():
+                starts_by_user[owner].append(start)
+
+            relabeled = 0
+            for owner, starts in starts_by_user.items():
+                relabeled += self._relabel_symptoms(
+                    session,
+                    starts,
+                    span_start=starts[0],
+                    only_unlabeled=True,
+                    user_id=owner,
+                    update_counters=False
+                )
+            session.commit()
+
+            if relabeled:
+                logger.info(f"Backfilled cycle phase for {relabeled} symptoms")
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error backfilling cycle phases: {str(e)}")
+
+        finally:
+            session.close()
+
+    def _backfill_pattern_counters(self) -> None:
+        """
+        Costruisce i contatori dei pattern per gli utenti che non li hanno
+        ancora (database creati prima delle tabelle di stato).
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            owners = [row[0] for row in session.query(SymptomRecord.user_id).distinct()]
+            with_counters = {
+                row[0] for row in session.query(PhaseSymptomCount.user_id).distinct()
+            }
+
+            missing = [owner for owner in owners if user_key(owner) not in with_counters]
+            for owner in missing:
+                pattern_state.rebuild(session, owner)
+            session.commit()
+
+            if missing:
+                logger.info(f"Built pattern counters for {len(missing)} users")
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error building pattern counters: {str(e)}")
+
+        finally:
+            session.close()
+
+    def _backfill_symptom_baselines(self) -> None:
+        """
+        Costruisce le baseline EWMA per gli utenti che non le hanno ancora
+        (database creati prima della tabella symptom_baselines).
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            owners = [row[0] for row in session.query(SymptomRecord.user_id).distinct()]
+            with_baselines = {
+                row[0] for row in session.query(SymptomBaseline.user_id).distinct()
+            }
+
+            missing = [owner for owner in owners if user_key(owner) not in with_baselines]
+            for owner in missing:
+                anomaly_state.rebuild(session, owner)
+            session.commit()
+
+            if missing:
+                logger.info(f"Built symptom baselines for {len(missing)} users")
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error building symptom baselines: {str(e)}")
+
+        finally:
+            session.close()
+
+    def _backfill_intensity_sketches(self) -> None:
+        """
+        Costruisce gli sketch delle intensità per gli utenti che non li
+        hanno ancora (database creati prima della tabella intensity_sketches).
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            owners = [row[0] for row in session.query(SymptomRecord.user_id).distinct()]
+            with_sketches = {
+                row[0] for row in session.query(IntensitySketchRecord.user_id).distinct()
+            }
+
+            missing = [owner for owner in owners if user_key(owner) not in with_sketches]
+            for owner in missing:
+                intensity_sketch.rebuild(session, owner)
+            session.commit()
+
+            if missing:
+                logger.info(f"Built intensity sketches for {len(missing)} users")
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error building intensity sketches: {str(e)}")
+
+        finally:
+            session.close()
+
+    def _backfill_cycle_statistics(self) -> None:
+        """
+        Costruisce le statistiche dei cicli per gli utenti che non le hanno
+        ancora (database creati prima della tabella cycle_statistics).
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            owners = [row[0] for row in session.query(CycleRecord.user_id).distinct()]
+            with_statistics = {
+                row[0] for row in session.query(CycleStatistics.user_id).distinct()
+            }
+
+            missing = [owner for owner in owners if user_key(owner) not in with_statistics]
+            for owner in missing:
+                cycle_state.rebuild(session, owner)
+            session.commit()
+
+            if missing:
+                logger.info(f"Built cycle statistics for {len(missing)} users")
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error building cycle statistics: {str(e)}")
+
+        finally:
+            session.close()
+
+    def rebuild_cycle_statistics(self, user_id: Optional[int] = None) -> bool:
+        """
+        Ricostruisce da zero le statistiche dei cicli di un utente.
+
+        Da usare dopo scritture bulk che non passano da add_cycle.
+
+        Args:
+            user_id: Owner dei cicli (None = storico locale)
+
+        Returns:
+            True se ricostruite, False altrimenti
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            cycle_state.rebuild(session, user_id)
+            _clear_forecasts(session, user_id)
+            session.commit()
+            return True
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error rebuilding cycle statistics: {str(e)}")
+            return False
+
+        finally:
+            session.close()
+
+    def rebuild_intensity_sketches(self, user_id: Optional[int] = None) -> bool:
+        """
+        Ricostruisce da zero gli sketch delle intensità di un utente.
+
+        Da usare dopo scritture bulk che non passano da add_symptom.
+
+        Args:
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            True se ricostruiti, False altrimenti
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            intensity_sketch.rebuild(session, user_id)
+            session.commit()
+            return True
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error rebuilding intensity sketches: {str(e)}")
+            return False
+
+        finally:
+            session.close()
+
+    def get_intensity_sketches(
+        self,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> Dict[Optional[int], Dict[str, intensity_sketch.IntensitySketch]]:
+        """
+        Sketch delle intensità per utente e tipo su una finestra.
+
+        Args:
+            start_date: Inizio della finestra
+            end_date: Fine della finestra (default: ora)
+            user_ids: Utenti da leggere (default: solo lo storico locale)
+
+        Returns:
+            Dizionario user_id -> {symptom_type: IntensitySketch}
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            return intensity_sketch.read_sketches(
+                session, user_ids if user_ids is not None else [None],
+                start_date, end_date or datetime.now()
+            )
+
+        except Exception as e:
+            logger.error(f"Error reading intensity sketches: {str(e)}")
+            return {}
+
+        finally:
+            session.close()
+
+    def get_intensity_percentiles(
+        self,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Conteggio, media e percentili dell'intensità per tipo di sintomo.
+
+        Args:
+            start_date: Inizio della finestra
+            end_date: Fine della finestra (default: ora)
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            Dizionario symptom_type -> {count, mean, p10, p25, median, p75, p90}
+        """
+        sketches = self.get_intensity_sketches(start_date, end_date, [user_id])
+        return {
+            stype: sketch.summary()
+            for stype, sketch in sorted(sketches.get(user_id, {}).items())
+        }
+
+    def rebuild_symptom_baselines(self, user_id: Optional[int] = None) -> bool:
+        """
+        Ricostruisce da zero le baseline EWMA di un utente.
+
+        Da usare dopo scritture bulk che non passano da add_symptom.
+
+        Args:
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            True se ricostruite, False altrimenti
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            anomaly_state.rebuild(session, user_id)
+            session.commit()
+            return True
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error rebuilding symptom baselines: {str(e)}")
+            return False
+
+        finally:
+            session.close()
+
+    def rebuild_pattern_counters(self, user_id: Optional[int] = None) -> bool:
+        """
+        Ricostruisce da zero i contatori dei pattern di un utente.
+
+        Da usare dopo scritture bulk che non passano da add_symptom/add_cycle.
+
+        Args:
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            True se ricostruiti, False altrimenti
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            pattern_state.rebuild(session, user_id)
+            session.commit()
+            return True
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error rebuilding pattern counters: {str(e)}")
+            return False
+
+        finally:
+            session.close()
+
+    def get_pattern_counters(
+        self,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Legge i contatori fase × sintomo e delle combinazioni giornaliere.
+
+        I mesi interi si leggono dai contatori, quelli di start_date e
+        end_date dai soli sintomi della finestra: il risultato è esatto.
+
+        Args:
+            start_date: Inizio della finestra
+            end_date: Fine della finestra (default: ora)
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            Dizionario con total, phase_patterns e symptom_combos
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            return pattern_state.read_counters(
+                session, user_id, start_date, end_date or datetime.now()
+            )
+
+        except Exception as e:
+            logger.error(f"Error retrieving pattern counters: {str(e)}")
+            return {'total': 0, 'phase_patterns': {}, 'symptom_combos': {}}
+
+        finally:
+            session.close()
+
+    # ========================================================================
+    # FASE 3: Cycle Tracking Methods
+    # ========================================================================
+
+    def add_cycle(
+        self,
+        cycle: CycleEntry,
+        user_id: Optional[int] = None
+    ) -> CycleResponse:
+        """
+        Aggiunge un nuovo ciclo mestruale al database.
+
+        Args:
+            cycle: CycleEntry validato con Pydantic
+            user_id: Owner del ciclo (None = storico locale)
+
+        Returns:
+            CycleResponse con esito operazione
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            # Crea record database
+            record = CycleRecord(
+                start_date=cycle.start_date,
+                end_date=cycle.end_date,
+                flow_intensity=cycle.flow_intensity.value,
+                notes=cycle.notes,
+                user_id=user_id
+            )
+
+            session.add(record)
+            session.flush()
+
+            cycle_state.cycle_added(session, user_id, record.start_date, record.end_date)
+
+            # Il nuovo inizio sposta i confini: rietichetta solo lo span toccato
+            relabeled = self._relabel_cycle_span(session, record.start_date, user_id)
+            _clear_forecasts(session, user_id)
+
+            session.commit()
+            session.refresh(record)
+
+            if relabeled:
+                logger.info(f"Relabeled cycle phase for {relabeled} symptoms")
+
+            # Calcola lunghezza ciclo se end_date presente
+            cycle_length = None
+            if record.end_date:
+                cycle_length = (record.end_date - record.start_date).days
+
+            logger.info(f"Cycle added: ID={record.id}, start={record.start_date}")
+
+            return CycleResponse(
+                success=True,
+                message="Ciclo mestruale registrato con successo",
+                entry_id=record.id,
+                cycle_length=cycle_length,
+                timestamp=datetime.now()
+            )
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error adding cycle: {str(e)}")
+
+            return CycleResponse(
+                success=False,
+                message=f"Errore nel salvare il ciclo: {str(e)}",
+                timestamp=datetime.now()
+            )
+
+        finally:
+            session.close()
+
+    def get_cycles(
+        self,
+        limit: int = 10,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recupera cicli dal database con filtri opzionali.
+
+        Args:
+            limit: Numero massimo di risultati
+            start_date: Filtra da questa data
+            end_date: Filtra fino a questa data
+            user_id: Owner dei cicli (None = storico locale)
+
+        Returns:
+            Lista di cicli come dizionari
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            query = session.query(CycleRecord).filter(
+                user_filter(CycleRecord.user_id, user_id)
+            )
+
+            # Applica filtri
+            if start_date:
+                query = query.filter(CycleRecord.start_date >= start_date)
+
+            if end_date:
+                query = query.filter(CycleRecord.start_date <= end_date)
+
+            # Ordina per start_date discendente (più recenti prima)
+            query = query.order_by(desc(CycleRecord.start_date))
+
+            # Limita risultati
+            records = query.limit(limit).all()
+
+            logger.info(f"Retrieved {len(records)} cycle records")
+
+            # Converti in dizionari con calcolo cycle_length
+            return [_cycle_to_dict(record) for record in records]
+
+        except Exception as e:
+            logger.error(f"Error retrieving cycles: {str(e)}")
+            return []
+
+        finally:
+            session.close()
+
+    def update_cycle_end_date(
+        self,
+        cycle_id: int,
+        end_date: datetime,
+        user_id: Optional[int] = None
+    ) -> CycleResponse:
+        """
+        Aggiorna la data di fine di un ciclo esistente.
+
+        Args:
+            cycle_id: ID del ciclo da aggiornare
+            end_date: Nuova data di fine
+            user_id: Owner del ciclo (None = storico locale); i cicli di
+                     altri utenti risultano non trovati
+
+        Returns:
+            CycleResponse con esito operazione
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            record = session.query(CycleRecord).filter(
+                CycleRecord.id == cycle_id,
+                user_filter(CycleRecord.user_id, user_id)
+            ).first()
+
+            if not record:
+                return CycleResponse(
+                    success=False,
+                    message=f"Ciclo con ID {cycle_id} non trovato",
+                    timestamp=datetime.now()
+                )
+
+            # Valida che end_date sia dopo start_date
+            if end_date < record.start_date:
+                return CycleResponse(
+                    success=False,
+                    message="La data di fine deve essere dopo la data di inizio",
+                    timestamp=datetime.now()
+                )
+
+            # end_date non sposta i confini di fase (basati sugli inizi ciclo):
+            # i cycle_phase denormalizzati restano validi
+            old_end = record.end_date
+            record.end_date = end_date
+            session.flush()
+
+            cycle_state.cycle_end_changed(
+                session, record.user_id, record.start_date, old_end, end_date
+            )
+            _clear_forecasts(session, record.user_id)
+            session.commit()
+            session.refresh(record)
+
+            cycle_length = (record.end_date - record.start_date).days
+
+            logger.info(f"Cycle updated: ID={cycle_id}, end_date={end_date}")
+
+            return CycleResponse(
+                success=True,
+                message="Data di fine ciclo aggiornata con successo",
+                entry_id=record.id,
+                cycle_length=cycle_length,
+                timestamp=datetime.now()
+            )
 
         except Exception as e:
             session.rollback()
@@ -443,102 +1380,738 @@ class DatabaseManager:
 
     def get_cycle_summary(
         self,
-        months: int = 6
+        months: Optional[int] = 6,
+        user_id: Optional[int] = None
     ) -> CycleSummary:
         """
         Genera un riepilogo statistico dei cicli mestruali.
 
+        Intervallo medio e predizione vengono sempre dalla riga di
+        cycle_statistics dell'utente (ultimo inizio e media pesata recente
+        degli intervalli, aggiornati in scrittura). Anche le lunghezze e la
+        regolarità si leggono dalla riga se la finestra contiene tutto lo
+        storico (o months è None); altrimenti si calcolano sui soli cicli
+        chiusi iniziati nella finestra, caricati come CycleSeries.
+        total_cycles conta i cicli chiusi della finestra.
+
         Args:
-            months: Numero di mesi da analizzare (default: 6)
+            months: Numero di mesi da analizzare (default: 6, None = tutto lo storico)
+            user_id: Owner dei cicli (None = storico locale)
 
         Returns:
             CycleSummary con statistiche
         """
+        empty = CycleSummary(
+            total_cycles=0,
+            average_cycle_length=None,
+            shortest_cycle=None,
+            longest_cycle=None,
+            regularity_score=None,
+            predicted_next_start=None
+        )
         session: Session = self.SessionMaker()
 
         try:
+            stats = session.query(CycleStatistics).filter(
+                CycleStatistics.user_id == user_key(user_id)
+            ).one_or_none()
+
+            if stats is None:
+                return empty
+
+            summary = cycle_state.summarize(stats)
+
             # Calcola date range
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=months * 30)
+            start_date = end_date - timedelta(days=months * 30) if months is not None else None
 
-            # Query per cicli nel periodo con end_date non null
-            query = session.query(CycleRecord).filter(
-                CycleRecord.start_date >= start_date,
-                CycleRecord.start_date <= end_date,
-                CycleRecord.end_date.isnot(None)
+            covers_history = start_date is None or (
+                stats.first_start >= start_date and stats.last_start <= end_date
             )
+            if not covers_history:
+                summary.update(self._window_cycle_lengths(start_date, end_date, user_id))
 
-            # Conta totale
-            total_cycles = query.count()
-
-            if total_cycles == 0:
-                return CycleSummary(
-                    total_cycles=0,
-                    average_cycle_length=None,
-                    shortest_cycle=None,
-                    longest_cycle=None,
-                    regularity_score=None,
-                    predicted_next_start=None
+            logger.info(f"Generated cycle summary: {summary['total_cycles']} cycles in last {months} months")
+
+            return CycleSummary(**summary)
+
+        except Exception as e:
+            logger.error(f"Error generating cycle summary: {str(e)}")
+            return empty
+
+        finally:
+            session.close()
+
+    def _window_cycle_lengths(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[int]
+    ) -> Dict[str, Any]:
+        """Statistiche delle lunghezze dei soli cicli chiusi iniziati nella finestra"""
+        cycle_lengths = self.load_cycle_series(start_date, end_date, user_id=user_id).durations()
+
+        if len(cycle_lengths) == 0:
+            return {
+                "total_cycles": 0,
+                "average_cycle_length": None,
+                "shortest_cycle": None,
+                "longest_cycle": None,
+                "regularity_score": None
+            }
+
+        # Calcola regularity score (più bassa la varianza, più alto il score)
+        std_dev = float(cycle_lengths.std())
+
+        return {
+            "total_cycles": len(cycle_lengths),
+            "average_cycle_length": round(float(cycle_lengths.mean()), 1),
+            "shortest_cycle": int(cycle_lengths.min()),
+            "longest_cycle": int(cycle_lengths.max()),
+            "regularity_score": round(max(0, 100 - (std_dev * 10)), 1)
+        }
+
+    # ========================================================================
+    # Import di storici da altre app (tools.history_importer)
+    # ========================================================================
+
+    def import_cycles(
+        self,
+        cycles: List[CycleEntry],
+        user_id: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Inserisce un batch di cicli importati, saltando quelli già presenti.
+
+        Un ciclo importato è identificato dal suo inizio: i cicli con un
+        inizio già registrato (anche a mano) sono saltati, e la source_key
+        con INSERT ... ON CONFLICT DO NOTHING rende idempotenti i reimport.
+        Statistiche e fasi dei sintomi si aggiornano una volta a fine import
+        con refresh_imported_history.
+
+        Args:
+            cycles: Cicli validati
+            user_id: Owner dei cicli (None = storico locale)
+
+        Returns:
+            Numero di cicli inseriti, None in caso di errore
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            inserted = 0
+            existing = {
+                row[0] for row in session.query(CycleRecord.start_date).filter(
+                    user_filter(CycleRecord.user_id, user_id),
+                    CycleRecord.start_date.in_({cycle.start_date for cycle in cycles})
+                )
+            } if cycles else set()
+            new_cycles = [cycle for cycle in cycles if cycle.start_date not in existing]
+
+            if new_cycles:
+                result = session.connection().execute(_insert_ignoring_duplicates(session, CycleRecord), [
+                    {
+                        "start_date": cycle.start_date,
+                        "end_date": cycle.end_date,
+                        "flow_intensity": cycle.flow_intensity.value,
+                        "notes": cycle.notes,
+                        "user_id": user_id,
+                        "source_key": cycle_source_key(cycle),
+                    }
+                    for cycle in new_cycles
+                ])
+                inserted = result.rowcount
+            session.commit()
+            return inserted
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error importing cycles: {str(e)}")
+            return None
+
+        finally:
+            session.close()
+
+    def add_symptoms(
+        self,
+        symptoms: List[SymptomEntry],
+        user_id: Optional[int] = None
+    ) -> Optional[List[Optional[SymptomResponse]]]:
+        """
+        Inserisce un batch di sintomi registrati dall'utente (sync offline).
+
+        A differenza di import_symptoms lo stato derivato non viene
+        ricostruito: ogni riga inserita aggiorna contatori, sketch e
+        baseline in O(1) come add_symptom, nella stessa transazione, e
+        riceve la valutazione di anomalia. Le righe già inviate (stessa
+        source_key) sono saltate; le righe sono applicate in ordine di
+        timestamp.
+
+        Args:
+            symptoms: Sintomi validati
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            Lista allineata a symptoms: SymptomResponse per le righe
+            inserite, None per i duplicati; None in caso di errore
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            responses: List[Optional[SymptomResponse]] = [None] * len(symptoms)
+            if symptoms:
+                starts = [row[0] for row in session.query(CycleRecord.start_date).filter(
+                    user_filter(CycleRecord.user_id, user_id)
+                ).order_by(CycleRecord.start_date)]
+                phases, cycle_days = label_cycle_phases([s.timestamp for s in symptoms], starts)
+                stmt = _insert_ignoring_duplicates(session, SymptomRecord).returning(SymptomRecord.id)
+
+                for i in sorted(range(len(symptoms)), key=lambda i: symptoms[i].timestamp):
+                    symptom = symptoms[i]
+                    symptom_type = symptom.symptom_type.value
+                    entry_id = session.execute(stmt, {
+                        "symptom_type": symptom_type,
+                        "intensity": symptom.intensity,
+                        "notes": symptom.notes,
+                        "timestamp": symptom.timestamp,
+                        "cycle_phase": phases[i],
+                        "cycle_day": cycle_days[i],
+                        "user_id": user_id,
+                        "source_key": symptom_source_key(symptom),
+                    }).scalar()
+                    if entry_id is None:
+                        continue
+
+                    pattern_state.symptom_added(
+                        session, user_id, symptom.timestamp, symptom_type, phases[i],
+                        record_id=entry_id
+                    )
+                    intensity_sketch.symptom_added(
+                        session, user_id, symptom.timestamp, symptom_type, symptom.intensity
+                    )
+                    anomaly = anomaly_state.observe(
+                        session, user_id, symptom_type, symptom.intensity
+                    )
+                    responses[i] = SymptomResponse(
+                        success=True,
+                        message=f"Sintomo '{symptom_type}' registrato con successo",
+                        entry_id=entry_id,
+                        timestamp=symptom.timestamp,
+                        anomaly=anomaly
+                    )
+
+            session.commit()
+            return responses
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error adding symptom batch: {str(e)}")
+            return None
+
+        finally:
+            session.close()
+
+    def import_symptoms(
+        self,
+        symptoms: List[SymptomEntry],
+        user_id: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Inserisce un batch di sintomi importati, saltando quelli già importati.
+
+        Ogni riga riceve una source_key derivata da tipo, timestamp e
+        intensità: reimportare lo stesso export (o export sovrapposti) non
+        crea duplicati. Fase e giorno del ciclo sono calcolati sui cicli
+        presenti al momento del batch.
+
+        Args:
+            symptoms: Sintomi validati
+            user_id: Owner dei sintomi (None = storico locale)
+
+        Returns:
+            Numero di sintomi inseriti, None in caso di errore
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            inserted = 0
+            if symptoms:
+                starts = [row[0] for row in session.query(CycleRecord.start_date).filter(
+                    user_filter(CycleRecord.user_id, user_id)
+                ).order_by(CycleRecord.start_date)]
+                phases, cycle_days = label_cycle_phases([s.timestamp for s in symptoms], starts)
+
+                result = session.connection().execute(_insert_ignoring_duplicates(session, SymptomRecord), [
+                    {
+                        "symptom_type": symptom.symptom_type.value,
+                        "intensity": symptom.intensity,
+                        "notes": symptom.notes,
+                        "timestamp": symptom.timestamp,
+                        "cycle_phase": cycle_phase,
+                        "cycle_day": cycle_day,
+                        "user_id": user_id,
+                        "source_key": symptom_source_key(symptom),
+                    }
+                    for symptom, cycle_phase, cycle_day in zip(symptoms, phases, cycle_days)
+                ])
+                inserted = result.rowcount
+            session.commit()
+            return inserted
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error importing symptoms: {str(e)}")
+            return None
+
+        finally:
+            session.close()
+
+    def refresh_imported_history(
+        self,
+        user_id: Optional[int] = None,
+        relabel_from: Optional[datetime] = None
+    ) -> bool:
+        """
+        Aggiorna lo stato derivato dopo un import, in un'unica transazione.
+
+        I cicli importati spostano le fasi dei sintomi successivi al ciclo
+        che precede relabel_from; contatori, baseline, sketch e statistiche
+        dei cicli si ricostruiscono una volta sola invece che per riga.
+
+        Args:
+            user_id: Owner dello storico (None = storico locale)
+            relabel_from: Primo inizio ciclo importato (None = nessun ciclo)
+
+        Returns:
+            True se aggiornato, False altrimenti
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            if relabel_from is not None:
+                starts = [row[0] for row in session.query(CycleRecord.start_date).filter(
+                    user_filter(CycleRecord.user_id, user_id)
+                ).order_by(CycleRecord.start_date)]
+                previous = [start for start in starts if start < relabel_from]
+
+                relabeled = self._relabel_symptoms(
+                    session,
+                    starts,
+                    span_start=previous[-1] if previous else None,
+                    user_id=user_id,
+                    update_counters=False
                 )
+                if relabeled:
+                    logger.info(f"Relabeled cycle phase for {relabeled} symptoms")
+
+            pattern_state.rebuild(session, user_id)
+            anomaly_state.rebuild(session, user_id)
+            intensity_sketch.rebuild(session, user_id)
+            cycle_state.rebuild(session, user_id)
+            _clear_forecasts(session, user_id)
+            session.commit()
+            return True
 
-            # Recupera tutti i cicli per calcoli
-            cycles = query.order_by(CycleRecord.start_date).all()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error refreshing imported history: {str(e)}")
+            return False
+
+        finally:
+            session.close()
+
+    # ========================================================================
+    # Forecast calendari (generati in batch da tools.forecast_engine)
+    # ========================================================================
+
+    def get_forecast_parameters(
+        self,
+        active_since: Optional[datetime] = None,
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> List[Tuple]:
+        """
+        Parametri di previsione per utente dalla tabella cycle_statistics.
+
+        Args:
+            active_since: Solo utenti con ultimo inizio da questa data
+            user_ids: Utenti da leggere (None = tutti)
+
+        Returns:
+            Tuple (user_id, last_start, interval_ewma, interval_count,
+            length_sum, closed_count) ordinate per utente
+        """
+        session: Session = self.SessionMaker()
 
-            # Calcola lunghezze cicli
-            cycle_lengths = [
-                (c.end_date - c.start_date).days
-                for c in cycles
-                if c.end_date
+        try:
+            query = session.query(
+                CycleStatistics.user_id,
+                CycleStatistics.last_start,
+                CycleStatistics.interval_ewma,
+                CycleStatistics.interval_count,
+                CycleStatistics.length_sum,
+                CycleStatistics.closed_count
+            ).filter(CycleStatistics.last_start.isnot(None))
+
+            if active_since:
+                query = query.filter(CycleStatistics.last_start >= active_since)
+
+            if user_ids is not None:
+                query = query.filter(CycleStatistics.user_id.in_([user_key(u) for u in user_ids]))
+
+            return [
+                (user_from_key(row[0]),) + tuple(row[1:])
+                for row in query.order_by(CycleStatistics.user_id)
             ]
 
-            if not cycle_lengths:
-                return CycleSummary(
-                    total_cycles=total_cycles,
-                    average_cycle_length=None,
-                    shortest_cycle=None,
-                    longest_cycle=None,
-                    regularity_score=None,
-                    predicted_next_start=None
+        except Exception as e:
+            logger.error(f"Error retrieving forecast parameters: {str(e)}")
+            return []
+
+        finally:
+            session.close()
+
+    def replace_forecasts(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> Optional[int]:
+        """
+        Sostituisce i calendari previsti in un'unica transazione.
+
+        Args:
+            rows: Righe di CycleForecast come dizionari (user_id già come chiave)
+            user_ids: Utenti da sostituire (None = tutta la tabella)
+
+        Returns:
+            Numero di righe scritte, None in caso di errore
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            query = session.query(CycleForecast)
+            if user_ids is not None:
+                query = query.filter(CycleForecast.user_id.in_([user_key(u) for u in user_ids]))
+            query.delete(synchronize_session=False)
+
+            written = 0
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= 10_000:
+                    session.execute(insert(CycleForecast), batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                session.execute(insert(CycleForecast), batch)
+                written += len(batch)
+
+            session.commit()
+            return written
+
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error writing forecasts: {str(e)}")
+            return None
+
+        finally:
+            session.close()
+
+    def get_forecasts(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> Dict[Optional[int], List[Dict[str, Any]]]:
+        """
+        Legge i calendari previsti che si sovrappongono alla finestra.
+
+        Args:
+            start_date: Cicli che terminano dopo questa data
+            end_date: Cicli che iniziano entro questa data
+            user_ids: Utenti da leggere (None = tutti, None nella lista = storico locale)
+
+        Returns:
+            Dizionario user_id -> cicli previsti in ordine, ognuno con le fasi
+            come intervalli [start, end] inclusivi
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            query = session.query(CycleForecast)
+
+            if user_ids is not None:
+                query = query.filter(CycleForecast.user_id.in_([user_key(u) for u in user_ids]))
+
+            if start_date:
+                query = query.filter(CycleForecast.next_start > start_date)
+
+            if end_date:
+                query = query.filter(CycleForecast.cycle_start <= end_date)
+
+            result: Dict[Optional[int], List[Dict[str, Any]]] = defaultdict(list)
+            for record in query.order_by(CycleForecast.user_id, CycleForecast.cycle_number):
+                result[user_from_key(record.user_id)].append(_forecast_to_dict(record))
+
+            return dict(result)
+
+        except Exception as e:
+            logger.error(f"Error retrieving forecasts: {str(e)}")
+            return {}
+
+        finally:
+            session.close()
+
+
+    # ========================================================================
+    # Embedding delle note (indice append-only, scritto da tools.note_search)
+    # ========================================================================
+
+    def get_unembedded_notes(
+        self,
+        user_ids: Optional[List[Optional[int]]] = None
+    ) -> List[Tuple[Optional[int], str, int, str]]:
+        """
+        Note di sintomi e cicli senza embedding o con embedding di un testo diverso.
+
+        Il testo è confrontato con il text_hash dell'embedding: le note
+        modificate (e i record che riusano l'id di uno eliminato) sono
+        restituite per un nuovo embedding.
+
+        Args:
+            user_ids: Utenti da leggere (None = tutti, None nella lista = storico locale)
+
+        Returns:
+            Tuple (user_id, source, record_id, notes) in ordine di id
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            pending = []
+            for source, model in (("symptom", SymptomRecord), ("cycle", CycleRecord)):
+                query = session.query(
+                    model.user_id, model.id, model.notes, NoteEmbedding.text_hash
+                ).outerjoin(
+                    NoteEmbedding,
+                    and_(
+                        NoteEmbedding.source == source,
+                        NoteEmbedding.record_id == model.id,
+                        NoteEmbedding.user_id == func.coalesce(model.user_id, LOCAL_USER_KEY)
+                    )
+                ).filter(
+                    model.notes.isnot(None),
+                    model.notes != ""
                 )
 
-            # Statistiche di base
-            avg_length = sum(cycle_lengths) / len(cycle_lengths)
-            shortest = min(cycle_lengths)
-            longest = max(cycle_lengths)
+                if user_ids is not None:
+                    query = query.filter(users_filter(model.user_id, user_ids))
 
-            # Calcola regularity score (più bassa la varianza, più alto il score)
-            variance = sum((x - avg_length) ** 2 for x in cycle_lengths) / len(cycle_lengths)
-            std_dev = variance ** 0.5
-            regularity = max(0, 100 - (std_dev * 10))  # 0-100 scale
+                pending.extend(
+                    (owner, source, record_id, notes)
+                    for owner, record_id, notes, text_hash in query.order_by(model.id)
+                    if text_hash != note_hash(notes)
+                )
 
-            # Predici prossimo ciclo basato su media
-            last_cycle = cycles[-1]
-            if last_cycle.end_date:
-                predicted_next = last_cycle.end_date + timedelta(days=int(avg_length))
-            else:
-                predicted_next = None
+            return pending
 
-            logger.info(f"Generated cycle summary: {total_cycles} cycles in last {months} months")
+        except Exception as e:
+            logger.error(f"Error retrieving unembedded notes: {str(e)}")
+            return []
 
-            return CycleSummary(
-                total_cycles=total_cycles,
-                average_cycle_length=round(avg_length, 1),
-                shortest_cycle=shortest,
-                longest_cycle=longest,
-                regularity_score=round(regularity, 1),
-                predicted_next_start=predicted_next
-            )
+        finally:
+            session.close()
+
+    def add_note_embeddings(self, rows: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        Salva embedding di note, sostituendo quelli esistenti degli stessi record.
+
+        Le righe sostituite sono eliminate e reinserite, così ricevono un id
+        nuovo e le letture incrementali (get_note_embeddings) le vedono.
+
+        Args:
+            rows: Righe di NoteEmbedding come dizionari (user_id già come chiave)
+
+        Returns:
+            Numero di righe scritte, None in caso di errore
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            written = 0
+            if rows:
+                replaced = defaultdict(list)
+                for row in rows:
+                    replaced[(row["user_id"], row["source"])].append(row["record_id"])
+
+                for (owner, source), record_ids in replaced.items():
+                    session.query(NoteEmbedding).filter(
+                        NoteEmbedding.user_id == owner,
+                        NoteEmbedding.source == source,
+                        NoteEmbedding.record_id.in_(record_ids)
+                    ).delete(synchronize_session=False)
+
+                result = session.connection().execute(
+                    _insert_ignoring_duplicates(session, NoteEmbedding), rows
+                )
+                written = result.rowcount
+            session.commit()
+            return written
 
         except Exception as e:
-            logger.error(f"Error generating cycle summary: {str(e)}")
-            return CycleSummary(
-                total_cycles=0,
-                average_cycle_length=None,
-                shortest_cycle=None,
-                longest_cycle=None,
-                regularity_score=None,
-                predicted_next_start=None
+            session.rollback()
+            logger.error(f"Error adding note embeddings: {str(e)}")
+            return None
+
+        finally:
+            session.close()
+
+    def get_note_embeddings(
+        self,
+        user_id: Optional[int] = None,
+        after_id: int = 0
+    ) -> List[Tuple[int, str, int, bytes, Optional[str]]]:
+        """
+        Embedding delle note di un utente scritti dopo after_id.
+
+        Args:
+            user_id: Owner delle note (None = storico locale)
+            after_id: Ultimo id già letto (0 = tutti)
+
+        Returns:
+            Tuple (id, source, record_id, vector, text_hash) in ordine di id
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            query = session.query(
+                NoteEmbedding.id, NoteEmbedding.source,
+                NoteEmbedding.record_id, NoteEmbedding.vector,
+                NoteEmbedding.text_hash
+            ).filter(
+                NoteEmbedding.user_id == user_key(user_id),
+                NoteEmbedding.id > after_id
+            ).order_by(NoteEmbedding.id)
+
+            return [tuple(row) for row in query]
+
+        except Exception as e:
+            logger.error(f"Error retrieving note embeddings: {str(e)}")
+            return []
+
+        finally:
+            session.close()
+
+    def get_note_entries(
+        self,
+        refs: List[Tuple[str, int]],
+        user_id: Optional[int] = None
+    ) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """
+        Sintomi e cicli di un utente per (source, record_id).
+
+        Args:
+            refs: Coppie (source, record_id) da leggere
+            user_id: Owner dei record (None = storico locale)
+
+        Returns:
+            Dizionario (source, record_id) -> record come dizionario
+            (i record eliminati o di altri utenti sono assenti)
+        """
+        session: Session = self.SessionMaker()
+
+        try:
+            entries = {}
+            sources = (
+                ("symptom", SymptomRecord, lambda record: record.to_dict()),
+                ("cycle", CycleRecord, _cycle_to_dict),
             )
+            for source, model, to_dict in sources:
+                ids = [record_id for ref_source, record_id in refs if ref_source == source]
+                if not ids:
+                    continue
+
+                records = session.query(model).filter(
+                    model.id.in_(ids),
+                    user_filter(model.user_id, user_id)
+                )
+                entries.update({(source, record.id): to_dict(record) for record in records})
+
+            return entries
+
+        except Exception as e:
+            logger.error(f"Error retrieving note entries: {str(e)}")
+            return {}
 
         finally:
             session.close()
+
+
+def _cycle_to_dict(record: CycleRecord) -> Dict[str, Any]:
+    """Ciclo come dizionario, con lunghezza se concluso"""
+    return {
+        'id': record.id,
+        'start_date': record.start_date.isoformat(),
+        'end_date': record.end_date.isoformat() if record.end_date else None,
+        'flow_intensity': record.flow_intensity,
+        'notes': record.notes,
+        'created_at': record.created_at.isoformat(),
+        'cycle_length': (record.end_date - record.start_date).days if record.end_date else None
+    }
+
+
+def _with_epochs(rows: List[tuple]) -> List[tuple]:
+    """Righe con il datetime in prima colonna sostituito dall'epoch (calcolato in Python)"""
+    epochs = to_epochs([row[0] for row in rows]).tolist()
+    return [(epoch,) + tuple(row[1:]) for epoch, row in zip(epochs, rows)]
+
+
+def symptom_source_key(symptom: SymptomEntry) -> str:
+    """Chiave di deduplica di un sintomo importato (tipo, timestamp, intensità)"""
+    content = f"{symptom.symptom_type.value}|{symptom.timestamp.isoformat()}|{symptom.intensity}"
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def note_hash(notes: Optional[str]) -> str:
+    """Hash del testo di una nota (NoteEmbedding.text_hash)"""
+    return hashlib.sha1((notes or "").encode("utf-8")).hexdigest()
+
+
+def cycle_source_key(cycle: CycleEntry) -> str:
+    """Chiave di deduplica di un ciclo importato (data di inizio)"""
+    return hashlib.sha1(cycle.start_date.isoformat().encode("utf-8")).hexdigest()
+
+
+def _insert_ignoring_duplicates(session: Session, model):
+    """INSERT ... ON CONFLICT DO NOTHING nel dialetto del database della sessione"""
+    return dialect_insert(session, model).on_conflict_do_nothing()
+
+
+def _clear_forecasts(session: Session, user_id: Optional[int]) -> None:
+    """Elimina i calendari salvati di un utente i cui cicli sono cambiati"""
+    session.query(CycleForecast).filter(
+        CycleForecast.user_id == user_key(user_id)
+    ).delete(synchronize_session=False)
+
+
+def _forecast_to_dict(record: CycleForecast) -> Dict[str, Any]:
+    """Ciclo previsto con le fasi non vuote come intervalli inclusivi di date"""
+    one_day = timedelta(days=1)
+    boundaries = (
+        ("early", record.cycle_start, record.mid_start),
+        ("mid", record.mid_start, record.late_start),
+        ("late", record.late_start, record.pre_menstrual_start),
+        ("pre_menstrual", record.pre_menstrual_start, record.next_start),
+    )
+
+    return {
+        "cycle_number": record.cycle_number,
+        "predicted": record.cycle_number > 0,
+        "cycle_start": record.cycle_start.date().isoformat(),
+        "period_end": record.period_end.date().isoformat(),
+        "next_start": record.next_start.date().isoformat(),
+        "interval_days": round(record.interval_days, 1),
+        "phases": {
+            phase: {"start": start.date().isoformat(), "end": (end - one_day).date().isoformat()}
+            for phase, start, end in boundaries if end > start
+        },
+        "generated_at": record.generated_at.isoformat()
+    }
@@ -0,0 +1,255 @@
+"""
+Intensity Sketch - Distribuzioni di intensità mergeable per utente, tipo e mese
+Percentili (mediana, p90, ...) senza rileggere i sintomi
+
+L'intensità è un intero 1-10: l'istogramma dei 10 livelli è uno sketch
+esatto, più piccolo di un t-digest o di un KLL e con merge esatto (somma),
+che supporta anche la rimozione. Ogni sketch è serializzato in forma
+sparsa (livello, conteggio varint): pochi byte per riga.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from database.pattern_state import month_key
+from database.schema import SymptomRecord, IntensitySketchRecord, user_filter, user_key, users_filter
+
+INTENSITY_LEVELS = 10
+SKETCH_QUANTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+class IntensitySketch:
+    """Istogramma delle intensità 1-10 con merge, quantili e serializzazione"""
+
+    __slots__ = ("counts",)
+
+    def __init__(self, counts: Optional[Iterable[int]] = None):
+        self.counts = list(counts) if counts is not None else [0] * INTENSITY_LEVELS
+
+    def add(self, intensity: int, count: int = 1) -> None:
+        """Aggiunge (o rimuove, con count negativo) registrazioni di un livello"""
+        level = min(max(int(intensity), 1), INTENSITY_LEVELS) - 1
+        self.counts[level] = max(0, self.counts[level] + count)
+
+    def merge(self, other: "IntensitySketch") -> "IntensitySketch":
+        """Unisce other in questo sketch (in place) e lo restituisce"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def mean(self) -> Optional[float]:
+        total = self.total
+        if total == 0:
+            return None
+        return sum((level + 1) * n for level, n in enumerate(self.counts)) / total
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Livello più basso con frequenza cumulativa >= q · totale"""
+        total = self.total
+        if total == 0:
+            return None
+        target, cumulative = q * total, 0
+        for level, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target and cumulative > 0:
+                return level + 1
+        return INTENSITY_LEVELS
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Conteggio, media e quantili SKETCH_QUANTILES"""
+        mean = self.mean()
+        return {
+            "count": self.total,
+            "mean": round(mean, 2) if mean is not None else None,
+            **{name: self.quantile(q) for name, q in SKETCH_QUANTILES.items()}
+        }
+
+    def to_bytes(self) -> bytes:
+        """Serializzazione sparsa: per ogni livello non vuoto, livello + varint"""
+        out = bytearray()
+        for level, n in enumerate(self.counts):
+            if n <= 0:
+                continue
+            out.append(level)
+            while True:
+                byte, n = n & 0x7F, n >> 7
+                out.append(byte | (0x80 if n else 0))
+                if not n:
+                    break
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IntensitySketch":
+        sketch = cls()
+        i = 0
+        while i < len(data):
+            level, value, shift = data[i], 0, 0
+            i += 1
+            while True:
+                byte = data[i]
+                i += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+            sketch.counts[level] = value
+        return sketch
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, IntensitySketch) and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return f"IntensitySketch({self.counts})"
+
+
+def _apply(
+    session: Session,
+    user_id: Optional[int],
+    timestamp: datetime,
+    symptom_type: str,
+    intensity: int,
+    delta: int
+) -> None:
+    """Aggiorna lo sketch (utente, mese, tipo) con una lettura e una scrittura"""
+    key, month = user_key(user_id), month_key(timestamp)
+    record = session.query(IntensitySketchRecord).filter(
+        IntensitySketchRecord.user_id == key,
+        IntensitySketchRecord.month == month,
+        IntensitySketchRecord.symptom_type == symptom_type
+    ).one_or_none()
+
+    sketch = IntensitySketch.from_bytes(record.sketch) if record else IntensitySketch()
+    sketch.add(intensity, delta)
+
+    if sketch.total == 0:
+        if record:
+            session.delete(record)
+    elif record:
+        record.sketch = sketch.to_bytes()
+    else:
+        session.add(IntensitySketchRecord(
+            user_id=key, month=month, symptom_type=symptom_type, sketch=sketch.to_bytes()
+        ))
+
+
+def symptom_added(session, user_id, timestamp, symptom_type, intensity) -> None:
+    """Da chiamare nella transazione dell'insert del sintomo"""
+    _apply(session, user_id, timestamp, symptom_type, intensity, 1)
+
+
+def symptom_removed(session, user_id, timestamp, symptom_type, intensity) -> None:
+    """Da chiamare nella transazione della cancellazione del sintomo"""
+    _apply(session, user_id, timestamp, symptom_type, intensity, -1)
+
+
+def rebuild(session: Session, user_id: Optional[int]) -> None:
+    """
+    Ricostruisce da zero gli sketch di un utente con un GROUP BY
+    mese/tipo/intensità. Usato per i database esistenti e dopo caricamenti
+    bulk che non passano da add_symptom.
+    """
+    key = user_key(user_id)
+    session.query(IntensitySketchRecord).filter(
+        IntensitySketchRecord.user_id == key
+    ).delete(synchronize_session=False)
+
+    month = func.strftime('%Y-%m', SymptomRecord.timestamp)
+    sketches: Dict[Tuple[str, str], IntensitySketch] = defaultdict(IntensitySketch)
+    for month_value, stype, intensity, count in session.query(
+        month, SymptomRecord.symptom_type, SymptomRecord.intensity, func.count(SymptomRecord.id)
+    ).filter(
+        user_filter(SymptomRecord.user_id, user_id)
+    ).group_by(month, SymptomRecord.symptom_type, SymptomRecord.intensity):
+        sketches[(month_value, stype)].add(intensity, count)
+
+    session.add_all(
+        IntensitySketchRecord(user_id=key, month=m, symptom_type=stype, sketch=s.to_bytes())
+        for (m, stype), s in sketches.items()
+    )
+
+
+def _month_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(timestamp: datetime) -> datetime:
+    start = _month_start(timestamp)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+def read_sketches(
+    session: Session,
+    user_ids: List[Optional[int]],
+    start_date: datetime,
+    end_date: datetime
+) -> Dict[Optional[int], Dict[str, IntensitySketch]]:
+    """
+    Sketch per utente e tipo sulla finestra [start_date, end_date].
+
+    I mesi interamente contenuti nella finestra si leggono dagli sketch
+    (merge per somma); le frazioni di mese ai bordi con un GROUP BY sui
+    soli giorni di bordo, così il risultato è esatto per qualunque finestra.
+
+    Args:
+        session: Sessione aperta
+        user_ids: Utenti da leggere (None = storico locale)
+        start_date: Inizio della finestra
+        end_date: Fine della finestra (inclusa)
+
+    Returns:
+        Dizionario user_id -> {symptom_type: IntensitySketch}
+    """
+    result: Dict[Optional[int], Dict[str, IntensitySketch]] = defaultdict(
+        lambda: defaultdict(IntensitySketch)
+    )
+    keys = {user_key(user_id): user_id for user_id in user_ids}
+
+    full_start = start_date if start_date == _month_start(start_date) else _next_month(start_date)
+    full_end = _month_start(end_date)
+
+    if full_start < full_end:
+        for key, stype, data in session.query(
+            IntensitySketchRecord.user_id,
+            IntensitySketchRecord.symptom_type,
+            IntensitySketchRecord.sketch
+        ).filter(
+            IntensitySketchRecord.user_id.in_(list(keys)),
+            IntensitySketchRecord.month >= month_key(full_start),
+            IntensitySketchRecord.month < month_key(full_end)
+        ):
+            result[keys[key]][stype].merge(IntensitySketch.from_bytes(data))
+
+        edges = or_(
+            and_(SymptomRecord.timestamp >= start_date, SymptomRecord.timestamp < full_start),
+            and_(SymptomRecord.timestamp >= full_end, SymptomRecord.timestamp <= end_date)
+        )
+    else:
+        edges = and_(SymptomRecord.timestamp >= start_date, SymptomRecord.timestamp <= end_date)
+
+    for owner, stype, intensity, count in session.query(
+        SymptomRecord.user_id, SymptomRecord.symptom_type,
+        SymptomRecord.intensity, func.count(SymptomRecord.id)
+    ).filter(
+        users_filter(SymptomRecord.user_id, user_ids), edges
+    ).group_by(SymptomRecord.user_id, SymptomRecord.symptom_type, SymptomRecord.intensity):
+        result[owner][stype].add(intensity, count)
+
+    return {owner: dict(types) for owner, types in result.items()}
+
+
+def merge_sketches(
+    sketches: Iterable[Dict[str, IntensitySketch]]
+) -> Dict[str, IntensitySketch]:
+    """Unisce gli sketch per tipo di più utenti o finestre"""
+    merged: Dict[str, IntensitySketch] = defaultdict(IntensitySketch)
+    for by_type in sketches:
+        for stype, sketch in by_type.items():
+            merged[stype].merge(sketch)
+    return dict(merged)
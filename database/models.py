@@ -4,8 +4,8 @@ Using Pydantic for runtime validation and type safety
 """
 
 from datetime import datetime
-from typing import Optional, Literal
-from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Any, Dict, List, Optional, Literal, Tuple, Union
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
 from enum import Enum
 
 
@@ -85,6 +85,7 @@ class SymptomResponse(BaseModel):
     message: str
     entry_id: Optional[int] = None
     timestamp: datetime
+    anomaly: Optional[Dict[str, Any]] = None
     
     class Config:
         json_schema_extra = {
@@ -103,6 +104,7 @@ class SymptomSummary(BaseModel):
     total_entries: int
     most_common_symptom: Optional[str] = None
     average_intensity: Optional[float] = None
+    intensity_percentiles: Dict[str, Dict[str, Any]] = {}
     date_range: tuple[datetime, datetime]
 
     class Config:
@@ -217,6 +219,7 @@ class CycleSummary(BaseModel):
     shortest_cycle: Optional[int] = None
     longest_cycle: Optional[int] = None
     regularity_score: Optional[float] = None  # 0-100, 100 = molto regolare
+    average_interval: Optional[float] = None  # media pesata recente tra inizi (giorni)
     predicted_next_start: Optional[datetime] = None
 
     class Config:
@@ -227,6 +230,74 @@ class CycleSummary(BaseModel):
                 "shortest_cycle": 26,
                 "longest_cycle": 31,
                 "regularity_score": 75.0,
+                "average_interval": 30.2,
                 "predicted_next_start": "2025-11-15T00:00:00"
             }
         }
+
+
+# ============================================================================
+# Validazione a liste (import ed endpoint batch)
+# ============================================================================
+
+# Un'unica chiamata al core di Pydantic per l'intera lista invece di un
+# costruttore per riga; validatori e messaggi sono quelli dei modelli
+SYMPTOM_ENTRY_LIST = TypeAdapter(List[SymptomEntry])
+CYCLE_ENTRY_LIST = TypeAdapter(List[CycleEntry])
+
+# Variante tollerante: una riga non valida resta il dizionario di input
+# invece di far fallire la lista (union provata da sinistra a destra)
+_TOLERANT_LISTS = {
+    SymptomEntry: TypeAdapter(List[Annotated[Union[SymptomEntry, Dict[str, Any]], Field(union_mode="left_to_right")]]),
+    CycleEntry: TypeAdapter(List[Annotated[Union[CycleEntry, Dict[str, Any]], Field(union_mode="left_to_right")]]),
+}
+_STRICT_LISTS = {SymptomEntry: SYMPTOM_ENTRY_LIST, CycleEntry: CYCLE_ENTRY_LIST}
+
+
+def validate_entries(
+    model: type,
+    rows: List[Dict[str, Any]]
+) -> Tuple[List[Any], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Valida un batch di righe senza interromperlo alla prima riga non valida.
+
+    Un solo passaggio sulla lista separa righe valide e non valide; solo
+    le righe non valide sono rivalidate (con SYMPTOM_ENTRY_LIST /
+    CYCLE_ENTRY_LIST) per raccoglierne gli errori.
+
+    Args:
+        model: SymptomEntry o CycleEntry
+        rows: Righe come dizionari di campi
+
+    Returns:
+        Tupla (entry valide nell'ordine delle righe, indice riga -> errori
+        Pydantic con loc relativo alla riga)
+    """
+    strict = _STRICT_LISTS[model]
+    try:
+        validated = _TOLERANT_LISTS[model].validate_python(rows)
+    except ValidationError:
+        # Righe che non sono nemmeno dizionari: validazione riga per riga
+        validated = [_validate_row(model, row) for row in rows]
+
+    failed = [index for index, item in enumerate(validated) if not isinstance(item, model)]
+    if not failed:
+        return validated, {}
+
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+    try:
+        strict.validate_python([rows[index] for index in failed])
+    except ValidationError as e:
+        for error in e.errors(include_url=False):
+            position, *loc = error["loc"]
+            errors.setdefault(failed[position], []).append({**error, "loc": tuple(loc)})
+
+    entries = [item for item in validated if isinstance(item, model)]
+    return entries, errors
+
+
+def _validate_row(model: type, row: Any) -> Any:
+    try:
+        return model.model_validate(row)
+    except ValidationError:
+        return row
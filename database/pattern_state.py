@@ -0,0 +1,358 @@
+"""
+Pattern State - Contatori incrementali per i pattern ricorrenti
+Mantiene fase × sintomo e combinazioni giornaliere per utente e mese
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database.schema import (
+    SymptomRecord, PhaseSymptomCount, SymptomComboCount, dialect_insert, user_filter, user_key
+)
+
+# Fase registrata per i sintomi fuori da un ciclo noto (conta nel totale)
+UNLABELED_PHASE = "none"
+
+PhaseDeltas = Dict[Tuple[str, str, str], int]   # (month, symptom_type, phase) -> delta
+ComboDeltas = Dict[Tuple[str, str], int]        # (month, combo) -> delta
+
+
+def month_key(timestamp: datetime) -> str:
+    """Bucket mensile YYYY-MM"""
+    return timestamp.strftime('%Y-%m')
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return _month_start(_month_start(moment) + timedelta(days=32))
+
+
+def combo_key(symptom_types: Iterable[str]) -> Optional[str]:
+    """Chiave combinazione (tipi distinti ordinati), None se meno di 2 tipi"""
+    distinct = sorted(set(symptom_types))
+    if len(distinct) < 2:
+        return None
+    return ",".join(distinct)
+
+
+def day_symptom_types(
+    session: Session,
+    user_id: Optional[int],
+    timestamp: datetime,
+    exclude_id: Optional[int] = None
+) -> Set[str]:
+    """Tipi di sintomo distinti registrati dall'utente nel giorno di timestamp"""
+    day_start = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    query = session.query(SymptomRecord.symptom_type).filter(
+        user_filter(SymptomRecord.user_id, user_id),
+        SymptomRecord.timestamp >= day_start,
+        SymptomRecord.timestamp < day_start + timedelta(days=1)
+    )
+    if exclude_id is not None:
+        query = query.filter(SymptomRecord.id != exclude_id)
+    rows = query.distinct().all()
+    return {row[0] for row in rows}
+
+
+def combo_change(
+    before: Set[str],
+    after: Set[str],
+    month: str,
+    combo_deltas: ComboDeltas
+) -> None:
+    """Registra il passaggio della combinazione del giorno da before ad after"""
+    old_key, new_key = combo_key(before), combo_key(after)
+    if old_key == new_key:
+        return
+    if old_key:
+        combo_deltas[(month, old_key)] -= 1
+    if new_key:
+        combo_deltas[(month, new_key)] += 1
+
+
+def symptom_added(
+    session: Session,
+    user_id: Optional[int],
+    timestamp: datetime,
+    symptom_type: str,
+    cycle_phase: Optional[str],
+    record_id: Optional[int] = None
+) -> None:
+    """
+    Aggiorna i contatori per un nuovo sintomo.
+
+    Da chiamare prima di inserire il record, oppure dopo passando record_id
+    (la combinazione del giorno viene letta senza il nuovo sintomo).
+    """
+    month = month_key(timestamp)
+    phase_deltas: PhaseDeltas = defaultdict(int)
+    combo_deltas: ComboDeltas = defaultdict(int)
+
+    phase_deltas[(month, symptom_type, cycle_phase or UNLABELED_PHASE)] += 1
+
+    before = day_symptom_types(session, user_id, timestamp, exclude_id=record_id)
+    combo_change(before, before | {symptom_type}, month, combo_deltas)
+
+    apply_deltas(session, user_id, phase_deltas, combo_deltas)
+
+
+def symptom_removed(
+    session: Session,
+    user_id: Optional[int],
+    timestamp: datetime,
+    symptom_type: str,
+    cycle_phase: Optional[str]
+) -> None:
+    """
+    Aggiorna i contatori per un sintomo eliminato.
+
+    Da chiamare dopo il flush della delete (la combinazione del giorno
+    viene letta senza il sintomo eliminato).
+    """
+    month = month_key(timestamp)
+    phase_deltas: PhaseDeltas = defaultdict(int)
+    combo_deltas: ComboDeltas = defaultdict(int)
+
+    phase_deltas[(month, symptom_type, cycle_phase or UNLABELED_PHASE)] -= 1
+
+    after = day_symptom_types(session, user_id, timestamp)
+    combo_change(after | {symptom_type}, after, month, combo_deltas)
+
+    apply_deltas(session, user_id, phase_deltas, combo_deltas)
+
+
+def phases_changed(
+    session: Session,
+    user_id: Optional[int],
+    changes: Iterable[Tuple[datetime, str, Optional[str], Optional[str]]]
+) -> None:
+    """
+    Sposta i contatori fase × sintomo dopo una rietichettatura.
+
+    Args:
+        changes: Tuple (timestamp, symptom_type, fase precedente, nuova fase)
+    """
+    phase_deltas: PhaseDeltas = defaultdict(int)
+
+    for timestamp, symptom_type, old_phase, new_phase in changes:
+        old_phase = old_phase or UNLABELED_PHASE
+        new_phase = new_phase or UNLABELED_PHASE
+        if old_phase == new_phase:
+            continue
+        month = month_key(timestamp)
+        phase_deltas[(month, symptom_type, old_phase)] -= 1
+        phase_deltas[(month, symptom_type, new_phase)] += 1
+
+    apply_deltas(session, user_id, phase_deltas, {})
+
+
+def apply_deltas(
+    session: Session,
+    user_id: Optional[int],
+    phase_deltas: PhaseDeltas,
+    combo_deltas: ComboDeltas
+) -> None:
+    """Applica i delta con upsert (INSERT ... ON CONFLICT DO UPDATE)"""
+    key = user_key(user_id)
+
+    phase_rows = [
+        {'user_id': key, 'month': month, 'symptom_type': stype,
+         'cycle_phase': phase, 'count': delta}
+        for (month, stype, phase), delta in phase_deltas.items() if delta
+    ]
+    if phase_rows:
+        stmt = dialect_insert(session, PhaseSymptomCount).values(phase_rows)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month', 'symptom_type', 'cycle_phase'],
+            set_={'count': PhaseSymptomCount.count + stmt.excluded.count}
+        ))
+
+    combo_rows = [
+        {'user_id': key, 'month': month, 'combo': combo, 'count': delta}
+        for (month, combo), delta in combo_deltas.items() if delta
+    ]
+    if combo_rows:
+        stmt = dialect_insert(session, SymptomComboCount).values(combo_rows)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month', 'combo'],
+            set_={'count': SymptomComboCount.count + stmt.excluded.count}
+        ))
+
+    # Le combinazioni che non compaiono più non servono allo stato
+    if any(delta < 0 for delta in combo_deltas.values()):
+        session.query(SymptomComboCount).filter(
+            SymptomComboCount.user_id == key,
+            SymptomComboCount.count <= 0
+        ).delete(synchronize_session=False)
+
+
+def count_symptoms(
+    session: Session,
+    user_id: Optional[int],
+    *clauses,
+    chunk_size: int = 10_000
+) -> Tuple[PhaseDeltas, ComboDeltas]:
+    """
+    Conta fasi e combinazioni giornaliere dai sintomi dell'utente.
+
+    Le fasi sono contate scorrendo i sintomi a blocchi, le combinazioni con
+    un GROUP BY giorno/tipo.
+
+    Args:
+        clauses: Filtri SQL aggiuntivi sui sintomi (es. un intervallo di tempo)
+
+    Returns:
+        Tupla (conteggi per mese/tipo/fase, conteggi per mese/combinazione)
+    """
+    phase_counts: PhaseDeltas = defaultdict(int)
+    combo_counts: ComboDeltas = defaultdict(int)
+    owner = user_filter(SymptomRecord.user_id, user_id)
+
+    last_id = 0
+    while True:
+        rows = session.query(
+            SymptomRecord.id, SymptomRecord.timestamp,
+            SymptomRecord.symptom_type, SymptomRecord.cycle_phase
+        ).filter(
+            owner, SymptomRecord.id > last_id, *clauses
+        ).order_by(SymptomRecord.id).limit(chunk_size).all()
+
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        for _, timestamp, stype, phase in rows:
+            phase_counts[(month_key(timestamp), stype, phase or UNLABELED_PHASE)] += 1
+
+    # Le combinazioni richiedono l'ordine per giorno: GROUP BY giorno/tipo
+    # (date() è una stringa su SQLite e una data su PostgreSQL)
+    day = func.date(SymptomRecord.timestamp)
+    current_day, current_types = None, set()
+    for day_value, stype in session.query(day, SymptomRecord.symptom_type).filter(
+        owner, *clauses
+    ).group_by(day, SymptomRecord.symptom_type).order_by(day):
+        day_value = str(day_value)
+        if day_value != current_day:
+            combo = combo_key(current_types)
+            if combo:
+                combo_counts[(current_day[:7], combo)] += 1
+            current_day, current_types = day_value, set()
+        current_types.add(stype)
+
+    combo = combo_key(current_types)
+    if combo:
+        combo_counts[(current_day[:7], combo)] += 1
+
+    return phase_counts, combo_counts
+
+
+def rebuild(
+    session: Session,
+    user_id: Optional[int],
+    chunk_size: int = 10_000
+) -> None:
+    """
+    Ricostruisce da zero i contatori di un utente.
+
+    Usato per i database esistenti e dopo caricamenti bulk che non passano
+    da add_symptom.
+    """
+    key = user_key(user_id)
+    phase_deltas, combo_deltas = count_symptoms(session, user_id, chunk_size=chunk_size)
+
+    session.query(PhaseSymptomCount).filter(
+        PhaseSymptomCount.user_id == key
+    ).delete(synchronize_session=False)
+    session.query(SymptomComboCount).filter(
+        SymptomComboCount.user_id == key
+    ).delete(synchronize_session=False)
+
+    apply_deltas(session, user_id, phase_deltas, combo_deltas)
+
+
+def read_counters(
+    session: Session,
+    user_id: Optional[int],
+    start_date: datetime,
+    end_date: datetime
+) -> Dict:
+    """
+    Conteggi fase × sintomo e combinazioni giornaliere tra start_date e end_date.
+
+    I mesi interamente nella finestra si leggono dai contatori; i mesi di
+    start_date e end_date, coperti solo in parte, si contano dai sintomi
+    della sola parte nella finestra (al più due mesi di righe), così
+    "ultimi N mesi" non include un mese intero in più all'inizio.
+
+    Returns:
+        Dizionario con total, phase_patterns {tipo: {fase: n}} e
+        symptom_combos {(tipo, ...): n}
+    """
+    key = user_key(user_id)
+    first_full, after_full = _next_month(start_date), _month_start(end_date)
+
+    if first_full >= after_full:
+        # Finestra entro due mesi: solo righe
+        phase_counts, combo_counts = count_symptoms(
+            session, user_id,
+            SymptomRecord.timestamp >= start_date, SymptomRecord.timestamp <= end_date
+        )
+    else:
+        phase_counts, combo_counts = count_symptoms(
+            session, user_id,
+            SymptomRecord.timestamp >= start_date, SymptomRecord.timestamp < first_full
+        )
+        tail_phases, tail_combos = count_symptoms(
+            session, user_id,
+            SymptomRecord.timestamp >= after_full, SymptomRecord.timestamp <= end_date
+        )
+        for bucket, count in tail_phases.items():
+            phase_counts[bucket] += count
+        for bucket, count in tail_combos.items():
+            combo_counts[bucket] += count
+
+        start_month, end_month = month_key(first_full), month_key(after_full)
+        for stype, phase, count in session.query(
+            PhaseSymptomCount.symptom_type,
+            PhaseSymptomCount.cycle_phase,
+            func.sum(PhaseSymptomCount.count)
+        ).filter(
+            PhaseSymptomCount.user_id == key,
+            PhaseSymptomCount.month >= start_month,
+            PhaseSymptomCount.month < end_month
+        ).group_by(PhaseSymptomCount.symptom_type, PhaseSymptomCount.cycle_phase):
+            phase_counts[(start_month, stype, phase)] += count
+
+        for combo, count in session.query(
+            SymptomComboCount.combo,
+            func.sum(SymptomComboCount.count)
+        ).filter(
+            SymptomComboCount.user_id == key,
+            SymptomComboCount.month >= start_month,
+            SymptomComboCount.month < end_month
+        ).group_by(SymptomComboCount.combo):
+            combo_counts[(start_month, combo)] += count
+
+    total = 0
+    phase_patterns = defaultdict(lambda: defaultdict(int))
+    for (_, stype, phase), count in phase_counts.items():
+        total += count
+        if phase != UNLABELED_PHASE and count:
+            phase_patterns[stype][phase] += count
+
+    symptom_combos = defaultdict(int)
+    for (_, combo), count in combo_counts.items():
+        symptom_combos[tuple(combo.split(","))] += count
+
+    return {
+        'total': total,
+        'phase_patterns': {stype: dict(phases) for stype, phases in phase_patterns.items()},
+        'symptom_combos': {combo: count for combo, count in symptom_combos.items() if count > 0}
+    }
@@ -3,12 +3,18 @@ Database Schema usando SQLAlchemy ORM
 Best practice: ORM invece di raw SQL per type safety e maintainability
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import create_engine, and_, or_, func, inspect, select, text, Column, Integer, String, Float, DateTime, Text, Index, UniqueConstraint, LargeBinary
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 from datetime import datetime
+from typing import List, Optional
+import logging
 import os
 
+logger = logging.getLogger("pcos-care-mcp.database")
+
 Base = declarative_base()
 
 
@@ -23,9 +29,18 @@ class SymptomRecord(Base):
     - notes: Text per note lunghe
     - timestamp: DateTime con default per auto-tracking
     - created_at: Per audit trail
+    - cycle_phase / cycle_day: denormalizzati al momento dell'insert
+      (ricalcolati dal DatabaseManager quando cambiano i cicli)
+    - user_id: owner dello storico (NULL = storico locale single-user),
+      con indice composto (user_id, timestamp) per le query per utente
+    - source_key: chiave delle righe importate da altre app (NULL per le
+      registrazioni manuali), unica per utente per deduplicare gli import
     """
     
     __tablename__ = 'symptom_records'
+    __table_args__ = (
+        Index('ix_symptom_records_user_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     symptom_type = Column(String(50), nullable=False, index=True)
@@ -33,6 +48,10 @@ class SymptomRecord(Base):
     notes = Column(Text, default="")
     timestamp = Column(DateTime, nullable=False, default=datetime.now, index=True)
     created_at = Column(DateTime, default=datetime.now)
+    cycle_phase = Column(String(20), nullable=True, index=True)
+    cycle_day = Column(Integer, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    source_key = Column(String(64), nullable=True)
     
     def __repr__(self):
         return f"<SymptomRecord(id={self.id}, type='{self.symptom_type}', intensity={self.intensity})>"
@@ -45,7 +64,9 @@ class SymptomRecord(Base):
             'intensity': self.intensity,
             'notes': self.notes,
             'timestamp': self.timestamp.isoformat(),
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'cycle_phase': self.cycle_phase,
+            'cycle_day': self.cycle_day
         }
 
 
@@ -54,9 +75,15 @@ class CycleRecord(Base):
     Tabella per il tracking del ciclo mestruale.
     
     Future implementation - placeholder per FASE 3
+
+    - source_key: chiave dei cicli importati da altre app (NULL per le
+      registrazioni manuali), unica per utente per deduplicare gli import
     """
     
     __tablename__ = 'cycle_records'
+    __table_args__ = (
+        Index('ix_cycle_records_user_start', 'user_id', 'start_date'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     start_date = Column(DateTime, nullable=False, index=True)
@@ -64,11 +91,270 @@ class CycleRecord(Base):
     flow_intensity = Column(String(20))  # light, medium, heavy
     notes = Column(Text, default="")
     created_at = Column(DateTime, default=datetime.now)
+    user_id = Column(Integer, nullable=True)
+    source_key = Column(String(64), nullable=True)
     
     def __repr__(self):
         return f"<CycleRecord(id={self.id}, start='{self.start_date}')>"
 
 
+# ============================================================================
+# State tables: aggregati incrementali per utente
+# ============================================================================
+
+# Le tabelle di stato usano user_id NOT NULL nelle chiavi uniche (in SQL due
+# NULL non sono mai uguali): lo storico locale (user_id NULL) usa la chiave 0
+LOCAL_USER_KEY = 0
+
+
+def user_key(user_id) -> int:
+    """Chiave utente per le tabelle di stato (None -> LOCAL_USER_KEY)"""
+    return LOCAL_USER_KEY if user_id is None else user_id
+
+
+def user_from_key(key: int):
+    """Inverso di user_key (LOCAL_USER_KEY -> None)"""
+    return None if key == LOCAL_USER_KEY else key
+
+
+def user_filter(column, user_id: Optional[int]):
+    """
+    Filtro SQL per lo storico di un utente.
+
+    user_id=None identifica lo storico locale single-user (righe senza owner),
+    usato dal server MCP e dai database creati prima dell'introduzione di user_id.
+    """
+    if user_id is None:
+        return column.is_(None)
+    return column == user_id
+
+
+def users_filter(column, user_ids: List[Optional[int]]):
+    """Filtro SQL per più storici (None nella lista = storico locale)"""
+    owners = [user_id for user_id in user_ids if user_id is not None]
+    clauses = [column.in_(owners)] if owners else []
+    if len(owners) < len(user_ids):
+        clauses.append(column.is_(None))
+    return or_(*clauses) if clauses else column.in_([])
+
+
+def dialect_insert(session, model):
+    """INSERT nel dialetto del database della sessione (con ON CONFLICT)"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model.__table__)
+    if dialect == "sqlite":
+        return sqlite.insert(model.__table__)
+    raise NotImplementedError(f"ON CONFLICT not supported for {dialect}")
+
+
+# Chiavi uniche per la deduplica degli import (INSERT ... ON CONFLICT DO
+# NOTHING). Solo le righe importate hanno una source_key: le registrazioni
+# manuali (NULL, mai in conflitto) si comportano come prima. Indici su
+# espressione perché lo storico locale ha user_id NULL
+Index(
+    'uq_symptom_records_source',
+    func.coalesce(SymptomRecord.user_id, LOCAL_USER_KEY),
+    SymptomRecord.source_key,
+    unique=True
+)
+Index(
+    'uq_cycle_records_source',
+    func.coalesce(CycleRecord.user_id, LOCAL_USER_KEY),
+    CycleRecord.source_key,
+    unique=True
+)
+
+# Indici unici di versioni precedenti, rimossi dalla migrazione
+DROPPED_INDEXES = ('uq_cycle_records_start',)
+
+
+class PhaseSymptomCount(Base):
+    """
+    Contatori fase × sintomo per utente, a bucket mensili.
+
+    Aggiornati in modo incrementale dal DatabaseManager a ogni scrittura
+    di sintomi/cicli: i pattern ricorrenti leggono solo questi contatori.
+    cycle_phase = UNLABELED_PHASE per i sintomi fuori da un ciclo noto.
+    """
+
+    __tablename__ = 'phase_symptom_counts'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'symptom_type', 'cycle_phase',
+                         name='uq_phase_symptom_counts'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    symptom_type = Column(String(50), nullable=False)
+    cycle_phase = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SymptomComboCount(Base):
+    """
+    Contatori delle combinazioni di sintomi nello stesso giorno, per utente
+    e mese. combo: tipi distinti ordinati e separati da virgola.
+    """
+
+    __tablename__ = 'symptom_combo_counts'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'combo', name='uq_symptom_combo_counts'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    combo = Column(String(700), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SymptomBaseline(Base):
+    """
+    Baseline EWMA dell'intensità per utente e tipo di sintomo.
+
+    Aggiornata in O(1) a ogni add_symptom: il controllo delle anomalie
+    confronta la nuova intensità con media e varianza correnti senza
+    rileggere lo storico.
+    """
+
+    __tablename__ = 'symptom_baselines'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'symptom_type', name='uq_symptom_baselines'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    symptom_type = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    variance = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class CycleStatistics(Base):
+    """
+    Statistiche correnti dei cicli per utente.
+
+    Somme delle lunghezze dei cicli chiusi (count, somma, somma dei
+    quadrati, min, max), ultimo inizio e media pesata recente degli
+    intervalli tra inizi consecutivi: analytics e predizione del
+    prossimo ciclo si leggono da una sola riga.
+    """
+
+    __tablename__ = 'cycle_statistics'
+    __table_args__ = (
+        UniqueConstraint('user_id', name='uq_cycle_statistics'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    cycle_count = Column(Integer, nullable=False, default=0)
+    first_start = Column(DateTime)
+    last_start = Column(DateTime)
+    closed_count = Column(Integer, nullable=False, default=0)
+    length_sum = Column(Float, nullable=False, default=0.0)
+    length_sumsq = Column(Float, nullable=False, default=0.0)
+    min_length = Column(Integer)
+    max_length = Column(Integer)
+    last_closed_start = Column(DateTime)
+    last_closed_end = Column(DateTime)
+    interval_count = Column(Integer, nullable=False, default=0)
+    interval_ewma = Column(Float)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class CycleForecast(Base):
+    """
+    Calendario previsto di un ciclo per utente (generato in batch).
+
+    Una riga per ciclo: cycle_number 0 è il ciclo in corso (ultimo inizio
+    registrato), 1, 2, ... i cicli previsti. Le fasi sono intervalli
+    [inizio, inizio della fase successiva); una fase vuota ha inizio
+    uguale a quello della fase seguente. Job di promemoria e API leggono
+    queste righe senza ricalcolare.
+    """
+
+    __tablename__ = 'cycle_forecasts'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'cycle_number', name='uq_cycle_forecasts'),
+        Index('ix_cycle_forecasts_start', 'cycle_start'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    cycle_number = Column(Integer, nullable=False)
+    cycle_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)      # ultimo giorno di mestruazione previsto
+    mid_start = Column(DateTime, nullable=False)
+    late_start = Column(DateTime, nullable=False)
+    pre_menstrual_start = Column(DateTime, nullable=False)
+    next_start = Column(DateTime, nullable=False)
+    interval_days = Column(Float, nullable=False)
+    generated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class IntensitySketchRecord(Base):
+    """
+    Distribuzione delle intensità per utente, mese e tipo di sintomo.
+
+    sketch: istogramma dei livelli 1-10 serializzato da
+    database.intensity_sketch.IntensitySketch; gli sketch di mesi e utenti
+    diversi si uniscono sommandoli.
+    """
+
+    __tablename__ = 'intensity_sketches'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'symptom_type', name='uq_intensity_sketches'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    symptom_type = Column(String(50), nullable=False)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class NoteEmbedding(Base):
+    """
+    Embedding delle note libere di sintomi e cicli, per utente.
+
+    Indice vettoriale append-only: una riga per nota, scritta in background
+    da tools.note_search dopo la registrazione. La ricerca carica solo le
+    righe con id maggiore dell'ultimo letto, quindi l'indice in memoria
+    cresce senza essere mai ricostruito.
+
+    source: 'symptom' o 'cycle'
+    vector: float32 normalizzati (norma 1), dimensione dim
+    text_hash: sha1 del testo della nota: se la nota cambia l'embedding è
+               ricalcolato e la riga sostituita da una nuova (id maggiore)
+    """
+
+    __tablename__ = 'note_embeddings'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'source', 'record_id', name='uq_note_embeddings'),
+        # id mai riusati: una riga sostituita deve avere id maggiore dell'ultimo letto
+        {'sqlite_autoincrement': True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    source = Column(String(10), nullable=False)
+    record_id = Column(Integer, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    text_hash = Column(String(40), nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+# Aggregati ricostruibili dallo storico (vedi _merge_duplicate_imports)
+DERIVED_STATE_TABLES = (
+    PhaseSymptomCount, SymptomComboCount, SymptomBaseline,
+    IntensitySketchRecord, CycleStatistics
+)
+
+
 def get_database_url(db_name: str = "pcos_care.db") -> str:
     """
     Genera database URL.
@@ -93,6 +379,119 @@ def create_tables(engine):
         engine: SQLAlchemy engine
     """
     Base.metadata.create_all(engine)
+    migrate_schema(engine)
+
+
+def migrate_schema(engine):
+    """
+    Aggiunge le colonne introdotte dopo la creazione delle tabelle.
+
+    create_all() non modifica tabelle esistenti: i database creati con
+    versioni precedenti ricevono qui le nuove colonne (nullable) e i loro
+    indici. Per il modello multi-utente, symptom_records e cycle_records
+    ricevono user_id con gli indici composti (user_id, timestamp) e
+    (user_id, start_date): le righe esistenti restano con user_id NULL,
+    cioè lo storico locale letto con user_id=None.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    with engine.begin() as conn:
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+        # note_embeddings è ricalcolabile (NoteIndex.sync): le versioni create
+        # senza AUTOINCREMENT, che riusano gli id, sono ricreate vuote
+        if engine.dialect.name == "sqlite":
+            table_sql = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": NoteEmbedding.__tablename__}).scalar()
+            if table_sql and "AUTOINCREMENT" not in table_sql.upper():
+                logger.warning("Recreating note_embeddings with AUTOINCREMENT (notes are re-embedded on sync)")
+                NoteEmbedding.__table__.drop(conn)
+                NoteEmbedding.__table__.create(conn)
+
+        inspector = inspect(conn)
+
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'
+                ))
+
+            # Indici (anche composti) definiti dopo la creazione della tabella
+            # (IF NOT EXISTS: la riflessione non vede gli indici su espressione)
+            for index in table.indexes:
+                if index.unique and not _index_exists(conn, index.name):
+                    _merge_duplicate_imports(conn, table, index)
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _index_exists(conn, name: str) -> bool:
+    """True se l'indice esiste (la riflessione non vede gli indici su espressione)"""
+    if conn.dialect.name == "sqlite":
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    elif conn.dialect.name == "postgresql":
+        query = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    else:
+        return False
+    return conn.execute(text(query), {"name": name}).first() is not None
+
+
+def _merge_duplicate_imports(conn, table, index) -> int:
+    """
+    Unisce le righe importate con la stessa chiave unica prima di creare l'indice.
+
+    Le chiavi uniche sono source_key di righe importate: righe con la
+    stessa chiave (non NULL) sono lo stesso record importato più volte. Resta quella
+    con id minore; lo stato derivato degli utenti coinvolti viene
+    cancellato e ricostruito dai backfill del DatabaseManager.
+
+    Returns:
+        Numero di righe rimosse
+    """
+    key_columns = list(index.expressions)
+    duplicates = conn.execute(
+        select(func.min(table.c.id), *key_columns)
+        .where(and_(*(column.isnot(None) for column in key_columns)))
+        .group_by(*key_columns)
+        .having(func.count() > 1)
+    ).all()
+
+    if not duplicates:
+        return 0
+
+    removed = 0
+    owners = set()
+    for keep_id, *key in duplicates:
+        result = conn.execute(
+            table.delete().where(
+                and_(*(column == value for column, value in zip(key_columns, key))),
+                table.c.id != keep_id
+            )
+        )
+        removed += result.rowcount
+        owners.add(key[0])
+
+    for state_table in DERIVED_STATE_TABLES:
+        conn.execute(state_table.__table__.delete().where(
+            state_table.user_id.in_(owners)
+        ))
+
+    logger.warning(
+        f"Merged {removed} duplicate imported rows in {table.name} "
+        f"({len(duplicates)} keys, users {sorted(owners)}) before creating {index.name}"
+    )
+    return removed
 
 
 def get_session_maker(db_url: str = None):
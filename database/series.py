@@ -0,0 +1,293 @@
+"""
+Series - Storici compatti ad array paralleli per gli analyzer
+SymptomSeries e CycleSeries al posto di liste di dizionari
+
+Ogni registrazione occupa pochi byte (epoch int64, codici uint8, ...)
+invece di un dizionario con stringhe e datetime; le note, se richieste,
+stanno in un unico buffer UTF-8 con offset. Le serie sono ordinate nel
+tempo: il taglio per intervallo usa searchsorted e restituisce viste
+sugli stessi array, senza copie.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from database.cycle_phases import CYCLE_PHASES
+from database.models import SymptomType, FlowIntensity
+
+SYMPTOM_TYPES = tuple(t.value for t in SymptomType)
+FLOW_INTENSITIES = tuple(f.value for f in FlowIntensity)
+
+NO_CODE = 255          # tipo/fase/flusso sconosciuto o assente
+NO_END = np.iinfo(np.int64).min
+
+_TYPE_CODES = {name: i for i, name in enumerate(SYMPTOM_TYPES)}
+_PHASE_CODES = {name: i for i, name in enumerate(CYCLE_PHASES)}
+_FLOW_CODES = {name: i for i, name in enumerate(FLOW_INTENSITIES)}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(moment: datetime) -> int:
+    """Secondi dall'epoch di un datetime naive, letto come UTC (precisione al secondo)"""
+    return int(np.datetime64(moment, 's').astype(np.int64))
+
+
+def to_epochs(moments: Sequence[datetime]):
+    """Versione vettoriale di to_epoch: array int64 di secondi dall'epoch"""
+    return np.array(moments, dtype='datetime64[s]').astype(np.int64)
+
+
+def from_epoch(epoch: int) -> datetime:
+    """Inverso di to_epoch (datetime naive, precisione al secondo)"""
+    return _EPOCH + timedelta(seconds=int(epoch))
+
+
+def _time_bounds(epochs, start: Optional[datetime], end: Optional[datetime]):
+    """Indici [lo, hi) delle registrazioni in [start, end]"""
+    lo = 0 if start is None else int(np.searchsorted(epochs, to_epoch(start), side='left'))
+    hi = len(epochs) if end is None else int(np.searchsorted(epochs, to_epoch(end), side='right'))
+    return lo, max(lo, hi)
+
+
+class SymptomSeries:
+    """
+    Sintomi come array paralleli ordinati per epoch.
+
+    - epochs: int64, secondi dall'epoch
+    - type_codes: uint8, indice in SYMPTOM_TYPES
+    - intensities: uint8, 1-10
+    - cycle_days: uint16, giorno del ciclo (0 = fuori da un ciclo noto)
+    - phase_codes: uint8, indice in CYCLE_PHASES (NO_CODE = nessuna fase)
+    - note_offsets: int64 (len + 1), note i = notes_buffer[off[i]:off[i+1]]
+    """
+
+    __slots__ = ("epochs", "type_codes", "intensities", "cycle_days",
+                 "phase_codes", "note_offsets", "notes_buffer")
+
+    type_names = SYMPTOM_TYPES
+
+    def __init__(self, epochs, type_codes, intensities, cycle_days, phase_codes,
+                 note_offsets=None, notes_buffer: bytes = b""):
+        self.epochs = epochs
+        self.type_codes = type_codes
+        self.intensities = intensities
+        self.cycle_days = cycle_days
+        self.phase_codes = phase_codes
+        self.note_offsets = (
+            note_offsets if note_offsets is not None
+            else np.zeros(len(epochs) + 1, dtype=np.int64)
+        )
+        self.notes_buffer = notes_buffer
+
+    @classmethod
+    def empty(cls) -> "SymptomSeries":
+        return cls.from_rows([])
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], with_notes: bool = False) -> "SymptomSeries":
+        """
+        Costruisce una serie da righe già ordinate nel tempo.
+
+        Args:
+            rows: Tuple (epoch, symptom_type, intensity, cycle_day, cycle_phase[, notes]);
+                i tipi sconosciuti vengono scartati
+            with_notes: Le righe contengono le note come sesto elemento
+        """
+        rows = [row for row in rows if row[1] in _TYPE_CODES]
+        n = len(rows)
+
+        series = cls(
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=n),
+            np.fromiter((_TYPE_CODES[row[1]] for row in rows), dtype=np.uint8, count=n),
+            np.fromiter((row[2] for row in rows), dtype=np.uint8, count=n),
+            np.fromiter((row[3] or 0 for row in rows), dtype=np.uint16, count=n),
+            np.fromiter((_PHASE_CODES.get(row[4], NO_CODE) for row in rows), dtype=np.uint8, count=n)
+        )
+
+        if with_notes:
+            encoded = [(row[5] or "").encode("utf-8") for row in rows]
+            series.note_offsets = np.concatenate((
+                [0], np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=n))
+            )).astype(np.int64)
+            series.notes_buffer = b"".join(encoded)
+
+        return series
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Sequence[tuple]], with_notes: bool = False) -> "SymptomSeries":
+        """
+        Costruisce una serie da blocchi di righe consecutivi nel tempo.
+
+        Ogni blocco viene convertito e copiato in array che crescono per
+        raddoppio: in memoria restano un solo blocco di righe e gli array
+        compatti, mai tutte le righe del periodo né una lista di parti.
+
+        Args:
+            chunks: Blocchi di righe nel formato di from_rows
+            with_notes: Le righe contengono le note come sesto elemento
+        """
+        series = cls.empty()
+        arrays = ("epochs", "type_codes", "intensities", "cycle_days", "phase_codes")
+        size = 0
+        notes = bytearray()
+
+        for rows in chunks:
+            part = cls.from_rows(rows, with_notes=with_notes)
+            n = len(part)
+            if not n:
+                continue
+
+            capacity = len(series.epochs)
+            if size + n > capacity:
+                capacity = max(size + n, 2 * capacity)
+                for name in arrays:
+                    getattr(series, name).resize(capacity, refcheck=False)
+                series.note_offsets.resize(capacity + 1, refcheck=False)
+
+            for name in arrays:
+                getattr(series, name)[size:size + n] = getattr(part, name)
+            series.note_offsets[size + 1:size + n + 1] = part.note_offsets[1:] + len(notes)
+            notes += part.notes_buffer
+            size += n
+
+        for name in arrays:
+            getattr(series, name).resize(size, refcheck=False)
+        series.note_offsets.resize(size + 1, refcheck=False)
+        series.notes_buffer = bytes(notes)
+        return series
+
+    @classmethod
+    def concat(cls, parts: Iterable["SymptomSeries"]) -> "SymptomSeries":
+        """Concatena serie consecutive nel tempo (es. blocchi letti dal database)"""
+        parts = list(parts)
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+
+        offsets = [parts[0].note_offsets]
+        base = parts[0].note_offsets[-1]
+        for part in parts[1:]:
+            offsets.append(part.note_offsets[1:] - part.note_offsets[0] + base)
+            base = offsets[-1][-1] if len(offsets[-1]) else base
+
+        return cls(
+            np.concatenate([p.epochs for p in parts]),
+            np.concatenate([p.type_codes for p in parts]),
+            np.concatenate([p.intensities for p in parts]),
+            np.concatenate([p.cycle_days for p in parts]),
+            np.concatenate([p.phase_codes for p in parts]),
+            np.concatenate(offsets),
+            b"".join(
+                p.notes_buffer[p.note_offsets[0]:p.note_offsets[-1]] for p in parts
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def __getitem__(self, index: slice) -> "SymptomSeries":
+        """Taglio posizionale: viste sugli array, buffer delle note condiviso"""
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("SymptomSeries supporta solo slice contigue")
+        start, stop, _ = index.indices(len(self))
+        stop = max(start, stop)
+        return SymptomSeries(
+            self.epochs[start:stop], self.type_codes[start:stop],
+            self.intensities[start:stop], self.cycle_days[start:stop],
+            self.phase_codes[start:stop], self.note_offsets[start:stop + 1],
+            self.notes_buffer
+        )
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "SymptomSeries":
+        """Registrazioni in [start, end], senza copie"""
+        lo, hi = _time_bounds(self.epochs, start, end)
+        return self[lo:hi]
+
+    def of_type(self, symptom_type: str) -> "SymptomSeries":
+        """Registrazioni di un solo tipo (copia: la selezione non è contigua)"""
+        mask = self.type_codes == _TYPE_CODES.get(symptom_type, NO_CODE)
+        indices = np.nonzero(mask)[0]
+        lengths = self.note_offsets[indices + 1] - self.note_offsets[indices]
+        return SymptomSeries(
+            self.epochs[mask], self.type_codes[mask], self.intensities[mask],
+            self.cycle_days[mask], self.phase_codes[mask],
+            np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            b"".join(
+                self.notes_buffer[self.note_offsets[i]:self.note_offsets[i + 1]] for i in indices
+            )
+        )
+
+    def note(self, i: int) -> str:
+        return self.notes_buffer[self.note_offsets[i]:self.note_offsets[i + 1]].decode("utf-8")
+
+    def elapsed_days(self, origin: datetime):
+        """Giorni (frazionari) trascorsi da origin per ogni registrazione"""
+        return (self.epochs - to_epoch(origin)) / 86400.0
+
+    def day_ordinals(self):
+        """Giorno di calendario (giorni dall'epoch) di ogni registrazione"""
+        return self.epochs // 86400
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata da array e note"""
+        return sum(
+            getattr(self, name).nbytes for name in self.__slots__ if name != "notes_buffer"
+        ) + len(self.notes_buffer)
+
+
+class CycleSeries:
+    """
+    Cicli come array paralleli ordinati per inizio.
+
+    - starts / ends: int64 epoch (NO_END se il ciclo non è chiuso)
+    - flow_codes: uint8, indice in FLOW_INTENSITIES (NO_CODE = assente)
+    """
+
+    __slots__ = ("starts", "ends", "flow_codes")
+
+    def __init__(self, starts, ends, flow_codes):
+        self.starts = starts
+        self.ends = ends
+        self.flow_codes = flow_codes
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "CycleSeries":
+        """Righe (start_epoch, end_epoch o None, flow_intensity) ordinate per inizio"""
+        n = len(rows)
+        return cls(
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=n),
+            np.fromiter((NO_END if row[1] is None else row[1] for row in rows), dtype=np.int64, count=n),
+            np.fromiter((_FLOW_CODES.get(row[2], NO_CODE) for row in rows), dtype=np.uint8, count=n)
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: slice) -> "CycleSeries":
+        return CycleSeries(self.starts[index], self.ends[index], self.flow_codes[index])
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "CycleSeries":
+        """Cicli iniziati in [start, end], senza copie"""
+        lo, hi = _time_bounds(self.starts, start, end)
+        return self[lo:hi]
+
+    @property
+    def closed(self):
+        """Maschera dei cicli con data di fine"""
+        return self.ends != NO_END
+
+    def durations(self):
+        """Giorni interi tra inizio e fine dei cicli chiusi"""
+        closed = self.closed
+        return (self.ends[closed] - self.starts[closed]) // 86400
+
+    def intervals(self):
+        """Giorni interi tra inizi consecutivi"""
+        return np.diff(self.starts) // 86400
+
+    def flows(self) -> List[Optional[str]]:
+        return [FLOW_INTENSITIES[c] if c != NO_CODE else None for c in self.flow_codes.tolist()]
@@ -0,0 +1,88 @@
+"""
+Acronyms - Medical acronym expansion for embedding preprocessing
+
+Features:
+- PCOS research acronyms with their expansions
+- Precompiled single-pass expander (one regex alternation per text)
+- Only the first occurrence of each acronym is expanded
+"""
+
+import re
+from typing import Dict, Optional
+
+
+# Medical acronyms common in PCOS research
+MEDICAL_ACRONYMS = {
+    "PCOS": "Polycystic Ovary Syndrome",
+    "BMI": "Body Mass Index",
+    "CVD": "Cardiovascular Disease",
+    "IR": "Insulin Resistance",
+    "T2D": "Type 2 Diabetes",
+    "MetS": "Metabolic Syndrome",
+    "SHBG": "Sex Hormone-Binding Globulin",
+    "LH": "Luteinizing Hormone",
+    "FSH": "Follicle-Stimulating Hormone",
+    "AMH": "Anti-Müllerian Hormone",
+    "HOMA-IR": "Homeostatic Model Assessment for Insulin Resistance",
+    "OGTT": "Oral Glucose Tolerance Test",
+    "HbA1c": "Glycated Hemoglobin",
+    "HDL": "High-Density Lipoprotein",
+    "LDL": "Low-Density Lipoprotein",
+    "TG": "Triglycerides",
+    "WHR": "Waist-to-Hip Ratio",
+    "QOL": "Quality of Life",
+    "PCOS-Q": "PCOS Questionnaire",
+    "ART": "Assisted Reproductive Technology",
+    "IVF": "In Vitro Fertilization",
+}
+
+
+class AcronymExpander:
+    """
+    Expand standalone acronyms to "ACRONYM (expansion)".
+
+    All acronyms are matched by one precompiled alternation, longest
+    first, so a text is scanned once. Acronyms containing a shorter one
+    (HOMA-IR, PCOS-Q) are expanded as a whole rather than also
+    expanding the inner IR / PCOS at that position.
+    """
+
+    def __init__(self, acronyms: Dict[str, str]):
+        """
+        Initialize expander
+
+        Args:
+            acronyms: Mapping acronym -> expansion
+        """
+        self.acronyms = dict(acronyms)
+        self.pattern: Optional[re.Pattern] = None
+
+        if self.acronyms:
+            alternatives = sorted(self.acronyms, key=len, reverse=True)
+            self.pattern = re.compile(
+                r"\b(?:" + "|".join(re.escape(acronym) for acronym in alternatives) + r")\b"
+            )
+
+    def expand(self, text: str) -> str:
+        """
+        Expand the first occurrence of each acronym
+
+        Args:
+            text: Input text
+
+        Returns:
+            Text with expanded acronyms
+        """
+        if self.pattern is None:
+            return text
+
+        seen = set()
+
+        def replace_first(match):
+            acronym = match.group(0)
+            if acronym in seen:
+                return acronym
+            seen.add(acronym)
+            return f"{acronym} ({self.acronyms[acronym]})"
+
+        return self.pattern.sub(replace_first, text)
@@ -0,0 +1,437 @@
+"""
+Embedding Cache - Caches for query and chunk embeddings
+
+Features:
+- In-memory LRU keyed by (model_name, hash of preprocessed text)
+- On-disk memory-mapped store that survives restarts
+- Hit/miss counters per level
+- Content-addressed chunk embeddings for incremental RAG builds
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer per store
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+MEMORY_CAPACITY = 1024      # entries kept in the LRU
+DISK_CAPACITY = 20_000      # slots in the on-disk store (~30 MB at 384 dim)
+KEY_BYTES = 40              # hex sha1 (numpy S dtype strips trailing NUL bytes)
+
+
+def text_key(text: str) -> bytes:
+    """Cache key of a (preprocessed) text"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+
+def model_slug(model_name: str) -> str:
+    """Directory name for a model's cache files"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+class DiskEmbeddingStore:
+    """
+    Fixed-size memory-mapped store of embeddings for one model.
+
+    Files in the store directory:
+    - vectors.f32: float32 matrix (capacity x dim)
+    - keys.bin: hex sha1 per slot (empty = free)
+    - meta.json: dim, capacity and next slot to write
+    - lock: held while writing (POSIX advisory lock)
+
+    Slots are reused as a ring once the store is full (oldest first).
+    Several processes (MCP server, web API) may share a store: writes take
+    the file lock and read the ring position from meta.json, which is
+    replaced atomically; reads check the slot's key, so a slot reused by
+    another process is a miss rather than a wrong vector. The vector is
+    written before its key, so an interrupted write leaves the slot free.
+    Entries written by other processes become visible on the next open.
+    """
+
+    def __init__(self, directory: Union[str, Path], capacity: int = DISK_CAPACITY):
+        """
+        Initialize disk store
+
+        Args:
+            directory: Store directory (one per model)
+            capacity: Number of slots
+        """
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.dim: Optional[int] = None
+        self.next_slot = 0
+        self._keys: Optional[np.memmap] = None
+        self._vectors: Optional[np.memmap] = None
+        self._slots: Dict[bytes, int] = {}
+
+        meta = self._read_meta()
+        if meta is not None:
+            try:
+                self._open(meta["dim"], meta["capacity"], mode="r+")
+                self.next_slot = meta["next_slot"] % self.capacity
+            except Exception as e:
+                logger.warning(f"Discarding unreadable embedding store {self.directory}: {e}")
+                self.dim = None
+                self._slots = {}
+
+    def __len__(self) -> int:
+        """Number of stored embeddings"""
+        return len(self._slots)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Look up an embedding
+
+        Args:
+            key: Text key
+
+        Returns:
+            Copy of the stored vector, or None if missing
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+
+        # Key checked after the copy: writers clear it before touching the vector
+        vector = np.array(self._vectors[slot])
+        if bytes(self._keys[slot]) != key:
+            # Slot reused by another process since it was mapped
+            del self._slots[key]
+            return None
+        return vector
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        """
+        Store an embedding, overwriting the oldest slot when full
+
+        Args:
+            key: Text key
+            vector: Embedding vector
+        """
+        if key in self._slots:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.directory / "lock"):
+            # Ring position and dimension as left by the last writer
+            meta = self._read_meta()
+            if meta is not None and self.dim is None:
+                # Store created by another process after this one started
+                self._open(meta["dim"], meta["capacity"], mode="r+")
+            if meta is not None and meta["dim"] == self.dim and meta["capacity"] == self.capacity:
+                self.next_slot = meta["next_slot"] % self.capacity
+
+            if self.dim is None:
+                self._open(vector.shape[0], self.capacity, mode="w+")
+            elif vector.shape[0] != self.dim:
+                logger.warning(
+                    f"Embedding dimension changed ({self.dim} -> {vector.shape[0]}), "
+                    f"resetting store {self.directory}"
+                )
+                self._open(vector.shape[0], self.capacity, mode="w+")
+                self.next_slot = 0
+
+            slot = self.next_slot
+            old_key = bytes(self._keys[slot])
+            if old_key:
+                if self._slots.get(old_key) == slot:
+                    del self._slots[old_key]
+                self._keys[slot] = b""
+
+            self._vectors[slot] = vector
+            self._keys[slot] = key
+            self._slots[key] = slot
+            self.next_slot = (slot + 1) % self.capacity
+
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta()
+
+    def _open(self, dim: int, capacity: int, mode: str) -> None:
+        """Map the store files ('w+' creates them empty)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.capacity = capacity
+        self._vectors = np.memmap(
+            self.directory / "vectors.f32", dtype=np.float32, mode=mode, shape=(capacity, dim)
+        )
+        self._keys = np.memmap(
+            self.directory / "keys.bin", dtype=f"S{KEY_BYTES}", mode=mode, shape=(capacity,)
+        )
+        self._slots = {bytes(key): slot for slot, key in enumerate(self._keys) if key}
+        if mode == "w+":
+            self._write_meta()
+
+    def _read_meta(self) -> Optional[Dict[str, int]]:
+        """Stored dim, capacity and ring position (None if missing or unreadable)"""
+        try:
+            return json.loads((self.directory / "meta.json").read_text())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable embedding store metadata {self.directory}: {e}")
+            return None
+
+    def _write_meta(self) -> None:
+        """Persist dim, capacity and ring position (atomic replace)"""
+        meta = {"dim": self.dim, "capacity": self.capacity, "next_slot": self.next_slot}
+        tmp_path = self.directory / f"meta.json.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self.directory / "meta.json")
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive advisory lock on path (no-op where fcntl is unavailable)"""
+    with open(path, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    """
+    Two-level cache for query embeddings.
+
+    Level 1 is an in-memory LRU keyed by (model_name, sha1 of the
+    preprocessed text); level 2 is an optional DiskEmbeddingStore per
+    model. A hit at either level skips the transformer forward pass.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        capacity: int = MEMORY_CAPACITY,
+        cache_dir: Optional[Union[str, Path]] = None,
+        disk_capacity: int = DISK_CAPACITY
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            model_name: Model the embeddings come from (part of the key)
+            capacity: Entries kept in memory
+            cache_dir: Directory for the on-disk level (None = memory only)
+            disk_capacity: Slots in the on-disk level
+        """
+        self.model_name = model_name
+        self.capacity = capacity
+        self._memory: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.disk: Optional[DiskEmbeddingStore] = None
+        if cache_dir is not None:
+            self.disk = DiskEmbeddingStore(Path(cache_dir) / model_slug(model_name), capacity=disk_capacity)
+
+    def get_or_compute(self, text: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Cached embedding of a preprocessed text
+
+        Args:
+            text: Preprocessed text (exactly what the model would encode)
+            compute: Called on a miss to run the model
+
+        Returns:
+            Embedding vector (read-only)
+        """
+        key = (self.model_name, text_key(text))
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            if self.disk is not None:
+                vector = self.disk.get(key[1])
+                if vector is not None:
+                    self.disk_hits += 1
+                    return self._remember(key, vector)
+
+            self.misses += 1
+
+        vector = np.asarray(compute(), dtype=np.float32)
+
+        with self._lock:
+            if self.disk is not None:
+                try:
+                    self.disk.put(key[1], vector)
+                except Exception as e:
+                    logger.warning(f"Could not persist query embedding: {e}")
+            return self._remember(key, vector)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Hit/miss counters
+
+        Returns:
+            Dictionary with counts per level and overall hit rate
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self.disk) if self.disk is not None else 0
+            }
+
+    def _remember(self, key: Tuple[str, bytes], vector: np.ndarray) -> np.ndarray:
+        """Insert into the LRU, evicting the least recently used entry"""
+        vector = vector.copy()
+        vector.setflags(write=False)
+        self._memory[key] = vector
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+        return vector
+
+
+class ChunkEmbeddingCache:
+    """
+    Persistent content-addressed embeddings of document chunks.
+
+    Keyed by the hash of the preprocessed chunk text, one directory per
+    model: rebuilding the knowledge base after editing a few PDFs only
+    encodes the chunks whose text changed. Files (loaded memory-mapped):
+    - keys.npy: hex sha1 per row
+    - vectors.npy: float32 matrix (rows x dim)
+
+    New embeddings are kept in memory until save(), which rewrites both
+    files atomically. Entries are never evicted: at 384 dim a cached
+    chunk costs ~1.5 KB.
+    """
+
+    def __init__(self, model_name: str, cache_dir: Union[str, Path]):
+        """
+        Initialize chunk embedding cache
+
+        Args:
+            model_name: Model the embeddings come from
+            cache_dir: Base cache directory
+        """
+        self.model_name = model_name
+        self.directory = Path(cache_dir) / model_slug(model_name)
+        self.hits = 0
+        self.misses = 0
+        self._rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._new: Dict[bytes, np.ndarray] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        """Number of cached embeddings (saved and pending)"""
+        return len(self._rows) + len(self._new)
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Embedding dimension of the cached vectors"""
+        if self._vectors is not None:
+            return self._vectors.shape[1]
+        if self._new:
+            return next(iter(self._new.values())).shape[0]
+        return None
+
+    def get_many(self, keys: List[bytes]) -> Dict[int, np.ndarray]:
+        """
+        Look up embeddings
+
+        Args:
+            keys: Text keys (see text_key)
+
+        Returns:
+            Dictionary position in keys -> vector, for the cached ones
+        """
+        found = {}
+        for position, key in enumerate(keys):
+            row = self._rows.get(key)
+            if row is not None:
+                found[position] = np.array(self._vectors[row])
+            elif key in self._new:
+                found[position] = self._new[key]
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def add(self, keys: List[bytes], vectors: List[np.ndarray]) -> None:
+        """
+        Add embeddings (written on save)
+
+        Args:
+            keys: Text keys
+            vectors: Embedding vectors, same order as keys
+        """
+        for key, vector in zip(keys, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            if self.dim is not None and vector.shape[0] != self.dim:
+                logger.warning(
+                    f"Embedding dimension changed ({self.dim} -> {vector.shape[0]}), "
+                    f"discarding chunk cache {self.directory}"
+                )
+                self._rows, self._vectors, self._new = {}, None, {}
+            if key not in self._rows:
+                self._new[key] = vector
+
+    def save(self) -> None:
+        """Write pending embeddings to disk (no-op if nothing changed)"""
+        if not self._new:
+            return
+
+        keys = list(self._rows) + list(self._new)
+        new_vectors = np.stack(list(self._new.values()))
+        vectors = new_vectors if self._vectors is None else np.concatenate([self._vectors, new_vectors])
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, array in (("vectors", vectors), ("keys", np.array(keys, dtype=f"S{KEY_BYTES}"))):
+            tmp_path = self.directory / f"{name}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, self.directory / f"{name}.npy")
+
+        logger.info(f"Saved {len(self._new)} new chunk embeddings ({len(keys)} cached)")
+        self._load()
+
+    def _load(self) -> None:
+        """Map the saved files (mismatched or unreadable files are ignored)"""
+        self._rows, self._vectors, self._new = {}, None, {}
+
+        keys_path = self.directory / "keys.npy"
+        vectors_path = self.directory / "vectors.npy"
+        if not (keys_path.exists() and vectors_path.exists()):
+            return
+
+        try:
+            keys = np.load(keys_path)
+            vectors = np.load(vectors_path, mmap_mode="r")
+            if len(keys) != len(vectors):
+                raise ValueError(f"{len(keys)} keys for {len(vectors)} vectors")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable chunk cache {self.directory}: {e}")
+            return
+
+        self._rows = {bytes(key): row for row, key in enumerate(keys)}
+        self._vectors = vectors
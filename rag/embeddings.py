@@ -6,10 +6,13 @@ Features:
 - Medical acronym expansion for better context
 - Batch processing for efficiency
 - Progress tracking with tqdm
+- Query embedding cache (in-memory LRU + on-disk store)
+- Content-addressed chunk embedding cache for incremental builds
+- Vectorized top-k similarity search (single and batched queries)
 """
 
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import numpy as np
 from tqdm import tqdm
 
@@ -18,7 +21,10 @@ try:
 except ImportError:
     SentenceTransformer = None
 
+from rag.acronyms import AcronymExpander, MEDICAL_ACRONYMS
 from rag.chunker import TextChunk
+from rag.embedding_cache import EmbeddingCache, ChunkEmbeddingCache, MEMORY_CAPACITY, text_key
+from rag.similarity import SimilarityIndex
 
 
 logger = logging.getLogger(__name__)
@@ -28,35 +34,16 @@ class EmbeddingsGenerator:
     """Generate embeddings for text chunks"""
 
     # Medical acronyms common in PCOS research
-    MEDICAL_ACRONYMS = {
-        "PCOS": "Polycystic Ovary Syndrome",
-        "BMI": "Body Mass Index",
-        "CVD": "Cardiovascular Disease",
-        "IR": "Insulin Resistance",
-        "T2D": "Type 2 Diabetes",
-        "MetS": "Metabolic Syndrome",
-        "SHBG": "Sex Hormone-Binding Globulin",
-        "LH": "Luteinizing Hormone",
-        "FSH": "Follicle-Stimulating Hormone",
-        "AMH": "Anti-Müllerian Hormone",
-        "HOMA-IR": "Homeostatic Model Assessment for Insulin Resistance",
-        "OGTT": "Oral Glucose Tolerance Test",
-        "HbA1c": "Glycated Hemoglobin",
-        "HDL": "High-Density Lipoprotein",
-        "LDL": "Low-Density Lipoprotein",
-        "TG": "Triglycerides",
-        "WHR": "Waist-to-Hip Ratio",
-        "QOL": "Quality of Life",
-        "PCOS-Q": "PCOS Questionnaire",
-        "ART": "Assisted Reproductive Technology",
-        "IVF": "In Vitro Fertilization",
-    }
+    MEDICAL_ACRONYMS = MEDICAL_ACRONYMS
 
     def __init__(
         self,
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         batch_size: int = 32,
-        expand_acronyms: bool = True
+        expand_acronyms: bool = True,
+        cache_size: int = MEMORY_CAPACITY,
+        cache_dir: Optional[str] = None,
+        chunk_cache_dir: Optional[str] = None
     ):
         """
         Initialize embeddings generator
@@ -65,6 +52,9 @@ class EmbeddingsGenerator:
             model_name: Sentence-transformers model name
             batch_size: Batch size for processing
             expand_acronyms: Whether to expand medical acronyms
+            cache_size: Query embeddings kept in memory (0 = no cache)
+            cache_dir: Directory for the persistent query cache (None = memory only)
+            chunk_cache_dir: Directory for the persistent chunk embedding cache (None = disabled)
         """
         if SentenceTransformer is None:
             raise ImportError(
@@ -75,6 +65,15 @@ class EmbeddingsGenerator:
         self.model_name = model_name
         self.batch_size = batch_size
         self.expand_acronyms = expand_acronyms
+        self.acronym_expander = AcronymExpander(self.MEDICAL_ACRONYMS)
+        self.query_cache = (
+            EmbeddingCache(model_name, capacity=cache_size, cache_dir=cache_dir)
+            if cache_size > 0 else None
+        )
+        self.chunk_cache = (
+            ChunkEmbeddingCache(model_name, chunk_cache_dir)
+            if chunk_cache_dir is not None else None
+        )
 
         logger.info(f"Loading embedding model: {model_name}")
         self.model = SentenceTransformer(model_name)
@@ -93,22 +92,8 @@ class EmbeddingsGenerator:
         if not self.expand_acronyms:
             return text
 
-        # Expand medical acronyms for better context
-        processed = text
-
-        for acronym, expansion in self.MEDICAL_ACRONYMS.items():
-            # Replace acronym with "acronym (expansion)" pattern
-            # But only if it's a standalone word
-            import re
-            pattern = r'\b' + re.escape(acronym) + r'\b'
-
-            # Only replace first occurrence in each sentence to avoid repetition
-            def replace_first(match):
-                return f"{acronym} ({expansion})"
-
-            processed = re.sub(pattern, replace_first, processed, count=1)
-
-        return processed
+        # Expand medical acronyms for better context (first occurrence only)
+        return self.acronym_expander.expand(text)
 
     def generate_embedding(self, text: str) -> np.ndarray:
         """
@@ -121,8 +106,15 @@ class EmbeddingsGenerator:
             Embedding vector as numpy array
         """
         preprocessed = self._preprocess_text(text)
-        embedding = self.model.encode(preprocessed, convert_to_numpy=True)
-        return embedding
+
+        if self.query_cache is None:
+            return self.model.encode(preprocessed, convert_to_numpy=True)
+
+        # Repeated questions skip the forward pass
+        return self.query_cache.get_or_compute(
+            preprocessed,
+            lambda: self.model.encode(preprocessed, convert_to_numpy=True)
+        )
 
     def generate_embeddings_batch(
         self,
@@ -144,7 +136,27 @@ class EmbeddingsGenerator:
         # Preprocess all texts
         preprocessed_texts = [self._preprocess_text(text) for text in texts]
 
-        # Generate embeddings in batches
+        all_embeddings = self._encode_batches(preprocessed_texts, show_progress)
+
+        logger.info(f"Generated {len(all_embeddings)} embeddings")
+
+        return all_embeddings
+
+    def _encode_batches(
+        self,
+        preprocessed_texts: List[str],
+        show_progress: bool
+    ) -> List[np.ndarray]:
+        """
+        Run the model over preprocessed texts in batches
+
+        Args:
+            preprocessed_texts: Texts already passed through _preprocess_text
+            show_progress: Show progress bar
+
+        Returns:
+            List of embedding vectors
+        """
         all_embeddings = []
 
         if show_progress:
@@ -174,8 +186,6 @@ class EmbeddingsGenerator:
         if pbar:
             pbar.close()
 
-        logger.info(f"Generated {len(all_embeddings)} embeddings")
-
         return all_embeddings
 
     def generate_chunk_embeddings(
@@ -198,8 +208,11 @@ class EmbeddingsGenerator:
         # Extract texts
         texts = [chunk.text for chunk in chunks]
 
-        # Generate embeddings
-        embeddings = self.generate_embeddings_batch(texts, show_progress=show_progress)
+        # Generate embeddings (only cache misses go to the model)
+        if self.chunk_cache is None:
+            embeddings = self.generate_embeddings_batch(texts, show_progress=show_progress)
+        else:
+            embeddings = self._cached_embeddings(texts, show_progress)
 
         # Create mapping
         chunk_embeddings = {
@@ -211,6 +224,54 @@ class EmbeddingsGenerator:
 
         return chunk_embeddings
 
+    def _cached_embeddings(
+        self,
+        texts: List[str],
+        show_progress: bool
+    ) -> List[np.ndarray]:
+        """
+        Embeddings through the chunk cache, keyed by preprocessed text hash
+
+        Args:
+            texts: List of input texts
+            show_progress: Show progress bar for the misses
+
+        Returns:
+            List of embedding vectors, same order as texts
+        """
+        preprocessed_texts = [self._preprocess_text(text) for text in texts]
+        keys = [text_key(text) for text in preprocessed_texts]
+        embeddings = self.chunk_cache.get_many(keys)
+
+        # Identical chunks (e.g. repeated boilerplate) are encoded once
+        missing: Dict[bytes, str] = {}
+        for position, (key, text) in enumerate(zip(keys, preprocessed_texts)):
+            if position not in embeddings:
+                missing.setdefault(key, text)
+
+        logger.info(f"Chunk cache: {len(embeddings)} cached, {len(missing)} to encode")
+
+        if missing:
+            encoded = self._encode_batches(list(missing.values()), show_progress)
+            self.chunk_cache.add(list(missing), encoded)
+            self.chunk_cache.save()
+
+            by_key = dict(zip(missing, encoded))
+            for position, key in enumerate(keys):
+                if position not in embeddings:
+                    embeddings[position] = by_key[key]
+
+        return [embeddings[position] for position in range(len(texts))]
+
+    def cache_stats(self) -> Dict[str, float]:
+        """
+        Get query cache hit/miss counters
+
+        Returns:
+            Cache statistics (empty if the cache is disabled)
+        """
+        return self.query_cache.stats() if self.query_cache is not None else {}
+
     def get_embedding_dimension(self) -> int:
         """
         Get embedding dimension
@@ -244,10 +305,25 @@ class EmbeddingsGenerator:
 
         return float(similarity)
 
+    def build_similarity_index(
+        self,
+        chunk_embeddings: Dict[str, np.ndarray]
+    ) -> SimilarityIndex:
+        """
+        Build a reusable similarity index (normalized float32 matrix)
+
+        Args:
+            chunk_embeddings: Dictionary of chunk embeddings
+
+        Returns:
+            SimilarityIndex over the chunks
+        """
+        return SimilarityIndex.from_dict(chunk_embeddings)
+
     def find_most_similar(
         self,
         query_embedding: np.ndarray,
-        chunk_embeddings: Dict[str, np.ndarray],
+        chunk_embeddings: Union[Dict[str, np.ndarray], SimilarityIndex],
         top_k: int = 5
     ) -> List[tuple]:
         """
@@ -255,22 +331,44 @@ class EmbeddingsGenerator:
 
         Args:
             query_embedding: Query embedding
-            chunk_embeddings: Dictionary of chunk embeddings
+            chunk_embeddings: Dictionary of chunk embeddings, or an index from
+                build_similarity_index (reuse it across queries)
             top_k: Number of results to return
 
         Returns:
             List of (chunk_id, similarity_score) tuples
         """
-        similarities = []
+        index = self._as_index(chunk_embeddings)
+        return index.search(query_embedding, top_k=top_k)
 
-        for chunk_id, embedding in chunk_embeddings.items():
-            similarity = self.compute_similarity(query_embedding, embedding)
-            similarities.append((chunk_id, similarity))
+    def find_most_similar_batch(
+        self,
+        query_embeddings: Union[np.ndarray, List[np.ndarray]],
+        chunk_embeddings: Union[Dict[str, np.ndarray], SimilarityIndex],
+        top_k: int = 5
+    ) -> List[List[tuple]]:
+        """
+        Find most similar chunks for many queries at once
 
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        Args:
+            query_embeddings: Query embeddings (matrix or list of vectors)
+            chunk_embeddings: Dictionary of chunk embeddings or SimilarityIndex
+            top_k: Number of results per query
 
-        return similarities[:top_k]
+        Returns:
+            One list of (chunk_id, similarity_score) tuples per query
+        """
+        index = self._as_index(chunk_embeddings)
+        return index.search_batch(np.asarray(query_embeddings), top_k=top_k)
+
+    @staticmethod
+    def _as_index(
+        chunk_embeddings: Union[Dict[str, np.ndarray], SimilarityIndex]
+    ) -> SimilarityIndex:
+        """Use a prebuilt index as is, build one from a dictionary"""
+        if isinstance(chunk_embeddings, SimilarityIndex):
+            return chunk_embeddings
+        return SimilarityIndex.from_dict(chunk_embeddings)
 
 
 def main():
@@ -13,6 +13,7 @@ try:
     import numpy as np
     import faiss
     from sentence_transformers import SentenceTransformer
+    from rag.embedding_cache import EmbeddingCache
     DEPENDENCIES_AVAILABLE = True
 except ImportError:
     DEPENDENCIES_AVAILABLE = False
@@ -84,14 +85,20 @@ class PCOSKnowledgeBase:
         self.docs_path = self.cache_dir / "documents.pkl"
 
         # Initialize PDF-based RAG system if available
+        self.query_cache_dir = self.cache_dir / "query_embeddings"
         self.vector_store = None
         self.embeddings_generator = None
+        self.query_cache = None
 
         if self.use_pdf_rag:
             try:
                 logger.info("Initializing PDF-based RAG system...")
                 self.vector_store = VectorStore()
-                self.embeddings_generator = EmbeddingsGenerator(model_name=model_name)
+                self.embeddings_generator = EmbeddingsGenerator(
+                    model_name=model_name,
+                    cache_dir=str(self.query_cache_dir)
+                )
+                self.query_cache = self.embeddings_generator.query_cache
 
                 # Check if ChromaDB has data
                 stats = self.vector_store.get_statistics()
@@ -238,11 +245,14 @@ class PCOSKnowledgeBase:
             logger.warning("Index not built, building now...")
             self.build_index()
 
-        # Create query embedding
-        query_embedding = self.model.encode(
-            [query],
-            convert_to_numpy=True
-        )
+        # Create query embedding (repeated questions come from the cache)
+        if self.query_cache is None:
+            self.query_cache = EmbeddingCache(self.model_name, cache_dir=self.query_cache_dir)
+
+        query_embedding = np.array([self.query_cache.get_or_compute(
+            query,
+            lambda: self.model.encode(query, convert_to_numpy=True)
+        )])
 
         # Search in FAISS
         distances, indices = self.index.search(query_embedding, top_k)
@@ -364,12 +374,20 @@ class PCOSKnowledgeBase:
             }
 
         try:
-            # Query vector store
-            results = self.vector_store.query_by_text(
-                query_text=query,
-                top_k=top_k,
-                category_filter=category_filter
-            )
+            # Query vector store with our own (cached) query embedding,
+            # the same model and preprocessing used for the stored chunks
+            if self.embeddings_generator is not None:
+                results = self.vector_store.query(
+                    query_embedding=self.embeddings_generator.generate_embedding(query),
+                    top_k=top_k,
+                    category_filter=category_filter
+                )
+            else:
+                results = self.vector_store.query_by_text(
+                    query_text=query,
+                    top_k=top_k,
+                    category_filter=category_filter
+                )
 
             if not results['chunks']:
                 return {
@@ -470,6 +488,10 @@ class PCOSKnowledgeBase:
             except Exception as e:
                 stats["pdf_rag"] = {"status": "error", "message": str(e)}
 
+        # Query embedding cache
+        if self.query_cache is not None:
+            stats["query_cache"] = self.query_cache.stats()
+
         # Legacy FAISS stats
         if self.index is None:
             stats["legacy_faiss"] = {
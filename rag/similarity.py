@@ -0,0 +1,142 @@
+"""
+Similarity Index - Vectorized cosine top-k over embeddings
+
+Features:
+- Contiguous, pre-normalized float32 matrix with an ID array
+- One matrix-vector product per query, top-k via argpartition
+- Batched search for many queries at once
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+QUERY_BATCH = 256       # queries scored per matrix product (bounds memory)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize rows as float32 (zero vectors stay zero)
+
+    Args:
+        vectors: Matrix (n x dim) or single vector
+
+    Returns:
+        Contiguous float32 array with unit-norm rows
+    """
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2, copy=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return np.ascontiguousarray(vectors)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores along the last axis, best first
+
+    Args:
+        scores: Scores (n,) or (queries x n)
+        top_k: Number of results
+
+    Returns:
+        Index array (top_k,) or (queries x top_k)
+    """
+    n = scores.shape[-1]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class SimilarityIndex:
+    """Cosine similarity search over a fixed set of embeddings"""
+
+    def __init__(self, ids: Sequence[str], embeddings: np.ndarray):
+        """
+        Initialize similarity index
+
+        Args:
+            ids: Identifier per row
+            embeddings: Matrix (n x dim), normalized here
+        """
+        if len(ids) != len(embeddings):
+            raise ValueError(f"{len(ids)} ids for {len(embeddings)} embeddings")
+
+        self.ids = np.asarray(ids, dtype=object)
+        self.matrix = normalize_rows(embeddings) if len(ids) else np.empty((0, 0), dtype=np.float32)
+
+    @classmethod
+    def from_dict(cls, embeddings: Dict[str, np.ndarray]) -> "SimilarityIndex":
+        """
+        Build from a chunk_id -> embedding mapping
+
+        Args:
+            embeddings: Dictionary of embeddings
+
+        Returns:
+            SimilarityIndex with rows in dictionary order
+        """
+        if not embeddings:
+            return cls([], np.empty((0, 0), dtype=np.float32))
+        return cls(list(embeddings), np.stack(list(embeddings.values())))
+
+    def __len__(self) -> int:
+        """Number of indexed embeddings"""
+        return len(self.ids)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Most similar embeddings to a query
+
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results to return
+
+        Returns:
+            List of (id, cosine similarity) tuples, best first
+        """
+        return self.search_batch(np.asarray(query_embedding)[np.newaxis, :], top_k)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        batch_size: Optional[int] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Most similar embeddings for many queries at once
+
+        Args:
+            query_embeddings: Matrix (queries x dim)
+            top_k: Number of results per query
+            batch_size: Queries per matrix product (default: QUERY_BATCH)
+
+        Returns:
+            One list of (id, cosine similarity) tuples per query, best first
+        """
+        queries = normalize_rows(query_embeddings)
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+
+        batch_size = batch_size or QUERY_BATCH
+        results = []
+        for start in range(0, len(queries), batch_size):
+            scores = queries[start:start + batch_size] @ self.matrix.T
+            best = top_k_indices(scores, top_k)
+            best_scores = np.take_along_axis(scores, best, axis=-1)
+
+            results.extend(
+                list(zip(self.ids[row].tolist(), row_scores.tolist()))
+                for row, row_scores in zip(best, best_scores)
+            )
+
+        return results
@@ -0,0 +1,134 @@
+"""
+Benchmark espansione acronimi - Loop di regex per acronimo vs passaggio singolo
+
+Confronta, sull'intero set di chunk della knowledge base:
+1. Loop originale di EmbeddingsGenerator._preprocess_text (una regex
+   compilata e applicata per ogni acronimo e per ogni testo)
+2. AcronymExpander: un'unica alternanza precompilata, un passaggio per testo
+
+Chunk letti da docs/processed/chunks/metadata.json (scritto da
+scripts/setup_rag.py), altrimenti dai PDF in docs/raw_pdfs, altrimenti
+generati dai documenti di rag.pcos_documents (--synthetic-chunks).
+
+I due metodi devono dare lo stesso testo, salvo dove un acronimo ne contiene
+un altro (HOMA-IR / IR, PCOS-Q / PCOS): ora è espanso solo quello lungo.
+
+    python scripts/benchmark_acronyms.py
+    python scripts/benchmark_acronyms.py --synthetic-chunks 20000
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rag.acronyms import AcronymExpander, MEDICAL_ACRONYMS
+from rag.pcos_documents import get_all_documents
+
+METADATA_PATH = Path("docs/processed/chunks/metadata.json")
+PDF_DIR = Path("docs/raw_pdfs")
+OVERLAPPING = ("HOMA-IR", "PCOS-Q")
+
+
+def legacy_preprocess(text: str) -> str:
+    """Copia del vecchio EmbeddingsGenerator._preprocess_text (riferimento)"""
+    processed = text
+
+    for acronym, expansion in MEDICAL_ACRONYMS.items():
+        import re
+        pattern = r'\b' + re.escape(acronym) + r'\b'
+
+        def replace_first(match):
+            return f"{acronym} ({expansion})"
+
+        processed = re.sub(pattern, replace_first, processed, count=1)
+
+    return processed
+
+
+def load_chunks(synthetic_chunks: int, seed: int) -> Tuple[str, List[str]]:
+    """Testi dei chunk e descrizione della sorgente"""
+    if METADATA_PATH.exists():
+        metadata = json.loads(METADATA_PATH.read_text(encoding="utf-8"))
+        return str(METADATA_PATH), [chunk["text"] for chunk in metadata["chunks"]]
+
+    if PDF_DIR.exists():
+        try:
+            from rag.pdf_processor import PDFProcessor
+            from rag.chunker import Chunker
+            documents = PDFProcessor(pdf_dir=str(PDF_DIR)).process_all_pdfs()
+            if documents:
+                chunks = Chunker(chunk_size=700, overlap=50, min_chunk_size=100).chunk_documents(documents)
+                return f"{PDF_DIR} ({len(documents)} PDF)", [chunk.text for chunk in chunks]
+        except ImportError:
+            pass
+
+    # Chunk di ~700 token dai paragrafi dei documenti integrati, con acronimi
+    rng = random.Random(seed)
+    paragraphs = [
+        p.strip() for doc in get_all_documents()
+        for p in re.split(r"\n\s*\n", doc["content"]) if p.strip()
+    ]
+    acronyms = list(MEDICAL_ACRONYMS)
+    chunks = []
+    for _ in range(synthetic_chunks):
+        parts, size = [], 0
+        while size < 2800:
+            paragraph = rng.choice(paragraphs)
+            if rng.random() < 0.5:
+                paragraph += f" Valutare {rng.choice(acronyms)} e {rng.choice(acronyms)}."
+            parts.append(paragraph)
+            size += len(paragraph)
+        chunks.append("\n\n".join(parts))
+    return f"synthetic ({len(paragraphs)} paragraphs from rag.pcos_documents)", chunks
+
+
+def best_of(fn: Callable[[], List[str]], repeats: int) -> Tuple[float, List[str]]:
+    """Tempo minimo su più esecuzioni (secondi) e risultato dell'ultima"""
+    best, result = float("inf"), []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark espansione acronimi")
+    parser.add_argument("--synthetic-chunks", type=int, default=3000,
+                        help="Chunk generati se non ci sono metadata né PDF")
+    parser.add_argument("--repeats", type=int, default=3, help="Esecuzioni per misura (minimo)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    args = parser.parse_args()
+
+    source, texts = load_chunks(args.synthetic_chunks, args.seed)
+    total_chars = sum(len(text) for text in texts)
+    print(f"Chunks: {len(texts):,} from {source}  ({total_chars / 1e6:.1f}M chars)")
+
+    expander = AcronymExpander(MEDICAL_ACRONYMS)
+    legacy_seconds, legacy = best_of(lambda: [legacy_preprocess(t) for t in texts], args.repeats)
+    single_seconds, single = best_of(lambda: [expander.expand(t) for t in texts], args.repeats)
+
+    differing = [i for i, (a, b) in enumerate(zip(legacy, single)) if a != b]
+    unexpected = [i for i in differing if not any(a in texts[i] for a in OVERLAPPING)]
+    assert not unexpected, f"{len(unexpected)} chunks differ without overlapping acronyms"
+
+    print(f"\n  regex per acronym: {legacy_seconds:>8.3f} s  ({legacy_seconds / len(texts) * 1e6:.1f} µs/chunk)")
+    print(f"  single pass:       {single_seconds:>8.3f} s  ({single_seconds / len(texts) * 1e6:.1f} µs/chunk,"
+          f" x{legacy_seconds / single_seconds:.1f})")
+
+    print(f"\n✓ Identical output for {len(texts) - len(differing):,} chunks;"
+          f" {len(differing):,} differ only on {' / '.join(OVERLAPPING)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Cohort Analytics Benchmark - Scaling con il numero di processi worker
+
+Carica N utenti sintetici in un database temporaneo e misura
+CohortAnalytics con 1, 2, 4, ... worker (cache disabilitata, pool già
+avviato).
+
+    python scripts/benchmark_cohort.py
+    python scripts/benchmark_cohort.py --users 2000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager
+from tools.cohort_analytics import CohortAnalytics
+from synthetic_history import generate_histories, load_history
+
+
+def main() -> int:
+    """Entry point CLI"""
+    cpus = os.cpu_count() or 1
+    default_workers = [w for w in (1, 2, 4, 8, 16) if w <= cpus] or [1]
+
+    parser = argparse.ArgumentParser(description="Benchmark cohort analytics")
+    parser.add_argument("--users", type=int, default=500, help="Numero di utenti sintetici")
+    parser.add_argument("--years", type=float, default=2.0, help="Anni di storico per utente")
+    parser.add_argument("--entries-per-day", type=float, default=1.5, help="Sintomi medi al giorno")
+    parser.add_argument("--months", type=int, default=24, help="Mesi analizzati dal report")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers,
+                        help="Numero di worker da misurare")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(db_url=f"sqlite:///{Path(tmp) / 'cohort.db'}")
+
+        t0 = time.perf_counter()
+        rows = sum(
+            load_history(db, history)
+            for history in generate_histories(
+                args.users, args.years, args.entries_per_day, args.seed, datetime.now()
+            )
+        )
+        print(f"Loaded {rows:,} symptoms for {args.users} users in {time.perf_counter() - t0:.1f} s")
+
+        baseline = None
+        reference = None
+        for workers in args.workers:
+            cohort = CohortAnalytics(db, workers=workers, cache_ttl=0)
+
+            # Il pool resta attivo tra le richieste: si misura la seconda
+            cohort.get_cohort_report(months=args.months)
+            t0 = time.perf_counter()
+            report = cohort.get_cohort_report(months=args.months)
+            seconds = time.perf_counter() - t0
+            cohort.close()
+
+            report.pop("generated_at", None)
+            if reference is None:
+                reference, baseline = report, seconds
+            assert report == reference, f"Report with {workers} workers differs"
+
+            print(f"workers={workers:>2}  {seconds:>8.3f} s  speedup x{baseline / seconds:.2f}")
+
+        db.get_session().get_bind().dispose()
+
+    print("\n✓ All worker counts return identical reports")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
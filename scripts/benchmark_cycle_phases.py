@@ -0,0 +1,153 @@
+"""
+Cycle Phase Labeling Benchmark - loop per sintomo vs searchsorted
+
+Confronta, su 100k sintomi e 100 cicli (default):
+1. Loop originale di PatternAnalyzer._determine_cycle_phase (O(S·C²))
+2. assign_cycle_phase per data (bisect, O(S log C))
+3. label_cycle_phases vettoriale (np.searchsorted, O((S + C) log C)),
+   sia end-to-end da liste di datetime sia sul solo core ad array
+
+Il loop originale costa ~C² per sintomo: di default viene misurato su un
+campione ed estrapolato linearmente (--full-legacy per eseguirlo tutto).
+Tutti i metodi devono produrre le stesse etichette.
+
+    python scripts/benchmark_cycle_phases.py
+    python scripts/benchmark_cycle_phases.py --symptoms 1000000 --cycles 400
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from database.cycle_phases import assign_cycle_phase, label_cycle_phases, label_cycle_phase_codes
+
+
+def legacy_determine_cycle_phase(date: datetime, cycles: List[Dict]) -> Optional[str]:
+    """Copia del vecchio PatternAnalyzer._determine_cycle_phase (riferimento)"""
+    for cycle in cycles:
+        start_date = datetime.fromisoformat(cycle['start_date'])
+
+        # Find next cycle start (if exists)
+        next_cycle_start = None
+        for next_cycle in cycles:
+            next_start = datetime.fromisoformat(next_cycle['start_date'])
+            if next_start > start_date:
+                if next_cycle_start is None or next_start < next_cycle_start:
+                    next_cycle_start = next_start
+
+        # If date is during this cycle
+        if date >= start_date:
+            if next_cycle_start and date < next_cycle_start:
+                days_from_start = (date - start_date).days
+
+                if days_from_start <= 5:
+                    return "early"
+                elif days_from_start <= 14:
+                    return "mid"
+                else:
+                    days_to_next = (next_cycle_start - date).days
+                    if days_to_next <= 3:
+                        return "pre_menstrual"
+                    else:
+                        return "late"
+
+            elif not next_cycle_start:
+                days_from_start = (date - start_date).days
+                if days_from_start <= 5:
+                    return "early"
+                elif days_from_start <= 14:
+                    return "mid"
+                else:
+                    return "late"
+
+    return None
+
+
+def make_data(n_symptoms: int, n_cycles: int, seed: int):
+    """Genera inizi ciclo irregolari e sintomi distribuiti sullo stesso periodo"""
+    rng = random.Random(seed)
+    origin = datetime(2020, 1, 1)
+
+    starts = []
+    current = origin
+    for _ in range(n_cycles):
+        starts.append(current)
+        current += timedelta(days=rng.randint(21, 45))
+
+    span = (current - origin).total_seconds()
+    dates = [
+        origin - timedelta(days=10) + timedelta(seconds=rng.uniform(0, span))
+        for _ in range(n_symptoms)
+    ]
+
+    # get_cycles restituisce i cicli dal più recente
+    cycles = [{'start_date': s.isoformat()} for s in sorted(starts, reverse=True)]
+    return dates, starts, cycles
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark etichettatura fasi del ciclo")
+    parser.add_argument("--symptoms", type=int, default=100_000, help="Numero di sintomi")
+    parser.add_argument("--cycles", type=int, default=100, help="Numero di cicli")
+    parser.add_argument("--legacy-sample", type=int, default=1_000,
+                        help="Sintomi su cui misurare il loop originale")
+    parser.add_argument("--full-legacy", action="store_true",
+                        help="Esegui il loop originale su tutti i sintomi (lento)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    args = parser.parse_args()
+
+    dates, starts, cycles = make_data(args.symptoms, args.cycles, args.seed)
+    print(f"Symptoms: {len(dates):,}  Cycles: {len(starts)}")
+
+    # 1. Loop originale (campione + estrapolazione)
+    sample = dates if args.full_legacy else dates[:args.legacy_sample]
+    t0 = time.perf_counter()
+    legacy = [legacy_determine_cycle_phase(d, cycles) for d in sample]
+    legacy_seconds = (time.perf_counter() - t0) * len(dates) / len(sample)
+
+    # 2. bisect per data
+    sorted_starts = sorted(starts)
+    t0 = time.perf_counter()
+    bisect_labels = [assign_cycle_phase(d, sorted_starts) for d in dates]
+    bisect_seconds = time.perf_counter() - t0
+
+    # 3. searchsorted vettoriale (end-to-end da datetime Python)
+    t0 = time.perf_counter()
+    phases, cycle_days = label_cycle_phases(dates, starts)
+    vector_seconds = time.perf_counter() - t0
+
+    # 3b. solo il core ad array (dati già in datetime64)
+    dates_array = np.asarray(dates, dtype='datetime64[us]')
+    starts_array = np.asarray(starts, dtype='datetime64[us]')
+    t0 = time.perf_counter()
+    label_cycle_phase_codes(dates_array, starts_array)
+    core_seconds = time.perf_counter() - t0
+
+    # Verifica equivalenza
+    assert phases[:len(sample)] == legacy, "searchsorted labels differ from legacy loop"
+    assert phases == [p for p, _ in bisect_labels], "searchsorted labels differ from bisect"
+    assert cycle_days == [d for _, d in bisect_labels], "cycle days differ from bisect"
+
+    estimated = "" if args.full_legacy else f" (estimated from {len(sample):,} symptoms)"
+    print(f"\nLegacy loop:   {legacy_seconds:>10.3f} s{estimated}")
+    print(f"bisect:        {bisect_seconds:>10.3f} s  (x{legacy_seconds / bisect_seconds:,.0f})")
+    print(f"searchsorted:  {vector_seconds:>10.3f} s  (x{legacy_seconds / vector_seconds:,.0f})"
+          "  incl. datetime -> datetime64 conversion")
+    print(f"  array core:  {core_seconds:>10.3f} s  (x{legacy_seconds / core_seconds:,.0f})")
+    print("\n✓ All methods return identical labels")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
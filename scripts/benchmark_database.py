@@ -0,0 +1,256 @@
+"""
+Database Benchmark - Scaling di DatabaseManager su storici sintetici
+
+Misura, per ogni dimensione del database (default 10k, 100k, 1M righe):
+1. Throughput di caricamento bulk (righe/s)
+2. Throughput di add_symptom riga per riga (righe/s)
+3. Latenza get_symptoms (ultimi 10 e finestra 90 giorni)
+4. Latenza get_symptom_summary
+5. Latenza get_cycle_summary
+
+I risultati sono salvati in JSON (con commit git) per confrontare
+regressioni tra commit:
+
+    python scripts/benchmark_database.py
+    python scripts/benchmark_database.py --sizes 10000 --compare data/benchmarks/database_<sha>.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager, SymptomEntry, SymptomType
+from synthetic_history import generate_histories, load_history, rows_per_user
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+REGRESSION_THRESHOLD = 1.2  # +20% latenza / -20% throughput
+
+
+def git_commit() -> str:
+    """Commit corrente (o 'unknown' fuori da un repo git)"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent.parent,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def time_calls(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """
+    Esegue fn più volte e ritorna statistiche di latenza in millisecondi.
+
+    Args:
+        fn: Funzione da misurare
+        repeats: Numero di esecuzioni
+
+    Returns:
+        Dizionario con median_ms, p95_ms, min_ms
+    """
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+def run_size(
+    target_rows: int,
+    years: float,
+    entries_per_day: float,
+    seed: int,
+    repeats: int,
+    insert_samples: int,
+    workdir: Path
+) -> Dict[str, Any]:
+    """
+    Esegue il benchmark per una dimensione del database.
+
+    Returns:
+        Dizionario con i risultati per questa dimensione
+    """
+    db_path = workdir / f"bench_{target_rows}.db"
+    db = DatabaseManager(db_url=f"sqlite:///{db_path}")
+
+    n_users = max(1, -(-target_rows // rows_per_user(years, entries_per_day)))
+    end_date = datetime.now()
+
+    # 1. Caricamento bulk
+    total_rows = 0
+    load_seconds = 0.0
+    for history in generate_histories(n_users, years, entries_per_day, seed, end_date):
+        t0 = time.perf_counter()
+        total_rows += load_history(db, history)
+        load_seconds += time.perf_counter() - t0
+
+    user_ids = list(range(1, n_users + 1))
+    rng = random.Random(seed)
+
+    # 2. add_symptom riga per riga (un commit per entry) per un utente esistente
+    probe_user = user_ids[0]
+    t0 = time.perf_counter()
+    for i in range(insert_samples):
+        db.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI,
+            intensity=1 + i % 10,
+            timestamp=end_date - timedelta(minutes=i)
+        ), user_id=probe_user)
+    add_seconds = time.perf_counter() - t0
+
+    def pick_user() -> int:
+        return rng.choice(user_ids)
+
+    window_start = end_date - timedelta(days=90)
+
+    result = {
+        "target_rows": target_rows,
+        "symptom_rows": total_rows + insert_samples,
+        "users": n_users,
+        "bulk_load_rows_per_s": round(total_rows / load_seconds, 1) if load_seconds else None,
+        "add_symptom_rows_per_s": round(insert_samples / add_seconds, 1) if add_seconds else None,
+        "get_symptoms_recent": time_calls(
+            lambda: db.get_symptoms(limit=10, user_id=pick_user()), repeats
+        ),
+        "get_symptoms_90d": time_calls(
+            lambda: db.get_symptoms(
+                limit=1000, start_date=window_start, end_date=end_date, user_id=pick_user()
+            ),
+            repeats
+        ),
+        "symptom_summary_30d": time_calls(
+            lambda: db.get_symptom_summary(days=30, user_id=pick_user()), repeats
+        ),
+        "cycle_summary_6m": time_calls(
+            lambda: db.get_cycle_summary(months=6, user_id=pick_user()), repeats
+        ),
+    }
+
+    db.get_session().get_bind().dispose()
+    db_path.unlink(missing_ok=True)
+
+    return result
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    """
+    Confronta due file di risultati e segnala le regressioni.
+
+    Returns:
+        Lista di righe di report (le regressioni iniziano con '!!')
+    """
+    lines = [f"Compare {previous.get('commit')} -> {current.get('commit')}"]
+
+    for size, cur in current["results"].items():
+        prev = previous.get("results", {}).get(size)
+        if not prev:
+            continue
+
+        for metric, value in cur.items():
+            old = prev.get(metric)
+            if isinstance(value, dict) and isinstance(old, dict):
+                ratio = value["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+                flag = "!!" if ratio > REGRESSION_THRESHOLD else "  "
+                lines.append(
+                    f"{flag} {size:>8} {metric:<24} {old['median_ms']:>9.3f} -> "
+                    f"{value['median_ms']:>9.3f} ms  (x{ratio:.2f})"
+                )
+            elif metric.endswith("_per_s") and value and old:
+                ratio = old / value
+                flag = "!!" if ratio > REGRESSION_THRESHOLD else "  "
+                lines.append(
+                    f"{flag} {size:>8} {metric:<24} {old:>9.1f} -> {value:>9.1f} rows/s"
+                )
+
+    return lines
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Numero di righe sintomi per ogni run")
+    parser.add_argument("--years", type=float, default=3.0, help="Anni di storico per utente")
+    parser.add_argument("--entries-per-day", type=float, default=2.0, help="Sintomi medi al giorno")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    parser.add_argument("--repeats", type=int, default=50, help="Ripetizioni per ogni query")
+    parser.add_argument("--insert-samples", type=int, default=500,
+                        help="Entry inserite con add_symptom per misurare il throughput")
+    parser.add_argument("--output", type=str, default=None,
+                        help="File JSON di output (default: data/benchmarks/database_<commit>.json)")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="File JSON di un run precedente da confrontare")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else (
+        Path(__file__).parent.parent / "data" / "benchmarks" / f"database_{commit}.json"
+    )
+
+    report = {
+        "benchmark": "database",
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "years": args.years,
+            "entries_per_day": args.entries_per_day,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "insert_samples": args.insert_samples,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            print(f"Running size {size:,}...")
+            result = run_size(
+                size, args.years, args.entries_per_day, args.seed,
+                args.repeats, args.insert_samples, Path(tmp)
+            )
+            report["results"][str(size)] = result
+
+            print(f"  rows={result['symptom_rows']:,} users={result['users']}")
+            print(f"  bulk load:      {result['bulk_load_rows_per_s']:>12,.0f} rows/s")
+            print(f"  add_symptom:    {result['add_symptom_rows_per_s']:>12,.0f} rows/s")
+            for key in ("get_symptoms_recent", "get_symptoms_90d",
+                        "symptom_summary_30d", "cycle_summary_6m"):
+                print(f"  {key:<22} median {result[key]['median_ms']:>8.3f} ms  "
+                      f"p95 {result[key]['p95_ms']:>8.3f} ms")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to: {output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print()
+        print("\n".join(compare(report, previous)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
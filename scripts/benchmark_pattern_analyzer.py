@@ -0,0 +1,472 @@
+"""
+PatternAnalyzer Benchmark - Tempi, memoria ed equivalenza su storici lunghi
+
+Per ogni lunghezza dello storico (default 1, 3 e 10 anni) carica un utente
+sintetico con più sintomi al giorno e, per ogni metodo pubblico di
+PatternAnalyzer:
+1. Misura la latenza (median/p95/min su più ripetizioni)
+2. Misura il picco di memoria Python (tracemalloc, allocazioni NumPy incluse)
+3. Confronta il risultato con un'implementazione di riferimento in Python
+   puro sui sintomi letti come dizionari (iter_symptom_chunks)
+
+L'orologio di PatternAnalyzer è congelato durante il run, così metodo e
+riferimento usano esattamente la stessa finestra. I p-value dei test di
+permutazione (stocastici) non sono confrontati; statistiche, conteggi e
+medie sì.
+
+    python scripts/benchmark_pattern_analyzer.py
+    python scripts/benchmark_pattern_analyzer.py --years 1 3 --entries-per-day 6 --repeats 3
+    python scripts/benchmark_pattern_analyzer.py --compare data/benchmarks/pattern_analyzer_<sha>.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager
+from database.cycle_phases import CYCLE_PHASES
+from tools import pattern_analyzer
+from tools.pattern_analyzer import PatternAnalyzer, DEFAULT_REPORT_WINDOWS, MIN_SIGNIFICANCE_ENTRIES
+from tools.cycle_heatmap import DEFAULT_MAX_CYCLE_DAY
+from tools.lag_correlation import MIN_OVERLAP_DAYS
+from benchmark_database import compare, git_commit, time_calls
+from synthetic_history import generate_user_history, load_history
+
+
+DEFAULT_YEARS = [1, 3, 10]
+BENCH_USER_ID = 1
+
+
+def _close(a, b, tolerance: float) -> bool:
+    return a is not None and b is not None and abs(a - b) <= tolerance + 1e-9
+
+
+# ============================================================================
+# Implementazioni di riferimento (Python puro, nessuna ottimizzazione)
+# ============================================================================
+
+def _window(symptoms: List[Dict], start: datetime, end: datetime) -> List[Dict]:
+    return [s for s in symptoms if start <= s["ts"] <= end]
+
+
+def check_correlation(result, symptoms, cycles, now, months, **_) -> List[str]:
+    start = now - timedelta(days=months * 30)
+    rows = [s for s in _window(symptoms, start, now) if s["cycle_phase"] in CYCLE_PHASES]
+    if not result.get("success"):
+        return ["correlation: no result"] if rows else []
+
+    errors = []
+    correlations = result["correlations"]
+
+    distribution = dict(Counter(s["cycle_phase"] for s in rows))
+    if correlations["phase_distribution"] != distribution:
+        errors.append("correlation: phase_distribution differs")
+
+    by_cell = defaultdict(list)
+    for s in rows:
+        by_cell[(s["cycle_phase"], s["symptom_type"])].append(s["intensity"])
+    for (phase, stype), values in by_cell.items():
+        got = correlations["symptom_intensity_by_phase"].get(phase, {}).get(stype)
+        if not _close(got, round(sum(values) / len(values), 1), 0.05):
+            errors.append(f"correlation: avg {stype}/{phase} {got}")
+
+    # Chi-quadro tipo × fase (righe/colonne vuote escluse)
+    types = sorted({stype for _, stype in by_cell})
+    phases = [p for p in CYCLE_PHASES if any((p, t) in by_cell for t in types)]
+    n = len(rows)
+    row_totals = {t: sum(len(by_cell.get((p, t), [])) for p in phases) for t in types}
+    col_totals = {p: sum(len(by_cell.get((p, t), [])) for t in types) for p in phases}
+    statistic = sum(
+        (len(by_cell.get((p, t), [])) - row_totals[t] * col_totals[p] / n) ** 2
+        / (row_totals[t] * col_totals[p] / n)
+        for t in types for p in phases
+    ) if len(types) > 1 and len(phases) > 1 else 0.0
+    got = correlations["significance"]["chi_square"]["statistic"]
+    if not _close(got, statistic, 1e-3 * max(1.0, statistic)):
+        errors.append(f"correlation: chi-square {got} != {statistic:.3f}")
+
+    # Media nella fase contro media nelle altre fasi, per tipo
+    tested = correlations["significance"]["intensity_by_phase"]
+    for stype in types:
+        groups = {p: by_cell.get((p, stype), []) for p in CYCLE_PHASES}
+        total = sum(len(v) for v in groups.values())
+        if total < MIN_SIGNIFICANCE_ENTRIES or sum(1 for v in groups.values() if v) < 2:
+            if stype in tested:
+                errors.append(f"correlation: {stype} should not be tested")
+            continue
+        for phase, values in groups.items():
+            if not values:
+                continue
+            others = [v for p, vs in groups.items() if p != phase for v in vs]
+            cell = tested.get(stype, {}).get("phases", {}).get(phase)
+            difference = sum(values) / len(values) - sum(others) / len(others) if others else 0.0
+            if cell is None or cell["count"] != len(values) or not _close(cell["difference"], difference, 0.005):
+                errors.append(f"correlation: intensity test {stype}/{phase}")
+
+    return errors
+
+
+def _least_squares(points):
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    if n < 3 or sxx <= 1e-12:
+        return None
+    slope = sxy / sxx
+    return {"count": n, "avg": mean_y, "slope": slope, "intercept": mean_y - slope * mean_x}
+
+
+def check_trends(result, symptoms, cycles, now, days, **_) -> List[str]:
+    start = now - timedelta(days=days)
+    points = defaultdict(list)
+    for s in _window(symptoms, start, now):
+        points[s["symptom_type"]].append(((s["ts"] - start).total_seconds() / 86400, s["intensity"]))
+
+    expected = {stype: fit for stype, p in points.items() if (fit := _least_squares(p))}
+    trends = result.get("trends", {})
+    if set(trends) != set(expected):
+        return [f"trends: types {sorted(trends)} != {sorted(expected)}"]
+
+    errors = []
+    for stype, fit in expected.items():
+        got = trends[stype]
+        if not (got["count"] == fit["count"]
+                and _close(got["avg_intensity"], fit["avg"], 0.05)
+                and _close(got["slope"], fit["slope"], 0.0005 + 1e-5)
+                and _close(got["intercept"], fit["intercept"], 0.005 + 1e-3)):
+            errors.append(f"trends: {stype} {got} vs {fit}")
+    return errors
+
+
+def check_multi_window(result, symptoms, cycles, now, windows, **_) -> List[str]:
+    longest = max(windows)
+    start = now - timedelta(days=longest)
+
+    errors = []
+    for days in windows:
+        values = defaultdict(list)
+        for s in _window(symptoms, start, now):
+            day = min(max(int((s["ts"] - start).total_seconds() // 86400), 0), longest - 1)
+            if day >= longest - days:
+                values[s["symptom_type"]].append(s["intensity"])
+
+        report = result["reports"][str(days)]
+        if report["total_entries"] != sum(len(v) for v in values.values()):
+            errors.append(f"multi_window: {days}d total_entries")
+        for stype, v in values.items():
+            got = report["symptoms"].get(stype)
+            if got is None or got["count"] != len(v) or not _close(got["avg_intensity"], sum(v) / len(v), 0.05):
+                errors.append(f"multi_window: {days}d {stype}")
+    return errors
+
+
+def check_heatmap(result, symptoms, cycles, now, months, max_day=DEFAULT_MAX_CYCLE_DAY, **_) -> List[str]:
+    start = now - timedelta(days=months * 30)
+    rows = _window(symptoms, start, now)
+    cells = defaultdict(list)
+    for s in rows:
+        if s["cycle_day"] and 1 <= s["cycle_day"] <= max_day:
+            cells[(s["symptom_type"], s["cycle_day"])].append(s["intensity"])
+
+    errors = []
+    if result["total_entries"] != len(rows):
+        errors.append("heatmap: total_entries")
+    if result["unaligned_entries"] != sum(1 for s in rows if not s["cycle_day"]):
+        errors.append("heatmap: unaligned_entries")
+
+    got = {
+        (stype, day): (count, mean)
+        for stype, counts, means in zip(result["symptom_types"], result["counts"], result["mean_intensity"])
+        for day, count, mean in zip(result["days"], counts, means) if count
+    }
+    if set(got) != set(cells):
+        return errors + ["heatmap: non-empty cells differ"]
+    for key, values in cells.items():
+        count, mean = got[key]
+        if count != len(values) or not _close(mean, sum(values) / len(values), 0.005):
+            errors.append(f"heatmap: cell {key}")
+    return errors
+
+
+def check_lagged(result, symptoms, cycles, now, days, max_lag=14, min_correlation=0.2, top_k=10, **_) -> List[str]:
+    start = now - timedelta(days=days)
+    n_days = days + 1
+
+    sums = defaultdict(lambda: [0.0] * n_days)
+    counts = defaultdict(lambda: [0] * n_days)
+    for s in _window(symptoms, start, now):
+        day = min(max(int((s["ts"] - start).total_seconds() // 86400), 0), n_days - 1)
+        sums[s["symptom_type"]][day] += s["intensity"]
+        counts[s["symptom_type"]][day] += 1
+
+    z = {}
+    for stype in sums:
+        series = [t / c if c else 0.0 for t, c in zip(sums[stype], counts[stype])]
+        mean = sum(series) / n_days
+        std = math.sqrt(sum((v - mean) ** 2 for v in series) / n_days)
+        z[stype] = [(v - mean) / std if std > 0 else 0.0 for v in series]
+
+    # Correlazione diretta, ritardo per ritardo: Σ z_i(t) z_j(t+k) / (n - k)
+    expected = []
+    for leader in z:
+        for follower in z:
+            if leader == follower:
+                continue
+            best = None
+            for lag in range(1, min(max_lag, n_days - 1) + 1):
+                if n_days - lag < MIN_OVERLAP_DAYS:
+                    break
+                r = float(np.dot(z[leader][:n_days - lag], z[follower][lag:])) / (n_days - lag)
+                if best is None or r > best[1]:
+                    best = (lag, r)
+            if best and best[1] >= min_correlation:
+                expected.append((leader, follower, best[0], best[1]))
+    expected.sort(key=lambda item: -item[3])
+
+    got = {(r["leader"], r["follower"], r["lag_days"]): r["correlation"] for r in result.get("relationships", [])}
+    want = {(l, f, k): r for l, f, k, r in expected[:top_k]}
+    if set(got) != set(want):
+        return [f"lagged: relationships {sorted(got)} != {sorted(want)}"]
+    return [f"lagged: correlation {key}" for key, r in want.items() if not _close(got[key], r, 0.0005 + 1e-6)]
+
+
+def check_recurring(result, symptoms, cycles, now, min_occurrences=2, **_) -> List[str]:
+    start = now - timedelta(days=180)
+    rows = _window(symptoms, start, now)
+
+    phase_counts = Counter(
+        (s["symptom_type"], s["cycle_phase"]) for s in rows if s["cycle_phase"]
+    )
+    day_types = defaultdict(set)
+    for s in rows:
+        day_types[s["ts"].date()].add(s["symptom_type"])
+    combos = Counter(tuple(sorted(types)) for types in day_types.values() if len(types) >= 2)
+
+    expected = set()
+    if any(start <= c["start_date"] <= now for c in cycles):
+        expected |= {("phase", t, p, n) for (t, p), n in phase_counts.items() if n >= min_occurrences}
+        expected |= {("combo", c, None, n) for c, n in combos.items() if n >= min_occurrences}
+
+    got = {
+        ("phase", p["symptom"], p["phase"], p["occurrences"]) if p["type"] == "cycle_phase_recurrence"
+        else ("combo", tuple(p["symptoms"]), None, p["occurrences"])
+        for p in result.get("patterns", [])
+    }
+    return [] if got == expected else [f"recurring: {len(got ^ expected)} patterns differ"]
+
+
+def check_cooccurrences(result, symptoms, cycles, now, days, min_support=0.1, min_lift=1.0,
+                        max_size=4, min_count=2, **_) -> List[str]:
+    start = now - timedelta(days=days)
+    day_types = defaultdict(set)
+    for s in _window(symptoms, start, now):
+        day_types[s["ts"].date()].add(s["symptom_type"])
+    transactions = list(day_types.values())
+    total = len(transactions)
+
+    support = {t: sum(1 for d in transactions if t in d) / total for t in set().union(*transactions)}
+    expected = {}
+    for size in range(2, max_size + 1):
+        for itemset in combinations(sorted(support), size):
+            count = sum(1 for d in transactions if d.issuperset(itemset))
+            lift = (count / total) / math.prod(support[t] for t in itemset)
+            if count / total >= min_support and count >= min_count and lift >= min_lift:
+                expected[itemset] = (count, round(lift, 2))
+
+    got = {tuple(i["symptoms"]): (i["days"], i["lift"]) for i in result.get("itemsets", [])}
+    return [] if got == expected else [f"cooccurrences: {len(set(got) ^ set(expected))} itemsets differ"]
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def method_cases(years: float, n_permutations: int) -> Dict[str, Dict[str, Any]]:
+    """Argomenti di ogni metodo pubblico, scalati sull'intero storico"""
+    days = int(years * 365)
+    months = max(1, int(years * 12))
+    return {
+        "analyze_symptom_cycle_correlation": {
+            "kwargs": {"months": months, "n_permutations": n_permutations, "seed": 0},
+            "check": check_correlation
+        },
+        "analyze_symptom_trends": {"kwargs": {"days": days, "weekly": True}, "check": check_trends},
+        "multi_window_report": {
+            "kwargs": {"windows": tuple(sorted({*DEFAULT_REPORT_WINDOWS, days}))},
+            "check": check_multi_window
+        },
+        "cycle_day_heatmap": {"kwargs": {"months": months}, "check": check_heatmap},
+        "analyze_lagged_correlations": {"kwargs": {"days": days}, "check": check_lagged},
+        "identify_recurring_patterns": {"kwargs": {}, "check": check_recurring},
+        "find_symptom_cooccurrences": {"kwargs": {"days": days}, "check": check_cooccurrences},
+    }
+
+
+def peak_memory_kib(fn: Callable[[], Any]) -> float:
+    """Picco di memoria allocata durante fn (KiB)"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def frozen_clock(now: datetime):
+    """datetime di pattern_analyzer con now() fisso sull'istante del benchmark"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    return mock.patch.object(pattern_analyzer, "datetime", FrozenDatetime)
+
+
+def run_years(
+    years: float,
+    entries_per_day: float,
+    seed: int,
+    repeats: int,
+    n_permutations: int,
+    workdir: Path,
+    workers: int = 1
+) -> Dict[str, Any]:
+    """
+    Esegue il benchmark per una lunghezza dello storico.
+
+    Returns:
+        Dizionario con righe caricate, metriche per metodo, metodi che
+        differiscono dal riferimento ed errori di equivalenza
+    """
+    db_path = workdir / f"pattern_{years}y.db"
+    db = DatabaseManager(db_url=f"sqlite:///{db_path}")
+
+    now = datetime.now()
+    history = generate_user_history(BENCH_USER_ID, years, entries_per_day, seed, now)
+    rows = load_history(db, history)
+
+    symptoms = [
+        {**s, "ts": datetime.fromisoformat(s["timestamp"])}
+        for chunk in db.iter_symptom_chunks(user_id=BENCH_USER_ID)
+        for s in chunk
+    ]
+
+    analyzer = PatternAnalyzer(db, user_id=BENCH_USER_ID, workers=workers)
+    result: Dict[str, Any] = {"years": years, "symptom_rows": rows, "differs": [], "errors": []}
+
+    with frozen_clock(now):
+        for name, case in method_cases(years, n_permutations).items():
+            call = lambda: getattr(analyzer, name)(**case["kwargs"])
+
+            output = call()
+            errors = case["check"](output, symptoms, history["cycles"], now, **case["kwargs"])
+            if errors:
+                result["differs"].append(name)
+                result["errors"].extend(errors)
+
+            result[name] = {
+                **time_calls(call, repeats),
+                "peak_kib": peak_memory_kib(call)
+            }
+
+    db.get_session().get_bind().dispose()
+    db_path.unlink(missing_ok=True)
+
+    return result
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark PatternAnalyzer")
+    parser.add_argument("--years", type=float, nargs="+", default=DEFAULT_YEARS,
+                        help="Anni di storico dell'utente sintetico")
+    parser.add_argument("--entries-per-day", type=float, default=4.0, help="Sintomi medi al giorno")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    parser.add_argument("--repeats", type=int, default=5, help="Ripetizioni per ogni metodo")
+    parser.add_argument("--permutations", type=int, default=2000,
+                        help="Permutazioni per i test di significatività")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processi per i test di permutazione su storici grandi")
+    parser.add_argument("--output", type=str, default=None,
+                        help="File JSON di output (default: data/benchmarks/pattern_analyzer_<commit>.json)")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="File JSON di un run precedente da confrontare")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = Path(args.output) if args.output else (
+        Path(__file__).parent.parent / "data" / "benchmarks" / f"pattern_analyzer_{commit}.json"
+    )
+
+    report = {
+        "benchmark": "pattern_analyzer",
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "entries_per_day": args.entries_per_day,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "permutations": args.permutations,
+            "workers": args.workers,
+        },
+        "results": {},
+    }
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for years in args.years:
+            print(f"Running {years:g} years...")
+            t0 = time.perf_counter()
+            result = run_years(
+                years, args.entries_per_day, args.seed, args.repeats, args.permutations, Path(tmp),
+                args.workers
+            )
+            report["results"][f"{years:g}y"] = result
+
+            print(f"  rows={result['symptom_rows']:,} ({time.perf_counter() - t0:.1f} s)")
+            for name, metrics in result.items():
+                if isinstance(metrics, dict) and "median_ms" in metrics:
+                    status = "DIFF" if name in result["differs"] else "ok"
+                    print(f"  {name:<36} median {metrics['median_ms']:>10.3f} ms  "
+                          f"p95 {metrics['p95_ms']:>10.3f} ms  peak {metrics['peak_kib']:>10.1f} KiB  {status}")
+            failures += len(result["differs"])
+            for error in result["errors"][:10]:
+                print(f"    !! {error}")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults saved to: {output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print()
+        print("\n".join(compare(report, previous)))
+
+    if failures:
+        print(f"\n{failures} method(s) differ from the reference implementation")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
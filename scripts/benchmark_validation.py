@@ -0,0 +1,130 @@
+"""
+Benchmark validazione - Costruttore per riga vs TypeAdapter sulla lista
+
+Confronta, su righe come quelle prodotte dall'importer (stringhe ISO,
+~1% di righe non valide):
+1. Loop originale: SymptomEntry(**row) / CycleEntry(**row) con try/except
+2. validate_entries: un passaggio TypeAdapter sulla lista (più uno sulle
+   sole righe non valide per raccoglierne gli errori)
+
+Riporta il costo per 100k righe e verifica che entry ed errori coincidano:
+
+    python scripts/benchmark_validation.py
+    python scripts/benchmark_validation.py --rows 1000000 --invalid-rate 0
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import ValidationError
+
+from database import SymptomEntry, SymptomType, CycleEntry, FlowIntensity, validate_entries
+
+
+def make_symptom_rows(n: int, invalid_rate: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Righe di sintomi, una quota con intensità fuori scala o tipo sconosciuto"""
+    types = [t.value for t in SymptomType]
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(n):
+        row = {
+            "symptom_type": rng.choice(types),
+            "intensity": rng.randint(1, 10),
+            "notes": rng.choice(["", "", "  dopo il lavoro ", "migliorato"]),
+            "timestamp": (start + timedelta(minutes=37 * i)).isoformat(),
+        }
+        if rng.random() < invalid_rate:
+            row[rng.choice(["intensity", "symptom_type"])] = rng.choice([0, 14, "sconosciuto"])
+        rows.append(row)
+    return rows
+
+
+def make_cycle_rows(n: int, invalid_rate: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Righe di cicli, una quota con fine precedente all'inizio"""
+    flows = [f.value for f in FlowIntensity]
+    start = datetime(1990, 1, 1)
+    rows = []
+    for i in range(n):
+        begin = start + timedelta(days=29 * i)
+        length = -2 if rng.random() < invalid_rate else rng.randint(3, 7)
+        rows.append({
+            "start_date": begin.isoformat(),
+            "end_date": (begin + timedelta(days=length)).isoformat(),
+            "flow_intensity": rng.choice(flows),
+            "notes": "",
+        })
+    return rows
+
+
+def validate_loop(model, rows: List[Dict[str, Any]]) -> Tuple[List[Any], List[int]]:
+    """Validazione originale: un costruttore per riga"""
+    entries, invalid = [], []
+    for index, row in enumerate(rows):
+        try:
+            entries.append(model(**row))
+        except ValidationError:
+            invalid.append(index)
+    return entries, invalid
+
+
+def validate_list(model, rows: List[Dict[str, Any]]) -> Tuple[List[Any], List[int]]:
+    entries, errors = validate_entries(model, rows)
+    return entries, sorted(errors)
+
+
+def best_of(fn: Callable[[], Any], repeats: int) -> Tuple[float, Any]:
+    """Tempo minimo su più esecuzioni (secondi) e risultato dell'ultima"""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Benchmark validazione per riga vs lista")
+    parser.add_argument("--rows", type=int, default=100_000, help="Righe per modello")
+    parser.add_argument("--invalid-rate", type=float, default=0.01, help="Quota di righe non valide")
+    parser.add_argument("--repeats", type=int, default=3, help="Esecuzioni per misura (minimo)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed del generatore")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = [
+        ("SymptomEntry", SymptomEntry, make_symptom_rows(args.rows, args.invalid_rate, rng)),
+        ("CycleEntry", CycleEntry, make_cycle_rows(args.rows, args.invalid_rate, rng)),
+    ]
+    per_100k = 100_000 / args.rows
+
+    print(f"Rows: {args.rows:,} per model  invalid rate: {args.invalid_rate:.1%}")
+
+    for name, model, rows in cases:
+        loop_seconds, (loop_entries, loop_invalid) = best_of(lambda: validate_loop(model, rows), args.repeats)
+        list_seconds, (list_entries, list_invalid) = best_of(lambda: validate_list(model, rows), args.repeats)
+
+        assert loop_invalid == list_invalid, f"{name}: invalid rows differ"
+        assert [e.model_dump() for e in loop_entries] == [e.model_dump() for e in list_entries], \
+            f"{name}: validated entries differ"
+
+        print(f"\n{name} ({len(loop_invalid):,} invalid)")
+        print(f"  per-row loop:   {loop_seconds * per_100k:>8.3f} s / 100k rows"
+              f"  ({loop_seconds / args.rows * 1e6:.2f} µs/row)")
+        print(f"  TypeAdapter:    {list_seconds * per_100k:>8.3f} s / 100k rows"
+              f"  ({list_seconds / args.rows * 1e6:.2f} µs/row, x{loop_seconds / list_seconds:.1f})")
+
+    print("\n✓ Both paths return identical entries and invalid rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
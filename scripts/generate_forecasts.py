@@ -0,0 +1,56 @@
+"""
+Generate Forecasts - Job periodico dei calendari previsti
+
+Rigenera la tabella cycle_forecasts per tutti gli utenti attivi in un
+solo passaggio vettoriale. Pensato per un'esecuzione notturna (cron),
+prima dei job di promemoria che leggono i calendari salvati:
+
+    0 3 * * * python scripts/generate_forecasts.py --months 3
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager
+from tools.forecast_engine import ForecastEngine, DEFAULT_FORECAST_MONTHS
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Genera i calendari previsti dei cicli")
+    parser.add_argument("--db-url", default=None, help="Database URL (default: SQLite locale)")
+    parser.add_argument("--months", type=int, default=DEFAULT_FORECAST_MONTHS,
+                        help="Mesi coperti dal calendario")
+    parser.add_argument("--user", type=int, action="append", dest="users",
+                        help="Rigenera solo questo utente (ripetibile)")
+    args = parser.parse_args()
+
+    engine = ForecastEngine(DatabaseManager(db_url=args.db_url))
+
+    t0 = time.perf_counter()
+    result = engine.generate(months=args.months, user_ids=args.users)
+    seconds = time.perf_counter() - t0
+
+    if not result["success"]:
+        print(f"✗ {result['message']}")
+        return 1
+
+    print(f"✓ {result['users']:,} users, {result['cycles']:,} cycles "
+          f"({result['start']} → {result['end']}) in {seconds:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Import History - Import da riga di comando di export di altre app
+
+Legge export CSV/JSON/JSON Lines a blocchi e li scrive a batch,
+saltando le righe già presenti:
+
+    python scripts/import_history.py export.csv
+    python scripts/import_history.py clue.json --user 12 --batch-size 10000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager
+from tools.history_importer import HistoryImporter, BATCH_SIZE, FORMATS
+
+
+def print_progress(stats: dict) -> None:
+    """Avanzamento sulla stessa riga del terminale"""
+    print(
+        f"\r  {stats['rows']:>10,} rows  {stats['cycles_imported']:>8,} cycles  "
+        f"{stats['symptoms_imported']:>10,} symptoms  {stats['duplicates']:>8,} duplicates",
+        end="", flush=True
+    )
+
+
+def main() -> int:
+    """Entry point CLI"""
+    parser = argparse.ArgumentParser(description="Importa storico cicli/sintomi da export di altre app")
+    parser.add_argument("path", help="File di export")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="Formato del file (default: dall'estensione)")
+    parser.add_argument("--user", type=int, default=None,
+                        help="Utente di destinazione (default: storico locale)")
+    parser.add_argument("--db-url", default=None, help="Database URL (default: SQLite locale)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Righe per transazione")
+    args = parser.parse_args()
+
+    importer = HistoryImporter(DatabaseManager(db_url=args.db_url), user_id=args.user,
+                               batch_size=args.batch_size)
+
+    print(f"Importing {args.path}")
+    result = importer.import_file(args.path, file_format=args.format, progress=print_progress)
+    print()
+
+    for error in result.get("errors", []):
+        print(f"  ! {error}")
+
+    if not result["success"]:
+        print(f"✗ {result['message']}")
+        return 1
+
+    print(f"✓ {result['message']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ Setup RAG system - Process PDFs and create embeddings
 Complete pipeline:
 1. Extract text from PDFs
 2. Create intelligent chunks
-3. Generate embeddings
+3. Generate embeddings (unchanged chunks come from the chunk cache)
 4. Store in ChromaDB
 5. Save metadata
 """
@@ -36,6 +36,9 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Chunk embeddings keyed by text hash: rebuilds only re-encode changed chunks
+CHUNK_CACHE_DIR = "data/rag_cache/chunk_embeddings"
+
 
 def print_header(text: str):
     """Print formatted header"""
@@ -123,7 +126,8 @@ def main():
         generator = EmbeddingsGenerator(
             model_name="sentence-transformers/all-MiniLM-L6-v2",
             batch_size=32,
-            expand_acronyms=True
+            expand_acronyms=True,
+            chunk_cache_dir=CHUNK_CACHE_DIR
         )
 
         embeddings = generator.generate_chunk_embeddings(
@@ -133,6 +137,8 @@ def main():
 
         print_stats("Embedding Results", {
             "Embeddings Generated": len(embeddings),
+            "From Cache": generator.chunk_cache.hits,
+            "Cache Misses": generator.chunk_cache.misses,
             "Embedding Dimension": generator.get_embedding_dimension(),
             "Model": generator.model_name
         })
@@ -0,0 +1,258 @@
+"""
+Synthetic History Generator - Storici realistici di sintomi e cicli
+
+Features:
+- Generatore deterministico (seed) per N utenti su più anni
+- Cicli irregolari per una quota di utenti (profilo PCOS)
+- Sintomi con frequenza e intensità dipendenti dalla fase del ciclo
+- Caricamento bulk in DatabaseManager con fasi già etichettate
+
+Usato dai benchmark in scripts/ per misurare lo scaling del database.
+"""
+
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import insert
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import DatabaseManager, SymptomType, FlowIntensity
+from database.schema import SymptomRecord, CycleRecord
+from database.cycle_phases import assign_cycle_phase, label_cycle_phases
+
+
+# Moltiplicatori di frequenza per fase: sintomi tipicamente legati al ciclo
+PHASE_WEIGHTS = {
+    SymptomType.CRAMPI: {"early": 4.0, "mid": 0.3, "late": 0.5, "pre_menstrual": 2.0},
+    SymptomType.DOLORE_PELVICO: {"early": 3.0, "mid": 0.8, "late": 0.6, "pre_menstrual": 1.5},
+    SymptomType.MAL_DI_TESTA: {"early": 1.2, "mid": 0.7, "late": 1.0, "pre_menstrual": 2.5},
+    SymptomType.ANSIA: {"early": 0.8, "mid": 0.7, "late": 1.2, "pre_menstrual": 2.5},
+    SymptomType.DEPRESSIONE: {"early": 1.0, "mid": 0.6, "late": 1.2, "pre_menstrual": 2.0},
+    SymptomType.ACNE: {"early": 0.8, "mid": 0.6, "late": 1.5, "pre_menstrual": 2.0},
+    SymptomType.AFFATICAMENTO: {"early": 2.0, "mid": 0.8, "late": 1.2, "pre_menstrual": 1.5},
+}
+
+FLOW_CHOICES = [
+    FlowIntensity.SPOTTING, FlowIntensity.LIGHT, FlowIntensity.MEDIUM,
+    FlowIntensity.HEAVY, FlowIntensity.VERY_HEAVY
+]
+FLOW_WEIGHTS = [0.05, 0.25, 0.4, 0.22, 0.08]
+
+NOTES = [
+    "", "", "", "",
+    "Dopo una giornata stressante",
+    "Migliorato dopo il riposo",
+    "Peggiorato in serata",
+    "Dormito poco",
+    "Dopo attività fisica",
+]
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    """Campiona da una Poisson (algoritmo di Knuth, adatto a lambda piccoli)"""
+    threshold = math.exp(-lam)
+    k, p = 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return k
+        k += 1
+
+
+def generate_user_history(
+    user_id: int,
+    years: float = 3.0,
+    entries_per_day: float = 1.0,
+    seed: int = 42,
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Genera lo storico di un singolo utente.
+
+    Args:
+        user_id: ID utente (usato anche per derivare il seed)
+        years: Anni di storico
+        entries_per_day: Numero medio di sintomi registrati al giorno
+        seed: Seed globale del generatore
+        end_date: Fine dello storico (default: ora)
+
+    Returns:
+        Dizionario con 'user_id', 'cycles' e 'symptoms' (liste di dict
+        compatibili con CycleEntry/SymptomEntry)
+    """
+    rng = random.Random(seed * 1_000_003 + user_id)
+    end_date = end_date or datetime.now()
+    start_date = end_date - timedelta(days=int(years * 365))
+
+    # Profilo utente: ~40% con cicli irregolari (PCOS)
+    irregular = rng.random() < 0.4
+    mean_length = rng.gauss(33 if irregular else 29, 2)
+    length_sd = rng.uniform(6, 12) if irregular else rng.uniform(1, 3)
+
+    # Cicli
+    cycles = []
+    current = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    while current < end_date:
+        duration = rng.randint(3, 7)
+        cycle_end = current + timedelta(days=duration)
+        cycles.append({
+            "start_date": current,
+            "end_date": cycle_end if cycle_end < end_date else None,
+            "flow_intensity": rng.choices(FLOW_CHOICES, FLOW_WEIGHTS)[0].value,
+            "notes": rng.choice(NOTES),
+        })
+
+        length = rng.gauss(mean_length, length_sd)
+        if irregular and rng.random() < 0.1:
+            length *= 2  # ciclo saltato
+        current += timedelta(days=max(21, int(round(length))))
+
+    # Profilo sintomi: 3-6 tipi preferiti con intensità di base personale
+    types = list(SymptomType)
+    tracked = rng.sample(types, rng.randint(3, 6))
+    base_weight = {stype: rng.uniform(0.5, 2.0) for stype in tracked}
+    base_intensity = {stype: rng.uniform(3, 6) for stype in tracked}
+
+    starts = [c["start_date"] for c in cycles]
+    symptoms = []
+
+    day = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end_date:
+        phase, _ = assign_cycle_phase(day, starts)
+        phase = phase or "mid"
+
+        weights = [
+            base_weight[stype] * PHASE_WEIGHTS.get(stype, {}).get(phase, 1.0)
+            for stype in tracked
+        ]
+
+        for _ in range(_poisson(rng, entries_per_day)):
+            stype = rng.choices(tracked, weights)[0]
+            boost = 1.5 if PHASE_WEIGHTS.get(stype, {}).get(phase, 1.0) > 1.5 else 0.0
+            intensity = int(round(rng.gauss(base_intensity[stype] + boost, 1.5)))
+            timestamp = day + timedelta(minutes=rng.randint(7 * 60, 23 * 60))
+
+            if timestamp > end_date:
+                continue
+
+            symptoms.append({
+                "symptom_type": stype.value,
+                "intensity": min(10, max(1, intensity)),
+                "notes": rng.choice(NOTES),
+                "timestamp": timestamp,
+            })
+
+        day += timedelta(days=1)
+
+    return {"user_id": user_id, "cycles": cycles, "symptoms": symptoms}
+
+
+def generate_histories(
+    n_users: int,
+    years: float = 3.0,
+    entries_per_day: float = 1.0,
+    seed: int = 42,
+    end_date: Optional[datetime] = None,
+    first_user_id: int = 1
+) -> Iterator[Dict[str, Any]]:
+    """
+    Genera gli storici di N utenti (lazy, un utente alla volta).
+
+    Args:
+        n_users: Numero di utenti
+        years: Anni di storico per utente
+        entries_per_day: Sintomi medi al giorno
+        seed: Seed globale (stesso seed = stessi dati)
+        end_date: Fine degli storici (default: ora)
+        first_user_id: Primo user_id assegnato
+
+    Yields:
+        Storico del singolo utente (vedi generate_user_history)
+    """
+    end_date = end_date or datetime.now()
+    for user_id in range(first_user_id, first_user_id + n_users):
+        yield generate_user_history(user_id, years, entries_per_day, seed, end_date)
+
+
+def load_history(
+    db: DatabaseManager,
+    history: Dict[str, Any],
+    batch_size: int = 10_000
+) -> int:
+    """
+    Carica in blocco uno storico nel database.
+
+    Bypassa add_symptom/add_cycle (un commit per riga) e scrive le fasi
+    già calcolate, equivalenti a quelle dell'insert riga per riga; i
+    contatori e le statistiche derivate vengono ricostruiti a fine caricamento.
+
+    Args:
+        db: DatabaseManager di destinazione
+        history: Storico generato da generate_user_history
+        batch_size: Righe per executemany
+
+    Returns:
+        Numero di sintomi inseriti
+    """
+    user_id = history["user_id"]
+    starts = sorted(c["start_date"] for c in history["cycles"])
+    now = datetime.now()
+
+    session = db.get_session()
+    try:
+        if history["cycles"]:
+            session.execute(insert(CycleRecord), [
+                {**cycle, "user_id": user_id, "created_at": now}
+                for cycle in history["cycles"]
+            ])
+
+        symptoms = history["symptoms"]
+        for i in range(0, len(symptoms), batch_size):
+            batch = symptoms[i:i + batch_size]
+            phases, cycle_days = label_cycle_phases(
+                [symptom["timestamp"] for symptom in batch], starts
+            )
+            session.execute(insert(SymptomRecord), [
+                {
+                    **symptom,
+                    "user_id": user_id,
+                    "created_at": now,
+                    "cycle_phase": cycle_phase,
+                    "cycle_day": cycle_day,
+                }
+                for symptom, cycle_phase, cycle_day in zip(batch, phases, cycle_days)
+            ])
+
+        session.commit()
+
+    except Exception:
+        session.rollback()
+        raise
+
+    finally:
+        session.close()
+
+    db.rebuild_pattern_counters(user_id=user_id)
+    db.rebuild_symptom_baselines(user_id=user_id)
+    db.rebuild_intensity_sketches(user_id=user_id)
+    db.rebuild_cycle_statistics(user_id=user_id)
+    return len(symptoms)
+
+
+def rows_per_user(years: float, entries_per_day: float) -> int:
+    """Stima dei sintomi generati per utente"""
+    return max(1, int(years * 365 * entries_per_day))
+
+
+if __name__ == "__main__":
+    history = generate_user_history(user_id=1, years=1, entries_per_day=2)
+    print(f"Cycles: {len(history['cycles'])}")
+    print(f"Symptoms: {len(history['symptoms'])}")
+    for symptom in history["symptoms"][:5]:
+        print(f"  {symptom['timestamp']:%Y-%m-%d %H:%M} {symptom['symptom_type']} {symptom['intensity']}/10")
@@ -13,6 +13,7 @@ Architecture:
 import asyncio
 import logging
 import json
+import os
 from pathlib import Path
 from mcp.server import Server
 from mcp.types import Tool, TextContent
@@ -21,6 +22,9 @@ from mcp.server.stdio import stdio_server
 # Import business logic
 from database import DatabaseManager, SymptomType, FlowIntensity
 from tools import SymptomTracker, CycleTracker, PatternAnalyzer
+from tools.pattern_analyzer import MAX_REPORT_WINDOW_DAYS
+from tools.history_importer import HistoryImporter, FORMATS
+from tools.note_search import NoteIndex, SOURCES
 
 # Import RAG system (with fallback if dependencies not installed)
 try:
@@ -48,11 +52,20 @@ def setup_logging():
 setup_logging()
 logger = logging.getLogger("pcos-care-mcp")
 
+# Ricerca nelle note: carica sentence-transformers, disattivabile con ENABLE_NOTE_SEARCH=false
+ENABLE_NOTE_SEARCH = RAG_AVAILABLE and os.getenv("ENABLE_NOTE_SEARCH", "true").lower() == "true"
+
 # Inizializza database e tools
 db_manager = DatabaseManager()
-symptom_tracker = SymptomTracker(db_manager)
-cycle_tracker = CycleTracker(db_manager)
+note_index = NoteIndex(db_manager) if ENABLE_NOTE_SEARCH else None
+symptom_tracker = SymptomTracker(db_manager, note_index=note_index)
+cycle_tracker = CycleTracker(db_manager, note_index=note_index)
 pattern_analyzer = PatternAnalyzer(db_manager)
+history_importer = HistoryImporter(db_manager)
+
+# Note salvate senza embedding (import, riavvii): indicizzate in background
+if note_index is not None:
+    note_index.sync()
 
 # Inizializza RAG system (se disponibile)
 knowledge_base = None
@@ -287,6 +300,29 @@ Tool(
                 }
             }
         ),
+        Tool(
+            name="get_analytics_report",
+            description=(
+                "Riepilogo dei sintomi su più periodi in una sola chiamata "
+                "(es. ultimi 30, 90, 180 e 365 giorni): conteggi, intensità media, "
+                "variabilità e trend per ogni sintomo."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "windows": {
+                        "type": "array",
+                        "items": {"type": "integer", "minimum": 1, "maximum": MAX_REPORT_WINDOW_DAYS},
+                        "default": [30, 90, 180, 365],
+                        "description": "Periodi da analizzare in giorni (default: 30, 90, 180, 365)"
+                    },
+                    "symptom_type": {
+                        "type": "string",
+                        "description": "Tipo di sintomo da analizzare (opzionale, altrimenti tutti)"
+                    }
+                }
+            }
+        ),
         Tool(
             name="identify_patterns",
             description=(
@@ -306,6 +342,61 @@ Tool(
                 }
             }
         ),
+        Tool(
+            name="import_history",
+            description=(
+                "Importa lo storico di cicli e sintomi da un export di un'altra app "
+                "(CSV, JSON o JSON Lines). Le righe già presenti vengono saltate."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Percorso del file di export"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": list(FORMATS),
+                        "description": "Formato del file (default: dall'estensione)"
+                    }
+                },
+                "required": ["file_path"]
+            }
+        ),
+        Tool(
+            name="search_my_notes",
+            description=(
+                "Ricerca semantica nelle note personali di sintomi e cicli. "
+                "Trova le registrazioni con note simili a un testo libero "
+                "o a quelle di un sintomo/ciclo indicato."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Testo da cercare nelle note (es. 'dolore dopo la palestra')"
+                    },
+                    "source": {
+                        "type": "string",
+                        "enum": list(SOURCES),
+                        "description": "Cerca solo tra sintomi o cicli (con entry_id: tipo della registrazione)"
+                    },
+                    "entry_id": {
+                        "type": "integer",
+                        "description": "ID della registrazione di cui cercare note simili (al posto di query)"
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 20,
+                        "default": 5,
+                        "description": "Numero massimo di risultati (default: 5)"
+                    }
+                }
+            }
+        ),
         Tool(
             name="get_medical_info",
             description=(
@@ -436,9 +527,14 @@ Riprova o controlla i parametri.
 - Totale sintomi registrati: {result['total_entries']}
 - Sintomo più frequente: {result['most_common_symptom'] or 'N/A'}
 - Intensità media: {result['average_intensity'] or 'N/A'}/10
-
-**Insights:**
 """
+                percentiles = result.get('intensity_percentiles', {})
+                if percentiles:
+                    response += "\n**Intensità per sintomo (mediana / p90):**\n"
+                    for stype, stats in percentiles.items():
+                        response += f"- {stype}: {stats['median']}/10 / {stats['p90']}/10 ({stats['count']} registrazioni)\n"
+
+                response += "\n**Insights:**\n"
                 for insight in result.get('insights', []):
                     response += f"\n{insight}"
                 
@@ -562,6 +658,7 @@ Riprova o controlla i parametri.
 - Ciclo più breve: {result['shortest_cycle'] or 'N/A'} giorni
 - Ciclo più lungo: {result['longest_cycle'] or 'N/A'} giorni
 - Regolarità: {result['regularity_score'] or 'N/A'}/100
+- Intervallo medio recente tra inizi: {result['average_interval'] or 'N/A'} giorni
 
 {f"🔮 **Prossimo ciclo previsto:** {result['predicted_next_start'][:10] if result['predicted_next_start'] else 'N/A'}" if result.get('predicted_next_start') else ""}
 
@@ -625,6 +722,38 @@ Riprova o controlla i parametri.
 
             return [TextContent(type="text", text=response.strip())]
 
+        elif name == "get_analytics_report":
+            windows = arguments.get("windows", [30, 90, 180, 365])
+            symptom_type = arguments.get("symptom_type")
+
+            result = pattern_analyzer.multi_window_report(
+                windows=windows,
+                symptom_type=symptom_type
+            )
+
+            if result["success"]:
+                response = f"""
+📊 **Report Sintomi per Periodo**
+
+**Sintomo:** {result['symptom_type']}
+"""
+                for days in result['windows']:
+                    report = result['reports'][str(days)]
+                    response += f"\n**Ultimi {days} giorni:** {report['total_entries']} entries"
+                    if report['total_entries']:
+                        response += (
+                            f" · intensità media {report['avg_intensity']}/10"
+                            f" · più frequente: {report['most_common']}"
+                        )
+                    for stype, data in report['symptoms'].items():
+                        trend = f", trend {data['trend']}" if data['trend'] else ""
+                        response += f"\n  - {stype}: {data['count']}x, media {data['avg_intensity']}/10{trend}"
+                    response += "\n"
+            else:
+                response = f"❌ {result.get('message', 'Errore nell analisi')}"
+
+            return [TextContent(type="text", text=response.strip())]
+
         elif name == "identify_patterns":
             min_occurrences = arguments.get("min_occurrences", 2)
 
@@ -651,6 +780,80 @@ Riprova o controlla i parametri.
 
             return [TextContent(type="text", text=response.strip())]
 
+        elif name == "import_history":
+            file_path = arguments.get("file_path")
+
+            result = history_importer.import_file(file_path, file_format=arguments.get("format"))
+
+            if result["success"]:
+                response = f"""
+✅ **Storico Importato!**
+
+**Dettagli:**
+- Righe lette: {result['rows']}
+- Cicli importati: {result['cycles_imported']}
+- Sintomi importati: {result['symptoms_imported']}
+- Già presenti (saltati): {result['duplicates']}
+- Righe non valide: {result['invalid']}
+"""
+                if result['errors']:
+                    response += "\n**Prime righe non valide:**\n"
+                    for error in result['errors']:
+                        response += f"- {error}\n"
+
+                response += "\n💡 Usa `get_cycle_analytics` o `get_symptom_summary` per le statistiche aggiornate."
+            else:
+                response = f"""
+❌ **Errore nell'Importare lo Storico**
+
+{result['message']}
+"""
+
+            return [TextContent(type="text", text=response.strip())]
+
+        elif name == "search_my_notes":
+            query = arguments.get("query")
+            source = arguments.get("source")
+            entry_id = arguments.get("entry_id")
+            top_k = arguments.get("top_k", 5)
+
+            if note_index is None:
+                result = {
+                    "success": False,
+                    "message": "Ricerca nelle note non attiva (richiede sentence-transformers e ENABLE_NOTE_SEARCH=true)"
+                }
+                title = ""
+            elif entry_id is not None:
+                result = note_index.find_similar(source or "symptom", entry_id, top_k=top_k)
+                title = f"Note simili a {source or 'symptom'} #{entry_id}"
+            else:
+                result = note_index.search(query, top_k=top_k, source=source)
+                title = f"Note simili a: \"{query}\""
+
+            if result["success"]:
+                response = f"""
+🔎 **{title}**
+
+"""
+                for item in result["results"]:
+                    entry = item["entry"]
+                    if item["source"] == "symptom":
+                        label = f"{entry['symptom_type']} {entry['intensity']}/10 - {entry['timestamp'][:10]}"
+                    else:
+                        label = f"ciclo del {entry['start_date'][:10]}"
+                    response += f"- **{label}** (#{item['entry_id']}, somiglianza {item['score']:.0%})\n  {entry['notes']}\n"
+
+                if not result["results"]:
+                    response += "Nessuna nota trovata.\n"
+
+                response += f"\n📊 Note indicizzate: {result['indexed_notes']}"
+                if result["pending_notes"]:
+                    response += f" (+{result['pending_notes']} in indicizzazione)"
+            else:
+                response = f"❌ {result['message']}"
+
+            return [TextContent(type="text", text=response.strip())]
+
         elif name == "get_medical_info":
             if not RAG_AVAILABLE or knowledge_base is None:
                 response = """
@@ -786,9 +989,16 @@ Riprova o contatta il supporto.
 8. `analyze_symptom_cycle_correlation` - Correlazioni sintomi-ciclo
 9. `analyze_symptom_trends` - Trend sintomi nel tempo
 10. `identify_patterns` - Pattern ricorrenti
+11. `get_analytics_report` - Riepilogo su più periodi
 
 **Medical Info (RAG):**
-11. `get_medical_info` - Q&A evidence-based su PCOS
+12. `get_medical_info` - Q&A evidence-based su PCOS
+
+**Import:**
+13. `import_history` - Importa storico da export di altre app (CSV/JSON)
+
+**Note:**
+14. `search_my_notes` - Ricerca semantica nelle tue note
 
 **Prova a dire:**
 - "Registra crampi intensità 7"
@@ -0,0 +1,126 @@
+"""
+Unit Tests per Cohort Analytics
+Test per aggregati parziali, merge tra processi, anonimato e cache
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from database import DatabaseManager, SymptomEntry, SymptomType, CycleEntry, FlowIntensity
+from tools.cohort_analytics import CohortAnalytics, MIN_COHORT_USERS
+
+
+def _populate(db_manager, n_users):
+    """Ogni utente: 4 cicli regolari e crampi nei primi giorni di ciascuno"""
+    origin = datetime.now() - timedelta(days=150)
+    for user_id in range(1, n_users + 1):
+        length = 26 + user_id % 5
+        for k in range(4):
+            start = origin + timedelta(days=k * length)
+            db_manager.add_cycle(CycleEntry(
+                start_date=start, flow_intensity=FlowIntensity.MEDIUM
+            ), user_id=user_id)
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI,
+                intensity=4 + user_id % 6,
+                timestamp=start + timedelta(days=1)
+            ), user_id=user_id)
+
+    # Un solo utente registra acne: cella sotto la soglia di anonimato
+    db_manager.add_symptom(SymptomEntry(
+        symptom_type=SymptomType.ACNE, intensity=3, timestamp=origin + timedelta(days=2)
+    ), user_id=1)
+
+
+class TestCohortAnalytics:
+    """Test suite per CohortAnalytics"""
+
+    def test_population_distributions(self):
+        """Test: Distribuzioni per fase e cicli su tutti gli utenti"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        _populate(db_manager, MIN_COHORT_USERS + 1)
+
+        report = CohortAnalytics(db_manager, workers=1).get_cohort_report(months=12)
+
+        assert report["success"] is True
+        assert report["users_analyzed"] == MIN_COHORT_USERS + 1
+
+        crampi = report["phase_symptom_intensity"]["early"]["crampi"]
+        assert crampi["users"] == MIN_COHORT_USERS + 1
+        assert crampi["entries"] == 4 * (MIN_COHORT_USERS + 1)
+        assert sum(crampi["intensity_distribution"]) == crampi["entries"]
+
+        # La cella acne (1 utente) non viene esposta
+        assert "acne" not in report["phase_symptom_intensity"].get("early", {})
+        assert report["suppressed_cells"] == 1
+
+        # Distribuzione per tipo dal merge degli sketch dei singoli utenti
+        assert report["symptom_intensity"]["crampi"]["entries"] == crampi["entries"]
+        assert report["symptom_intensity"]["crampi"]["median"] == crampi["median"]
+        assert "acne" not in report["symptom_intensity"]
+
+        assert report["cycle_length"]["intervals"] == 3 * (MIN_COHORT_USERS + 1)
+        assert 26 <= report["cycle_length"]["median"] <= 30
+        assert report["user_cycle_variability"]["median"] == 0
+        assert report["cycle_length"]["suppressed"] is False
+
+    def test_process_pool_matches_single_process(self, tmp_path):
+        """Test: Il merge dei parziali dai worker coincide con il calcolo seriale"""
+        db_manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'cohort.db'}")
+        _populate(db_manager, 8)
+
+        serial = CohortAnalytics(db_manager, workers=1).get_cohort_report()
+        cohort = CohortAnalytics(db_manager, workers=2, cache_ttl=0)
+        parallel = cohort.get_cohort_report()
+        pool = cohort._pool
+        again = cohort.get_cohort_report()
+        cohort.close()
+
+        assert pool is not None and again is not parallel
+        assert cohort._pool is None
+        for report in (serial, parallel, again):
+            report.pop("generated_at")
+        assert parallel == serial == again
+
+    def test_default_runs_in_process(self):
+        """Test: Senza workers espliciti nessun pool viene avviato"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        _populate(db_manager, 3)
+        cohort = CohortAnalytics(db_manager)
+
+        assert cohort.get_cohort_report()["success"] is True
+        assert cohort._pool is None
+
+    def test_small_cohort_hides_cycle_distributions(self):
+        """Test: Con meno di MIN_COHORT_USERS utenti i cicli non sono esposti"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        _populate(db_manager, MIN_COHORT_USERS - 1)
+
+        report = CohortAnalytics(db_manager).get_cohort_report()
+
+        for section in ("cycle_length", "user_avg_cycle_length", "user_cycle_variability"):
+            assert report[section]["suppressed"] is True
+            assert report[section]["users"] == MIN_COHORT_USERS - 1
+            assert report[section]["median"] is None
+        assert report["cycle_length"]["intervals"] is None
+        assert report["phase_symptom_intensity"] == {}
+
+    def test_report_is_cached(self):
+        """Test: La seconda richiesta usa la cache, refresh la ricalcola"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        _populate(db_manager, 2)
+        cohort = CohortAnalytics(db_manager, workers=1)
+
+        first = cohort.get_cohort_report()
+        _populate(db_manager, 3)
+
+        assert cohort.get_cohort_report() is first
+        assert cohort.get_cohort_report(refresh=True)["symptoms_analyzed"] > first["symptoms_analyzed"]
+
+    def test_empty_database(self):
+        """Test: Senza utenti il report è vuoto ma valido"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        report = CohortAnalytics(db_manager, workers=1).get_cohort_report()
+
+        assert report["success"] is True
+        assert report["users_analyzed"] == 0
+        assert report["cycle_length"]["median"] is None
@@ -0,0 +1,138 @@
+"""
+Unit Tests per Symptom Co-occurrence Miner
+Test per bitset giornalieri, finestre ±k giorni e mining batch
+"""
+
+import random
+import pytest
+from datetime import date, datetime, timedelta
+from itertools import combinations
+from database import DatabaseManager, SymptomEntry, SymptomType
+from tools.cooccurrence import CooccurrenceMiner
+from tools.pattern_analyzer import PatternAnalyzer
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+def _rows(user_id, days_types, origin=date(2025, 1, 1)):
+    """Righe (user_id, giorno, tipo) da {offset giorno: [tipi]}"""
+    return [
+        (user_id, (origin + timedelta(days=offset)).isoformat(), stype)
+        for offset, types in days_types.items()
+        for stype in types
+    ]
+
+
+def _brute_force(rows, min_support, min_count, max_size):
+    """Riferimento: enumera tutti i sottoinsiemi dei giorni"""
+    by_day = {}
+    for _, day, stype in rows:
+        by_day.setdefault(day, set()).add(stype)
+
+    n_days = len(by_day)
+    counts = {}
+    for types in by_day.values():
+        for size in range(1, min(len(types), max_size) + 1):
+            for subset in combinations(sorted(types), size):
+                counts[subset] = counts.get(subset, 0) + 1
+
+    return {
+        subset: count for subset, count in counts.items()
+        if len(subset) >= 2 and count >= min_count and count / n_days >= min_support
+    }
+
+
+class TestCooccurrenceMiner:
+    """Test suite per CooccurrenceMiner"""
+
+    def test_subsets_are_counted(self):
+        """Test: Un sottoinsieme conta anche nei giorni con più sintomi"""
+        rows = _rows(1, {
+            0: ["crampi", "ansia", "acne"],
+            1: ["crampi", "ansia"],
+            2: ["crampi", "ansia", "mal_di_testa"],
+            3: ["acne"],
+        })
+
+        itemsets = CooccurrenceMiner(min_support=0.5).mine(rows)[1]
+        pairs = {tuple(item["symptoms"]): item for item in itemsets}
+
+        assert pairs[("ansia", "crampi")]["days"] == 3
+        assert pairs[("ansia", "crampi")]["support"] == 0.75
+        assert pairs[("ansia", "crampi")]["lift"] == pytest.approx(1.33, abs=0.01)
+
+    def test_window_links_adjacent_days(self):
+        """Test: Con window_days=1 sintomi in giorni consecutivi co-occorrono"""
+        rows = _rows(1, {0: ["affaticamento"], 1: ["acne"], 10: ["affaticamento"], 11: ["acne"]})
+
+        same_day = CooccurrenceMiner(min_support=0.1).mine(rows)[1]
+        windowed = CooccurrenceMiner(window_days=1, min_support=0.1, min_lift=0).mine(rows)[1]
+
+        assert same_day == []
+        assert windowed[0]["symptoms"] == ["acne", "affaticamento"]
+
+    def test_matches_brute_force(self):
+        """Test: Gli itemset coincidono con l'enumerazione esaustiva"""
+        rng = random.Random(3)
+        types = [t.value for t in SymptomType][:8]
+        days_types = {
+            offset: rng.sample(types, rng.randint(1, 5)) for offset in range(200)
+        }
+        rows = _rows(1, days_types)
+
+        mined = CooccurrenceMiner(min_support=0.05, min_count=2, min_lift=0, max_size=4).mine(rows)[1]
+        expected = _brute_force(rows, 0.05, 2, 4)
+
+        assert {tuple(item["symptoms"]): item["days"] for item in mined} == expected
+
+    def test_batch_users_match_single_runs(self):
+        """Test: Il mining batch equivale al mining utente per utente"""
+        rng = random.Random(11)
+        types = [t.value for t in SymptomType][:6]
+        rows = []
+        for user_id in (None, 1, 2, 3):
+            rows += _rows(user_id, {
+                offset: rng.sample(types, rng.randint(1, 4)) for offset in range(60)
+            })
+
+        miner = CooccurrenceMiner(window_days=2, min_support=0.2, min_lift=1.0)
+        batch = miner.mine(rows)
+
+        assert set(batch) == {None, 1, 2, 3}
+        for user_id in batch:
+            single = miner.mine([row for row in rows if row[0] == user_id])
+            assert batch[user_id] == single[user_id]
+
+    def test_empty_rows(self):
+        """Test: Nessun dato, nessun itemset"""
+        assert CooccurrenceMiner().mine([]) == {}
+
+
+class TestCooccurrenceAnalysis:
+    """Test per PatternAnalyzer.find_symptom_cooccurrences"""
+
+    def test_analyzer_reads_user_history(self, db_manager):
+        """Test: L'analisi usa solo lo storico dell'utente"""
+        now = datetime.now()
+        for offset in range(6):
+            for stype in (SymptomType.CRAMPI, SymptomType.DOLORE_PELVICO):
+                db_manager.add_symptom(SymptomEntry(
+                    symptom_type=stype, intensity=5, timestamp=now - timedelta(days=offset)
+                ), user_id=5)
+        db_manager.add_symptom(SymptomEntry(symptom_type=SymptomType.ACNE, intensity=3))
+
+        result = PatternAnalyzer(db_manager, user_id=5).find_symptom_cooccurrences(days=30)
+
+        assert result["success"] is True
+        assert result["itemsets"][0]["symptoms"] == ["crampi", "dolore_pelvico"]
+        assert result["itemsets"][0]["days"] == 6
+
+    def test_analyzer_without_data(self, db_manager):
+        """Test: Senza sintomi l'analisi fallisce in modo esplicito"""
+        result = PatternAnalyzer(db_manager).find_symptom_cooccurrences()
+        assert result["success"] is False
@@ -5,7 +5,7 @@ Best practice: Test isolati, setup/teardown, edge cases
 
 import pytest
 from datetime import datetime, timedelta
-from database import DatabaseManager, SymptomEntry, SymptomType
+from database import DatabaseManager, SymptomEntry, SymptomType, CycleEntry, FlowIntensity, validate_entries
 
 
 @pytest.fixture
@@ -131,6 +131,565 @@ class TestDatabaseManager:
         result = db_manager.delete_symptom(9999)
         assert result is False
 
+    def test_user_histories_are_isolated(self, db_manager):
+        """Test: Sintomi e cicli di utenti diversi non si mescolano"""
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI, intensity=5
+        ))
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ACNE, intensity=3
+        ), user_id=1)
+        db_manager.add_cycle(CycleEntry(
+            start_date=datetime.now() - timedelta(days=2),
+            flow_intensity=FlowIntensity.MEDIUM
+        ), user_id=1)
+
+        local = db_manager.get_symptoms()
+        user_1 = db_manager.get_symptoms(user_id=1)
+
+        assert [s['symptom_type'] for s in local] == ['crampi']
+        assert [s['symptom_type'] for s in user_1] == ['acne']
+        assert db_manager.get_cycles() == []
+        assert len(db_manager.get_cycles(user_id=1)) == 1
+        # Il ciclo dell'utente 1 non etichetta i sintomi dello storico locale
+        assert local[0]['cycle_phase'] is None
+        assert db_manager.get_symptom_summary(user_id=2).total_entries == 0
+
+
+class TestSchemaMigration:
+    """Test per migrate_schema su database creati da versioni precedenti"""
+
+    def test_legacy_cycle_start_index_dropped(self, tmp_path):
+        """Test: L'indice unico sugli inizi ciclo non blocca più add_cycle"""
+        from sqlalchemy import text
+        db_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        session = DatabaseManager(db_url=db_url).get_session()
+        session.execute(text(
+            "CREATE UNIQUE INDEX uq_cycle_records_start "
+            "ON cycle_records (coalesce(user_id, 0), start_date)"
+        ))
+        session.commit()
+        session.close()
+
+        manager = DatabaseManager(db_url=db_url)
+        entry = CycleEntry(start_date=datetime(2025, 1, 1), flow_intensity=FlowIntensity.MEDIUM)
+
+        assert manager.add_cycle(entry).success
+        assert manager.add_cycle(entry).success
+
+    def test_duplicate_imports_merged_before_unique_index(self, tmp_path):
+        """Test: Le righe importate duplicate sono unite e lo stato ricostruito"""
+        from sqlalchemy import text
+        from tools.history_importer import HistoryImporter
+        import io
+        db_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        manager = DatabaseManager(db_url=db_url)
+        HistoryImporter(manager, user_id=3).import_stream(
+            io.StringIO("date,symptom,intensity\n2025-01-02,acne,4\n"), "csv"
+        )
+        for _ in range(2):
+            manager.add_symptom(SymptomEntry(symptom_type=SymptomType.CRAMPI, intensity=6), user_id=3)
+        session = manager.get_session()
+        session.execute(text("DROP INDEX uq_symptom_records_source"))
+        session.execute(text(
+            "INSERT INTO symptom_records (symptom_type, intensity, notes, timestamp, created_at, user_id, source_key) "
+            "SELECT symptom_type, intensity, notes, timestamp, created_at, user_id, source_key "
+            "FROM symptom_records WHERE source_key IS NOT NULL"
+        ))
+        session.commit()
+        session.close()
+        assert len(manager.get_symptoms(user_id=3)) == 4
+
+        migrated = DatabaseManager(db_url=db_url)
+
+        # Restano la riga importata e le due manuali (source_key NULL)
+        assert len(migrated.get_symptoms(user_id=3)) == 3
+        assert migrated.get_pattern_counters(datetime(2025, 1, 1), user_id=3)['total'] == 3
+        assert migrated.import_symptoms(
+            [SymptomEntry(symptom_type=SymptomType.ACNE, intensity=4, timestamp=datetime(2025, 1, 2))],
+            user_id=3
+        ) == 0
+
+
+class TestMultiUser:
+    """Test per lo storico per utente (user_id, NULL = storico locale)"""
+
+    LEGACY_TABLES = (
+        "CREATE TABLE symptom_records (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "symptom_type VARCHAR(50) NOT NULL, intensity INTEGER NOT NULL, notes TEXT, "
+        "timestamp DATETIME NOT NULL, created_at DATETIME)",
+        "CREATE TABLE cycle_records (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "start_date DATETIME NOT NULL, end_date DATETIME, flow_intensity VARCHAR(20), "
+        "notes TEXT, created_at DATETIME)",
+        "INSERT INTO symptom_records (symptom_type, intensity, notes, timestamp, created_at) "
+        "VALUES ('crampi', 6, '', '2025-01-03 08:00:00', '2025-01-03 08:00:00'), "
+        "('acne', 3, '', '2025-01-04 08:00:00', '2025-01-04 08:00:00')",
+        "INSERT INTO cycle_records (start_date, end_date, flow_intensity, notes, created_at) "
+        "VALUES ('2025-01-01 00:00:00', '2025-01-29 00:00:00', 'medium', '', '2025-01-01 00:00:00')",
+    )
+
+    def test_legacy_database_migrated_to_local_history(self, tmp_path):
+        """Test: Un database senza user_id riceve colonne e indici e resta lo storico locale"""
+        from sqlalchemy import create_engine, inspect, text
+        db_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        engine = create_engine(db_url)
+        with engine.begin() as conn:
+            for statement in self.LEGACY_TABLES:
+                conn.execute(text(statement))
+        engine.dispose()
+
+        manager = DatabaseManager(db_url=db_url)
+        engine = manager.get_session().get_bind()
+        inspector = inspect(engine)
+        with engine.connect() as conn:
+            indexes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+        for table, index in (("symptom_records", "ix_symptom_records_user_timestamp"),
+                             ("cycle_records", "ix_cycle_records_user_start")):
+            assert "user_id" in {c["name"] for c in inspector.get_columns(table)}
+            assert index in indexes
+        assert len(manager.get_symptoms()) == 2
+        assert manager.get_symptoms(user_id=1) == []
+        assert manager.get_cycle_summary(months=None).total_cycles == 1
+        assert manager.get_cycle_summary(months=None, user_id=1).total_cycles == 0
+        assert manager.get_pattern_counters(datetime(2025, 1, 1))['total'] == 2
+
+        # Una seconda migrazione non cambia nulla
+        assert len(DatabaseManager(db_url=db_url).get_symptoms()) == 2
+
+    def test_writes_by_id_respect_owner(self, db_manager):
+        """Test: Eliminazioni e aggiornamenti per id toccano solo lo storico indicato"""
+        symptom = db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ACNE, intensity=3
+        ), user_id=1)
+        cycle = db_manager.add_cycle(CycleEntry(
+            start_date=datetime(2025, 1, 1), flow_intensity=FlowIntensity.MEDIUM
+        ), user_id=1)
+
+        assert db_manager.delete_symptom(symptom.entry_id) is False
+        assert db_manager.delete_symptom(symptom.entry_id, user_id=2) is False
+        assert not db_manager.update_cycle_end_date(cycle.entry_id, datetime(2025, 1, 29)).success
+        assert len(db_manager.get_symptoms(user_id=1)) == 1
+
+        assert db_manager.update_cycle_end_date(cycle.entry_id, datetime(2025, 1, 29), user_id=1).success
+        assert db_manager.delete_symptom(symptom.entry_id, user_id=1) is True
+
+    def test_summaries_are_per_user(self, db_manager):
+        """Test: Riepiloghi e statistiche non mescolano gli utenti"""
+        now = datetime.now()
+        for user_id, intensity in ((None, 2), (1, 8), (1, 8)):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI, intensity=intensity, timestamp=now - timedelta(days=1)
+            ), user_id=user_id)
+        db_manager.add_cycle(CycleEntry(
+            start_date=now - timedelta(days=40), end_date=now - timedelta(days=35)
+        ), user_id=1)
+
+        local = db_manager.get_symptom_summary(days=30)
+        user_1 = db_manager.get_symptom_summary(days=30, user_id=1)
+
+        assert local.total_entries == 1
+        assert user_1.total_entries == 2
+        assert db_manager.get_cycle_summary().total_cycles == 0
+        assert db_manager.get_cycle_summary(user_id=1).total_cycles == 1
+
+
+class TestSymptomStreaming:
+    """Test per la lettura a blocchi (iter_symptom_chunks)"""
+
+    def test_chunks_cover_whole_window_in_order(self, db_manager):
+        """Test: I blocchi coprono tutte le righe, in ordine, anche con timestamp uguali"""
+        base = datetime(2025, 1, 1)
+        for i in range(25):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI, intensity=1 + i % 10,
+                timestamp=base + timedelta(hours=i // 2)  # coppie con stesso timestamp
+            ))
+
+        chunks = list(db_manager.iter_symptom_chunks(chunk_size=4))
+        ids = [s['id'] for chunk in chunks for s in chunk]
+
+        assert all(len(chunk) <= 4 for chunk in chunks)
+        assert sorted(ids) == ids
+        assert len(ids) == len(set(ids)) == 25
+
+    def test_chunks_empty(self, db_manager):
+        """Test: Nessun blocco su database vuoto"""
+        assert list(db_manager.iter_symptom_chunks()) == []
+
+
+class TestCyclePhaseDenormalization:
+    """Test per le colonne cycle_phase/cycle_day su symptom_records"""
+
+    def test_symptom_without_cycles_has_no_phase(self, db_manager):
+        """Test: Senza cicli registrati la fase resta vuota"""
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI, intensity=5
+        ))
+
+        symptom = db_manager.get_symptoms()[0]
+        assert symptom['cycle_phase'] is None
+        assert symptom['cycle_day'] is None
+
+    def test_phase_computed_at_insert(self, db_manager):
+        """Test: La fase viene calcolata all'insert dai cicli esistenti"""
+        start = datetime(2025, 1, 1)
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI, intensity=6,
+            timestamp=start + timedelta(days=2)
+        ))
+
+        symptom = db_manager.get_symptoms()[0]
+        assert symptom['cycle_phase'] == "early"
+        assert symptom['cycle_day'] == 3
+
+    def test_add_cycle_relabels_affected_span(self, db_manager):
+        """Test: Un nuovo ciclo aggiorna la fase pre-mestruale del ciclo precedente"""
+        start = datetime(2025, 1, 1)
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ANSIA, intensity=4,
+            timestamp=start + timedelta(days=26)
+        ))
+        assert db_manager.get_symptoms()[0]['cycle_phase'] == "late"
+
+        db_manager.add_cycle(CycleEntry(
+            start_date=start + timedelta(days=28), flow_intensity=FlowIntensity.MEDIUM
+        ))
+
+        symptom = db_manager.get_symptoms()[0]
+        assert symptom['cycle_phase'] == "pre_menstrual"
+        assert symptom['cycle_day'] == 27
+
+    def test_add_earlier_cycle_labels_older_symptoms(self, db_manager):
+        """Test: Un ciclo inserito nel passato etichetta i sintomi precedenti"""
+        start = datetime(2025, 3, 1)
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ACNE, intensity=5,
+            timestamp=start + timedelta(days=8)
+        ))
+
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.LIGHT))
+
+        symptom = db_manager.get_symptoms()[0]
+        assert symptom['cycle_phase'] == "mid"
+        assert symptom['cycle_day'] == 9
+
+    def test_phase_statistics_group_by(self, db_manager):
+        """Test: Statistiche per fase aggregate in SQL"""
+        start = datetime(2025, 1, 1)
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+
+        for day, intensity in [(0, 8), (1, 6), (10, 3)]:
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI, intensity=intensity,
+                timestamp=start + timedelta(days=day)
+            ))
+
+        stats = {
+            (row['cycle_phase'], row['symptom_type']): row
+            for row in db_manager.get_phase_statistics()
+        }
+
+        assert stats[("early", "crampi")]['count'] == 2
+        assert stats[("early", "crampi")]['avg_intensity'] == pytest.approx(7.0)
+        assert stats[("mid", "crampi")]['count'] == 1
+
+
+class TestPatternCounters:
+    """Test per i contatori incrementali fase × sintomo"""
+
+    WINDOW = (datetime(2024, 12, 1), datetime(2025, 3, 31))
+
+    def _counters(self, db_manager, user_id=None):
+        return db_manager.get_pattern_counters(*self.WINDOW, user_id=user_id)
+
+    def test_counters_follow_inserts(self, db_manager):
+        """Test: add_symptom aggiorna fasi e combinazioni del giorno"""
+        start = datetime(2025, 1, 1)
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+
+        for stype in (SymptomType.CRAMPI, SymptomType.ANSIA, SymptomType.CRAMPI):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=stype, intensity=5, timestamp=start + timedelta(hours=8)
+            ))
+
+        counters = self._counters(db_manager)
+        assert counters['total'] == 3
+        assert counters['phase_patterns']['crampi'] == {"early": 2}
+        assert counters['symptom_combos'] == {("ansia", "crampi"): 1}
+
+    def test_counters_follow_deletes(self, db_manager):
+        """Test: delete_symptom riporta indietro i contatori"""
+        timestamp = datetime(2025, 1, 5, 9)
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ACNE, intensity=3, timestamp=timestamp
+        ))
+        response = db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ANSIA, intensity=3, timestamp=timestamp
+        ))
+
+        assert db_manager.delete_symptom(response.entry_id)
+
+        counters = self._counters(db_manager)
+        assert counters['total'] == 1
+        assert counters['symptom_combos'] == {}
+
+    def test_counters_match_rebuild_after_relabel(self, db_manager):
+        """Test: Dopo add_cycle i contatori coincidono con una ricostruzione"""
+        start = datetime(2025, 1, 1)
+        for day in range(0, 60, 3):
+            for stype in (SymptomType.CRAMPI, SymptomType.MAL_DI_TESTA):
+                db_manager.add_symptom(SymptomEntry(
+                    symptom_type=stype, intensity=4, timestamp=start + timedelta(days=day)
+                ), user_id=7)
+
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM), user_id=7)
+        db_manager.add_cycle(CycleEntry(
+            start_date=start + timedelta(days=30), flow_intensity=FlowIntensity.MEDIUM
+        ), user_id=7)
+
+        incremental = self._counters(db_manager, user_id=7)
+        assert db_manager.rebuild_pattern_counters(user_id=7)
+
+        assert self._counters(db_manager, user_id=7) == incremental
+        assert incremental['phase_patterns']['crampi']['pre_menstrual'] > 0
+        assert self._counters(db_manager)['total'] == 0
+
+    def test_window_excludes_rest_of_partial_months(self, db_manager):
+        """Test: I mesi di inizio e fine finestra contano solo i giorni inclusi"""
+        for day in (2, 20):
+            for month in (1, 2, 3):
+                for stype in (SymptomType.CRAMPI, SymptomType.ACNE):
+                    db_manager.add_symptom(SymptomEntry(
+                        symptom_type=stype, intensity=4, timestamp=datetime(2025, month, day, 9)
+                    ))
+
+        counters = db_manager.get_pattern_counters(datetime(2025, 1, 10), datetime(2025, 3, 10))
+        same_month = db_manager.get_pattern_counters(datetime(2025, 2, 10), datetime(2025, 2, 25))
+
+        assert counters['total'] == 8
+        assert counters['symptom_combos'] == {("acne", "crampi"): 4}
+        assert same_month['total'] == 2
+        assert same_month['symptom_combos'] == {("acne", "crampi"): 1}
+
+    def test_upsert_compiles_for_postgresql(self):
+        """Test: L'upsert dei contatori usa il dialetto del database"""
+        from unittest.mock import MagicMock
+        from sqlalchemy.dialects import postgresql
+        from database.schema import PhaseSymptomCount, dialect_insert
+
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        stmt = dialect_insert(session, PhaseSymptomCount).values(
+            user_id=0, month="2025-01", symptom_type="acne", cycle_phase="none", count=1
+        )
+        sql = str(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month', 'symptom_type', 'cycle_phase'],
+            set_={'count': PhaseSymptomCount.count + stmt.excluded.count}
+        ).compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (user_id, month, symptom_type, cycle_phase) DO UPDATE" in sql
+
+
+class TestSymptomBaselines:
+    """Test per le baseline EWMA e il rilevamento anomalie in scrittura"""
+
+    def _add(self, db_manager, intensity, hours, user_id=None, stype=SymptomType.CRAMPI):
+        return db_manager.add_symptom(SymptomEntry(
+            symptom_type=stype, intensity=intensity,
+            timestamp=datetime(2025, 1, 1) + timedelta(hours=hours)
+        ), user_id=user_id)
+
+    def test_outlier_flagged_after_warmup(self, db_manager):
+        """Test: Dopo alcune registrazioni simili un valore estremo è anomalo"""
+        for i, intensity in enumerate([3, 4, 3, 4, 3, 4]):
+            response = self._add(db_manager, intensity, i)
+            assert response.anomaly["is_anomaly"] is False
+
+        response = self._add(db_manager, 10, 10)
+
+        assert response.anomaly["is_anomaly"] is True
+        assert response.anomaly["direction"] == "higher"
+        assert response.anomaly["baseline_entries"] == 6
+        assert response.anomaly["baseline_mean"] == pytest.approx(3.5, abs=0.1)
+
+    def test_baselines_are_per_user_and_type(self, db_manager):
+        """Test: Baseline separate per utente e tipo"""
+        for i in range(6):
+            self._add(db_manager, 8, i, user_id=1)
+            self._add(db_manager, 2, i, user_id=2)
+
+        assert self._add(db_manager, 8, 10, user_id=1).anomaly["is_anomaly"] is False
+        assert self._add(db_manager, 8, 10, user_id=2).anomaly["is_anomaly"] is True
+        assert self._add(db_manager, 8, 10, user_id=2, stype=SymptomType.ACNE).anomaly["baseline_entries"] == 0
+
+    def test_rebuild_matches_incremental(self, db_manager):
+        """Test: La ricostruzione dallo storico coincide con lo stato incrementale"""
+        for i in range(12):
+            self._add(db_manager, 1 + (i * 7) % 10, i)
+
+        before = self._add(db_manager, 9, 20).anomaly
+        db_manager.delete_symptom(db_manager.get_symptoms(limit=1)[0]["id"])
+        assert db_manager.rebuild_symptom_baselines()
+
+        assert self._add(db_manager, 9, 20).anomaly == before
+
+
+class TestCycleStatistics:
+    """Test per le statistiche correnti dei cicli (cycle_statistics)"""
+
+    def _state(self, db_manager, user_id=None):
+        from database.schema import CycleStatistics, user_key
+        session = db_manager.get_session()
+        try:
+            stats = session.query(CycleStatistics).filter(
+                CycleStatistics.user_id == user_key(user_id)
+            ).one()
+            return {
+                column.name: getattr(stats, column.name)
+                for column in CycleStatistics.__table__.columns
+                if column.name not in ("id", "updated_at")
+            }
+        finally:
+            session.close()
+
+    def _add(self, db_manager, days_ago, length=None, user_id=None):
+        start = datetime.now().replace(microsecond=0) - timedelta(days=days_ago)
+        return db_manager.add_cycle(CycleEntry(
+            start_date=start,
+            end_date=start + timedelta(days=length) if length else None
+        ), user_id=user_id)
+
+    def test_summary_from_state_matches_scan(self, db_manager):
+        """Test: Il riepilogo dallo stato coincide con il calcolo sui cicli"""
+        for days_ago, length in [(120, 5), (90, 4), (61, 7), (30, 5)]:
+            self._add(db_manager, days_ago, length)
+
+        summary = db_manager.get_cycle_summary(months=6)
+        lengths = [5, 4, 7, 5]
+        mean = sum(lengths) / 4
+        std = (sum((x - mean) ** 2 for x in lengths) / 4) ** 0.5
+
+        assert summary.total_cycles == 4
+        assert summary.shortest_cycle == 4
+        assert summary.longest_cycle == 7
+        assert summary.average_cycle_length == round(mean, 1)
+        assert summary.regularity_score == round(max(0, 100 - std * 10), 1)
+
+    def test_window_excludes_older_cycles(self, db_manager):
+        """Test: Una finestra più corta dello storico conta solo i suoi cicli"""
+        self._add(db_manager, 400, 9)
+        self._add(db_manager, 60, 4)
+        self._add(db_manager, 30, 6)
+
+        summary = db_manager.get_cycle_summary(months=6)
+        everything = db_manager.get_cycle_summary(months=None)
+
+        assert summary.total_cycles == 2
+        assert summary.longest_cycle == 6
+        assert everything.total_cycles == 3
+        assert everything.longest_cycle == 9
+
+    def test_window_reads_prediction_from_state(self, db_manager):
+        """Test: Con una finestra parziale intervallo e predizione vengono dalla riga salvata"""
+        for days_ago in (700, 690, 680):
+            self._add(db_manager, days_ago, 9)
+        for days_ago in (100, 60, 20):
+            self._add(db_manager, days_ago, 5)
+
+        summary = db_manager.get_cycle_summary(months=6)
+        everything = db_manager.get_cycle_summary(months=None)
+        state = self._state(db_manager)
+
+        assert summary.total_cycles == 3
+        assert summary.longest_cycle == 5
+        assert everything.longest_cycle == 9
+        assert summary.average_interval == round(state["interval_ewma"], 1)
+        assert summary.predicted_next_start == everything.predicted_next_start
+        assert summary.predicted_next_start == state["last_start"] + timedelta(days=round(state["interval_ewma"]))
+
+    def test_open_cycles_keep_prediction(self, db_manager):
+        """Test: Con soli cicli aperti nella finestra restano intervallo e predizione"""
+        self._add(db_manager, 400, 5)
+        self._add(db_manager, 60)
+        self._add(db_manager, 30)
+
+        summary = db_manager.get_cycle_summary(months=6)
+        everything = db_manager.get_cycle_summary(months=None)
+
+        assert summary.total_cycles == 0
+        assert summary.average_cycle_length is None
+        assert summary.regularity_score is None
+        assert summary.average_interval == everything.average_interval
+        assert summary.predicted_next_start == everything.predicted_next_start
+        assert everything.total_cycles == 1
+
+    def test_prediction_uses_recent_intervals(self, db_manager):
+        """Test: La predizione segue la media pesata recente degli intervalli"""
+        for days_ago in (120, 90, 60, 30):
+            self._add(db_manager, days_ago, 5)
+
+        summary = db_manager.get_cycle_summary(months=6)
+        last_start = datetime.now().replace(microsecond=0) - timedelta(days=30)
+
+        assert summary.average_interval == pytest.approx(30.0)
+        assert summary.predicted_next_start.date() == (last_start + timedelta(days=30)).date()
+
+    def test_incremental_matches_rebuild(self, db_manager):
+        """Test: Inserimenti fuori ordine e cambi di fine coincidono con la ricostruzione"""
+        self._add(db_manager, 100, 5, user_id=1)
+        self._add(db_manager, 35, None, user_id=1)
+        self._add(db_manager, 70, 6, user_id=1)      # fuori ordine
+        open_cycle = db_manager.get_cycles(limit=1, user_id=1)[0]
+        db_manager.update_cycle_end_date(
+            open_cycle["id"], datetime.fromisoformat(open_cycle["start_date"]) + timedelta(days=4), user_id=1
+        )
+        db_manager.update_cycle_end_date(
+            open_cycle["id"], datetime.fromisoformat(open_cycle["start_date"]) + timedelta(days=5), user_id=1
+        )
+
+        incremental = self._state(db_manager, user_id=1)
+        assert db_manager.rebuild_cycle_statistics(user_id=1)
+
+        assert self._state(db_manager, user_id=1) == incremental
+        assert incremental["closed_count"] == 3
+        assert incremental["min_length"] == 5
+        assert incremental["interval_count"] == 2
+
+
+class TestCyclePhaseLabeling:
+    """Test per l'etichettatura vettoriale delle fasi"""
+
+    def test_bulk_labeler_matches_scalar(self):
+        """Test: label_cycle_phases coincide con assign_cycle_phase"""
+        import random
+        from database.cycle_phases import assign_cycle_phase, label_cycle_phases
+
+        rng = random.Random(7)
+        origin = datetime(2024, 1, 1)
+        starts = [origin + timedelta(days=d) for d in (0, 29, 61, 88, 130)]
+        dates = [
+            origin + timedelta(days=rng.uniform(-10, 170)) for _ in range(500)
+        ] + starts
+
+        phases, cycle_days = label_cycle_phases(dates, list(reversed(starts)))
+        expected = [assign_cycle_phase(d, starts) for d in dates]
+
+        assert phases == [p for p, _ in expected]
+        assert cycle_days == [d for _, d in expected]
+
+    def test_bulk_labeler_without_cycles(self):
+        """Test: Senza cicli nessuna data viene etichettata"""
+        from database.cycle_phases import label_cycle_phases
+
+        phases, cycle_days = label_cycle_phases([datetime(2025, 1, 1)], [])
+        assert phases == [None]
+        assert cycle_days == [None]
+
 
 class TestDataModels:
     """Test per Pydantic models"""
@@ -177,6 +736,34 @@ class TestDataModels:
         
         assert before <= symptom.timestamp <= after
 
+    def test_validate_entries_collects_row_errors(self):
+        """Test: Validazione della lista con errori per riga, senza interrompere il batch"""
+        rows = [
+            {"symptom_type": "acne", "intensity": 3, "notes": "  a  ", "timestamp": "2025-01-01T10:00"},
+            {"symptom_type": "sconosciuto", "intensity": 30},
+            {"symptom_type": "ansia", "intensity": 2, "timestamp": "2025-01-02"},
+            "non un dizionario",
+        ]
+
+        entries, errors = validate_entries(SymptomEntry, rows)
+
+        assert [e.symptom_type for e in entries] == [SymptomType.ACNE, SymptomType.ANSIA]
+        assert entries[0].notes == "a"
+        assert sorted(errors) == [1, 3]
+        assert {e["loc"] for e in errors[1]} == {("symptom_type",), ("intensity",)}
+
+    def test_validate_entries_runs_model_validators(self):
+        """Test: I validatori dei campi valgono anche sulla lista"""
+        rows = [
+            {"start_date": "2025-01-05", "end_date": "2025-01-01"},
+            {"start_date": "2025-02-01", "end_date": "2025-02-05"},
+        ]
+
+        entries, errors = validate_entries(CycleEntry, rows)
+
+        assert [e.cycle_length for e in entries] == [4]
+        assert "end_date deve essere dopo start_date" in errors[0][0]["msg"]
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
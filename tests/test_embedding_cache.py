@@ -0,0 +1,174 @@
+"""
+Unit Tests per EmbeddingCache
+Test per la cache a due livelli degli embedding delle query (LRU in memoria + store su disco)
+e per la cache content-addressed degli embedding dei chunk
+"""
+
+import numpy as np
+import pytest
+from rag.embedding_cache import EmbeddingCache, DiskEmbeddingStore, ChunkEmbeddingCache, text_key
+
+
+class CountingModel:
+    """Modello finto che conta i forward pass"""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(self.dim).astype(np.float32)
+
+
+def embed(cache, model, text):
+    return cache.get_or_compute(text, lambda: model.encode(text))
+
+
+class TestEmbeddingCache:
+    """Test per la cache degli embedding"""
+
+    def test_memory_hits_skip_model(self):
+        """Test: Una domanda ripetuta non richiama il modello"""
+        cache, model = EmbeddingCache("m", capacity=4), CountingModel()
+
+        first = embed(cache, model, "What is PCOS (Polycystic Ovary Syndrome)?")
+        second = embed(cache, model, "What is PCOS (Polycystic Ovary Syndrome)?")
+
+        assert model.calls == 1
+        np.testing.assert_array_equal(first, second)
+        assert not second.flags.writeable
+        assert cache.stats()["memory_hits"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_lru_evicts_least_recently_used(self):
+        """Test: Con capacità piena esce la voce usata meno di recente"""
+        cache, model = EmbeddingCache("m", capacity=2), CountingModel()
+
+        embed(cache, model, "a")
+        embed(cache, model, "b")
+        embed(cache, model, "a")
+        embed(cache, model, "c")
+        embed(cache, model, "a")
+        embed(cache, model, "b")
+
+        assert model.calls == 4
+        assert cache.stats()["memory_entries"] == 2
+
+    def test_disk_level_survives_restart(self, tmp_path):
+        """Test: Un nuovo processo legge gli embedding salvati su disco"""
+        model = CountingModel()
+        expected = embed(EmbeddingCache("org/model-x", cache_dir=tmp_path), model, "dieta")
+
+        restarted = EmbeddingCache("org/model-x", cache_dir=tmp_path)
+        vector = embed(restarted, model, "dieta")
+        embed(restarted, model, "dieta")
+
+        assert model.calls == 1
+        np.testing.assert_array_equal(vector, expected)
+        assert restarted.stats()["disk_hits"] == 1
+        assert restarted.stats()["memory_hits"] == 1
+
+    def test_model_name_is_part_of_the_key(self, tmp_path):
+        """Test: Modelli diversi non condividono gli embedding"""
+        model = CountingModel()
+        embed(EmbeddingCache("model-a", cache_dir=tmp_path), model, "sonno")
+        embed(EmbeddingCache("model-b", cache_dir=tmp_path), model, "sonno")
+
+        assert model.calls == 2
+
+
+class TestDiskEmbeddingStore:
+    """Test per lo store su disco"""
+
+    def test_ring_overwrites_oldest(self, tmp_path):
+        """Test: A store pieno si sovrascrive lo slot più vecchio, anche dopo riapertura"""
+        store = DiskEmbeddingStore(tmp_path, capacity=2)
+        for text in ("a", "b", "c"):
+            store.put(text_key(text), np.full(3, ord(text), dtype=np.float32))
+
+        reopened = DiskEmbeddingStore(tmp_path, capacity=2)
+        reopened.put(text_key("d"), np.full(3, 100, dtype=np.float32))
+
+        assert reopened.get(text_key("a")) is None
+        assert reopened.get(text_key("b")) is None
+        assert reopened.get(text_key("c"))[0] == ord("c")
+        assert len(reopened) == 2
+
+    def test_writers_share_ring_position(self, tmp_path):
+        """Test: Due processi che scrivono sullo stesso store non si sovrascrivono"""
+        first = DiskEmbeddingStore(tmp_path, capacity=4)
+        first.put(text_key("a"), np.full(3, 1, dtype=np.float32))
+        second = DiskEmbeddingStore(tmp_path, capacity=4)
+        first.put(text_key("b"), np.full(3, 2, dtype=np.float32))
+        second.put(text_key("c"), np.full(3, 3, dtype=np.float32))
+
+        reopened = DiskEmbeddingStore(tmp_path, capacity=4)
+
+        assert [reopened.get(text_key(t))[0] for t in "abc"] == [1, 2, 3]
+        assert reopened.next_slot == 3
+
+    def test_slot_reused_elsewhere_is_a_miss(self, tmp_path):
+        """Test: Uno slot riscritto da un altro processo non restituisce il vettore sbagliato"""
+        reader = DiskEmbeddingStore(tmp_path, capacity=2)
+        reader.put(text_key("a"), np.full(3, 1, dtype=np.float32))
+        reader.put(text_key("b"), np.full(3, 2, dtype=np.float32))
+
+        writer = DiskEmbeddingStore(tmp_path, capacity=2)
+        writer.put(text_key("c"), np.full(3, 3, dtype=np.float32))
+
+        assert reader.get(text_key("a")) is None
+        assert len(reader) == 1
+        assert reader.get(text_key("b"))[0] == 2
+
+    def test_dimension_change_resets_store(self, tmp_path):
+        """Test: Un modello con dimensione diversa azzera lo store"""
+        store = DiskEmbeddingStore(tmp_path, capacity=4)
+        store.put(text_key("a"), np.ones(3, dtype=np.float32))
+        store.put(text_key("b"), np.ones(5, dtype=np.float32))
+
+        assert store.get(text_key("a")) is None
+        assert store.get(text_key("b")).shape == (5,)
+        assert DiskEmbeddingStore(tmp_path).dim == 5
+
+
+class TestChunkEmbeddingCache:
+    """Test per la cache degli embedding dei chunk"""
+
+    def test_saved_embeddings_reused_after_restart(self, tmp_path):
+        """Test: Dopo save() un nuovo build trova i chunk invariati"""
+        cache = ChunkEmbeddingCache("model", tmp_path)
+        keys = [text_key("chunk 1"), text_key("chunk 2")]
+        cache.add(keys, [np.ones(4), np.zeros(4)])
+        cache.save()
+
+        rebuilt = ChunkEmbeddingCache("model", tmp_path)
+        found = rebuilt.get_many([text_key("chunk 2"), text_key("chunk 3 (modificato)"), keys[0]])
+
+        assert sorted(found) == [0, 2]
+        np.testing.assert_array_equal(found[2], np.ones(4, dtype=np.float32))
+        assert (rebuilt.hits, rebuilt.misses) == (2, 1)
+
+    def test_incremental_save_appends(self, tmp_path):
+        """Test: I nuovi embedding si aggiungono a quelli salvati"""
+        cache = ChunkEmbeddingCache("model", tmp_path)
+        cache.add([text_key("a")], [np.ones(4)])
+        cache.save()
+        cache.add([text_key("b")], [np.full(4, 2.0)])
+        assert len(cache.get_many([text_key("b")])) == 1
+        cache.save()
+
+        assert len(ChunkEmbeddingCache("model", tmp_path)) == 2
+        assert len(ChunkEmbeddingCache("other-model", tmp_path)) == 0
+
+    def test_dimension_change_discards_cache(self, tmp_path):
+        """Test: Un modello con dimensione diversa scarta la cache"""
+        cache = ChunkEmbeddingCache("model", tmp_path)
+        cache.add([text_key("a")], [np.ones(4)])
+        cache.save()
+        cache.add([text_key("b")], [np.ones(6)])
+        cache.save()
+
+        reloaded = ChunkEmbeddingCache("model", tmp_path)
+        assert (len(reloaded), reloaded.dim) == (1, 6)
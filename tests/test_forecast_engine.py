@@ -0,0 +1,173 @@
+"""
+Unit Tests per ForecastEngine
+Test per i calendari previsti: calcolo vettoriale, coerenza con le fasi e persistenza
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from database import DatabaseManager, CycleEntry, FlowIntensity
+from database.cycle_phases import CYCLE_PHASES, label_cycle_phase_codes
+from tools import CycleTracker
+from tools.forecast_engine import ForecastEngine, forecast_calendars
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+TODAY = datetime(2025, 6, 1)
+
+
+def _add_cycles(db, starts, user_id=None, length=5):
+    for start in starts:
+        db.add_cycle(CycleEntry(
+            start_date=start, end_date=start + timedelta(days=length),
+            flow_intensity=FlowIntensity.MEDIUM
+        ), user_id=user_id)
+
+
+def _day(moment):
+    return int(np.datetime64(moment, 'D').astype(np.int64))
+
+
+class TestForecastCalendars:
+    """Test per il calcolo vettoriale dei calendari"""
+
+    def test_cycles_cover_horizon(self):
+        """Test: Cicli contigui che coprono tutto l'orizzonte per ogni utente"""
+        today = _day(TODAY)
+        last_start = np.array([today - 10, today - 100, today + 2])
+        interval = np.array([28.0, 35.5, 21.0])
+
+        calendars = forecast_calendars(last_start, interval, np.array([5, 6, 4]), today, 90)
+
+        for user in range(3):
+            mask = calendars["user"] == user
+            starts = calendars["cycle_start"][mask]
+            nexts = calendars["next_start"][mask]
+            assert starts[0] <= today < nexts[0] or starts[0] == last_start[user]
+            assert (starts[1:] == nexts[:-1]).all()
+            assert nexts[-1] >= today + 90
+            assert starts[-1] < today + 90
+
+    def test_current_cycle_number(self):
+        """Test: L'ultimo ciclo registrato in corso è il ciclo 0"""
+        today = _day(TODAY)
+        calendars = forecast_calendars(np.array([today - 3]), np.array([28.0]), np.array([5]), today, 30)
+
+        assert calendars["cycle_number"].tolist()[:2] == [0, 1]
+        assert calendars["cycle_start"][0] == today - 3
+        assert calendars["period_end"][0] == today + 1
+        assert calendars["next_start"][0] == today + 25
+
+    def test_phases_match_cycle_phase_labels(self):
+        """Test: Le fasi salvate coincidono con label_cycle_phase_codes sugli inizi previsti"""
+        today = _day(TODAY)
+        for interval in (12.0, 17.0, 20.0, 28.0, 33.3, 45.0):
+            calendars = forecast_calendars(np.array([today - 5]), np.array([interval]),
+                                           np.array([5]), today, 120)
+            starts = np.append(calendars["cycle_start"], calendars["next_start"][-1])
+            days = np.arange(starts[0], starts[-1])
+
+            codes, _ = label_cycle_phase_codes(days.astype('datetime64[D]'), starts.astype('datetime64[D]'))
+
+            boundaries = np.stack([
+                calendars["cycle_start"], calendars["mid_start"], calendars["late_start"],
+                calendars["pre_menstrual_start"], calendars["next_start"]
+            ], axis=1)
+            expected = []
+            for row in boundaries:
+                for phase in range(len(CYCLE_PHASES)):
+                    expected += [phase] * int(row[phase + 1] - row[phase])
+
+            assert codes.tolist() == expected, f"interval {interval}"
+
+
+class TestForecastEngine:
+    """Test per la generazione e la lettura dei calendari salvati"""
+
+    def test_generate_all_users(self, db_manager):
+        """Test: Un calendario per ogni utente attivo, gli inattivi sono esclusi"""
+        _add_cycles(db_manager, [TODAY - timedelta(days=40), TODAY - timedelta(days=10)])
+        _add_cycles(db_manager, [TODAY - timedelta(days=70), TODAY - timedelta(days=35)], user_id=7)
+        _add_cycles(db_manager, [TODAY - timedelta(days=900)], user_id=8)
+
+        result = ForecastEngine(db_manager, batch_size=1).generate(months=3, today=TODAY)
+
+        assert result["success"] is True
+        assert result["users"] == 2
+
+        forecasts = db_manager.get_forecasts(TODAY, TODAY + timedelta(days=89))
+        assert set(forecasts) == {None, 7}
+        assert sum(len(cycles) for cycles in forecasts.values()) == result["cycles"]
+
+        local = forecasts[None]
+        assert local[0]["cycle_start"] == "2025-05-22"
+        assert local[0]["predicted"] is False
+        assert local[0]["period_end"] == "2025-05-26"
+        assert local[1]["cycle_start"] == "2025-06-21"
+        assert local[1]["predicted"] is True
+        assert local[1]["phases"]["early"] == {"start": "2025-06-21", "end": "2025-06-26"}
+        assert local[1]["phases"]["pre_menstrual"] == {"start": "2025-07-18", "end": "2025-07-20"}
+
+    def test_regenerate_single_user(self, db_manager):
+        """Test: La rigenerazione di un utente non tocca gli altri"""
+        _add_cycles(db_manager, [TODAY - timedelta(days=40), TODAY - timedelta(days=10)])
+        _add_cycles(db_manager, [TODAY - timedelta(days=70), TODAY - timedelta(days=35)], user_id=7)
+        engine = ForecastEngine(db_manager)
+        engine.generate(today=TODAY)
+
+        _add_cycles(db_manager, [TODAY - timedelta(days=2)], user_id=7)
+        engine.generate(user_ids=[7], today=TODAY)
+
+        forecasts = db_manager.get_forecasts(TODAY, TODAY + timedelta(days=89))
+        assert forecasts[7][0]["cycle_start"] == "2025-05-30"
+        assert forecasts[None][0]["cycle_start"] == "2025-05-22"
+
+    def test_tracker_generates_on_demand(self, db_manager):
+        """Test: Il tracker genera il calendario se il job non è ancora passato"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        _add_cycles(db_manager, [today - timedelta(days=40), today - timedelta(days=12)], user_id=3)
+
+        result = CycleTracker(db_manager, user_id=3).get_cycle_forecast(months=2)
+
+        assert result["success"] is True
+        assert result["count"] >= 2
+        assert result["cycles"][0]["cycle_start"] == (today - timedelta(days=12)).date().isoformat()
+        assert db_manager.get_forecasts(user_ids=[None]) == {}
+
+    def test_cycle_changes_clear_saved_forecast(self, db_manager):
+        """Test: Un nuovo ciclo o una nuova fine invalidano il calendario salvato dell'utente"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        _add_cycles(db_manager, [today - timedelta(days=60), today - timedelta(days=30)], user_id=3)
+        _add_cycles(db_manager, [today - timedelta(days=30)], user_id=4)
+        tracker = CycleTracker(db_manager, user_id=3)
+        tracker.get_cycle_forecast(months=3)
+        ForecastEngine(db_manager).generate(user_ids=[4], today=today)
+
+        started = (today - timedelta(days=2)).date().isoformat()
+        tracked = tracker.track_cycle(started, flow_intensity="medium")
+
+        assert db_manager.get_forecasts(user_ids=[3]) == {}
+        assert 4 in db_manager.get_forecasts(user_ids=[4])
+        assert tracker.get_cycle_forecast(months=3)["cycles"][0]["cycle_start"] == started
+
+        tracker.update_cycle_end(tracked["entry_id"], today.date().isoformat())
+        assert db_manager.get_forecasts(user_ids=[3]) == {}
+
+    def test_longer_request_extends_calendar(self, db_manager):
+        """Test: Una richiesta più lunga del calendario salvato lo rigenera"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        _add_cycles(db_manager, [today - timedelta(days=40), today - timedelta(days=12)], user_id=3)
+        tracker = CycleTracker(db_manager, user_id=3)
+        tracker.get_cycle_forecast(months=3)
+
+        result = tracker.get_cycle_forecast(months=12)
+
+        end = today + timedelta(days=12 * 30 - 1)
+        assert datetime.fromisoformat(result["cycles"][-1]["next_start"]) > end
+        assert result["count"] >= 12
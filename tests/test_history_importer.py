@@ -0,0 +1,177 @@
+"""
+Unit Tests per HistoryImporter
+Test per l'import incrementale di export CSV/JSON: mapping, deduplica, batch e stato derivato
+"""
+
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from database import DatabaseManager, SymptomEntry, SymptomType, CycleEntry, FlowIntensity
+from tools.history_importer import HistoryImporter, iter_json_records, detect_format
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+START = datetime(2025, 1, 1)
+
+SYMPTOMS_CSV = """Date,Symptom,Severity,Notes
+2025-01-02,cramps,7,forti
+2025-01-02,Mal di testa,moderate,
+02/01/2025 18:30,acne,3.4,
+2025-01-20,unknown_thing,5,
+2025-01-21,ansia,15,
+"""
+
+
+def _export(cycles=3, symptoms_per_cycle=2):
+    return {
+        "version": 2,
+        "cycles": [
+            {"period_start": (START + timedelta(days=30 * k)).isoformat(),
+             "period_end": (START + timedelta(days=30 * k + 5)).isoformat(),
+             "flow": "heavy"}
+            for k in range(cycles)
+        ],
+        "symptoms": [
+            {"symptom": "crampi", "intensity": 2 + j,
+             "timestamp": (START + timedelta(days=30 * k + j, hours=9)).isoformat()}
+            for k in range(cycles) for j in range(symptoms_per_cycle)
+        ],
+    }
+
+
+class TestStreamingReaders:
+    """Test per la lettura incrementale"""
+
+    def test_json_sections_small_chunks(self):
+        """Test: Oggetti decodificati uno alla volta anche con blocchi minuscoli"""
+        document = json.dumps(_export())
+
+        records = list(iter_json_records(io.StringIO(document), chunk_chars=7))
+
+        assert [section for _, section, _ in records] == ["cycles"] * 3 + ["symptoms"] * 6
+        assert records[3][2]["intensity"] == 2
+
+    def test_json_top_level_list(self):
+        """Test: Lista di oggetti al primo livello, chiavi normalizzate"""
+        document = '[{"Start Date": "2025-01-01"}, {"Symptom": "acne", "Intensity": 10}]'
+
+        records = list(iter_json_records(io.StringIO(document), chunk_chars=5))
+
+        assert [record for _, _, record in records] == [
+            {"start_date": "2025-01-01"}, {"symptom": "acne", "intensity": 10}
+        ]
+
+    def test_detect_format(self):
+        """Test: Formato dall'estensione"""
+        assert detect_format("export.CSV") == "csv"
+        assert detect_format("clue.ndjson") == "jsonl"
+        with pytest.raises(ValueError):
+            detect_format("export.xlsx")
+
+
+class TestHistoryImporter:
+    """Test per l'import nel database"""
+
+    def test_csv_symptoms_mapping_and_errors(self, db_manager):
+        """Test: Alias di colonne e valori, righe non valide riportate"""
+        result = HistoryImporter(db_manager).import_stream(io.BytesIO(SYMPTOMS_CSV.encode()), "csv")
+
+        assert result["success"] is True
+        assert result["symptoms_imported"] == 3
+        assert result["invalid"] == 2
+        assert result["errors"][0].startswith("riga 5: tipo di sintomo non riconosciuto")
+        assert "intensity" in result["errors"][1]
+
+        symptoms = db_manager.get_symptoms(limit=10)
+        assert sorted((s["symptom_type"], s["intensity"]) for s in symptoms) == [
+            ("acne", 3), ("crampi", 7), ("mal_di_testa", 6)
+        ]
+
+    def test_reimport_skips_duplicates(self, db_manager):
+        """Test: Lo stesso export importato due volte non crea duplicati"""
+        document = json.dumps(_export()).encode()
+        importer = HistoryImporter(db_manager, user_id=4, batch_size=2)
+
+        first = importer.import_stream(io.BytesIO(document), "json")
+        second = importer.import_stream(io.BytesIO(document), "json")
+
+        assert (first["cycles_imported"], first["symptoms_imported"], first["duplicates"]) == (3, 6, 0)
+        assert (second["cycles_imported"], second["symptoms_imported"], second["duplicates"]) == (0, 0, 9)
+        assert len(db_manager.get_cycles(limit=10, user_id=4)) == 3
+
+    def test_manual_entries_are_not_deduplicated(self, db_manager):
+        """Test: I sintomi registrati a mano possono ripetersi"""
+        entry = SymptomEntry(symptom_type=SymptomType.ANSIA, intensity=4, timestamp=START)
+
+        assert db_manager.add_symptom(entry).success
+        assert db_manager.add_symptom(entry).success
+
+    def test_progress_reported_per_batch(self, db_manager):
+        """Test: Callback di avanzamento dopo ogni batch"""
+        reports = []
+        lines = "\n".join(
+            json.dumps({"symptom": "acne", "intensity": 5,
+                        "date": (START + timedelta(hours=i)).isoformat()})
+            for i in range(7)
+        )
+
+        result = HistoryImporter(db_manager, batch_size=3).import_stream(
+            io.StringIO(lines), "jsonl", progress=reports.append
+        )
+
+        assert result["symptoms_imported"] == 7
+        assert [r["symptoms_imported"] for r in reports] == [3, 6, 7]
+
+    def test_imported_cycles_relabel_and_rebuild_state(self, db_manager):
+        """Test: Fasi dei sintomi esistenti e statistiche aggiornate dopo l'import"""
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI, intensity=6, timestamp=START + timedelta(hours=10)
+        ))
+        db_manager.add_cycle(CycleEntry(
+            start_date=START + timedelta(days=90), flow_intensity=FlowIntensity.LIGHT
+        ))
+
+        result = HistoryImporter(db_manager).import_stream(io.StringIO(json.dumps(_export())), "json")
+
+        assert result["success"] is True
+        manual = [s for s in db_manager.get_symptoms(limit=20) if s["intensity"] == 6][0]
+        assert (manual["cycle_phase"], manual["cycle_day"]) == ("early", 1)
+
+        summary = db_manager.get_cycle_summary(months=None)
+        assert summary.total_cycles == 3
+        assert summary.average_interval == 30.0
+
+    def test_duplicate_cycle_start_rejected(self, db_manager):
+        """Test: Il ciclo già registrato con lo stesso inizio è saltato"""
+        db_manager.add_cycle(CycleEntry(start_date=START, flow_intensity=FlowIntensity.MEDIUM))
+
+        result = HistoryImporter(db_manager).import_stream(
+            io.StringIO("start_date,end_date,flow\n2025-01-01,2025-01-05,light\n"), "csv"
+        )
+
+        assert (result["cycles_imported"], result["duplicates"]) == (0, 1)
+
+    def test_manual_cycles_are_not_deduplicated(self, db_manager):
+        """Test: add_cycle accetta due cicli con lo stesso inizio, come prima degli import"""
+        entry = CycleEntry(start_date=START, flow_intensity=FlowIntensity.MEDIUM)
+
+        assert db_manager.add_cycle(entry).success
+        assert db_manager.add_cycle(entry).success
+        assert len(db_manager.get_cycles(limit=10)) == 2
+
+    def test_import_file(self, db_manager, tmp_path):
+        """Test: Import da file con formato dall'estensione"""
+        path = tmp_path / "export.csv"
+        path.write_text("\ufeff" + SYMPTOMS_CSV, encoding="utf-8")
+
+        result = HistoryImporter(db_manager).import_file(path)
+
+        assert result["success"] is True
+        assert result["symptoms_imported"] == 3
@@ -0,0 +1,130 @@
+"""
+Unit Tests per Intensity Sketch
+Test per sketch delle intensità: merge, quantili, serializzazione e stato nel database
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from database import DatabaseManager, SymptomEntry, SymptomType
+from database.intensity_sketch import IntensitySketch, SKETCH_QUANTILES, merge_sketches
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+def _sketch(values):
+    sketch = IntensitySketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+class TestIntensitySketch:
+    """Test suite per IntensitySketch"""
+
+    def test_quantiles_match_numpy(self):
+        """Test: Quantili uguali a np.quantile (inverted_cdf) sui valori"""
+        values = np.random.default_rng(0).integers(1, 11, 500)
+        summary = _sketch(values).summary()
+
+        assert summary["count"] == 500
+        assert summary["mean"] == round(values.mean(), 2)
+        for name, q in SKETCH_QUANTILES.items():
+            assert summary[name] == np.quantile(values, q, method="inverted_cdf")
+
+    def test_merge_equals_union(self):
+        """Test: Il merge di due sketch coincide con lo sketch dell'unione"""
+        a, b = [1, 2, 2, 9], [5, 5, 10]
+
+        assert _sketch(a).merge(_sketch(b)) == _sketch(a + b)
+        assert merge_sketches([{"x": _sketch(a)}, {"x": _sketch(b), "y": _sketch(a)}]) == {
+            "x": _sketch(a + b), "y": _sketch(a)
+        }
+
+    def test_serialization_roundtrip(self):
+        """Test: Serializzazione sparsa compatta e reversibile"""
+        sketch = _sketch([3] * 300 + [7])
+
+        data = sketch.to_bytes()
+
+        assert len(data) == 5
+        assert IntensitySketch.from_bytes(data) == sketch
+        assert IntensitySketch.from_bytes(b"") == IntensitySketch()
+
+    def test_empty_sketch(self):
+        """Test: Sketch vuoto senza quantili"""
+        assert IntensitySketch().summary()["median"] is None
+
+
+class TestIntensitySketchState:
+    """Test per gli sketch mantenuti dal DatabaseManager"""
+
+    def _populate(self, db_manager, user_id=None, start=datetime(2025, 1, 10)):
+        values = []
+        for i in range(120):
+            intensity = 1 + (i * 7) % 10
+            timestamp = start + timedelta(days=i * 0.9, hours=i % 5)
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI if i % 3 else SymptomType.ACNE,
+                intensity=intensity, timestamp=timestamp
+            ), user_id=user_id)
+            values.append((timestamp, "crampi" if i % 3 else "acne", intensity))
+        return values
+
+    def test_any_window_is_exact(self, db_manager):
+        """Test: Mesi interi dagli sketch + bordi = distribuzione esatta"""
+        values = self._populate(db_manager)
+
+        for start, end in [
+            (datetime(2025, 1, 15), datetime(2025, 3, 20)),
+            (datetime(2025, 2, 1), datetime(2025, 4, 1)),
+            (datetime(2025, 2, 3), datetime(2025, 2, 9)),
+        ]:
+            percentiles = db_manager.get_intensity_percentiles(start, end)
+            for stype in ("crampi", "acne"):
+                expected = _sketch(v for t, s, v in values if s == stype and start <= t <= end)
+                assert percentiles[stype] == expected.summary()
+
+    def test_incremental_matches_rebuild_after_delete(self, db_manager):
+        """Test: add/delete incrementali coincidono con la ricostruzione"""
+        self._populate(db_manager)
+        for symptom in db_manager.get_symptoms(limit=10):
+            assert db_manager.delete_symptom(symptom["id"])
+
+        window = (datetime(2024, 12, 1), datetime(2025, 6, 1))
+        incremental = db_manager.get_intensity_percentiles(*window)
+        assert db_manager.rebuild_intensity_sketches()
+
+        assert db_manager.get_intensity_percentiles(*window) == incremental
+        assert sum(p["count"] for p in incremental.values()) == 110
+
+    def test_merge_across_users(self, db_manager):
+        """Test: Gli sketch di più utenti si uniscono per la vista di coorte"""
+        self._populate(db_manager, user_id=1)
+        self._populate(db_manager, user_id=2, start=datetime(2025, 2, 1))
+
+        window = (datetime(2025, 1, 1), datetime(2025, 6, 1))
+        sketches = db_manager.get_intensity_sketches(*window, user_ids=[1, 2])
+        merged = merge_sketches(sketches.values())
+
+        assert set(sketches) == {1, 2}
+        assert merged["crampi"].total == 160
+        assert db_manager.get_intensity_sketches(*window) == {}
+
+    def test_summary_exposes_percentiles(self, db_manager):
+        """Test: Il riepilogo include i percentili per tipo"""
+        for intensity in (2, 4, 6, 8, 10):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI, intensity=intensity,
+                timestamp=datetime.now() - timedelta(days=intensity)
+            ))
+
+        summary = db_manager.get_symptom_summary(days=30)
+
+        assert summary.intensity_percentiles["crampi"]["median"] == 6
+        assert summary.intensity_percentiles["crampi"]["p90"] == 10
@@ -0,0 +1,98 @@
+"""
+Unit Tests per Lag Correlation
+Test per correlazioni incrociate via FFT e relazioni ritardate tra sintomi
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from database import DatabaseManager, SymptomEntry, SymptomType
+from tools.lag_correlation import cross_correlation_matrix, strongest_lags
+from tools.pattern_analyzer import PatternAnalyzer
+
+
+def _reference(series, max_lag):
+    """Correlazioni con un doppio ciclo esplicito"""
+    z = (series - series.mean(axis=1, keepdims=True)) / series.std(axis=1, keepdims=True)
+    n_types, n_days = z.shape
+    out = np.zeros((n_types, n_types, max_lag + 1))
+    for i in range(n_types):
+        for j in range(n_types):
+            for k in range(max_lag + 1):
+                out[i, j, k] = np.dot(z[i, :n_days - k], z[j, k:]) / (n_days - k)
+    return out
+
+
+class TestCrossCorrelation:
+    """Test suite per cross_correlation_matrix e strongest_lags"""
+
+    def test_matches_direct_computation(self):
+        """Test: La FFT coincide con il calcolo diretto per ogni coppia e ritardo"""
+        series = np.random.default_rng(0).random((5, 200))
+
+        result = cross_correlation_matrix(series, max_lag=10)
+
+        assert result.shape == (5, 5, 11)
+        assert np.allclose(result, _reference(series, 10))
+
+    def test_shifted_series_found_at_lag(self):
+        """Test: Una serie ritardata di 3 giorni è riconosciuta come successiva"""
+        rng = np.random.default_rng(1)
+        leader = rng.random(400)
+        follower = np.concatenate((rng.random(3), leader[:-3]))
+        noise = rng.random(400)
+        series = np.vstack((leader, follower, noise))
+
+        relationships = strongest_lags(
+            cross_correlation_matrix(series, 7), ["a", "b", "c"], 400
+        )
+
+        assert relationships[0]["leader"] == "a"
+        assert relationships[0]["follower"] == "b"
+        assert relationships[0]["lag_days"] == 3
+        assert relationships[0]["correlation"] > 0.9
+        assert relationships[0]["p_value"] < 0.001
+
+    def test_constant_series_has_no_correlation(self):
+        """Test: Una serie costante non produce NaN né relazioni"""
+        series = np.vstack((np.ones(50), np.random.default_rng(2).random(50)))
+
+        result = cross_correlation_matrix(series, 5)
+
+        assert np.isfinite(result).all()
+        assert strongest_lags(result, ["a", "b"], 50) == []
+
+
+class TestLaggedCorrelationAnalysis:
+    """Test per PatternAnalyzer.analyze_lagged_correlations"""
+
+    def test_fatigue_precedes_acne(self):
+        """Test: Affaticamento seguito da acne dopo 3 giorni"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        rng = np.random.default_rng(3)
+        start = datetime.now() - timedelta(days=170)
+
+        for day in sorted(rng.choice(160, 40, replace=False)):
+            when = start + timedelta(days=int(day), hours=9)
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.AFFATICAMENTO, intensity=7, timestamp=when
+            ))
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.ACNE, intensity=5, timestamp=when + timedelta(days=3)
+            ))
+
+        result = PatternAnalyzer(db_manager).analyze_lagged_correlations(days=180, max_lag=7)
+
+        assert result["success"] is True
+        top = result["relationships"][0]
+        assert (top["leader"], top["follower"], top["lag_days"]) == ("affaticamento", "acne", 3)
+        assert "precede" in result["insights"][0]
+
+    def test_requires_two_symptom_types(self):
+        """Test: Con un solo tipo l'analisi non è possibile"""
+        db_manager = DatabaseManager(db_url="sqlite:///:memory:")
+        db_manager.add_symptom(SymptomEntry(symptom_type=SymptomType.ACNE, intensity=3))
+
+        result = PatternAnalyzer(db_manager).analyze_lagged_correlations()
+
+        assert result["success"] is False
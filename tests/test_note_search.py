@@ -0,0 +1,234 @@
+"""
+Unit Tests per NoteIndex
+Test per l'indicizzazione in background e la ricerca semantica nelle note personali
+"""
+
+import hashlib
+import re
+import pytest
+import numpy as np
+from database import DatabaseManager
+from tools import SymptomTracker, CycleTracker
+from tools import note_search
+from tools.note_search import NoteIndex
+
+
+class BagOfWordsEmbedder:
+    """Embedder deterministico per i test: parole hashate in 64 dimensioni"""
+
+    def generate_embeddings_batch(self, texts, show_progress=True):
+        vectors = []
+        for text in texts:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Database su file: il thread di embedding usa una propria connessione"""
+    manager = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'notes.db'}")
+    yield manager
+
+
+@pytest.fixture
+def note_index(db_manager):
+    """Indice con embedder deterministico"""
+    return NoteIndex(db_manager, embedder=BagOfWordsEmbedder(), batch_size=2)
+
+
+@pytest.fixture
+def symptom_tracker(db_manager, note_index):
+    return SymptomTracker(db_manager, note_index=note_index)
+
+
+class TestNoteIndex:
+    """Test per indicizzazione e ricerca"""
+
+    def test_search_finds_tracked_notes(self, symptom_tracker, note_index):
+        """Test: Le note registrate sono cercabili dopo l'embedding in background"""
+        symptom_tracker.track_symptom("crampi", 6, "dolore dopo la corsa al parco")
+        symptom_tracker.track_symptom("mal_di_testa", 4, "poco sonno e troppo caffè")
+        symptom_tracker.track_symptom("acne", 3, "")
+        note_index.wait()
+
+        result = note_index.search("corsa al parco")
+
+        assert result["success"] is True
+        assert result["indexed_notes"] == 2
+        assert result["results"][0]["entry"]["symptom_type"] == "crampi"
+        assert result["results"][0]["score"] > result["results"][1]["score"]
+
+    def test_find_similar_and_source_filter(self, db_manager, note_index, symptom_tracker):
+        """Test: Registrazioni simili a una data, esclusa se stessa; filtro per tipo"""
+        first = symptom_tracker.track_symptom("dolore_pelvico", 5, "gonfiore dopo pizza e birra")
+        symptom_tracker.track_symptom("dolore_pelvico", 6, "pizza a cena, gonfiore la mattina")
+        cycle_tracker = CycleTracker(db_manager, note_index=note_index)
+        cycle_tracker.track_cycle("2025-01-01", notes="pizza con le amiche")
+        note_index.wait()
+
+        similar = note_index.find_similar("symptom", first["entry_id"])
+        cycles_only = note_index.search("pizza", source="cycle")
+
+        assert first["entry_id"] not in [r["entry_id"] for r in similar["results"] if r["source"] == "symptom"]
+        assert len(similar["results"]) == 2
+        assert [r["source"] for r in cycles_only["results"]] == ["cycle"]
+
+    def test_filtered_rows_never_fill_the_top_k(self, db_manager, note_index, symptom_tracker):
+        """Test: Righe di altra sorgente, scartate o di riferimento non occupano i posti del top-k"""
+        entries = [symptom_tracker.track_symptom("crampi", 5, "pizza e birra")["entry_id"] for _ in range(12)]
+        CycleTracker(db_manager, note_index=note_index).track_cycle("2025-01-01", notes="pizza e birra la sera")
+        note_index.wait()
+
+        cycles_only = note_index.search("pizza e birra", source="cycle", top_k=1)
+        db_manager.delete_symptom(entries[1])
+        note_index.search("pizza e birra", top_k=20)
+        similar = note_index.find_similar("symptom", entries[0], top_k=20)
+
+        assert [r["source"] for r in cycles_only["results"]] == ["cycle"]
+        assert len(similar["results"]) == 11
+        assert entries[0] not in [r["entry_id"] for r in similar["results"] if r["source"] == "symptom"]
+        assert entries[1] not in [r["entry_id"] for r in similar["results"] if r["source"] == "symptom"]
+
+    def test_index_grows_incrementally(self, symptom_tracker, note_index):
+        """Test: Le ricerche successive leggono solo gli embedding nuovi"""
+        symptom_tracker.track_symptom("ansia", 5, "riunione di lavoro")
+        note_index.wait()
+        note_index.search("lavoro")
+        user_notes = note_index._users[0]
+        first_matrix, first_last_id = user_notes.matrix, user_notes.last_id
+
+        symptom_tracker.track_symptom("ansia", 7, "scadenza di lavoro")
+        note_index.wait()
+        result = note_index.search("lavoro")
+
+        assert result["indexed_notes"] == 2
+        assert note_index._users[0] is user_notes
+        assert user_notes.matrix is first_matrix
+        assert user_notes.last_id > first_last_id
+
+    def test_sync_indexes_batch_and_missing_notes(self, db_manager, note_index, symptom_tracker):
+        """Test: Le note salvate senza passare dalla coda vengono recuperate"""
+        symptom_tracker.track_symptoms([
+            {"symptom_type": "crampi", "intensity": 5, "notes": "ciclo doloroso", "timestamp": "2025-02-01T08:00"},
+            {"symptom_type": "acne", "intensity": 2, "timestamp": "2025-02-02T08:00"},
+        ])
+        note_index.wait()
+
+        assert note_index.search("doloroso")["indexed_notes"] == 1
+        assert note_index.sync() == 0
+        assert db_manager.get_unembedded_notes() == []
+
+    def test_deleted_entries_are_skipped(self, db_manager, note_index, symptom_tracker):
+        """Test: Un sintomo eliminato non compare più nei risultati"""
+        kept = symptom_tracker.track_symptom("crampi", 5, "crampi al mattino")
+        removed = symptom_tracker.track_symptom("crampi", 8, "crampi forti al mattino")
+        note_index.wait()
+        note_index.search("crampi")
+
+        assert db_manager.delete_symptom(removed["entry_id"])
+        result = note_index.search("crampi forti")
+
+        assert [r["entry_id"] for r in result["results"]] == [kept["entry_id"]]
+        assert ("symptom", removed["entry_id"]) not in note_index._users[0].positions
+
+    def test_reused_id_does_not_inherit_old_vector(self, db_manager, note_index, symptom_tracker):
+        """Test: Un nuovo record con l'id di uno eliminato non eredita il suo embedding"""
+        removed = symptom_tracker.track_symptom("crampi", 8, "crampi forti al mattino")
+        note_index.wait()
+        note_index.search("crampi")
+        assert db_manager.delete_symptom(removed["entry_id"])
+
+        reused = symptom_tracker.track_symptom("acne", 2, "")
+        result = note_index.search("crampi forti al mattino")
+
+        assert reused["entry_id"] == removed["entry_id"]
+        assert result["results"] == []
+        assert result["indexed_notes"] == 0
+
+    def test_edited_note_is_reembedded(self, db_manager, note_index, symptom_tracker):
+        """Test: Una nota modificata viene ricalcolata e sostituisce il vecchio embedding"""
+        from database.schema import SymptomRecord
+        entry = symptom_tracker.track_symptom("ansia", 5, "riunione di lavoro")
+        note_index.wait()
+        note_index.search("lavoro")
+
+        session = db_manager.get_session()
+        session.query(SymptomRecord).filter(SymptomRecord.id == entry["entry_id"]).update(
+            {"notes": "vacanza al mare"}
+        )
+        session.commit()
+        session.close()
+
+        assert note_index.sync() == 1
+        note_index.wait()
+        result = note_index.search("vacanza al mare")
+
+        assert result["indexed_notes"] == 1
+        assert result["results"][0]["entry"]["notes"] == "vacanza al mare"
+        assert result["results"][0]["score"] == pytest.approx(1.0)
+        assert note_index.sync() == 0
+
+    def test_stale_note_found_by_search_is_requeued(self, db_manager, note_index, symptom_tracker):
+        """Test: La ricerca scarta un embedding di testo vecchio e ne accoda uno nuovo"""
+        from database.schema import SymptomRecord
+        entry = symptom_tracker.track_symptom("ansia", 5, "riunione di lavoro")
+        note_index.wait()
+
+        session = db_manager.get_session()
+        session.query(SymptomRecord).filter(SymptomRecord.id == entry["entry_id"]).update(
+            {"notes": "riunione annullata"}
+        )
+        session.commit()
+        session.close()
+
+        assert note_index.search("riunione")["results"] == []
+        note_index.wait()
+        result = note_index.search("riunione")
+
+        assert [r["entry"]["notes"] for r in result["results"]] == ["riunione annullata"]
+
+    def test_legacy_embeddings_table_is_rebuilt(self, tmp_path, symptom_tracker, note_index):
+        """Test: La tabella senza AUTOINCREMENT né text_hash viene ricreata e reindicizzata"""
+        from sqlalchemy import text
+        symptom_tracker.track_symptom("crampi", 5, "crampi al mattino")
+        note_index.wait()
+        session = symptom_tracker.db.get_session()
+        session.execute(text("DROP TABLE note_embeddings"))
+        session.execute(text(
+            "CREATE TABLE note_embeddings (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "source VARCHAR(10) NOT NULL, record_id INTEGER NOT NULL, dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, created_at DATETIME)"
+        ))
+        session.commit()
+        session.close()
+
+        migrated = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'notes.db'}")
+        index = NoteIndex(migrated, embedder=BagOfWordsEmbedder())
+
+        assert index.sync() == 1
+        index.wait()
+        assert index.search("crampi")["indexed_notes"] == 1
+
+    def test_notes_are_per_user(self, db_manager, note_index):
+        """Test: Ogni utente cerca solo tra le proprie note"""
+        SymptomTracker(db_manager, user_id=1, note_index=note_index).track_symptom("ansia", 4, "esame universitario")
+        SymptomTracker(db_manager, user_id=2, note_index=note_index).track_symptom("ansia", 4, "esame del sangue")
+        note_index.wait()
+
+        result = note_index.search("esame", user_id=1)
+
+        assert [r["entry"]["notes"] for r in result["results"]] == ["esame universitario"]
+
+    def test_unavailable_without_embedder(self, db_manager, monkeypatch):
+        """Test: Senza sentence-transformers la ricerca risponde con un messaggio"""
+        monkeypatch.setattr(note_search, "EMBEDDINGS_AVAILABLE", False)
+        index = NoteIndex(db_manager)
+
+        assert index.add_note("symptom", 1, "nota") is False
+        result = index.search("nota")
+
+        assert result["success"] is False
+        assert "sentence-transformers" in result["message"]
@@ -55,6 +55,7 @@ class TestPatternAnalyzer:
         """Test: Inizializzazione pattern analyzer"""
         assert pattern_analyzer is not None
         assert pattern_analyzer.db is not None
+        assert pattern_analyzer.workers == 1
 
     def test_correlation_analysis_insufficient_data(self, pattern_analyzer):
         """Test: Analisi correlazione con dati insufficienti"""
@@ -77,6 +78,9 @@ class TestPatternAnalyzer:
         assert "total_cycles_analyzed" in result
         assert result["total_symptoms_analyzed"] > 0
         assert result["total_cycles_analyzed"] > 0
+        assert result["total_cycles_analyzed"] == len(populated_db.load_cycle_series(
+            start_date=datetime.now() - timedelta(days=90)
+        ))
 
     def test_symptom_trends_no_data(self, pattern_analyzer):
         """Test: Analisi trend senza dati"""
@@ -165,6 +169,50 @@ class TestPatternAnalyzer:
 
         assert result["success"] is True
 
+    def test_trends_cover_history_beyond_1000_entries(self, db_manager):
+        """Test: Il trend usa tutte le entry della finestra, non solo le ultime 1000"""
+        import numpy as np
+
+        intensities = [1 + (i * 7) % 10 for i in range(1100)]
+        start = datetime.now() - timedelta(days=60)
+        for i, intensity in enumerate(intensities):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI,
+                intensity=intensity,
+                timestamp=start + timedelta(minutes=30 * i)
+            ))
+
+        analyzer = PatternAnalyzer(db_manager, chunk_size=128)
+        result = analyzer.analyze_symptom_trends(days=90)
+
+        # x = giorni trascorsi (la pendenza non dipende dall'origine)
+        elapsed_days = np.arange(len(intensities)) * 30 / 1440
+        expected_slope = np.polyfit(elapsed_days, intensities, 1)[0]
+
+        assert result["total_entries"] == 1100
+        assert result["trends"]["crampi"]["count"] == 1100
+        assert result["trends"]["crampi"]["slope"] == pytest.approx(round(float(expected_slope), 3), abs=1e-3)
+        assert result["trends"]["crampi"]["avg_intensity"] == round(sum(intensities) / 1100, 1)
+
+    def test_same_day_combinations_streamed(self, db_manager):
+        """Test: Le combinazioni giornaliere sono contate anche a cavallo dei blocchi"""
+        start = datetime.now() - timedelta(days=20)
+        db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+
+        for day in range(3):
+            for stype in (SymptomType.CRAMPI, SymptomType.ANSIA):
+                db_manager.add_symptom(SymptomEntry(
+                    symptom_type=stype, intensity=5,
+                    timestamp=start + timedelta(days=day, hours=10)
+                ))
+
+        analyzer = PatternAnalyzer(db_manager, chunk_size=1)
+        result = analyzer.identify_recurring_patterns(min_occurrences=3)
+
+        combos = [p for p in result["patterns"] if p["type"] == "symptom_combination"]
+        assert combos[0]["symptoms"] == ["ansia", "crampi"]
+        assert combos[0]["occurrences"] == 3
+
     def test_time_range_parameters(self, populated_db):
         """Test: Parametri di range temporale"""
         analyzer = PatternAnalyzer(populated_db)
@@ -175,6 +223,28 @@ class TestPatternAnalyzer:
             if result["success"]:
                 assert result["period_months"] == months
 
+    def test_correlation_significance(self, db_manager):
+        """Test: Intensità più alta in mestruazione → insight con p-value"""
+        origin = datetime.now() - timedelta(days=170)
+        for k in range(6):
+            start = origin + timedelta(days=28 * k)
+            db_manager.add_cycle(CycleEntry(start_date=start, flow_intensity=FlowIntensity.MEDIUM))
+            for day in range(0, 25, 2):
+                db_manager.add_symptom(SymptomEntry(
+                    symptom_type=SymptomType.CRAMPI,
+                    intensity=8 + day % 3 if day < 5 else 2 + day % 3,
+                    timestamp=start + timedelta(days=day, hours=9)
+                ))
+
+        analyzer = PatternAnalyzer(db_manager)
+        result = analyzer.analyze_symptom_cycle_correlation(months=6, n_permutations=2000, seed=1)
+
+        crampi = result["correlations"]["significance"]["intensity_by_phase"]["crampi"]
+        assert crampi["p_value"] < 0.01
+        assert crampi["phases"]["early"]["p_value"] < 0.01
+        assert crampi["phases"]["early"]["difference"] > 0
+        assert any("crampi è più intenso" in i and "p=" in i for i in result["insights"])
+
     def test_insights_generation(self, populated_db):
         """Test: Generazione insights"""
         analyzer = PatternAnalyzer(populated_db)
@@ -185,6 +255,60 @@ class TestPatternAnalyzer:
             assert isinstance(result["insights"], list)
 
 
+class TestCycleDayHeatmap:
+    """Test per PatternAnalyzer.cycle_day_heatmap"""
+
+    def test_matrices_match_entries(self, db_manager):
+        """Test: Conteggi e medie per (tipo, giorno del ciclo)"""
+        start = datetime.now() - timedelta(days=80)
+        for k in range(2):
+            db_manager.add_cycle(CycleEntry(
+                start_date=start + timedelta(days=30 * k), flow_intensity=FlowIntensity.MEDIUM
+            ))
+            for day, stype, intensity in ((0, SymptomType.CRAMPI, 8), (0, SymptomType.CRAMPI, 6),
+                                          (13, SymptomType.ACNE, 4)):
+                db_manager.add_symptom(SymptomEntry(
+                    symptom_type=stype, intensity=intensity,
+                    timestamp=start + timedelta(days=30 * k + day, hours=10)
+                ))
+
+        # Prima del primo ciclo: nessun giorno del ciclo
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ANSIA, intensity=5, timestamp=start - timedelta(days=3)
+        ))
+
+        result = PatternAnalyzer(db_manager, chunk_size=2).cycle_day_heatmap(months=4, max_day=40)
+
+        assert result["success"] is True
+        assert result["days"] == list(range(1, 41))
+        assert result["symptom_types"] == ["crampi", "acne"]
+
+        crampi, acne = result["counts"]
+        assert crampi[0] == 4 and sum(crampi) == 4
+        assert acne[13] == 2 and sum(acne) == 2
+        assert result["mean_intensity"][0][0] == 7.0
+        assert result["mean_intensity"][0][1] is None
+        assert result["unaligned_entries"] == 1
+        assert result["total_entries"] == 7
+
+    def test_heatmap_without_cycles(self, db_manager):
+        """Test: Senza cicli nessun sintomo è allineato"""
+        db_manager.add_symptom(SymptomEntry(symptom_type=SymptomType.ACNE, intensity=3))
+
+        result = PatternAnalyzer(db_manager).cycle_day_heatmap()
+
+        assert result["success"] is False
+
+    def test_max_day_is_clamped(self):
+        """Test: max_day oltre il limite viene ridotto a MAX_CYCLE_DAY"""
+        from tools.cycle_heatmap import CycleDayHeatmap, MAX_CYCLE_DAY
+
+        heatmap = CycleDayHeatmap(max_day=10 ** 9)
+
+        assert heatmap.max_day == MAX_CYCLE_DAY
+        assert heatmap.counts.size == len(heatmap.types) * MAX_CYCLE_DAY
+
+
 class TestPatternAnalyzerHelpers:
     """Test per metodi helper del PatternAnalyzer"""
 
@@ -212,3 +336,54 @@ class TestPatternAnalyzerHelpers:
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestMultiWindowReport:
+    """Test per PatternAnalyzer.multi_window_report"""
+
+    def test_windows_match_separate_analyses(self, db_manager):
+        """Test: Ogni finestra coincide con l'analisi trend dedicata"""
+        now = datetime.now()
+        for i in range(120):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.CRAMPI if i % 3 else SymptomType.ANSIA,
+                intensity=1 + (i * 7) % 10,
+                timestamp=now - timedelta(days=i * 1.5 + 0.5)
+            ))
+
+        analyzer = PatternAnalyzer(db_manager)
+        result = analyzer.multi_window_report(windows=[90, 30, 365])
+
+        assert result["success"] is True
+        assert result["windows"] == [30, 90, 365]
+
+        for days in (30, 90, 365):
+            report = result["reports"][str(days)]
+            trends = analyzer.analyze_symptom_trends(days=days)["trends"]
+
+            assert report["total_entries"] == sum(t["count"] for t in trends.values())
+            for stype, data in trends.items():
+                assert report["symptoms"][stype]["count"] == data["count"]
+                assert report["symptoms"][stype]["avg_intensity"] == data["avg_intensity"]
+                assert report["symptoms"][stype]["weekly_change"] == data["weekly_change"]
+
+    def test_report_without_data(self, pattern_analyzer):
+        """Test: Report senza dati"""
+        result = pattern_analyzer.multi_window_report()
+        assert result["success"] is False
+
+    def test_windows_are_clamped(self, db_manager):
+        """Test: Finestre oltre il limite vengono ridotte a MAX_REPORT_WINDOW_DAYS"""
+        from tools.pattern_analyzer import MAX_REPORT_WINDOW_DAYS
+
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.CRAMPI,
+            intensity=5,
+            timestamp=datetime.now() - timedelta(days=1)
+        ))
+
+        result = PatternAnalyzer(db_manager).multi_window_report(windows=[30, 10 ** 9])
+
+        assert result["success"] is True
+        assert result["windows"] == [30, MAX_REPORT_WINDOW_DAYS]
+        assert str(MAX_REPORT_WINDOW_DAYS) in result["reports"]
@@ -136,5 +136,45 @@ class TestPCOSDocuments:
             assert len(doc["title"]) >= 5, f"Document {doc['id']} title too short"
 
 
+class TestAcronymExpander:
+    """Test per l'espansione degli acronimi medici"""
+
+    def test_first_occurrence_only(self):
+        """Test: Ogni acronimo è espanso solo alla prima occorrenza"""
+        from rag.acronyms import AcronymExpander, MEDICAL_ACRONYMS
+
+        text = "PCOS and BMI: BMI rises with PCOS."
+        expanded = AcronymExpander(MEDICAL_ACRONYMS).expand(text)
+
+        assert expanded == (
+            "PCOS (Polycystic Ovary Syndrome) and BMI (Body Mass Index): BMI rises with PCOS."
+        )
+
+    def test_standalone_words_only(self):
+        """Test: Acronimi dentro parole più lunghe non sono espansi"""
+        from rag.acronyms import AcronymExpander, MEDICAL_ACRONYMS
+
+        text = "ARTery and TGF levels"
+
+        assert AcronymExpander(MEDICAL_ACRONYMS).expand(text) == text
+
+    def test_longest_acronym_wins(self):
+        """Test: HOMA-IR è espanso per intero, IR isolato a parte"""
+        from rag.acronyms import AcronymExpander, MEDICAL_ACRONYMS
+
+        expanded = AcronymExpander(MEDICAL_ACRONYMS).expand("HOMA-IR predicts IR")
+
+        assert expanded == (
+            "HOMA-IR (Homeostatic Model Assessment for Insulin Resistance) "
+            "predicts IR (Insulin Resistance)"
+        )
+
+    def test_empty_mapping(self):
+        """Test: Senza acronimi il testo resta invariato"""
+        from rag.acronyms import AcronymExpander
+
+        assert AcronymExpander({}).expand("PCOS") == "PCOS"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
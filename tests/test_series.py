@@ -0,0 +1,145 @@
+"""
+Unit Tests per Series
+Test per SymptomSeries/CycleSeries: costruzione, tagli senza copie, note e caricamento dal database
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from database import (
+    DatabaseManager, SymptomEntry, SymptomType, CycleEntry, FlowIntensity,
+    SymptomSeries, CycleSeries
+)
+from database.series import to_epoch, to_epochs, from_epoch
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+START = datetime(2025, 3, 1, 8, 0)
+
+
+def _rows(n=10):
+    return [
+        (to_epoch(START + timedelta(days=i)), "crampi" if i % 2 else "acne",
+         1 + i % 10, i + 1, "early", f"nota {i}" if i % 3 else None)
+        for i in range(n)
+    ]
+
+
+class TestSymptomSeries:
+    """Test suite per SymptomSeries"""
+
+    def test_from_rows_dtypes(self):
+        """Test: Array paralleli con tipi compatti"""
+        series = SymptomSeries.from_rows(_rows() + [(0, "sconosciuto", 5, None, None, None)], with_notes=True)
+
+        assert len(series) == 10
+        assert series.epochs.dtype == np.int64
+        assert series.type_codes.dtype == np.uint8
+        assert series.intensities.dtype == np.uint8
+        assert series.type_names[series.type_codes[0]] == "acne"
+        assert series.note(1) == "nota 1"
+        assert series.note(0) == ""
+
+    def test_between_returns_views(self):
+        """Test: Il taglio per intervallo non copia gli array"""
+        series = SymptomSeries.from_rows(_rows(), with_notes=True)
+
+        window = series.between(START + timedelta(days=2), START + timedelta(days=5))
+
+        assert len(window) == 4
+        assert np.shares_memory(window.epochs, series.epochs)
+        assert np.shares_memory(window.intensities, series.intensities)
+        assert window.notes_buffer is series.notes_buffer
+        assert window.note(0) == "nota 2"
+        assert len(series.between(START + timedelta(days=50))) == 0
+
+    def test_concat_keeps_notes(self):
+        """Test: La concatenazione di blocchi conserva le note"""
+        rows = _rows()
+        parts = [SymptomSeries.from_rows(rows[i:i + 4], with_notes=True) for i in range(0, 10, 4)]
+
+        series = SymptomSeries.concat(parts)
+
+        assert [series.note(i) for i in range(10)] == [(r[5] or "") for r in rows]
+        assert series.of_type("crampi").note(0) == "nota 1"
+
+    def test_from_chunks_matches_concat(self):
+        """Test: La costruzione a blocchi equivale alla concatenazione"""
+        rows = _rows(25)
+        chunks = [rows[i:i + 4] for i in range(0, 25, 4)] + [[]]
+
+        series = SymptomSeries.from_chunks(iter(chunks), with_notes=True)
+        expected = SymptomSeries.from_rows(rows, with_notes=True)
+
+        for name in ("epochs", "type_codes", "intensities", "cycle_days", "phase_codes", "note_offsets"):
+            assert np.array_equal(getattr(series, name), getattr(expected, name))
+        assert series.notes_buffer == expected.notes_buffer
+        assert len(SymptomSeries.from_chunks(iter([]))) == 0
+
+    def test_epoch_roundtrip(self):
+        """Test: Conversione epoch reversibile al secondo"""
+        moment = datetime(2024, 2, 29, 23, 59, 58)
+        assert from_epoch(to_epoch(moment)) == moment
+        assert to_epochs([moment, START]).tolist() == [to_epoch(moment), to_epoch(START)]
+
+
+class TestSeriesFromDatabase:
+    """Test per il caricamento delle serie dal DatabaseManager"""
+
+    def test_load_symptom_series(self, db_manager):
+        """Test: Serie ordinata con epoch calcolati in SQL"""
+        timestamps = [START + timedelta(hours=7 * i) for i in range(30)]
+        for i, timestamp in enumerate(reversed(timestamps)):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.ACNE, intensity=1 + i % 10,
+                notes=f"n{i}", timestamp=timestamp
+            ))
+
+        series = db_manager.load_symptom_series(chunk_size=7, with_notes=True)
+
+        assert series.epochs.tolist() == [to_epoch(t) for t in timestamps]
+        assert series.note(0) == "n29"
+        assert len(db_manager.load_symptom_series(user_id=5)) == 0
+
+    def test_series_queries_are_dialect_neutral(self, db_manager):
+        """Test: Le query delle serie non usano funzioni SQL specifiche di SQLite"""
+        db_manager.add_symptom(SymptomEntry(
+            symptom_type=SymptomType.ACNE, intensity=3, timestamp=START + timedelta(microseconds=900)
+        ))
+        db_manager.add_cycle(CycleEntry(start_date=START))
+        statements = []
+        engine = db_manager.get_session().get_bind()
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement.lower()))
+
+        series = db_manager.load_symptom_series()
+        cycles = db_manager.load_cycle_series()
+
+        assert series.epochs.tolist() == [to_epoch(START)]
+        assert cycles.starts.tolist() == [to_epoch(START)]
+        assert statements and not any("strftime" in s for s in statements)
+
+    def test_load_cycle_series(self, db_manager):
+        """Test: Cicli aperti e chiusi con durate in giorni"""
+        db_manager.add_cycle(CycleEntry(
+            start_date=datetime(2025, 1, 1), end_date=datetime(2025, 1, 31),
+            flow_intensity=FlowIntensity.MEDIUM
+        ))
+        db_manager.add_cycle(CycleEntry(
+            start_date=datetime(2025, 2, 5), flow_intensity=FlowIntensity.HEAVY
+        ))
+
+        cycles = db_manager.load_cycle_series()
+
+        assert isinstance(cycles, CycleSeries)
+        assert cycles.closed.tolist() == [True, False]
+        assert cycles.durations().tolist() == [30]
+        assert cycles.intervals().tolist() == [35]
+        assert cycles.flows() == ["medium", "heavy"]
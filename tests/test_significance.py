@@ -0,0 +1,128 @@
+"""
+Unit Tests per i test di significatività
+Test per chi-quadro e test di permutazione vettoriali
+"""
+
+import time
+import numpy as np
+import pytest
+from tools import significance
+from tools.significance import chi2_sf, chi_square_independence, permutation_group_test
+
+
+class TestChiSquare:
+    """Test suite per il test chi-quadro"""
+
+    @pytest.mark.parametrize("statistic,dof,expected", [
+        (3.841459, 1, 0.05),
+        (11.070498, 5, 0.05),
+        (6.634897, 1, 0.01),
+        (0.0, 3, 1.0),
+    ])
+    def test_chi2_sf_critical_values(self, statistic, dof, expected):
+        """Test: Valori critici tabulati della distribuzione chi-quadro"""
+        assert chi2_sf(statistic, dof) == pytest.approx(expected, abs=1e-5)
+
+    def test_independence_table(self):
+        """Test: Tabella 2x2 con statistica calcolabile a mano"""
+        result = chi_square_independence([[10, 20], [20, 10]])
+
+        assert result["statistic"] == pytest.approx(20 / 3)
+        assert result["dof"] == 1
+        assert result["p_value"] < 0.01
+
+    def test_empty_rows_are_dropped(self):
+        """Test: Righe e colonne vuote non contano nei gradi di libertà"""
+        result = chi_square_independence([[5, 5, 0], [5, 5, 0], [0, 0, 0]])
+
+        assert result["dof"] == 1
+        assert result["p_value"] == pytest.approx(1.0)
+
+
+class TestPermutationTest:
+    """Test suite per il test di permutazione a blocchi"""
+
+    def _sample(self, effect, n=300, seed=0):
+        rng = np.random.default_rng(seed)
+        groups = rng.integers(0, 4, n)
+        values = rng.integers(1, 8, n) + effect * (groups == 0)
+        return groups, values
+
+    def test_detects_group_effect(self):
+        """Test: Un gruppo più intenso ha p-value basso e differenza positiva"""
+        groups, values = self._sample(effect=3)
+        result = permutation_group_test(groups, values, 4, n_permutations=2000, seed=1)
+
+        assert result["p_value"] < 0.01
+        assert result["p_values"][0] < 0.01
+        assert result["diff"][0] > 0
+
+    def test_no_effect_is_not_significant(self):
+        """Test: Senza effetto il p-value globale non è significativo"""
+        groups, values = self._sample(effect=0, seed=4)
+        result = permutation_group_test(groups, values, 4, n_permutations=2000, seed=1)
+
+        assert result["p_value"] > 0.05
+
+    def test_matches_loop_reference(self):
+        """Test: Le permutazioni a matrice coincidono con un ciclo Python"""
+        groups, values = self._sample(effect=1, n=40)
+        result = permutation_group_test(groups, values, 4, n_permutations=300, seed=7)
+
+        chunk = 300 // significance.PERMUTATION_CHUNKS
+        extra = 300 % significance.PERMUTATION_CHUNKS
+        shuffled = np.vstack([
+            np.random.default_rng(chunk_seed).permuted(
+                np.broadcast_to(values.astype(float), (chunk + (i < extra), 40)), axis=1
+            )
+            for i, chunk_seed in enumerate(
+                np.random.SeedSequence(7).spawn(significance.PERMUTATION_CHUNKS)
+            )
+        ])
+        observed = values[groups == 0].mean() - values[groups != 0].mean()
+        exceed = sum(
+            abs(row[groups == 0].mean() - row[groups != 0].mean()) >= abs(observed) - 1e-12
+            for row in shuffled
+        )
+
+        assert result["p_values"][0] == pytest.approx((exceed + 1) / 301)
+
+    def test_batches_do_not_change_result(self, monkeypatch):
+        """Test: La dimensione dei blocchi non cambia i p-value"""
+        groups, values = self._sample(effect=1)
+        full = permutation_group_test(groups, values, 4, n_permutations=1000, seed=5)
+
+        monkeypatch.setattr(significance, "PERMUTATION_BATCH_CELLS", 3000)
+        batched = permutation_group_test(groups, values, 4, n_permutations=1000, seed=5)
+
+        assert np.array_equal(full["p_values"], batched["p_values"])
+
+    def test_worker_pool(self, monkeypatch):
+        """Test: Con il pool di processi i p-value restano coerenti"""
+        groups, values = self._sample(effect=3)
+        monkeypatch.setattr(significance, "PARALLEL_MIN_CELLS", 0)
+
+        result = permutation_group_test(groups, values, 4, n_permutations=1000, seed=1, workers=2)
+
+        assert result["p_values"][0] < 0.01
+        assert result["n_permutations"] == 1000
+
+    def test_seeded_result_independent_of_workers(self, monkeypatch):
+        """Test: Lo stesso seed dà gli stessi p-value con o senza pool"""
+        groups, values = self._sample(effect=1)
+        serial = permutation_group_test(groups, values, 4, n_permutations=1000, seed=3)
+
+        monkeypatch.setattr(significance, "PARALLEL_MIN_CELLS", 0)
+        pooled = permutation_group_test(groups, values, 4, n_permutations=1000, seed=3, workers=3)
+
+        assert np.array_equal(serial["p_values"], pooled["p_values"])
+        assert serial["p_value"] == pooled["p_value"]
+
+    def test_ten_thousand_permutations_are_fast(self):
+        """Test: 10k permutazioni su uno storico tipico in meno di un secondo"""
+        groups, values = self._sample(effect=1, n=400)
+
+        start = time.perf_counter()
+        permutation_group_test(groups, values, 4, n_permutations=10_000, seed=1)
+
+        assert time.perf_counter() - start < 1.0
@@ -0,0 +1,72 @@
+"""
+Unit Tests per SimilarityIndex
+Test per il top-k vettoriale (matrice normalizzata, argpartition, query in batch)
+"""
+
+import numpy as np
+import pytest
+from rag.similarity import SimilarityIndex, top_k_indices
+
+
+def loop_most_similar(query, embeddings, top_k):
+    """Riferimento: similarità coseno per chunk e ordinamento completo"""
+    scores = [
+        (chunk_id, float(np.dot(query / np.linalg.norm(query), e / np.linalg.norm(e))))
+        for chunk_id, e in embeddings.items()
+    ]
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:top_k]
+
+
+@pytest.fixture
+def embeddings():
+    rng = np.random.default_rng(7)
+    return {f"chunk_{i}": rng.standard_normal(16) * rng.uniform(0.5, 3) for i in range(200)}
+
+
+class TestSimilarityIndex:
+    """Test per la ricerca top-k"""
+
+    def test_matches_loop(self, embeddings):
+        """Test: Stessi risultati del loop per chunk"""
+        query = np.random.default_rng(1).standard_normal(16)
+
+        result = SimilarityIndex.from_dict(embeddings).search(query, top_k=10)
+        expected = loop_most_similar(query, embeddings, 10)
+
+        assert [chunk_id for chunk_id, _ in result] == [chunk_id for chunk_id, _ in expected]
+        np.testing.assert_allclose([s for _, s in result], [s for _, s in expected], rtol=1e-5)
+
+    def test_batch_matches_single(self, embeddings):
+        """Test: La ricerca in batch equivale a query singole"""
+        index = SimilarityIndex.from_dict(embeddings)
+        queries = np.random.default_rng(2).standard_normal((7, 16))
+
+        batched = index.search_batch(queries, top_k=5, batch_size=3)
+        single = [index.search(q, top_k=5) for q in queries]
+
+        assert [[c for c, _ in r] for r in batched] == [[c for c, _ in r] for r in single]
+        np.testing.assert_allclose(
+            [[s for _, s in r] for r in batched], [[s for _, s in r] for r in single], rtol=1e-5
+        )
+
+    def test_matrix_is_normalized_float32(self, embeddings):
+        """Test: Matrice contigua float32 con righe a norma 1"""
+        index = SimilarityIndex.from_dict(embeddings)
+
+        assert index.matrix.dtype == np.float32
+        assert index.matrix.flags.c_contiguous
+        np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_top_k_larger_than_index_and_empty(self):
+        """Test: top_k oltre il numero di chunk, indice vuoto"""
+        index = SimilarityIndex(["a", "b"], np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+        assert [c for c, _ in index.search(np.array([0.2, 1.0]), top_k=5)] == ["b", "a"]
+        assert SimilarityIndex.from_dict({}).search(np.ones(3)) == []
+
+    def test_top_k_indices_orders_best_first(self):
+        """Test: Indici dei punteggi più alti in ordine decrescente"""
+        scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.4, 0.3, 0.8, 0.0]])
+
+        assert top_k_indices(scores, 2).tolist() == [[1, 3], [2, 0]]
@@ -171,6 +171,47 @@ class TestSymptomTracker:
         assert "insights" in result
         assert isinstance(result["insights"], list)
 
+    def test_track_symptoms_batch(self, symptom_tracker):
+        """Test: Batch con righe non valide e reinvii duplicati"""
+        items = [
+            {"symptom_type": "crampi", "intensity": 6, "timestamp": "2025-03-01T08:00"},
+            {"symptom_type": "crampi", "intensity": 0, "timestamp": "2025-03-01T09:00"},
+            {"symptom_type": "acne", "intensity": 4, "timestamp": "2025-03-02T08:00"},
+        ]
+
+        result = symptom_tracker.track_symptoms(items)
+        retry = symptom_tracker.track_symptoms(items)
+
+        assert result["success"] is True
+        assert (result["inserted"], result["invalid"]) == (2, 1)
+        assert result["errors"][1][0]["field"] == "intensity"
+        assert (retry["inserted"], retry["duplicates"]) == (0, 2)
+        assert symptom_tracker.get_summary(days=10000)["total_entries"] == 2
+
+    def test_batch_updates_state_incrementally(self, db_manager, symptom_tracker, monkeypatch):
+        """Test: Il batch aggiorna lo stato riga per riga, senza ricostruire lo storico"""
+        monkeypatch.setattr(db_manager, "refresh_imported_history",
+                            lambda *a, **k: pytest.fail("rebuild of the whole history"))
+        items = [
+            {"symptom_type": stype, "intensity": 3 + day % 2,
+             "timestamp": f"2025-03-{day:02d}T0{hour}:00"}
+            for day in range(1, 9) for hour, stype in ((8, "crampi"), (9, "acne"))
+        ] + [{"symptom_type": "crampi", "intensity": 10, "timestamp": "2025-03-09T08:00"}]
+
+        result = symptom_tracker.track_symptoms(items)
+
+        assert result["inserted"] == 17
+        assert list(result["anomalies"]) == [16]
+        window = (datetime(2025, 3, 1), datetime(2025, 3, 31))
+        incremental = db_manager.get_pattern_counters(*window)
+        percentiles = db_manager.get_intensity_percentiles(*window)
+        assert incremental['symptom_combos'] == {("acne", "crampi"): 8}
+
+        monkeypatch.undo()
+        assert db_manager.refresh_imported_history()
+        assert db_manager.get_pattern_counters(*window) == incremental
+        assert db_manager.get_intensity_percentiles(*window) == percentiles
+
 
 class TestSymptomTrackerContextMessages:
     """Test per messaggi contestuali"""
@@ -200,6 +241,18 @@ class TestSymptomTrackerContextMessages:
             assert "context" in result
 
 
+    def test_anomaly_in_context(self, symptom_tracker):
+        """Test: Un'intensità fuori dalla norma personale è segnalata"""
+        for _ in range(6):
+            result = symptom_tracker.track_symptom(symptom_type="crampi", intensity=3)
+            assert "insolitamente" not in result["context"]
+
+        result = symptom_tracker.track_symptom(symptom_type="crampi", intensity=9)
+
+        assert result["anomaly"]["is_anomaly"] is True
+        assert "insolitamente alta" in result["context"]
+
+
 class TestSymptomTrackerHelpers:
     """Test per metodi helper"""
 
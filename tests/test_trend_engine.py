@@ -0,0 +1,115 @@
+"""
+Unit Tests per Trend Engine
+Test per il fit in forma chiusa e i trend a finestra mobile
+"""
+
+import random
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from database import DatabaseManager, SymptomEntry, SymptomType
+from tools.pattern_analyzer import PatternAnalyzer
+from tools.trend_engine import TrendSums, fit_linear
+from tools.significance import t_two_sided_pvalue
+
+
+@pytest.fixture
+def db_manager():
+    """Fixture che crea un database in-memory per i test"""
+    manager = DatabaseManager(db_url="sqlite:///:memory:")
+    yield manager
+
+
+def _points(seed=5, n=400, days=120):
+    """Punti (giorni trascorsi, tipo, intensità) con pendenze diverse per tipo"""
+    rng = random.Random(seed)
+    slopes = {"crampi": 0.05, "ansia": -0.03, "acne": 0.0}
+    points = []
+    for _ in range(n):
+        stype = rng.choice(list(slopes))
+        x = rng.uniform(0, days)
+        y = 5 + slopes[stype] * x + rng.gauss(0, 1)
+        points.append((x, stype, y))
+    return points
+
+
+class TestTrendEngine:
+    """Test suite per TrendSums e fit_linear"""
+
+    def test_fit_matches_polyfit_for_every_type(self):
+        """Test: Pendenza, intercetta e R² coincidono con np.polyfit per tipo"""
+        points = _points()
+        sums = TrendSums(n_days=121)
+        sums.add(points[:150])
+        sums.add(points[150:])
+
+        fit = fit_linear(sums.totals())
+
+        for i, stype in enumerate(sums.type_names):
+            x = np.array([p[0] for p in points if p[1] == stype])
+            y = np.array([p[2] for p in points if p[1] == stype])
+            slope, intercept = np.polyfit(x, y, 1)
+            r_squared = np.corrcoef(x, y)[0, 1] ** 2
+
+            assert fit["count"][i] == len(x)
+            assert fit["slope"][i] == pytest.approx(slope)
+            assert fit["intercept"][i] == pytest.approx(intercept)
+            assert fit["r_squared"][i] == pytest.approx(r_squared)
+
+    def test_confidence_reflects_significance(self):
+        """Test: Un trend marcato ha confidenza alta, un tipo piatto no"""
+        sums = TrendSums(n_days=121)
+        sums.add(_points(n=2000))
+        fit = fit_linear(sums.totals())
+        confidence = dict(zip(sums.type_names, fit["confidence"]))
+
+        assert confidence["crampi"] > 0.99
+        assert confidence["ansia"] > 0.99
+
+    def test_too_few_points_have_no_slope(self):
+        """Test: Con meno di 3 punti la pendenza non è definita"""
+        sums = TrendSums(n_days=10)
+        sums.add([(1.0, "acne", 3), (2.0, "acne", 4)])
+        assert np.isnan(fit_linear(sums.totals())["slope"][0])
+
+    def test_rolling_windows_match_direct_sums(self):
+        """Test: Le finestre mobili coincidono con le somme calcolate a mano"""
+        points = _points(n=300, days=60)
+        sums = TrendSums(n_days=61)
+        sums.add(points)
+
+        ends, window_sums = sums.rolling(window_days=14, step_days=7)
+        fit = fit_linear(window_sums)
+        i = sums.types["crampi"]
+
+        assert ends[-1] == 60
+        for j, end in enumerate(ends):
+            window = [p for p in points if p[1] == "crampi" and end - 14 < int(p[0]) <= end]
+            assert fit["count"][i, j] == len(window)
+
+    def test_t_pvalue_reference_values(self):
+        """Test: P-value della t di Student su valori tabulati"""
+        assert t_two_sided_pvalue(2.228, 10) == pytest.approx(0.05, abs=1e-3)
+        assert t_two_sided_pvalue(0.0, 5) == pytest.approx(1.0)
+
+
+class TestTrendAnalysis:
+    """Test per PatternAnalyzer.analyze_symptom_trends sul nuovo engine"""
+
+    def test_increasing_trend_over_elapsed_days(self, db_manager):
+        """Test: Un aumento costante nel tempo viene classificato come tale"""
+        start = datetime.now() - timedelta(days=80)
+        for day in range(0, 80, 2):
+            db_manager.add_symptom(SymptomEntry(
+                symptom_type=SymptomType.ACNE,
+                intensity=min(10, 1 + day // 9),
+                timestamp=start + timedelta(days=day)
+            ))
+
+        result = PatternAnalyzer(db_manager).analyze_symptom_trends(days=90, weekly=True)
+        acne = result["trends"]["acne"]
+
+        assert acne["trend"] == "increasing"
+        assert acne["weekly_change"] == pytest.approx(7 / 9, abs=0.1)
+        assert acne["r_squared"] > 0.9
+        assert result["weekly_trends"]["acne"][-1]["count"] > 0
@@ -0,0 +1,430 @@
+"""
+Cohort Analytics - Viste anonime di popolazione su tutti gli utenti
+Aggregati parziali per partizione di utenti, nel processo corrente o in un
+ProcessPoolExecutor riutilizzato tra le richieste
+
+Features:
+- Distribuzione intensità per fase × sintomo (istogrammi 1-10, mergeabili)
+- Distribuzione della lunghezza dei cicli e della variabilità per utente
+- Soppressione delle celle e delle distribuzioni dei cicli con meno di
+  MIN_COHORT_USERS utenti
+- Cache in memoria con TTL per la dashboard
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+import multiprocessing
+import threading
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Cohort analytics requires numpy. Run: pip install numpy")
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import DatabaseManager, SymptomType
+from database.cycle_phases import CYCLE_PHASES
+from database import intensity_sketch
+from database.schema import SymptomRecord, CycleRecord, get_session_maker, users_filter
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+SYMPTOM_TYPES = tuple(t.value for t in SymptomType)
+INTENSITY_LEVELS = 10
+MAX_CYCLE_DAYS = 120          # intervalli più lunghi finiscono nell'ultimo bin
+MIN_COHORT_USERS = 5          # soglia di anonimato per cella
+PARTITIONS_PER_WORKER = 4     # partizioni piccole bilanciano meglio il carico
+DEFAULT_CACHE_TTL = 3600      # secondi
+
+QUANTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+def _empty_partial() -> Dict[str, Any]:
+    """Aggregati neutri per il merge"""
+    shape = (len(CYCLE_PHASES), len(SYMPTOM_TYPES))
+    return {
+        "users": 0,
+        "symptoms": 0,
+        "intervals": 0,
+        "intensity_hist": np.zeros(shape + (INTENSITY_LEVELS,), dtype=np.int64),
+        "cell_users": np.zeros(shape, dtype=np.int64),
+        "type_hist": np.zeros((len(SYMPTOM_TYPES), INTENSITY_LEVELS), dtype=np.int64),
+        "type_users": np.zeros(len(SYMPTOM_TYPES), dtype=np.int64),
+        "interval_hist": np.zeros(MAX_CYCLE_DAYS + 1, dtype=np.int64),
+        "user_mean_hist": np.zeros(MAX_CYCLE_DAYS + 1, dtype=np.int64),
+        "user_std_hist": np.zeros(MAX_CYCLE_DAYS + 1, dtype=np.int64),
+    }
+
+
+def partition_aggregates(
+    db_url: str,
+    user_ids: List[Optional[int]],
+    start_date: datetime,
+    end_date: datetime
+) -> Dict[str, Any]:
+    """
+    Aggregati parziali per una partizione di utenti (eseguita nei worker).
+
+    Ogni processo apre il proprio engine sul database.
+
+    Args:
+        db_url: URL del database
+        user_ids: Utenti della partizione (None = storico locale)
+        start_date: Inizio della finestra
+        end_date: Fine della finestra
+
+    Returns:
+        Dizionario di contatori e istogrammi
+    """
+    session = get_session_maker(db_url)()
+    engine = session.get_bind()
+
+    try:
+        return aggregate_partition(session, user_ids, start_date, end_date)
+
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def aggregate_partition(
+    session: Session,
+    user_ids: List[Optional[int]],
+    start_date: datetime,
+    end_date: datetime
+) -> Dict[str, Any]:
+    """
+    Calcola gli aggregati parziali di una partizione su una sessione aperta.
+
+    Le righe arrivano già raggruppate da SQL; fasi, tipi e intervalli tra
+    cicli sono ridotti a istogrammi con operazioni vettoriali, così il merge
+    tra partizioni è una somma di array.
+    """
+    partial = _empty_partial()
+
+    # 1. Fase × tipo × intensità, per utente (serve per la soglia di anonimato)
+    rows = session.query(
+        SymptomRecord.user_id,
+        SymptomRecord.cycle_phase,
+        SymptomRecord.symptom_type,
+        SymptomRecord.intensity,
+        func.count(SymptomRecord.id)
+    ).filter(
+        users_filter(SymptomRecord.user_id, user_ids),
+        SymptomRecord.timestamp >= start_date,
+        SymptomRecord.timestamp <= end_date
+    ).group_by(
+        SymptomRecord.user_id,
+        SymptomRecord.cycle_phase,
+        SymptomRecord.symptom_type,
+        SymptomRecord.intensity
+    ).all()
+
+    phase_index = {phase: i for i, phase in enumerate(CYCLE_PHASES)}
+    type_index = {stype: i for i, stype in enumerate(SYMPTOM_TYPES)}
+
+    if rows:
+        owners = np.array([-1 if r[0] is None else r[0] for r in rows], dtype=np.int64)
+        phases = np.array([phase_index.get(r[1], -1) for r in rows], dtype=np.int64)
+        types = np.array([type_index.get(r[2], -1) for r in rows], dtype=np.int64)
+        levels = np.clip(np.array([r[3] for r in rows], dtype=np.int64), 1, INTENSITY_LEVELS) - 1
+        counts = np.array([r[4] for r in rows], dtype=np.int64)
+
+        partial["users"] = len(np.unique(owners))
+        partial["symptoms"] = int(counts.sum())
+
+        labeled = (phases >= 0) & (types >= 0)
+        hist = partial["intensity_hist"]
+        np.add.at(hist, (phases[labeled], types[labeled], levels[labeled]), counts[labeled])
+
+        # Utenti distinti per cella
+        cells = np.unique(np.stack(
+            (owners[labeled], phases[labeled], types[labeled]), axis=1
+        ), axis=0)
+        if len(cells):
+            np.add.at(partial["cell_users"], (cells[:, 1], cells[:, 2]), 1)
+
+    # 2. Intensità per tipo su tutte le fasi: merge degli sketch per utente
+    for by_type in intensity_sketch.read_sketches(session, user_ids, start_date, end_date).values():
+        for stype, sketch in by_type.items():
+            t = type_index.get(stype)
+            if t is not None and sketch.total:
+                partial["type_hist"][t] += sketch.counts
+                partial["type_users"][t] += 1
+
+    # 3. Intervalli tra inizi ciclo consecutivi dello stesso utente
+    cycles = session.query(
+        CycleRecord.user_id, CycleRecord.start_date
+    ).filter(
+        users_filter(CycleRecord.user_id, user_ids),
+        CycleRecord.start_date >= start_date,
+        CycleRecord.start_date <= end_date
+    ).order_by(CycleRecord.user_id, CycleRecord.start_date).all()
+
+    if len(cycles) > 1:
+        owners = np.array([-1 if c[0] is None else c[0] for c in cycles], dtype=np.int64)
+        starts = np.array([c[1] for c in cycles], dtype='datetime64[D]').astype(np.int64)
+
+        same_user = owners[1:] == owners[:-1]
+        intervals = (starts[1:] - starts[:-1])[same_user]
+        interval_owners = owners[1:][same_user]
+        bins = np.clip(intervals, 0, MAX_CYCLE_DAYS)
+
+        partial["intervals"] = len(intervals)
+        partial["interval_hist"] += np.bincount(bins, minlength=MAX_CYCLE_DAYS + 1)
+
+        if len(intervals):
+            _, user_pos = np.unique(interval_owners, return_inverse=True)
+            n = np.bincount(user_pos).astype(np.float64)
+            mean = np.bincount(user_pos, weights=intervals) / n
+            var = np.bincount(user_pos, weights=intervals.astype(np.float64) ** 2) / n - mean ** 2
+            std = np.sqrt(np.maximum(var, 0.0))
+
+            partial["user_mean_hist"] += np.bincount(
+                np.clip(np.rint(mean).astype(np.int64), 0, MAX_CYCLE_DAYS),
+                minlength=MAX_CYCLE_DAYS + 1
+            )
+            partial["user_std_hist"] += np.bincount(
+                np.clip(np.rint(std[n >= 2]).astype(np.int64), 0, MAX_CYCLE_DAYS),
+                minlength=MAX_CYCLE_DAYS + 1
+            )
+
+    return partial
+
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Somma gli aggregati parziali (associativa e commutativa)"""
+    merged = _empty_partial()
+    for partial in partials:
+        for key, value in partial.items():
+            merged[key] = merged[key] + value
+    return merged
+
+
+def histogram_quantiles(hist, values=None) -> Dict[str, Optional[float]]:
+    """Quantili di una distribuzione data come istogramma"""
+    total = int(hist.sum())
+    if total == 0:
+        return {name: None for name in QUANTILES}
+
+    values = np.arange(len(hist)) if values is None else values
+    cumulative = np.cumsum(hist)
+    return {
+        name: float(values[np.searchsorted(cumulative, q * total, side='left')])
+        for name, q in QUANTILES.items()
+    }
+
+
+class CohortAnalytics:
+    """
+    Analytics di popolazione su tutti gli utenti del database.
+
+    Gli utenti sono divisi in partizioni, elaborate nel processo corrente
+    (default) o, con workers > 1, da un ProcessPoolExecutor creato alla
+    prima richiesta e riutilizzato fino a close(). I risultati sono tenuti
+    in cache per cache_ttl secondi.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        workers: int = 1,
+        cache_ttl: int = DEFAULT_CACHE_TTL
+    ):
+        """
+        Inizializza cohort analytics.
+
+        Args:
+            db_manager: Istanza di DatabaseManager
+            workers: Processi worker (default: 1 = nel processo corrente, senza pool)
+            cache_ttl: Durata della cache in secondi
+        """
+        self.db = db_manager
+        self.workers = max(1, workers)
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        logger.info("CohortAnalytics initialized")
+
+    def close(self) -> None:
+        """Termina i processi worker (se avviati)"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def get_cohort_report(
+        self,
+        months: int = 12,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Report anonimo di popolazione (dalla cache se ancora valido).
+
+        Args:
+            months: Mesi da analizzare
+            refresh: Ignora la cache e ricalcola
+
+        Returns:
+            Dizionario con distribuzioni per fase × sintomo e dei cicli
+        """
+        key = ("cohort", months)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and not refresh and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
+
+        try:
+            if not NUMPY_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per cohort analytics non installate. Installa numpy."
+                }
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=months * 30)
+
+            merged = self._compute(start_date, end_date)
+            result = self._format(merged, months)
+
+            with self._lock:
+                self._cache[key] = (time.monotonic(), result)
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Error in cohort analytics: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'analisi di popolazione: {str(e)}"
+            }
+
+    def _compute(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Partiziona gli utenti, calcola i parziali e li unisce"""
+        user_ids = self.db.get_user_ids()
+        if not user_ids:
+            return _empty_partial()
+
+        n_partitions = min(len(user_ids), self.workers * PARTITIONS_PER_WORKER)
+        partitions = [user_ids[i::n_partitions] for i in range(n_partitions)]
+        db_url = self.db.db_url
+
+        if self.workers == 1 or n_partitions == 1:
+            # Nel processo corrente (anche per database in-memory)
+            session = self.db.get_session()
+            try:
+                partials = [
+                    aggregate_partition(session, partition, start_date, end_date)
+                    for partition in partitions
+                ]
+            finally:
+                session.close()
+        else:
+            partials = list(self._get_pool().map(
+                partition_aggregates,
+                [db_url] * n_partitions,
+                partitions,
+                [start_date] * n_partitions,
+                [end_date] * n_partitions
+            ))
+
+        return merge_partials(partials)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Pool dei worker, avviato una volta sola"""
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: il processo chiamante (server web) ha thread attivi
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _format(self, merged: Dict[str, Any], months: int) -> Dict[str, Any]:
+        """Distribuzioni leggibili, con soppressione delle celle piccole"""
+        levels = np.arange(1, INTENSITY_LEVELS + 1)
+        phase_symptoms = {}
+        suppressed = 0
+
+        for p, phase in enumerate(CYCLE_PHASES):
+            for t, stype in enumerate(SYMPTOM_TYPES):
+                hist = merged["intensity_hist"][p, t]
+                entries = int(hist.sum())
+                if entries == 0:
+                    continue
+                if merged["cell_users"][p, t] < MIN_COHORT_USERS:
+                    suppressed += 1
+                    continue
+
+                phase_symptoms.setdefault(phase, {})[stype] = {
+                    "users": int(merged["cell_users"][p, t]),
+                    "entries": entries,
+                    "avg_intensity": round(float((hist * levels).sum() / entries), 2),
+                    "intensity_distribution": hist.tolist(),
+                    **histogram_quantiles(hist, levels)
+                }
+
+        symptom_intensity = {}
+        for t, stype in enumerate(SYMPTOM_TYPES):
+            hist = merged["type_hist"][t]
+            entries = int(hist.sum())
+            if entries == 0 or merged["type_users"][t] < MIN_COHORT_USERS:
+                continue
+
+            symptom_intensity[stype] = {
+                "users": int(merged["type_users"][t]),
+                "entries": entries,
+                "avg_intensity": round(float((hist * levels).sum() / entries), 2),
+                **histogram_quantiles(hist, levels)
+            }
+
+        interval_hist = merged["interval_hist"]
+        intervals = int(interval_hist.sum())
+        days = np.arange(MAX_CYCLE_DAYS + 1)
+        # Utenti con almeno un intervallo (con almeno due per la variabilità)
+        cycle_users = int(merged["user_mean_hist"].sum())
+        variability_users = int(merged["user_std_hist"].sum())
+
+        return {
+            "success": True,
+            "period_months": months,
+            "generated_at": datetime.now().isoformat(),
+            "users_analyzed": int(merged["users"]),
+            "symptoms_analyzed": int(merged["symptoms"]),
+            "min_users_per_cell": MIN_COHORT_USERS,
+            "suppressed_cells": suppressed,
+            "phase_symptom_intensity": phase_symptoms,
+            "symptom_intensity": symptom_intensity,
+            "cycle_length": _suppress_small(cycle_users, {
+                "intervals": intervals,
+                "avg_days": round(float((interval_hist * days).sum() / intervals), 1) if intervals else None,
+                **histogram_quantiles(interval_hist)
+            }),
+            "user_avg_cycle_length": _suppress_small(
+                cycle_users, histogram_quantiles(merged["user_mean_hist"])
+            ),
+            "user_cycle_variability": _suppress_small(
+                variability_users, histogram_quantiles(merged["user_std_hist"])
+            )
+        }
+
+
+def _suppress_small(users: int, stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Distribuzione con il numero di utenti; valori nascosti sotto MIN_COHORT_USERS"""
+    suppressed = users < MIN_COHORT_USERS
+    return {
+        "users": users,
+        "suppressed": suppressed,
+        **({name: None for name in stats} if suppressed else stats)
+    }
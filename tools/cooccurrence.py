@@ -0,0 +1,310 @@
+"""
+Symptom Co-occurrence Miner
+Itemset frequenti di sintomi su giorni codificati come bitset
+
+Features:
+- Ogni giorno (o finestra di ±k giorni) è un bitset dei tipi di sintomo
+- Mining Apriori livello per livello con supporto contato su array NumPy
+- Soglie di supporto e lift, sottoinsiemi e finestre multi-giorno
+- Batch di molti utenti in un solo passaggio (conteggi per utente)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from itertools import combinations
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Co-occurrence mining requires numpy. Run: pip install numpy")
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+MAX_SYMPTOM_TYPES = 64            # un bit per tipo in un uint64
+MAX_MATRIX_CELLS = 8_000_000      # transazioni × candidati per blocco di conteggio
+
+
+def encode_day_bitsets(
+    user_index,
+    day_ordinals,
+    type_codes,
+    n_users: int,
+    window_days: int = 0
+):
+    """
+    Codifica i sintomi come bitset giornalieri per utente.
+
+    Gli storici sono disposti uno dopo l'altro su un unico asse dei giorni,
+    con window_days giorni vuoti prima e dopo ciascuno: la finestra non
+    supera mai il confine tra due utenti.
+
+    Args:
+        user_index: np.ndarray int con l'indice utente (0..n_users-1) di ogni riga
+        day_ordinals: np.ndarray int con il giorno (ordinale) di ogni riga
+        type_codes: np.ndarray int con il codice del tipo (bit) di ogni riga
+        n_users: Numero di utenti
+        window_days: Raggio k della finestra (0 = stesso giorno)
+
+    Returns:
+        Tupla (bitset uint64 dei giorni non vuoti, utente di ogni giorno)
+    """
+    first_day = np.full(n_users, np.iinfo(np.int64).max, dtype=np.int64)
+    last_day = np.full(n_users, np.iinfo(np.int64).min, dtype=np.int64)
+    np.minimum.at(first_day, user_index, day_ordinals)
+    np.maximum.at(last_day, user_index, day_ordinals)
+
+    present = last_day >= first_day
+    span = np.where(present, last_day - first_day + 1 + 2 * window_days, 0)
+    offsets = np.concatenate(([0], np.cumsum(span)[:-1]))
+
+    masks = np.zeros(int(span.sum()), dtype=np.uint64)
+    position = offsets[user_index] + window_days + (day_ordinals - first_day[user_index])
+    np.bitwise_or.at(masks, position, np.left_shift(np.uint64(1), type_codes.astype(np.uint64)))
+
+    # Finestra ±k: OR dei bitset spostati (k piccolo, 2k operazioni su array)
+    if window_days > 0:
+        windowed = masks.copy()
+        for shift in range(1, window_days + 1):
+            windowed[shift:] |= masks[:-shift]
+            windowed[:-shift] |= masks[shift:]
+        masks = windowed
+
+    owners = np.repeat(np.arange(n_users), span)
+
+    # Solo i giorni con almeno un sintomo sono transazioni
+    non_empty = masks != 0
+    return masks[non_empty], owners[non_empty]
+
+
+def _count_support(masks, user_starts, candidates):
+    """
+    Conta, per ogni utente, i giorni che contengono ogni candidato.
+
+    Returns:
+        np.ndarray (utenti × candidati) di conteggi
+    """
+    counts = []
+    step = max(1, MAX_MATRIX_CELLS // max(1, len(masks)))
+
+    for i in range(0, len(candidates), step):
+        block = candidates[i:i + step, None]
+        # candidati × giorni: righe contigue, reduceat lungo l'asse dei giorni
+        contains = (masks[None, :] & block) == block
+        counts.append(np.add.reduceat(contains, user_starts, axis=1, dtype=np.int32))
+
+    return np.concatenate(counts, axis=0).T
+
+
+def _next_candidates(frequent: List[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+    """Join Apriori: unisce i k-itemset con lo stesso prefisso e pota i sottoinsiemi"""
+    frequent_set = set(frequent)
+    candidates = []
+
+    for i, left in enumerate(frequent):
+        for right in frequent[i + 1:]:
+            if left[:-1] != right[:-1]:
+                break
+            candidate = left + (right[-1],)
+            if all(subset in frequent_set for subset in combinations(candidate, len(left))):
+                candidates.append(candidate)
+
+    return candidates
+
+
+def mine_frequent_itemsets(
+    masks,
+    owners,
+    n_users: int,
+    min_support: float = 0.1,
+    min_count: int = 2,
+    min_lift: float = 1.0,
+    max_size: int = 4
+) -> List[List[Tuple[Tuple[int, ...], int, float, float]]]:
+    """
+    Mining Apriori degli itemset frequenti per molti utenti insieme.
+
+    I candidati di livello k+1 nascono dagli itemset frequenti per almeno un
+    utente (proprietà Apriori per utente preservata); il supporto è contato
+    per tutti gli utenti con un'unica operazione vettoriale per blocco.
+
+    Args:
+        masks: Bitset uint64 dei giorni (da encode_day_bitsets)
+        owners: Utente di ogni giorno, ordinato
+        n_users: Numero di utenti
+        min_support: Frazione minima di giorni che contengono l'itemset
+        min_count: Numero minimo assoluto di giorni
+        min_lift: Lift minimo (supporto / prodotto dei supporti singoli)
+        max_size: Dimensione massima degli itemset
+
+    Returns:
+        Per ogni utente, lista di (codici, giorni, supporto, lift) per gli
+        itemset di almeno 2 tipi
+    """
+    results = [[] for _ in range(n_users)]
+    if len(masks) == 0:
+        return results
+
+    # Gli owner sono contigui: reduceat sugli inizi dei blocchi utente
+    users, user_starts, transactions = np.unique(owners, return_index=True, return_counts=True)
+
+    all_bits = np.bitwise_or.reduce(masks)
+    items = [(bit,) for bit in range(MAX_SYMPTOM_TYPES) if (int(all_bits) >> bit) & 1]
+
+    item_support = np.zeros((len(users), MAX_SYMPTOM_TYPES))
+    candidates = items
+    size = 1
+
+    while candidates and size <= max_size:
+        codes = np.array(
+            [sum(1 << bit for bit in candidate) for candidate in candidates],
+            dtype=np.uint64
+        )
+        counts = _count_support(masks, user_starts, codes)
+        support = counts / transactions[:, None]
+        is_frequent = (support >= min_support) & (counts >= min_count)
+
+        if size == 1:
+            for j, (bit,) in enumerate(candidates):
+                item_support[:, bit] = support[:, j]
+        else:
+            for j, candidate in enumerate(candidates):
+                expected = np.prod(item_support[:, list(candidate)], axis=1)
+                lift = np.divide(support[:, j], expected, out=np.zeros(len(users)), where=expected > 0)
+
+                for u in np.nonzero(is_frequent[:, j] & (lift >= min_lift))[0]:
+                    results[users[u]].append(
+                        (candidate, int(counts[u, j]), float(support[u, j]), float(lift[u]))
+                    )
+
+        frequent = [c for j, c in enumerate(candidates) if is_frequent[:, j].any()]
+        candidates = _next_candidates(frequent)
+        size += 1
+
+    return results
+
+
+class CooccurrenceMiner:
+    """
+    Miner di co-occorrenze di sintomi per uno o più utenti.
+
+    Usa DatabaseManager.get_symptom_days (una riga per utente/giorno/tipo)
+    e restituisce gli itemset come dizionari pronti per le risposte dei tool.
+    """
+
+    def __init__(
+        self,
+        window_days: int = 0,
+        min_support: float = 0.1,
+        min_count: int = 2,
+        min_lift: float = 1.0,
+        max_size: int = 4
+    ):
+        """
+        Inizializza il miner.
+
+        Args:
+            window_days: Raggio k della finestra in giorni (0 = stesso giorno)
+            min_support: Frazione minima di giorni con sintomi che contengono l'itemset
+            min_count: Numero minimo di giorni
+            min_lift: Lift minimo (>1 = più frequente che per caso)
+            max_size: Numero massimo di sintomi per itemset
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for co-occurrence mining")
+
+        self.window_days = max(0, window_days)
+        self.min_support = min_support
+        self.min_count = min_count
+        self.min_lift = min_lift
+        self.max_size = max_size
+
+    def mine(
+        self,
+        rows: Iterable[Tuple[Optional[int], str, str]]
+    ) -> Dict[Optional[int], List[Dict[str, Any]]]:
+        """
+        Estrae gli itemset frequenti per ogni utente presente nelle righe.
+
+        Args:
+            rows: Tuple (user_id, 'YYYY-MM-DD', symptom_type)
+
+        Returns:
+            Dizionario user_id -> itemset ordinati per lift e supporto
+        """
+        rows = list(rows)
+        if not rows:
+            return {}
+
+        owners, days, types = zip(*rows)
+
+        user_ids, user_index = self._factorize(owners)
+        type_names, type_codes = np.unique(np.array(types, dtype=object).astype(str), return_inverse=True)
+        if len(type_names) > MAX_SYMPTOM_TYPES:
+            raise ValueError(f"At most {MAX_SYMPTOM_TYPES} symptom types are supported")
+
+        day_ordinals = np.array(days, dtype='datetime64[D]').astype(np.int64)
+
+        masks, day_owners = encode_day_bitsets(
+            user_index, day_ordinals, type_codes, len(user_ids), self.window_days
+        )
+        itemsets = mine_frequent_itemsets(
+            masks, day_owners, len(user_ids),
+            min_support=self.min_support,
+            min_count=self.min_count,
+            min_lift=self.min_lift,
+            max_size=self.max_size
+        )
+
+        return {
+            user_id: self._format(found, type_names)
+            for user_id, found in zip(user_ids, itemsets)
+        }
+
+    def mine_database(
+        self,
+        db,
+        user_ids: Optional[List[Optional[int]]] = None,
+        start_date=None,
+        end_date=None
+    ) -> Dict[Optional[int], List[Dict[str, Any]]]:
+        """
+        Estrae gli itemset per più utenti direttamente dal database.
+
+        Args:
+            db: DatabaseManager
+            user_ids: Utenti da analizzare (None = tutti)
+            start_date: Inizio della finestra
+            end_date: Fine della finestra
+
+        Returns:
+            Dizionario user_id -> itemset
+        """
+        rows = db.get_symptom_days(
+            start_date=start_date, end_date=end_date, user_ids=user_ids
+        )
+        return self.mine(rows)
+
+    @staticmethod
+    def _factorize(owners: Sequence[Optional[int]]):
+        """Indici utente contigui (None = storico locale incluso)"""
+        user_ids = list(dict.fromkeys(owners))
+        position = {user_id: i for i, user_id in enumerate(user_ids)}
+        return user_ids, np.array([position[o] for o in owners], dtype=np.int64)
+
+    @staticmethod
+    def _format(found, type_names) -> List[Dict[str, Any]]:
+        type_names = type_names.tolist()
+        itemsets = [
+            {
+                "symptoms": [type_names[code] for code in codes],
+                "size": len(codes),
+                "days": count,
+                "support": round(support, 3),
+                "lift": round(lift, 2)
+            }
+            for codes, count, support, lift in found
+        ]
+        itemsets.sort(key=lambda item: (-item["lift"], -item["support"], item["symptoms"]))
+        return itemsets
@@ -0,0 +1,123 @@
+"""
+Cycle Heatmap - Matrice giorno del ciclo × tipo di sintomo
+Conteggi e intensità media con np.bincount su un indice (tipo, giorno) appiattito
+
+I sintomi arrivano già allineati al giorno del ciclo (colonna cycle_day
+denormalizzata); le griglie si accumulano a blocchi durante lo streaming.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Cycle heatmap requires numpy. Run: pip install numpy")
+
+from database import SymptomType
+
+SYMPTOM_TYPES = tuple(t.value for t in SymptomType)
+DEFAULT_MAX_CYCLE_DAY = 60    # cicli PCOS lunghi: i giorni oltre sono contati a parte
+MAX_CYCLE_DAY = 120           # limite superiore della griglia (tipi × giorni)
+
+
+class CycleDayHeatmap:
+    """
+    Griglie (tipi, giorni del ciclo) di conteggi e somme delle intensità.
+
+    L'asse dei tipi segue l'ordine di SymptomType; nel risultato restano
+    solo i tipi con almeno una registrazione.
+    """
+
+    def __init__(self, max_day: int = DEFAULT_MAX_CYCLE_DAY):
+        """
+        Args:
+            max_day: Ultimo giorno del ciclo rappresentato (giorni 1..max_day),
+                     limitato a MAX_CYCLE_DAY
+        """
+        self.max_day = min(max(1, max_day), MAX_CYCLE_DAY)
+        self.types = {stype: i for i, stype in enumerate(SYMPTOM_TYPES)}
+        size = len(self.types) * self.max_day
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.total = 0
+        self.unaligned = 0
+        self.beyond_max_day = 0
+
+    def add(self, points: Sequence[Tuple[Any, str, int]]) -> None:
+        """
+        Aggiunge un blocco di punti (cycle_day, tipo, intensità).
+
+        I punti senza giorno del ciclo o oltre max_day sono solo contati.
+        """
+        if not points:
+            return
+
+        day = np.fromiter(
+            (p[0] if p[0] is not None else 0 for p in points),
+            dtype=np.int64, count=len(points)
+        )
+        codes = np.fromiter(
+            (self.types.get(p[1], -1) for p in points), dtype=np.int64, count=len(points)
+        )
+        intensity = np.fromiter((p[2] for p in points), dtype=np.float64, count=len(points))
+        self._accumulate(day, codes, intensity)
+
+    def add_series(self, series) -> None:
+        """
+        Aggiunge una SymptomSeries: i codici tipo seguono già SymptomType.
+        """
+        if not len(series):
+            return
+
+        self._accumulate(
+            series.cycle_days.astype(np.int64),
+            series.type_codes.astype(np.int64),
+            series.intensities.astype(np.float64)
+        )
+
+    def _accumulate(self, day, codes, intensity) -> None:
+        self.total += len(day)
+        aligned = (day >= 1) & (codes >= 0)
+        inside = aligned & (day <= self.max_day)
+        self.unaligned += int((~aligned).sum())
+        self.beyond_max_day += int((aligned & ~inside).sum())
+
+        # Indice appiattito: tipo * max_day + (giorno - 1)
+        flat = codes[inside] * self.max_day + day[inside] - 1
+        self.counts += np.bincount(flat, minlength=self.counts.size)
+        self.sums += np.bincount(flat, weights=intensity[inside], minlength=self.sums.size)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Matrici compatte pronte per il rendering.
+
+        Returns:
+            Dizionario con days, symptom_types, counts e mean_intensity
+            (righe = tipi, colonne = giorni; None dove non ci sono dati)
+        """
+        counts = self.counts.reshape(len(self.types), self.max_day)
+        sums = self.sums.reshape(len(self.types), self.max_day)
+        rows = np.nonzero(counts.sum(axis=1))[0]
+
+        counts = counts[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.round(sums[rows] / counts, 2)
+
+        return {
+            "days": list(range(1, self.max_day + 1)),
+            "symptom_types": [SYMPTOM_TYPES[i] for i in rows],
+            "counts": counts.tolist(),
+            "mean_intensity": _nan_to_none(means),
+            "total_entries": self.total,
+            "aligned_entries": int(counts.sum()),
+            "unaligned_entries": self.unaligned,
+            "beyond_max_day": self.beyond_max_day
+        }
+
+
+def _nan_to_none(matrix) -> List[List[Any]]:
+    """Lista di liste JSON-serializzabile (NaN → None)"""
+    return [[None if np.isnan(v) else v for v in row] for row in matrix.tolist()]
@@ -24,14 +24,23 @@ class CycleTracker:
     - Generare insights personalizzati
     """
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        user_id: Optional[int] = None,
+        note_index=None
+    ):
         """
         Inizializza cycle tracker.
 
         Args:
             db_manager: Istanza di DatabaseManager
+            user_id: Utente di cui gestire lo storico (None = storico locale)
+            note_index: NoteIndex per la ricerca nelle note (opzionale)
         """
         self.db = db_manager
+        self.user_id = user_id
+        self.note_index = note_index
         logger.info("CycleTracker initialized")
 
     def track_cycle(
@@ -76,9 +85,13 @@ class CycleTracker:
             )
 
             # Salva nel database
-            response = self.db.add_cycle(cycle_entry)
+            response = self.db.add_cycle(cycle_entry, user_id=self.user_id)
 
             if response.success:
+                # Embedding della nota in background (la risposta non lo attende)
+                if self.note_index is not None:
+                    self.note_index.add_note("cycle", response.entry_id, cycle_entry.notes, self.user_id)
+
                 # Genera messaggio contextual
                 context_msg = self._generate_context_message(
                     flow_intensity,
@@ -151,7 +164,7 @@ class CycleTracker:
                 end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
 
             # Aggiorna nel database
-            response = self.db.update_cycle_end_date(cycle_id, end_dt)
+            response = self.db.update_cycle_end_date(cycle_id, end_dt, user_id=self.user_id)
 
             if response.success:
                 return {
@@ -189,7 +202,7 @@ class CycleTracker:
             Dizionario con lista cicli
         """
         try:
-            cycles = self.db.get_cycles(limit=limit)
+            cycles = self.db.get_cycles(limit=limit, user_id=self.user_id)
 
             return {
                 "success": True,
@@ -219,7 +232,7 @@ class CycleTracker:
             Dizionario con statistiche e predizioni
         """
         try:
-            summary = self.db.get_cycle_summary(months=months)
+            summary = self.db.get_cycle_summary(months=months, user_id=self.user_id)
 
             # Genera insights
             insights = self._generate_insights(summary)
@@ -232,6 +245,7 @@ class CycleTracker:
                 "shortest_cycle": summary.shortest_cycle,
                 "longest_cycle": summary.longest_cycle,
                 "regularity_score": summary.regularity_score,
+                "average_interval": summary.average_interval,
                 "predicted_next_start": summary.predicted_next_start.isoformat() if summary.predicted_next_start else None,
                 "insights": insights
             }
@@ -244,6 +258,50 @@ class CycleTracker:
                 "error": str(e)
             }
 
+    def get_cycle_forecast(
+        self,
+        months: int = 3
+    ) -> Dict[str, Any]:
+        """
+        Calendario previsto di mestruazioni e fasi per i prossimi mesi.
+
+        Legge i calendari salvati dal job di previsione; se per l'utente
+        non ce ne sono (nuovo utente, job non ancora eseguito, cicli
+        cambiati dopo l'ultimo job) o non coprono tutti i mesi richiesti,
+        li genera e li salva solo per questo utente.
+
+        Args:
+            months: Mesi di calendario da restituire
+
+        Returns:
+            Dizionario con la lista dei cicli previsti e le loro fasi
+        """
+        try:
+            from tools.forecast_engine import ForecastEngine
+
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            end = today + timedelta(days=months * 30 - 1)
+
+            cycles = self.db.get_forecasts(today, end, user_ids=[self.user_id]).get(self.user_id)
+            if not cycles or datetime.fromisoformat(cycles[-1]["next_start"]) <= end:
+                ForecastEngine(self.db).generate(months=months, user_ids=[self.user_id], today=today)
+                cycles = self.db.get_forecasts(today, end, user_ids=[self.user_id]).get(self.user_id, [])
+
+            return {
+                "success": True,
+                "period_months": months,
+                "count": len(cycles),
+                "cycles": cycles
+            }
+
+        except Exception as e:
+            logger.error(f"Error retrieving cycle forecast: {e}")
+            return {
+                "success": False,
+                "message": "Errore nel recuperare il calendario previsto",
+                "error": str(e)
+            }
+
     def _generate_context_message(
         self,
         flow_intensity: str,
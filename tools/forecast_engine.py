@@ -0,0 +1,225 @@
+"""
+Forecast Engine - Calendari previsti di mestruazioni e fasi per molti utenti
+Un solo passaggio vettoriale su array di parametri per utente
+
+I parametri vengono dalla tabella cycle_statistics (ultimo inizio, media
+pesata recente degli intervalli, durata media della mestruazione): per
+ogni utente il k-esimo inizio previsto è
+
+    ultimo inizio + round(k · intervallo)
+
+e i confini delle fasi seguono le regole di database.cycle_phases. I
+calendari sono scritti nella tabella cycle_forecasts, letta da job di
+promemoria e API senza ricalcolare.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Forecast engine requires numpy. Run: pip install numpy")
+
+from database import DatabaseManager
+from database.schema import user_key
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+DEFAULT_FORECAST_MONTHS = 3
+DEFAULT_INTERVAL_DAYS = 28.0   # utenti con un solo ciclo registrato
+DEFAULT_PERIOD_DAYS = 5        # utenti senza cicli chiusi
+MIN_INTERVAL_DAYS = 1.0
+ACTIVE_DAYS = 365              # utenti con un inizio registrato nell'ultimo anno
+BATCH_USERS = 10_000
+
+# Offset delle fasi dall'inizio del ciclo (vedi cycle_phases.label_phase)
+MID_OFFSET = 6
+LATE_OFFSET = 15
+PRE_MENSTRUAL_DAYS = 3
+
+
+def forecast_calendars(
+    last_start,
+    interval,
+    period_days,
+    today: int,
+    horizon_days: int
+) -> Dict[str, "np.ndarray"]:
+    """
+    Calendari di tutti gli utenti del batch, in giorni (ordinali dall'epoch).
+
+    Per ogni utente si generano i cicli che si sovrappongono a
+    [today, today + horizon_days): il ciclo in corso (k = 0 se l'ultimo
+    inizio registrato non è ancora stato superato) e quelli previsti.
+
+    Args:
+        last_start: Array int64 dell'ultimo inizio registrato (giorno)
+        interval: Array float dell'intervallo previsto tra inizi (giorni)
+        period_days: Array int della durata prevista della mestruazione
+        today: Primo giorno del calendario
+        horizon_days: Giorni coperti dal calendario
+
+    Returns:
+        Array paralleli (uno per ciclo): user (indice nel batch),
+        cycle_number, cycle_start, period_end, mid_start, late_start,
+        pre_menstrual_start, next_start
+    """
+    last_start = np.asarray(last_start, dtype=np.int64)
+    interval = np.maximum(np.asarray(interval, dtype=np.float64), MIN_INTERVAL_DAYS)
+    period_days = np.maximum(np.asarray(period_days, dtype=np.int64), 1)
+    horizon_end = today + horizon_days
+
+    # Primo ciclo utile: salta i cicli previsti già conclusi prima di today
+    first = np.maximum(np.floor((today - last_start) / interval).astype(np.int64) - 1, 0)
+    span = int(np.ceil(horizon_days / interval.min())) + 3 if len(interval) else 0
+    k = first[:, None] + np.arange(span)[None, :]
+
+    starts = last_start[:, None] + np.rint(k * interval[:, None]).astype(np.int64)
+    nexts = last_start[:, None] + np.rint((k + 1) * interval[:, None]).astype(np.int64)
+    keep = (nexts > today) & (starts < horizon_end)
+
+    user = np.broadcast_to(np.arange(len(last_start))[:, None], k.shape)[keep]
+    starts, nexts, k = starts[keep], nexts[keep], k[keep]
+    length = nexts - starts
+
+    return {
+        "user": user,
+        "cycle_number": k,
+        "cycle_start": starts,
+        "period_end": starts + np.minimum(period_days[user], length) - 1,
+        "mid_start": starts + np.minimum(MID_OFFSET, length),
+        "late_start": starts + np.minimum(LATE_OFFSET, length),
+        "pre_menstrual_start": starts + np.clip(length - PRE_MENSTRUAL_DAYS, LATE_OFFSET, None).clip(None, length),
+        "next_start": nexts,
+    }
+
+
+def _day(moment: datetime) -> int:
+    return int(np.datetime64(moment, 'D').astype(np.int64))
+
+
+def _datetimes(days) -> List[datetime]:
+    return np.asarray(days, dtype='datetime64[D]').astype('datetime64[us]').tolist()
+
+
+class ForecastEngine:
+    """
+    Genera e salva i calendari previsti per tutti gli utenti attivi.
+
+    Legge i parametri dalle statistiche dei cicli (una riga per utente),
+    calcola i calendari a batch di BATCH_USERS utenti e sostituisce la
+    tabella cycle_forecasts in un'unica transazione.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = BATCH_USERS):
+        """
+        Args:
+            db_manager: Istanza di DatabaseManager
+            batch_size: Utenti per passaggio vettoriale
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for cycle forecasts")
+
+        self.db = db_manager
+        self.batch_size = batch_size
+
+    def generate(
+        self,
+        months: int = DEFAULT_FORECAST_MONTHS,
+        user_ids: Optional[Sequence[Optional[int]]] = None,
+        today: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Calcola e salva i calendari dei prossimi months mesi.
+
+        Args:
+            months: Mesi coperti dal calendario (30 giorni ciascuno)
+            user_ids: Utenti da aggiornare (None = tutti gli utenti attivi)
+            today: Primo giorno del calendario (default: oggi)
+
+        Returns:
+            Dizionario con success, users, cycles e intervallo del calendario
+        """
+        try:
+            today = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+            horizon_days = months * 30
+
+            parameters = self.db.get_forecast_parameters(
+                active_since=today - timedelta(days=ACTIVE_DAYS),
+                user_ids=list(user_ids) if user_ids is not None else None
+            )
+            generated_at = datetime.now()
+
+            written = self.db.replace_forecasts(
+                self._rows(parameters, _day(today), horizon_days, generated_at),
+                user_ids=list(user_ids) if user_ids is not None else None
+            )
+            if written is None:
+                return {
+                    "success": False,
+                    "message": "Errore nel salvare i calendari previsti"
+                }
+
+            logger.info(f"Generated forecasts: {len(parameters)} users, {written} cycles")
+
+            return {
+                "success": True,
+                "users": len(parameters),
+                "cycles": written,
+                "start": today.date().isoformat(),
+                "end": (today + timedelta(days=horizon_days - 1)).date().isoformat(),
+                "generated_at": generated_at.isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Error generating forecasts: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nella generazione dei calendari: {str(e)}"
+            }
+
+    def _rows(
+        self,
+        parameters: List[tuple],
+        today: int,
+        horizon_days: int,
+        generated_at: datetime
+    ) -> Iterator[Dict[str, Any]]:
+        """Righe di cycle_forecasts, un batch di utenti alla volta"""
+        for offset in range(0, len(parameters), self.batch_size):
+            batch = parameters[offset:offset + self.batch_size]
+            n = len(batch)
+
+            keys = np.fromiter((user_key(row[0]) for row in batch), dtype=np.int64, count=n)
+            last_start = np.fromiter((_day(row[1]) for row in batch), dtype=np.int64, count=n)
+            interval = np.fromiter(
+                (row[2] if row[3] else DEFAULT_INTERVAL_DAYS for row in batch),
+                dtype=np.float64, count=n
+            )
+            period_days = np.fromiter(
+                (round(row[4] / row[5]) if row[5] else DEFAULT_PERIOD_DAYS for row in batch),
+                dtype=np.int64, count=n
+            )
+
+            calendars = forecast_calendars(last_start, interval, period_days, today, horizon_days)
+            user = calendars["user"]
+
+            columns = {
+                name: _datetimes(calendars[name])
+                for name in ("cycle_start", "period_end", "mid_start", "late_start",
+                             "pre_menstrual_start", "next_start")
+            }
+            for i, (key, number, step) in enumerate(zip(
+                keys[user].tolist(), calendars["cycle_number"].tolist(), interval[user].tolist()
+            )):
+                yield {
+                    "user_id": key,
+                    "cycle_number": number,
+                    "interval_days": step,
+                    "generated_at": generated_at,
+                    **{name: values[i] for name, values in columns.items()}
+                }
@@ -0,0 +1,631 @@
+"""
+History Importer - Import di storici da altre app di period tracking
+Lettura incrementale di export CSV/JSON con deduplica e commit a batch
+
+Formati supportati:
+- CSV con intestazione: ogni riga è un ciclo (colonna di inizio ciclo
+  valorizzata) o un sintomo
+- JSON: lista di oggetti, oppure oggetto con sezioni ("cycles",
+  "symptoms", ...) che contengono liste di oggetti
+- JSON Lines: un oggetto per riga
+
+I file sono letti a blocchi: la memoria usata dipende dal batch, non
+dalla dimensione dell'export. Le righe già presenti vengono saltate dal
+database (indici unici + ON CONFLICT DO NOTHING), quindi reimportare lo
+stesso file non crea duplicati.
+"""
+
+import codecs
+import csv
+import json
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+import logging
+
+from database import (
+    DatabaseManager, CycleEntry, SymptomEntry, SymptomType, FlowIntensity,
+    validate_entries
+)
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+BATCH_SIZE = 5000
+READ_CHUNK_CHARS = 64 * 1024
+MAX_REPORTED_ERRORS = 20
+NOTES_MAX_LENGTH = 500
+
+FORMATS = ("csv", "json", "jsonl")
+
+KIND_CYCLE = "cycle"
+KIND_SYMPTOM = "symptom"
+
+# Nomi di colonna accettati (normalizzati: minuscolo, senza accenti, "_")
+CYCLE_COLUMNS = {
+    "start_date": ("start_date", "period_start", "cycle_start", "start", "inizio", "data_inizio"),
+    "end_date": ("end_date", "period_end", "cycle_end", "end", "fine", "data_fine"),
+    "flow_intensity": ("flow_intensity", "flow", "flusso"),
+    "notes": ("notes", "note", "notes_text", "comment", "comments"),
+}
+
+SYMPTOM_COLUMNS = {
+    "symptom_type": ("symptom_type", "symptom", "sintomo", "tipo", "type", "name"),
+    "intensity": ("intensity", "severity", "level", "intensita", "score"),
+    "timestamp": ("timestamp", "datetime", "date", "time", "logged_at", "data"),
+    "notes": ("notes", "note", "notes_text", "comment", "comments"),
+}
+
+# Sezioni JSON riconosciute
+SECTIONS = {
+    "cycles": KIND_CYCLE, "periods": KIND_CYCLE, "cicli": KIND_CYCLE,
+    "symptoms": KIND_SYMPTOM, "logs": KIND_SYMPTOM, "sintomi": KIND_SYMPTOM,
+}
+
+# Nomi inglesi usati dalle app più diffuse
+SYMPTOM_ALIASES = {
+    "cramps": SymptomType.CRAMPI,
+    "headache": SymptomType.MAL_DI_TESTA,
+    "weight_gain": SymptomType.AUMENTO_PESO,
+    "hair_loss": SymptomType.PERDITA_CAPELLI,
+    "hirsutism": SymptomType.IRSUTISMO,
+    "excess_hair": SymptomType.IRSUTISMO,
+    "irregular_cycle": SymptomType.IRREGOLARITA_CICLO,
+    "irregular_period": SymptomType.IRREGOLARITA_CICLO,
+    "pelvic_pain": SymptomType.DOLORE_PELVICO,
+    "fatigue": SymptomType.AFFATICAMENTO,
+    "tiredness": SymptomType.AFFATICAMENTO,
+    "anxiety": SymptomType.ANSIA,
+    "depression": SymptomType.DEPRESSIONE,
+    "low_mood": SymptomType.DEPRESSIONE,
+    "other": SymptomType.ALTRO,
+}
+
+FLOW_ALIASES = {
+    "leggero": FlowIntensity.LIGHT,
+    "moderate": FlowIntensity.MEDIUM,
+    "medio": FlowIntensity.MEDIUM,
+    "abbondante": FlowIntensity.HEAVY,
+    "super_heavy": FlowIntensity.VERY_HEAVY,
+    "molto_abbondante": FlowIntensity.VERY_HEAVY,
+}
+
+# Scale testuali di intensità
+INTENSITY_WORDS = {
+    "mild": 3, "lieve": 3, "low": 3,
+    "moderate": 6, "moderata": 6, "medium": 6,
+    "severe": 9, "forte": 9, "high": 9, "grave": 9,
+}
+
+DATE_FORMATS = ("%d/%m/%Y %H:%M", "%d/%m/%Y", "%d.%m.%Y")
+
+
+def _normalize(name: Any) -> str:
+    """Nome di colonna o valore categorico in forma canonica"""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return text.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _pick(record: Dict[str, Any], aliases: Tuple[str, ...]) -> Any:
+    for alias in aliases:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(text, date_format)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"data non riconosciuta: '{text}'")
+    # Orario locale dell'export: le date salvate sono naive
+    return parsed.replace(tzinfo=None)
+
+
+def _parse_intensity(value: Any) -> Any:
+    if isinstance(value, str):
+        word = _normalize(value)
+        if word in INTENSITY_WORDS:
+            return INTENSITY_WORDS[word]
+        try:
+            return round(float(value))
+        except ValueError:
+            return value  # lasciato a Pydantic per il messaggio d'errore
+    if isinstance(value, float):
+        return round(value)
+    return value
+
+
+def _parse_symptom_type(value: Any) -> SymptomType:
+    name = _normalize(value)
+    try:
+        return SymptomType(name)
+    except ValueError:
+        if name in SYMPTOM_ALIASES:
+            return SYMPTOM_ALIASES[name]
+        raise ValueError(f"tipo di sintomo non riconosciuto: '{value}'")
+
+
+def _parse_flow(value: Any) -> FlowIntensity:
+    if value in (None, ""):
+        return FlowIntensity.MEDIUM
+    name = _normalize(value)
+    try:
+        return FlowIntensity(name)
+    except ValueError:
+        if name in FLOW_ALIASES:
+            return FLOW_ALIASES[name]
+        raise ValueError(f"intensità del flusso non riconosciuta: '{value}'")
+
+
+def _notes(value: Any) -> str:
+    return "" if value is None else str(value).strip()[:NOTES_MAX_LENGTH]
+
+
+def record_kind(record: Dict[str, Any], section: Optional[str] = None) -> str:
+    """
+    Tipo di riga: la sezione JSON se riconosciuta, altrimenti ciclo se
+    la colonna di inizio ciclo è valorizzata.
+    """
+    if section is not None and _normalize(section) in SECTIONS:
+        return SECTIONS[_normalize(section)]
+    if _pick(record, CYCLE_COLUMNS["start_date"]) is not None:
+        return KIND_CYCLE
+    return KIND_SYMPTOM
+
+
+def cycle_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Campi di CycleEntry da una riga normalizzata (validati poi a batch).
+
+    Raises:
+        ValueError: Se mancano campi o i valori non sono riconosciuti
+    """
+    start = _parse_datetime(_pick(record, CYCLE_COLUMNS["start_date"]))
+    if start is None:
+        raise ValueError("data di inizio ciclo mancante")
+
+    return {
+        "start_date": start,
+        "end_date": _parse_datetime(_pick(record, CYCLE_COLUMNS["end_date"])),
+        "flow_intensity": _parse_flow(_pick(record, CYCLE_COLUMNS["flow_intensity"])),
+        "notes": _notes(_pick(record, CYCLE_COLUMNS["notes"])),
+    }
+
+
+def symptom_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Campi di SymptomEntry da una riga normalizzata (validati poi a batch).
+
+    Raises:
+        ValueError: Se mancano campi o i valori non sono riconosciuti
+    """
+    symptom_type = _pick(record, SYMPTOM_COLUMNS["symptom_type"])
+    if symptom_type is None:
+        raise ValueError("tipo di sintomo mancante")
+
+    timestamp = _parse_datetime(_pick(record, SYMPTOM_COLUMNS["timestamp"]))
+    if timestamp is None:
+        raise ValueError("data del sintomo mancante")
+
+    return {
+        "symptom_type": _parse_symptom_type(symptom_type),
+        "intensity": _parse_intensity(_pick(record, SYMPTOM_COLUMNS["intensity"])),
+        "notes": _notes(_pick(record, SYMPTOM_COLUMNS["notes"])),
+        "timestamp": timestamp,
+    }
+
+
+def format_validation_errors(errors: List[Dict[str, Any]]) -> str:
+    """Errori Pydantic di una riga come testo 'campo: messaggio; ...'"""
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in errors)
+
+
+# ============================================================================
+# Lettura incrementale
+# ============================================================================
+
+def iter_csv_records(stream: TextIO) -> Iterator[Tuple[int, Optional[str], Dict[str, Any]]]:
+    """Righe CSV come (numero di riga, None, dizionario normalizzato)"""
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [_normalize(name) for name in header]
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, None, dict(zip(columns, values))
+
+
+def iter_jsonl_records(stream: TextIO) -> Iterator[Tuple[int, Optional[str], Dict[str, Any]]]:
+    """Oggetti JSON Lines come (numero di riga, None, dizionario normalizzato)"""
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_number, None, _normalize_keys(json.loads(line))
+
+
+def iter_json_records(
+    stream: TextIO,
+    chunk_chars: int = READ_CHUNK_CHARS
+) -> Iterator[Tuple[int, Optional[str], Dict[str, Any]]]:
+    """
+    Oggetti di un documento JSON come (posizione, sezione, dizionario normalizzato).
+
+    Il documento è letto a blocchi di chunk_chars caratteri e decodificato
+    un elemento alla volta: in memoria c'è un solo record, non l'intero file.
+    Accetta una lista di oggetti o un oggetto con liste per sezione; gli
+    altri valori di primo livello (es. "version") sono ignorati.
+    """
+    reader = _JsonReader(stream, chunk_chars)
+    position = 0
+
+    first = reader.peek()
+    if first == "[":
+        for record in reader.array():
+            position += 1
+            yield position, None, record
+        return
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        section = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            for record in reader.array():
+                position += 1
+                yield position, section, record
+        else:
+            reader.value()
+
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
+
+class _JsonReader:
+    """Decodifica incrementale di valori JSON da uno stream di testo"""
+
+    def __init__(self, stream: TextIO, chunk_chars: int):
+        self.stream = stream
+        self.chunk_chars = chunk_chars
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_chars)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Primo carattere significativo (stringa vuota a fine file)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON non valido: atteso '{char}', trovato '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodifica il prossimo valore, leggendo altri blocchi se serve"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Un valore che arriva a fine buffer potrebbe essere troncato (es. numeri)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def array(self) -> Iterator[Dict[str, Any]]:
+        """Elementi di una lista, uno alla volta"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            item = self.value()
+            if isinstance(item, dict):
+                yield _normalize_keys(item)
+
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            self.expect(",")
+
+
+def _normalize_keys(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {_normalize(key): value for key, value in record.items()}
+
+
+def detect_format(filename: str) -> str:
+    """Formato dall'estensione del file (csv, json, jsonl)"""
+    suffix = Path(filename).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".json":
+        return "json"
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Formato non supportato: '{suffix or filename}' (usa {', '.join(FORMATS)})")
+
+
+class HistoryImporter:
+    """
+    Import incrementale di storici di cicli e sintomi.
+
+    Responsabilità:
+    - Leggere export CSV/JSON a blocchi
+    - Mappare le colonne su CycleEntry/SymptomEntry, validate a batch sulla lista
+    - Scrivere a batch saltando le righe già presenti
+    - Aggiornare una volta a fine import fasi, contatori e statistiche
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        user_id: Optional[int] = None,
+        batch_size: int = BATCH_SIZE
+    ):
+        """
+        Inizializza history importer.
+
+        Args:
+            db_manager: Istanza di DatabaseManager
+            user_id: Utente a cui importare lo storico (None = storico locale)
+            batch_size: Righe per transazione
+        """
+        self.db = db_manager
+        self.user_id = user_id
+        self.batch_size = batch_size
+        logger.info("HistoryImporter initialized")
+
+    def import_file(
+        self,
+        path: Union[str, Path],
+        file_format: Optional[str] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Importa un file di export.
+
+        Args:
+            path: Percorso del file
+            file_format: csv, json o jsonl (default: dall'estensione)
+            progress: Callback chiamata dopo ogni batch con i conteggi parziali
+
+        Returns:
+            Dizionario con risultato e conteggi dell'import
+        """
+        try:
+            file_format = file_format or detect_format(str(path))
+            with open(path, "r", encoding="utf-8-sig", newline="") as stream:
+                return self.import_stream(stream, file_format, progress=progress)
+
+        except Exception as e:
+            logger.error(f"Error importing {path}: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'importare il file: {str(e)}",
+                "error": str(e)
+            }
+
+    def import_stream(
+        self,
+        stream: Union[BinaryIO, TextIO],
+        file_format: str,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Importa un export da uno stream (file aperto, upload HTTP).
+
+        Args:
+            stream: Stream binario (UTF-8) o di testo
+            file_format: csv, json o jsonl
+            progress: Callback chiamata dopo ogni batch con i conteggi parziali
+
+        Returns:
+            Dizionario con success, cycles_imported, symptoms_imported,
+            duplicates, invalid ed errors (primi MAX_REPORTED_ERRORS)
+        """
+        stats = {
+            "rows": 0,
+            "cycles_imported": 0,
+            "symptoms_imported": 0,
+            "duplicates": 0,
+            "invalid": 0,
+            "errors": [],
+        }
+        # Righe mappate ma non ancora validate: (posizione nel file, campi)
+        cycles: List[Tuple[int, Dict[str, Any]]] = []
+        symptoms: List[Tuple[int, Dict[str, Any]]] = []
+        first_cycle_start: Optional[datetime] = None
+
+        try:
+            records = self._records(stream, file_format)
+
+            for position, section, record in records:
+                stats["rows"] += 1
+                try:
+                    if record_kind(record, section) == KIND_CYCLE:
+                        cycles.append((position, cycle_fields(record)))
+                    else:
+                        symptoms.append((position, symptom_fields(record)))
+                except ValueError as e:
+                    self._invalid(stats, position, str(e))
+                    continue
+
+                if len(cycles) >= self.batch_size:
+                    first_cycle_start = self._flush_cycles(cycles, stats, first_cycle_start, progress)
+                    cycles = []
+                if len(symptoms) >= self.batch_size:
+                    self._flush_symptoms(symptoms, stats, progress)
+                    symptoms = []
+
+            # I cicli prima dei sintomi: le fasi del batch finale sono già corrette
+            first_cycle_start = self._flush_cycles(cycles, stats, first_cycle_start, progress)
+            self._flush_symptoms(symptoms, stats, progress)
+
+        except Exception as e:
+            logger.error(f"Error importing history: {e}")
+            self._refresh(stats, first_cycle_start)
+            return {
+                "success": False,
+                "message": f"Import interrotto alla riga {stats['rows']}: {str(e)}",
+                "error": str(e),
+                **stats
+            }
+
+        if not self._refresh(stats, first_cycle_start):
+            return {
+                "success": False,
+                "message": "Righe importate, ma errore nell'aggiornare statistiche e fasi",
+                **stats
+            }
+
+        logger.info(
+            f"History imported: {stats['cycles_imported']} cycles, "
+            f"{stats['symptoms_imported']} symptoms, {stats['duplicates']} duplicates, "
+            f"{stats['invalid']} invalid"
+        )
+
+        return {
+            "success": True,
+            "message": (
+                f"Importati {stats['cycles_imported']} cicli e {stats['symptoms_imported']} sintomi "
+                f"({stats['duplicates']} già presenti, {stats['invalid']} non validi)"
+            ),
+            **stats
+        }
+
+    def _records(
+        self,
+        stream: Union[BinaryIO, TextIO],
+        file_format: str
+    ) -> Iterator[Tuple[int, Optional[str], Dict[str, Any]]]:
+        if file_format not in FORMATS:
+            raise ValueError(f"Formato non supportato: '{file_format}' (usa {', '.join(FORMATS)})")
+
+        if not isinstance(stream.read(0), str):
+            stream = codecs.getreader("utf-8-sig")(stream)
+
+        if file_format == "csv":
+            return iter_csv_records(stream)
+        if file_format == "jsonl":
+            return iter_jsonl_records(stream)
+        return iter_json_records(stream)
+
+    def _invalid(self, stats: Dict[str, Any], position: int, detail: str) -> None:
+        stats["invalid"] += 1
+        if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+            stats["errors"].append(f"riga {position}: {detail}")
+
+    def _validate(
+        self,
+        model: type,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        stats: Dict[str, Any]
+    ) -> List[Any]:
+        """Valida il batch con una chiamata sulla lista; le righe non valide sono riportate"""
+        entries, errors = validate_entries(model, [fields for _, fields in batch])
+        for index, row_errors in errors.items():
+            self._invalid(stats, batch[index][0], format_validation_errors(row_errors))
+        return entries
+
+    def _flush_cycles(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        stats: Dict[str, Any],
+        first_cycle_start: Optional[datetime],
+        progress: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> Optional[datetime]:
+        """Valida e scrive un batch di cicli; restituisce il primo inizio importato finora"""
+        cycles: List[CycleEntry] = self._validate(CycleEntry, batch, stats)
+        if not cycles:
+            return first_cycle_start
+
+        inserted = self.db.import_cycles(cycles, user_id=self.user_id)
+        if inserted is None:
+            raise RuntimeError("errore nel salvare i cicli")
+
+        stats["cycles_imported"] += inserted
+        stats["duplicates"] += len(cycles) - inserted
+        self._report(stats, progress)
+
+        if inserted:
+            batch_first = min(cycle.start_date for cycle in cycles)
+            if first_cycle_start is None or batch_first < first_cycle_start:
+                return batch_first
+        return first_cycle_start
+
+    def _flush_symptoms(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        stats: Dict[str, Any],
+        progress: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> None:
+        """Valida e scrive un batch di sintomi"""
+        symptoms: List[SymptomEntry] = self._validate(SymptomEntry, batch, stats)
+        if not symptoms:
+            return
+
+        inserted = self.db.import_symptoms(symptoms, user_id=self.user_id)
+        if inserted is None:
+            raise RuntimeError("errore nel salvare i sintomi")
+
+        stats["symptoms_imported"] += inserted
+        stats["duplicates"] += len(symptoms) - inserted
+        self._report(stats, progress)
+
+    def _report(
+        self,
+        stats: Dict[str, Any],
+        progress: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> None:
+        logger.info(
+            f"Import progress: {stats['rows']} rows, {stats['cycles_imported']} cycles, "
+            f"{stats['symptoms_imported']} symptoms"
+        )
+        if progress is not None:
+            progress(dict(stats))
+
+    def _refresh(self, stats: Dict[str, Any], first_cycle_start: Optional[datetime]) -> bool:
+        """Aggiorna lo stato derivato se l'import ha scritto qualcosa"""
+        if not (stats["cycles_imported"] or stats["symptoms_imported"]):
+            return True
+        return self.db.refresh_imported_history(self.user_id, relabel_from=first_cycle_start)
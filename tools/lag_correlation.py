@@ -0,0 +1,120 @@
+"""
+Lag Correlation - Correlazioni incrociate ritardate tra serie di sintomi
+Tutte le coppie di tipi e tutti i ritardi con una sola FFT
+
+Ogni tipo di sintomo è una serie giornaliera di intensità (0 = assente).
+Per le serie standardizzate x_i, x_j la correlazione al ritardo k è
+
+    r_ij(k) = Σ_t x_i(t) · x_j(t + k) / (n - k)
+
+e un valore alto con k > 0 indica che il tipo i precede il tipo j di k giorni.
+Il prodotto conj(FFT(x_i)) · FFT(x_j) con zero padding a ≥ 2n restituisce
+r_ij(k) per ogni k in O(n log n), per tutte le coppie in un'unica chiamata.
+"""
+
+from typing import Any, Dict, List, Sequence
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Lag correlation requires numpy. Run: pip install numpy")
+
+from tools.significance import t_two_sided_pvalues
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+MIN_OVERLAP_DAYS = 14     # giorni sovrapposti minimi per un ritardo
+
+
+def cross_correlation_matrix(series, max_lag: int):
+    """
+    Correlazioni incrociate di tutte le coppie di serie per i ritardi 0..max_lag.
+
+    Args:
+        series: Array (tipi, giorni) di valori giornalieri
+        max_lag: Ritardo massimo in giorni
+
+    Returns:
+        Array (tipi, tipi, max_lag + 1): [i, j, k] = correlazione tra il
+        tipo i al giorno t e il tipo j al giorno t + k; le serie costanti
+        hanno correlazione 0
+    """
+    series = np.asarray(series, dtype=np.float64)
+    n_types, n_days = series.shape
+    max_lag = max(0, min(max_lag, n_days - 1))
+
+    std = series.std(axis=1, keepdims=True)
+    z = np.divide(
+        series - series.mean(axis=1, keepdims=True), std,
+        out=np.zeros_like(series), where=std > 0
+    )
+
+    # Zero padding: nessuna sovrapposizione circolare fino a max_lag
+    nfft = 1 << int(np.ceil(np.log2(n_days + max_lag + 1)))
+    spectrum = np.fft.rfft(z, n=nfft, axis=1)
+    cross = np.fft.irfft(
+        np.conj(spectrum)[:, None, :] * spectrum[None, :, :], n=nfft, axis=2
+    )[:, :, :max_lag + 1]
+
+    overlap = n_days - np.arange(max_lag + 1)
+    return cross / overlap
+
+
+def strongest_lags(
+    correlations,
+    type_names: Sequence[str],
+    n_days: int,
+    min_lag: int = 1,
+    min_correlation: float = 0.2,
+    top_k: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Ritardo più forte per ogni coppia ordinata (precedente → successivo).
+
+    Args:
+        correlations: Output di cross_correlation_matrix
+        type_names: Nome del tipo per ogni riga
+        n_days: Lunghezza delle serie
+        min_lag: Ritardo minimo considerato (1 = escluso lo stesso giorno)
+        min_correlation: Correlazione minima da riportare
+        top_k: Numero massimo di relazioni
+
+    Returns:
+        Lista ordinata per correlazione decrescente
+    """
+    n_types, _, lags = correlations.shape
+    if lags <= min_lag:
+        return []
+
+    candidates = correlations[:, :, min_lag:].copy()
+    overlap = n_days - np.arange(min_lag, lags)
+    candidates[:, :, overlap < MIN_OVERLAP_DAYS] = 0.0
+    candidates[np.arange(n_types), np.arange(n_types), :] = 0.0
+
+    best = candidates.argmax(axis=2)
+    best_r = np.take_along_axis(candidates, best[:, :, None], axis=2)[:, :, 0]
+    leaders, followers = np.nonzero(best_r >= min_correlation)
+    if len(leaders) == 0:
+        return []
+
+    r = np.clip(best_r[leaders, followers], -0.999999, 0.999999)
+    lag = best[leaders, followers] + min_lag
+    df = n_days - lag - 2
+    p_values = t_two_sided_pvalues(r * np.sqrt(df / (1.0 - r * r)), df)
+
+    order = np.argsort(-r, kind="stable")[:top_k]
+    return [
+        {
+            "leader": type_names[leaders[i]],
+            "follower": type_names[followers[i]],
+            "lag_days": int(lag[i]),
+            "correlation": round(float(r[i]), 3),
+            "same_day_correlation": round(float(correlations[leaders[i], followers[i], 0]), 3),
+            "overlap_days": int(n_days - lag[i]),
+            "p_value": round(float(p_values[i]), 4)
+        }
+        for i in order
+    ]
@@ -0,0 +1,445 @@
+"""
+Note Search - Ricerca semantica nelle note personali
+
+Le note libere di sintomi e cicli sono trasformate in embedding con
+rag.embeddings.EmbeddingsGenerator da un thread in background: track_symptom
+e track_cycle accodano la nota e rispondono subito. Gli embedding sono
+salvati nella tabella note_embeddings (append-only, uno per nota) e tenuti
+in memoria come matrice per utente, estesa con le sole righe nuove.
+
+Ogni embedding porta l'hash del testo da cui è calcolato: una nota
+modificata viene ricalcolata da sync() e la nuova riga sostituisce quella
+in memoria; i vettori di record eliminati o con testo diverso sono scartati
+dalla ricerca invece di essere attribuiti al record sbagliato.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import queue
+import threading
+
+import numpy as np
+
+from database import DatabaseManager
+from database.db_manager import note_hash
+from database.schema import user_key
+from rag.similarity import top_k_indices
+
+try:
+    from rag.embeddings import EmbeddingsGenerator, SentenceTransformer
+    EMBEDDINGS_AVAILABLE = SentenceTransformer is not None
+except ImportError:
+    EmbeddingsGenerator = None
+    EMBEDDINGS_AVAILABLE = False
+
+logger = logging.getLogger("pcos-care-mcp.tools")
+
+SOURCES = ("symptom", "cycle")
+BATCH_NOTES = 64         # note per chiamata al modello
+MIN_CAPACITY = 64        # righe iniziali della matrice per utente
+DISCARDED = -1           # codice sorgente delle righe scartate
+
+
+class _UserNotes:
+    """
+    Matrice degli embedding di un utente, estesa per raddoppio.
+
+    refs[i] è il record della riga i (None = riga scartata), hashes[i]
+    l'hash del testo da cui è calcolata; positions indica la riga di
+    ogni record. codes[i] è l'indice della sorgente in SOURCES
+    (DISCARDED = riga scartata), per filtrare le righe senza cicli Python.
+    """
+
+    def __init__(self):
+        self.last_id = 0
+        self.refs: List[Optional[Tuple[str, int]]] = []
+        self.hashes: List[Optional[str]] = []
+        self.positions: Dict[Tuple[str, int], int] = {}
+        self.matrix: Optional[np.ndarray] = None
+        self.codes: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        """Note indicizzate"""
+        return len(self.positions)
+
+    def append(self, rows: List[Tuple[int, str, int, bytes, Optional[str]]]) -> None:
+        """Aggiunge le righe lette da note_embeddings (in ordine di id)"""
+        for _, source, record_id, vector, text_hash in rows:
+            ref = (source, record_id)
+            row = self.positions.get(ref)
+
+            if row is None:
+                # Nuovo record: riga in coda (capacità raddoppiata se piena)
+                row = len(self.refs)
+                if self.matrix is None or row == len(self.matrix):
+                    grown = np.empty((max(MIN_CAPACITY, 2 * row), len(vector) // 4), dtype=np.float32)
+                    codes = np.full(len(grown), DISCARDED, dtype=np.int8)
+                    if self.matrix is not None:
+                        grown[:row] = self.matrix[:row]
+                        codes[:row] = self.codes[:row]
+                    self.matrix = grown
+                    self.codes = codes
+                self.codes[row] = SOURCES.index(source)
+                self.refs.append(ref)
+                self.hashes.append(text_hash)
+                self.positions[ref] = row
+            else:
+                # Embedding ricalcolato (nota modificata): sostituisce quello vecchio
+                self.hashes[row] = text_hash
+
+            self.matrix[row] = np.frombuffer(vector, dtype=np.float32)
+
+        self.last_id = rows[-1][0]
+
+    def discard(self, ref: Tuple[str, int], text_hash: Optional[str]) -> None:
+        """Scarta la riga di un record se contiene ancora l'embedding text_hash"""
+        row = self.positions.get(ref)
+        if row is not None and self.hashes[row] == text_hash:
+            del self.positions[ref]
+            self.refs[row] = None
+            self.codes[row] = DISCARDED
+
+    def vectors(self) -> np.ndarray:
+        """Vista sulle righe occupate"""
+        return self.matrix[:len(self.refs)]
+
+    def mask(self, source: Optional[str], exclude: Optional[Tuple[str, int]]) -> np.ndarray:
+        """Righe candidate: non scartate, della sorgente richiesta, diverse da exclude"""
+        codes = self.codes[:len(self.refs)]
+        keep = codes == SOURCES.index(source) if source is not None else codes != DISCARDED
+        row = self.positions.get(exclude) if exclude is not None else None
+        if row is not None:
+            keep[row] = False
+        return keep
+
+
+class NoteIndex:
+    """
+    Indice vettoriale per utente delle note di sintomi e cicli.
+
+    Responsabilità:
+    - Accodare le note nuove e calcolarne gli embedding in background
+    - Recuperare le note rimaste senza embedding (sync)
+    - Ricerca per testo libero o per somiglianza a una registrazione
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        embedder=None,
+        batch_size: int = BATCH_NOTES
+    ):
+        """
+        Inizializza l'indice delle note.
+
+        Args:
+            db_manager: Istanza di DatabaseManager
+            embedder: Generatore di embedding (default: EmbeddingsGenerator,
+                      caricato al primo utilizzo)
+            batch_size: Note per chiamata al modello
+        """
+        self.db = db_manager
+        self.batch_size = batch_size
+        self._embedder = embedder
+        self._embedder_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[Optional[int], str, int, str]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._users: Dict[int, _UserNotes] = {}
+        self._users_lock = threading.Lock()
+        logger.info("NoteIndex initialized")
+
+    @property
+    def available(self) -> bool:
+        """True se è possibile calcolare embedding"""
+        return self._embedder is not None or EMBEDDINGS_AVAILABLE
+
+    @property
+    def pending(self) -> int:
+        """Note accodate non ancora indicizzate"""
+        return self._queue.unfinished_tasks
+
+    def add_note(
+        self,
+        source: str,
+        record_id: int,
+        notes: Optional[str],
+        user_id: Optional[int] = None
+    ) -> bool:
+        """
+        Accoda una nota per l'embedding in background.
+
+        Args:
+            source: 'symptom' o 'cycle'
+            record_id: ID del sintomo o del ciclo
+            notes: Testo della nota (le note vuote sono ignorate)
+            user_id: Owner della nota (None = storico locale)
+
+        Returns:
+            True se la nota è stata accodata
+        """
+        if not notes or not notes.strip() or not self.available:
+            return False
+
+        self._queue.put((user_id, source, record_id, notes))
+        self._ensure_worker()
+        return True
+
+    def sync(self, user_ids: Optional[List[Optional[int]]] = None) -> int:
+        """
+        Accoda le note salvate senza embedding (import, batch, riavvii).
+
+        Args:
+            user_ids: Utenti da controllare (None = tutti)
+
+        Returns:
+            Numero di note accodate
+        """
+        if not self.available:
+            return 0
+
+        pending = self.db.get_unembedded_notes(user_ids=user_ids)
+        for item in pending:
+            self._queue.put(item)
+
+        if pending:
+            logger.info(f"Queued {len(pending)} notes for embedding")
+            self._ensure_worker()
+
+        return len(pending)
+
+    def wait(self) -> None:
+        """Attende che le note accodate siano indicizzate"""
+        self._queue.join()
+
+    def search(
+        self,
+        query: str,
+        user_id: Optional[int] = None,
+        top_k: int = 5,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Ricerca semantica nelle note di un utente.
+
+        Args:
+            query: Testo da cercare
+            user_id: Owner delle note (None = storico locale)
+            top_k: Numero massimo di risultati
+            source: Solo 'symptom' o 'cycle' (None = entrambi)
+
+        Returns:
+            Dizionario con le registrazioni più simili e il loro punteggio
+        """
+        try:
+            if not query or not query.strip():
+                return {"success": False, "message": "Inserisci un testo da cercare"}
+
+            if not self.available:
+                return self._unavailable()
+
+            query_vector = self._embed([query])[0]
+            return self._search_vector(query_vector, user_id, top_k, source, exclude=None)
+
+        except Exception as e:
+            logger.error(f"Error searching notes: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nella ricerca delle note: {str(e)}"
+            }
+
+    def find_similar(
+        self,
+        source: str,
+        record_id: int,
+        user_id: Optional[int] = None,
+        top_k: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Registrazioni con note simili a quella di un sintomo o ciclo.
+
+        Args:
+            source: 'symptom' o 'cycle'
+            record_id: ID della registrazione di riferimento
+            user_id: Owner delle note (None = storico locale)
+            top_k: Numero massimo di risultati
+
+        Returns:
+            Dizionario con le registrazioni più simili (esclusa quella di riferimento)
+        """
+        try:
+            if source not in SOURCES:
+                return {"success": False, "message": f"Tipo non valido: '{source}'. Valori validi: {', '.join(SOURCES)}"}
+
+            notes = self._load(user_id)
+            with self._users_lock:
+                row = notes.positions.get((source, record_id))
+                query_vector = notes.matrix[row].copy() if row is not None else None
+
+            if query_vector is None:
+                return {
+                    "success": False,
+                    "message": f"Nessuna nota indicizzata per {source} #{record_id}"
+                               + (" (indicizzazione in corso)" if self.pending else "")
+                }
+
+            return self._search_vector(query_vector, user_id, top_k, None, exclude=(source, record_id))
+
+        except Exception as e:
+            logger.error(f"Error finding similar notes: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nella ricerca delle note: {str(e)}"
+            }
+
+    def _search_vector(
+        self,
+        query_vector: np.ndarray,
+        user_id: Optional[int],
+        top_k: int,
+        source: Optional[str],
+        exclude: Optional[Tuple[str, int]]
+    ) -> Dict[str, Any]:
+        """Top-k per similarità coseno sulla matrice dell'utente"""
+        notes = self._load(user_id)
+
+        with self._users_lock:
+            refs = list(notes.refs)
+            hashes = list(notes.hashes)
+            if refs:
+                scores = notes.vectors() @ query_vector
+                keep = notes.mask(source, exclude)
+            else:
+                scores = np.empty(0, dtype=np.float32)
+                keep = np.empty(0, dtype=bool)
+
+        # Righe escluse a -inf: argpartition sceglie i candidati senza
+        # ordinare tutte le righe. Record eliminati o modificati dopo
+        # l'embedding sono scoperti qui: si leggono più candidati del necessario
+        scores = np.where(keep, scores, -np.inf)
+        top = top_k_indices(scores, min(top_k * 2 + 5, int(keep.sum())))
+        wanted = top.tolist()
+        entries = self.db.get_note_entries([refs[i] for i in wanted], user_id=user_id)
+
+        results = []
+        stale = []
+        for i in wanted:
+            entry = entries.get(refs[i])
+            if entry is None or note_hash(entry["notes"]) != hashes[i]:
+                stale.append((i, entry))
+                continue
+            results.append({
+                "source": refs[i][0],
+                "entry_id": refs[i][1],
+                "score": round(float(scores[i]), 4),
+                "entry": entry
+            })
+            if len(results) >= top_k:
+                break
+
+        if stale:
+            with self._users_lock:
+                for i, _ in stale:
+                    notes.discard(refs[i], hashes[i])
+            # Nota modificata: nuovo embedding in background
+            for i, entry in stale:
+                if entry is not None:
+                    self.add_note(refs[i][0], refs[i][1], entry["notes"], user_id=user_id)
+
+        return {
+            "success": True,
+            "indexed_notes": len(notes),
+            "pending_notes": self.pending,
+            "results": results
+        }
+
+    def _load(self, user_id: Optional[int]) -> _UserNotes:
+        """Estende la matrice dell'utente con gli embedding scritti dall'ultima lettura"""
+        key = user_key(user_id)
+
+        with self._users_lock:
+            notes = self._users.setdefault(key, _UserNotes())
+            after_id = notes.last_id
+
+        rows = self.db.get_note_embeddings(user_id=user_id, after_id=after_id)
+
+        with self._users_lock:
+            # Un'altra ricerca può aver già letto le stesse righe
+            rows = [row for row in rows if row[0] > notes.last_id]
+            if rows:
+                notes.append(rows)
+
+        return notes
+
+    def _unavailable(self) -> Dict[str, Any]:
+        """Risposta quando sentence-transformers non è installato"""
+        return {
+            "success": False,
+            "message": (
+                "Ricerca nelle note non disponibile. "
+                "Installa con: pip install sentence-transformers"
+            )
+        }
+
+    def _get_embedder(self):
+        """Generatore di embedding, caricato al primo utilizzo"""
+        with self._embedder_lock:
+            if self._embedder is None:
+                self._embedder = EmbeddingsGenerator()
+            return self._embedder
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embedding float32 normalizzati (righe a norma 1)"""
+        embedder = self._get_embedder()
+
+        with self._embedder_lock:
+            vectors = np.asarray(
+                embedder.generate_embeddings_batch(texts, show_progress=False),
+                dtype=np.float32
+            )
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_worker(self) -> None:
+        """Avvia il thread di embedding se non è già attivo"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="note-embeddings", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        """Thread in background: embedding delle note accodate, a batch"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self._embed([notes for _, _, _, notes in batch])
+                written = self.db.add_note_embeddings([
+                    {
+                        "user_id": user_key(user_id),
+                        "source": source,
+                        "record_id": record_id,
+                        "dim": vectors.shape[1],
+                        "vector": vector.tobytes(),
+                        "text_hash": note_hash(notes)
+                    }
+                    for (user_id, source, record_id, notes), vector in zip(batch, vectors)
+                ])
+                if written is None:
+                    logger.warning(f"{len(batch)} note embeddings not saved, retried on next sync")
+
+            except Exception as e:
+                logger.error(f"Error embedding notes: {e}")
+
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
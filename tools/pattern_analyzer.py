@@ -3,7 +3,7 @@ Pattern Analyzer Tool - FASE 3
 Analisi avanzata di correlazioni tra sintomi e ciclo mestruale
 """
 
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import logging
@@ -16,11 +16,81 @@ except ImportError:
     DEPENDENCIES_AVAILABLE = False
     logging.warning("Pattern analysis dependencies not installed. Run: pip install pandas numpy")
 
-from database import DatabaseManager
+from database import DatabaseManager, SymptomSeries
+from database.cycle_phases import CYCLE_PHASES
+from tools.cooccurrence import CooccurrenceMiner
+from tools.cycle_heatmap import CycleDayHeatmap, DEFAULT_MAX_CYCLE_DAY
+from tools.lag_correlation import cross_correlation_matrix, strongest_lags
+from tools.significance import chi_square_independence, permutation_group_test
+from tools.trend_engine import TrendSums, fit_linear, N, SY
 
 logger = logging.getLogger("pcos-care-mcp.tools")
 
 
+# Soglie per classificare un trend (pendenza in punti di intensità a settimana)
+TREND_MIN_WEEKLY_CHANGE = 0.1
+TREND_MIN_CONFIDENCE = 0.8
+
+# Finestre del report multi-finestra (giorni)
+DEFAULT_REPORT_WINDOWS = (30, 90, 180, 365)
+MAX_REPORT_WINDOW_DAYS = 3650   # la finestra più lunga dimensiona TrendSums (tipi × giorni)
+
+# Test di significatività delle correlazioni sintomo-fase
+SIGNIFICANCE_ALPHA = 0.05
+DEFAULT_PERMUTATIONS = 10_000
+MIN_SIGNIFICANCE_ENTRIES = 8
+
+PHASE_NAMES = {
+    "early": "mestruazione (giorni 1-5)",
+    "mid": "fase follicolare/ovulazione (giorni 6-14)",
+    "late": "fase luteale (giorni 15+)",
+    "pre_menstrual": "pre-mestruale (2-3 giorni prima)"
+}
+
+
+def _threshold_patterns(
+    phase_patterns: Dict[str, Dict[str, int]],
+    symptom_combos: Dict[tuple, int],
+    min_occurrences: int
+) -> List[Dict[str, Any]]:
+    """Pattern con almeno min_occurrences occorrenze dai contatori"""
+    patterns = []
+
+    # Pattern 1: Sintomi che si ripetono in stessa fase ciclo
+    for stype, phases in phase_patterns.items():
+        for phase, count in phases.items():
+            if count >= min_occurrences:
+                patterns.append({
+                    "type": "cycle_phase_recurrence",
+                    "symptom": stype,
+                    "phase": phase,
+                    "occurrences": count,
+                    "description": f"{stype} ricorre {count} volte in fase {phase}"
+                })
+
+    # Pattern 2: Combinazioni di sintomi nello stesso giorno
+    for combo, count in symptom_combos.items():
+        if count >= min_occurrences:
+            patterns.append({
+                "type": "symptom_combination",
+                "symptoms": list(combo),
+                "occurrences": count,
+                "description": f"Combinazione {', '.join(combo)} si ripete {count} volte"
+            })
+
+    return patterns
+
+
+def _classify_trend(slope: float, confidence: float) -> str:
+    """Trend da pendenza giornaliera e confidenza del test sulla pendenza"""
+    if confidence >= TREND_MIN_CONFIDENCE:
+        if slope * 7 > TREND_MIN_WEEKLY_CHANGE:
+            return "increasing"
+        if slope * 7 < -TREND_MIN_WEEKLY_CHANGE:
+            return "decreasing"
+    return "stable"
+
+
 class PatternAnalyzer:
     """
     Tool per analisi pattern avanzata.
@@ -32,25 +102,46 @@ class PatternAnalyzer:
     - Insights predittivi
     """
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        user_id: Optional[int] = None,
+        chunk_size: int = 5000,
+        workers: int = 1
+    ):
         """
         Inizializza pattern analyzer.
 
         Args:
             db_manager: Istanza di DatabaseManager
+            user_id: Utente di cui gestire lo storico (None = storico locale)
+            chunk_size: Record letti dal database per blocco (limita la memoria)
+            workers: Processi per i test di permutazione su storici molto
+                     grandi (default: 1, nessun pool nel processo del server)
         """
         self.db = db_manager
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.workers = workers
         logger.info("PatternAnalyzer initialized")
 
     def analyze_symptom_cycle_correlation(
         self,
-        months: int = 3
+        months: int = 3,
+        n_permutations: int = DEFAULT_PERMUTATIONS,
+        seed: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Analizza correlazione tra sintomi e fasi del ciclo mestruale.
 
+        Oltre alle medie per fase calcola la significatività: test
+        chi-quadro tipo × fase sui conteggi e test di permutazione
+        sull'intensità di ogni tipo tra le fasi.
+
         Args:
             months: Numero di mesi da analizzare
+            n_permutations: Permutazioni per i test sull'intensità
+            seed: Seed delle permutazioni (risultati riproducibili)
 
         Returns:
             Dizionario con analisi correlazione
@@ -66,26 +157,38 @@ class PatternAnalyzer:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=months * 30)
 
-            symptoms = self.db.get_symptoms(
-                limit=1000,
+            # Aggregati per fase calcolati in SQL sulla colonna cycle_phase
+            phase_stats = self.db.get_phase_statistics(
                 start_date=start_date,
-                end_date=end_date
+                end_date=end_date,
+                user_id=self.user_id
             )
 
-            cycles = self.db.get_cycles(
-                limit=12,
+            # Solo inizi/fini come array: nessun oggetto ORM per contare i cicli
+            cycles = self.db.load_cycle_series(
                 start_date=start_date,
-                end_date=end_date
+                end_date=end_date,
+                user_id=self.user_id
             )
 
-            if not symptoms or not cycles:
+            if not phase_stats or not cycles:
                 return {
                     "success": False,
                     "message": "Dati insufficienti per l'analisi. Registra più sintomi e cicli."
                 }
 
             # Analyze correlation
-            correlations = self._find_symptom_cycle_patterns(symptoms, cycles)
+            correlations = self._find_symptom_cycle_patterns(phase_stats)
+            correlations["significance"] = self._test_phase_significance(
+                phase_stats,
+                self.db.get_phase_intensity_counts(
+                    start_date=start_date,
+                    end_date=end_date,
+                    user_id=self.user_id
+                ),
+                n_permutations,
+                seed
+            )
 
             # Generate insights
             insights = self._generate_correlation_insights(correlations)
@@ -93,7 +196,7 @@ class PatternAnalyzer:
             return {
                 "success": True,
                 "period_months": months,
-                "total_symptoms_analyzed": len(symptoms),
+                "total_symptoms_analyzed": sum(row['count'] for row in phase_stats),
                 "total_cycles_analyzed": len(cycles),
                 "correlations": correlations,
                 "insights": insights
@@ -109,50 +212,67 @@ class PatternAnalyzer:
     def analyze_symptom_trends(
         self,
         symptom_type: Optional[str] = None,
-        days: int = 90
+        days: int = 90,
+        weekly: bool = False,
+        window_days: int = 28
     ) -> Dict[str, Any]:
         """
         Analizza trend nel tempo per sintomi specifici.
 
+        Regressione lineare dell'intensità sui giorni trascorsi, calcolata
+        per tutti i tipi insieme da somme accumulate in streaming.
+
         Args:
             symptom_type: Tipo di sintomo da analizzare (opzionale)
             days: Giorni da analizzare
+            weekly: Aggiunge trend su finestre mobili, una per settimana
+            window_days: Ampiezza delle finestre mobili in giorni
 
         Returns:
             Dizionario con trend analysis
         """
         try:
+            if not DEPENDENCIES_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per pattern analysis non installate. Installa pandas e numpy."
+                }
+
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
 
-            symptoms = self.db.get_symptoms(
-                limit=1000,
-                symptom_type=symptom_type,
-                start_date=start_date,
-                end_date=end_date
-            )
+            # Stream dell'intera finestra in somme per tipo/giorno
+            sums = TrendSums(n_days=days + 1)
+            sums.add_series(self._load_series(start_date, end_date, symptom_type), start_date)
 
-            if not symptoms:
+            if sums.total == 0:
                 return {
                     "success": False,
                     "message": "Nessun sintomo trovato per l'analisi."
                 }
 
             # Analyze trends
-            trends = self._calculate_trends(symptoms)
+            trends = self._calculate_trends(sums)
 
             # Generate insights
             insights = self._generate_trend_insights(trends, symptom_type)
 
-            return {
+            result = {
                 "success": True,
                 "period_days": days,
                 "symptom_type": symptom_type or "all",
-                "total_entries": len(symptoms),
+                "total_entries": sums.total,
                 "trends": trends,
                 "insights": insights
             }
 
+            if weekly:
+                result["weekly_trends"] = self._calculate_rolling_trends(
+                    sums, start_date, window_days
+                )
+
+            return result
+
         except Exception as e:
             logger.error(f"Error in trend analysis: {e}")
             return {
@@ -160,6 +280,227 @@ class PatternAnalyzer:
                 "message": f"Errore nell'analisi: {str(e)}"
             }
 
+    def multi_window_report(
+        self,
+        windows: Sequence[int] = DEFAULT_REPORT_WINDOWS,
+        symptom_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Riepilogo e trend per più finestre temporali con una sola lettura.
+
+        Legge una volta la finestra più lunga, costruisce somme cumulative
+        giornaliere per tipo (conteggi, intensità, intensità², tempo) e
+        risponde a ogni finestra in O(1).
+
+        Args:
+            windows: Ampiezze delle finestre in giorni (es. 30, 90, 180, 365),
+                     limitate a MAX_REPORT_WINDOW_DAYS
+            symptom_type: Tipo di sintomo da analizzare (opzionale)
+
+        Returns:
+            Dizionario con un report per finestra
+        """
+        try:
+            if not DEPENDENCIES_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per pattern analysis non installate. Installa pandas e numpy."
+                }
+
+            windows = sorted({min(int(w), MAX_REPORT_WINDOW_DAYS) for w in windows if int(w) > 0})
+            if not windows:
+                return {
+                    "success": False,
+                    "message": "Specifica almeno una finestra di giorni valida."
+                }
+
+            longest = windows[-1]
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=longest)
+
+            # Un giorno per bin: la finestra di w giorni sono gli ultimi w bin
+            sums = TrendSums(n_days=longest)
+            sums.add_series(self._load_series(start_date, end_date, symptom_type), start_date)
+
+            if sums.total == 0:
+                return {
+                    "success": False,
+                    "message": "Nessun sintomo trovato per l'analisi."
+                }
+
+            window_sums = sums.trailing(windows)
+            fit = fit_linear(window_sums)
+            names = sums.type_names
+
+            report = {}
+            for j, days in enumerate(windows):
+                counts = window_sums[:, j, N]
+                total = int(counts.sum())
+
+                symptoms = {}
+                for i, stype in enumerate(names):
+                    if counts[i] == 0:
+                        continue
+
+                    slope = fit["slope"][i, j]
+                    has_fit = not np.isnan(slope)
+                    symptoms[stype] = {
+                        "count": int(counts[i]),
+                        "avg_intensity": round(float(fit["mean"][i, j]), 1),
+                        "std_intensity": round(float(fit["std"][i, j]), 2) if counts[i] > 1 else None,
+                        "trend": _classify_trend(slope, fit["confidence"][i, j]) if has_fit else None,
+                        "weekly_change": round(float(slope * 7), 2) if has_fit else None,
+                        "confidence": round(float(fit["confidence"][i, j]), 3) if has_fit else None
+                    }
+
+                report[str(days)] = {
+                    "days": days,
+                    "total_entries": total,
+                    "avg_intensity": round(float(window_sums[:, j, SY].sum() / total), 1) if total else None,
+                    "most_common": max(symptoms, key=lambda t: symptoms[t]["count"]) if symptoms else None,
+                    "symptoms": symptoms
+                }
+
+            return {
+                "success": True,
+                "symptom_type": symptom_type or "all",
+                "windows": windows,
+                "reports": report
+            }
+
+        except Exception as e:
+            logger.error(f"Error in multi-window report: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'analisi: {str(e)}"
+            }
+
+    def cycle_day_heatmap(
+        self,
+        months: int = 6,
+        max_day: int = DEFAULT_MAX_CYCLE_DAY
+    ) -> Dict[str, Any]:
+        """
+        Heatmap giorno del ciclo × tipo di sintomo (conteggi e intensità media).
+
+        I sintomi sono già allineati al giorno del ciclo (colonna cycle_day):
+        le matrici si costruiscono in streaming con np.bincount.
+
+        Args:
+            months: Numero di mesi da analizzare
+            max_day: Ultimo giorno del ciclo rappresentato
+
+        Returns:
+            Dizionario con matrici compatte (righe = tipi, colonne = giorni)
+        """
+        try:
+            if not DEPENDENCIES_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per pattern analysis non installate. Installa pandas e numpy."
+                }
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=months * 30)
+
+            heatmap = CycleDayHeatmap(max_day=max_day)
+            heatmap.add_series(self._load_series(start_date, end_date))
+
+            result = heatmap.result()
+            if result["aligned_entries"] == 0:
+                return {
+                    "success": False,
+                    "message": "Nessun sintomo allineato a un ciclo. Registra cicli e sintomi."
+                }
+
+            return {
+                "success": True,
+                "period_months": months,
+                **result
+            }
+
+        except Exception as e:
+            logger.error(f"Error building cycle-day heatmap: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'analisi: {str(e)}"
+            }
+
+    def analyze_lagged_correlations(
+        self,
+        days: int = 365,
+        max_lag: int = 14,
+        min_correlation: float = 0.2,
+        top_k: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Relazioni ritardate tra tipi di sintomo (es. affaticamento precede acne di 3 giorni).
+
+        Ogni tipo diventa una serie giornaliera di intensità media (0 nei
+        giorni senza registrazioni); le correlazioni incrociate di tutte le
+        coppie e di tutti i ritardi si calcolano insieme via FFT.
+
+        Args:
+            days: Giorni da analizzare
+            max_lag: Ritardo massimo in giorni
+            min_correlation: Correlazione minima da riportare
+            top_k: Numero massimo di relazioni restituite
+
+        Returns:
+            Dizionario con le relazioni ritardate più forti
+        """
+        try:
+            if not DEPENDENCIES_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per pattern analysis non installate. Installa pandas e numpy."
+                }
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+
+            sums = TrendSums(n_days=days + 1)
+            sums.add_series(self._load_series(start_date, end_date), start_date)
+
+            names = sums.type_names
+            if len(names) < 2:
+                return {
+                    "success": False,
+                    "message": "Servono almeno due tipi di sintomo per l'analisi dei ritardi."
+                }
+
+            counts = sums.daily[:, :, N]
+            series = np.divide(
+                sums.daily[:, :, SY], counts,
+                out=np.zeros_like(counts), where=counts > 0
+            )
+
+            correlations = cross_correlation_matrix(series, max_lag)
+            relationships = strongest_lags(
+                correlations, names, sums.n_days,
+                min_correlation=min_correlation, top_k=top_k
+            )
+
+            return {
+                "success": True,
+                "period_days": days,
+                "max_lag_days": max_lag,
+                "symptom_types": names,
+                "relationships": relationships,
+                "insights": [
+                    f"⏱️ {r['leader']} precede {r['follower']} di {r['lag_days']} giorni "
+                    f"(correlazione {r['correlation']}, p={r['p_value']:.3g})"
+                    for r in relationships
+                ] or ["📊 Nessuna relazione ritardata rilevante tra i sintomi."]
+            }
+
+        except Exception as e:
+            logger.error(f"Error in lagged correlation analysis: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'analisi: {str(e)}"
+            }
+
     def identify_recurring_patterns(
         self,
         min_occurrences: int = 2
@@ -167,6 +508,9 @@ class PatternAnalyzer:
         """
         Identifica pattern ricorrenti nei dati.
 
+        Legge i contatori fase × sintomo mantenuti dal database per i mesi
+        interi degli ultimi 6 mesi, più i sintomi dei due mesi parziali.
+
         Args:
             min_occurrences: Numero minimo di occorrenze per considerare un pattern
 
@@ -178,30 +522,32 @@ class PatternAnalyzer:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=180)
 
-            symptoms = self.db.get_symptoms(
-                limit=1000,
+            # Solo inizi/fini come array: nessun oggetto ORM per contare i cicli
+            cycles = self.db.load_cycle_series(
                 start_date=start_date,
-                end_date=end_date
+                end_date=end_date,
+                user_id=self.user_id
             )
 
-            cycles = self.db.get_cycles(
-                limit=12,
+            # Contatori incrementali mantenuti dal database (bucket mensili + bordi)
+            counters = self.db.get_pattern_counters(
                 start_date=start_date,
-                end_date=end_date
+                end_date=end_date,
+                user_id=self.user_id
             )
 
-            if not symptoms:
+            if counters['total'] == 0:
                 return {
                     "success": False,
                     "message": "Dati insufficienti per identificare pattern."
                 }
 
             # Find patterns
-            patterns = self._find_recurring_patterns(
-                symptoms,
-                cycles,
+            patterns = _threshold_patterns(
+                counters['phase_patterns'],
+                counters['symptom_combos'],
                 min_occurrences
-            )
+            ) if cycles else []
 
             # Generate insights
             insights = self._generate_pattern_insights(patterns)
@@ -221,233 +567,264 @@ class PatternAnalyzer:
                 "message": f"Errore nell'identificazione pattern: {str(e)}"
             }
 
-    def _find_symptom_cycle_patterns(
+    def find_symptom_cooccurrences(
         self,
-        symptoms: List[Dict],
-        cycles: List[Dict]
+        days: int = 365,
+        window_days: int = 0,
+        min_support: float = 0.1,
+        min_lift: float = 1.0,
+        max_size: int = 4
     ) -> Dict[str, Any]:
         """
-        Trova correlazioni tra sintomi e fasi del ciclo.
+        Trova gruppi di sintomi che compaiono insieme più spesso del caso.
+
+        A differenza di identify_recurring_patterns considera anche i
+        sottoinsiemi dei sintomi del giorno e finestre di ±window_days giorni.
 
         Args:
-            symptoms: Lista sintomi
-            cycles: Lista cicli
+            days: Giorni da analizzare
+            window_days: Raggio della finestra (0 = stesso giorno)
+            min_support: Frazione minima di giorni con sintomi
+            min_lift: Lift minimo
+            max_size: Numero massimo di sintomi per gruppo
 
         Returns:
-            Dizionario con correlazioni
+            Dizionario con gli itemset frequenti
         """
-        # Convert to pandas for easier analysis
-        if not cycles:
-            return {"phase_distribution": {}, "symptom_intensity_by_phase": {}}
+        try:
+            if not DEPENDENCIES_AVAILABLE:
+                return {
+                    "success": False,
+                    "message": "Dipendenze per pattern analysis non installate. Installa pandas e numpy."
+                }
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=days)
+
+            miner = CooccurrenceMiner(
+                window_days=window_days,
+                min_support=min_support,
+                min_lift=min_lift,
+                max_size=max_size
+            )
+            rows = self.db.get_symptom_days(
+                start_date=start_date,
+                end_date=end_date,
+                user_ids=[self.user_id]
+            )
 
-        # For each symptom, determine cycle phase
-        phase_symptoms = defaultdict(list)
+            if not rows:
+                return {
+                    "success": False,
+                    "message": "Nessun sintomo trovato per l'analisi."
+                }
 
-        for symptom in symptoms:
-            symptom_date = datetime.fromisoformat(symptom['timestamp'])
+            itemsets = miner.mine(rows).get(self.user_id, [])
 
-            # Find which cycle phase this symptom belongs to
-            phase = self._determine_cycle_phase(symptom_date, cycles)
+            return {
+                "success": True,
+                "period_days": days,
+                "window_days": window_days,
+                "days_with_symptoms": len({day for _, day, _ in rows}),
+                "itemsets_found": len(itemsets),
+                "itemsets": itemsets
+            }
 
-            if phase:
-                phase_symptoms[phase].append({
-                    "type": symptom['symptom_type'],
-                    "intensity": symptom['intensity']
-                })
+        except Exception as e:
+            logger.error(f"Error mining symptom co-occurrences: {e}")
+            return {
+                "success": False,
+                "message": f"Errore nell'analisi: {str(e)}"
+            }
 
-        # Calculate statistics per phase
-        phase_distribution = {}
-        symptom_intensity_by_phase = {}
+    def _find_symptom_cycle_patterns(
+        self,
+        phase_stats: List[Dict]
+    ) -> Dict[str, Any]:
+        """
+        Trova correlazioni tra sintomi e fasi del ciclo.
 
-        for phase, symptoms_list in phase_symptoms.items():
-            phase_distribution[phase] = len(symptoms_list)
+        Args:
+            phase_stats: Righe aggregate da DatabaseManager.get_phase_statistics
 
-            # Group by symptom type
-            symptom_types = defaultdict(list)
-            for s in symptoms_list:
-                symptom_types[s['type']].append(s['intensity'])
+        Returns:
+            Dizionario con correlazioni
+        """
+        phase_distribution = defaultdict(int)
+        symptom_intensity_by_phase = defaultdict(dict)
 
-            # Calculate average intensity per symptom type
-            symptom_intensity_by_phase[phase] = {
-                stype: round(sum(intensities) / len(intensities), 1)
-                for stype, intensities in symptom_types.items()
-            }
+        for row in phase_stats:
+            phase = row['cycle_phase']
+            phase_distribution[phase] += row['count']
+            symptom_intensity_by_phase[phase][row['symptom_type']] = round(row['avg_intensity'], 1)
 
         return {
-            "phase_distribution": phase_distribution,
-            "symptom_intensity_by_phase": symptom_intensity_by_phase
+            "phase_distribution": dict(phase_distribution),
+            "symptom_intensity_by_phase": dict(symptom_intensity_by_phase)
         }
 
-    def _determine_cycle_phase(
+    def _test_phase_significance(
         self,
-        date: datetime,
-        cycles: List[Dict]
-    ) -> Optional[str]:
+        phase_stats: List[Dict],
+        intensity_counts: List[Tuple[str, str, int, int]],
+        n_permutations: int,
+        seed: Optional[int]
+    ) -> Dict[str, Any]:
         """
-        Determina la fase del ciclo per una data specifica.
+        Test di significatività dell'associazione sintomo-fase.
+
+        - chi-quadro sulla tabella tipo × fase dei conteggi
+        - per ogni tipo con almeno MIN_SIGNIFICANCE_ENTRIES registrazioni,
+          test di permutazione dell'intensità tra le fasi: p-value globale
+          e, per ogni fase, media nella fase contro media nelle altre
 
-        Fasi:
-        - early: primi 1-5 giorni del ciclo (mestruazione)
-        - mid: giorni 6-14 (fase follicolare/ovulazione)
-        - late: giorni 15+ (fase luteale)
-        - pre_menstrual: 2-3 giorni prima del prossimo ciclo
+        I campioni si ricostruiscono con np.repeat dalla distribuzione
+        (fase, tipo, intensità, conteggio) letta dal database.
 
         Args:
-            date: Data da verificare
-            cycles: Lista cicli
+            phase_stats: Righe aggregate da DatabaseManager.get_phase_statistics
+            intensity_counts: Tuple da DatabaseManager.get_phase_intensity_counts
+            n_permutations: Permutazioni per tipo
+            seed: Seed delle permutazioni
 
         Returns:
-            Fase del ciclo o None
+            Dizionario con chi_square e intensity_by_phase
         """
-        for cycle in cycles:
-            start_date = datetime.fromisoformat(cycle['start_date'])
-
-            # Find next cycle start (if exists)
-            next_cycle_start = None
-            for next_cycle in cycles:
-                next_start = datetime.fromisoformat(next_cycle['start_date'])
-                if next_start > start_date:
-                    if next_cycle_start is None or next_start < next_cycle_start:
-                        next_cycle_start = next_start
-
-            # If date is during this cycle
-            if date >= start_date:
-                if next_cycle_start and date < next_cycle_start:
-                    days_from_start = (date - start_date).days
-
-                    if days_from_start <= 5:
-                        return "early"  # Menstruation
-                    elif days_from_start <= 14:
-                        return "mid"  # Follicular/Ovulation
-                    else:
-                        # Check if pre-menstrual
-                        days_to_next = (next_cycle_start - date).days
-                        if days_to_next <= 3:
-                            return "pre_menstrual"
-                        else:
-                            return "late"  # Luteal
-
-                elif not next_cycle_start:
-                    # Last cycle, can't determine post phases accurately
-                    days_from_start = (date - start_date).days
-                    if days_from_start <= 5:
-                        return "early"
-                    elif days_from_start <= 14:
-                        return "mid"
-                    else:
-                        return "late"
-
-        return None
-
-    def _calculate_trends(self, symptoms: List[Dict]) -> Dict[str, Any]:
-        """Calcola trend temporali"""
-        if not symptoms:
-            return {}
-
-        # Group by symptom type
-        symptom_groups = defaultdict(list)
-        for s in symptoms:
-            symptom_groups[s['symptom_type']].append({
-                "date": datetime.fromisoformat(s['timestamp']),
-                "intensity": s['intensity']
-            })
+        phase_index = {phase: i for i, phase in enumerate(CYCLE_PHASES)}
+        types = sorted({row['symptom_type'] for row in phase_stats})
+        type_index = {stype: i for i, stype in enumerate(types)}
+
+        table = np.zeros((len(types), len(CYCLE_PHASES)))
+        for row in phase_stats:
+            if row['cycle_phase'] in phase_index:
+                table[type_index[row['symptom_type']], phase_index[row['cycle_phase']]] += row['count']
+
+        chi_square = chi_square_independence(table)
+
+        samples = defaultdict(list)
+        for phase, stype, intensity, count in intensity_counts:
+            if phase in phase_index:
+                samples[stype].append((phase_index[phase], intensity, count))
+
+        intensity_by_phase = {}
+        for stype in types:
+            rows = np.array(samples.get(stype, []), dtype=np.int64).reshape(-1, 3)
+            if rows[:, 2].sum() < MIN_SIGNIFICANCE_ENTRIES or len(np.unique(rows[:, 0])) < 2:
+                continue
+
+            groups = np.repeat(rows[:, 0], rows[:, 2])
+            values = np.repeat(rows[:, 1], rows[:, 2])
+            test = permutation_group_test(
+                groups, values, len(CYCLE_PHASES),
+                n_permutations=n_permutations, seed=seed, workers=self.workers
+            )
 
-        trends = {}
-        for stype, entries in symptom_groups.items():
-            # Sort by date
-            entries_sorted = sorted(entries, key=lambda x: x['date'])
-
-            # Calculate if increasing/decreasing trend
-            if len(entries_sorted) >= 3:
-                intensities = [e['intensity'] for e in entries_sorted]
-
-                # Simple linear regression slope
-                x = np.arange(len(intensities))
-                y = np.array(intensities)
-                slope = np.polyfit(x, y, 1)[0]
-
-                if slope > 0.1:
-                    trend = "increasing"
-                elif slope < -0.1:
-                    trend = "decreasing"
-                else:
-                    trend = "stable"
-
-                trends[stype] = {
-                    "count": len(entries_sorted),
-                    "avg_intensity": round(sum(intensities) / len(intensities), 1),
-                    "trend": trend,
-                    "slope": round(float(slope), 2)
+            counts = np.bincount(groups, minlength=len(CYCLE_PHASES))
+            sums = np.bincount(groups, weights=values, minlength=len(CYCLE_PHASES))
+            intensity_by_phase[stype] = {
+                "p_value": round(float(test["p_value"]), 4),
+                "phases": {
+                    phase: {
+                        "count": int(counts[i]),
+                        "avg_intensity": round(float(sums[i] / counts[i]), 1),
+                        "difference": round(float(test["diff"][i]), 2),
+                        "p_value": round(float(test["p_values"][i]), 4)
+                    }
+                    for i, phase in enumerate(CYCLE_PHASES) if counts[i] > 0
                 }
+            }
+
+        return {
+            "alpha": SIGNIFICANCE_ALPHA,
+            "n_permutations": n_permutations,
+            "chi_square": {
+                "statistic": round(chi_square["statistic"], 3),
+                "dof": chi_square["dof"],
+                "p_value": round(chi_square["p_value"], 4),
+                "cramers_v": round(chi_square["cramers_v"], 3)
+            },
+            "intensity_by_phase": intensity_by_phase
+        }
+
+    def _load_series(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        symptom_type: Optional[str] = None
+    ) -> SymptomSeries:
+        """
+        Sintomi della finestra come SymptomSeries (array compatti).
+
+        Lettura a blocchi di chunk_size righe; ogni registrazione occupa
+        pochi byte, quindi anche storici di anni restano piccoli in memoria.
+        """
+        return self.db.load_symptom_series(
+            start_date=start_date,
+            end_date=end_date,
+            symptom_type=symptom_type,
+            user_id=self.user_id,
+            chunk_size=self.chunk_size
+        )
+
+    def _calculate_trends(self, sums: TrendSums) -> Dict[str, Any]:
+        """Calcola i trend di tutti i tipi con un unico fit vettoriale"""
+        fit = fit_linear(sums.totals())
+        trends = {}
+
+        for i, stype in enumerate(sums.type_names):
+            slope = fit["slope"][i]
+            if np.isnan(slope):
+                continue
+
+            trends[stype] = {
+                "count": int(fit["count"][i]),
+                "avg_intensity": round(float(fit["mean"][i]), 1),
+                "trend": _classify_trend(slope, fit["confidence"][i]),
+                "slope": round(float(slope), 3),
+                "weekly_change": round(float(slope * 7), 2),
+                "intercept": round(float(fit["intercept"][i]), 2),
+                "r_squared": round(float(fit["r_squared"][i]), 3),
+                "confidence": round(float(fit["confidence"][i]), 3)
+            }
 
         return trends
 
-    def _find_recurring_patterns(
+    def _calculate_rolling_trends(
         self,
-        symptoms: List[Dict],
-        cycles: List[Dict],
-        min_occurrences: int
-    ) -> List[Dict[str, Any]]:
-        """Identifica pattern ricorrenti"""
-        patterns = []
-
-        if not cycles:
-            return patterns
-
-        # Pattern 1: Sintomi che si ripetono in stessa fase ciclo
-        phase_patterns = defaultdict(lambda: defaultdict(int))
-
-        for symptom in symptoms:
-            symptom_date = datetime.fromisoformat(symptom['timestamp'])
-            phase = self._determine_cycle_phase(symptom_date, cycles)
-
-            if phase:
-                stype = symptom['symptom_type']
-                phase_patterns[stype][phase] += 1
-
-        # Convert to pattern list
-        for stype, phases in phase_patterns.items():
-            for phase, count in phases.items():
-                if count >= min_occurrences:
-                    patterns.append({
-                        "type": "cycle_phase_recurrence",
-                        "symptom": stype,
-                        "phase": phase,
-                        "occurrences": count,
-                        "description": f"{stype} ricorre {count} volte in fase {phase}"
-                    })
-
-        # Pattern 2: Combinazioni di sintomi
-        # (simplified - look for symptoms on same day)
-        symptom_combos = defaultdict(int)
-        symptoms_by_date = defaultdict(list)
-
-        for symptom in symptoms:
-            date_key = symptom['timestamp'][:10]  # YYYY-MM-DD
-            symptoms_by_date[date_key].append(symptom['symptom_type'])
-
-        for date, stypes in symptoms_by_date.items():
-            if len(stypes) >= 2:
-                combo = tuple(sorted(set(stypes)))
-                symptom_combos[combo] += 1
-
-        for combo, count in symptom_combos.items():
-            if count >= min_occurrences:
-                patterns.append({
-                    "type": "symptom_combination",
-                    "symptoms": list(combo),
-                    "occurrences": count,
-                    "description": f"Combinazione {', '.join(combo)} si ripete {count} volte"
+        sums: TrendSums,
+        start_date: datetime,
+        window_days: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Trend su finestre mobili di window_days giorni, una ogni 7 giorni"""
+        window_ends, window_sums = sums.rolling(window_days=window_days, step_days=7)
+        fit = fit_linear(window_sums)
+        rolling = {}
+
+        for i, stype in enumerate(sums.type_names):
+            windows = []
+            for j, end_day in enumerate(window_ends):
+                count = int(fit["count"][i, j])
+                if count == 0:
+                    continue
+
+                slope = fit["slope"][i, j]
+                has_fit = not np.isnan(slope)
+                windows.append({
+                    "window_end": (start_date + timedelta(days=int(end_day))).date().isoformat(),
+                    "count": count,
+                    "avg_intensity": round(float(fit["mean"][i, j]), 1),
+                    "weekly_change": round(float(slope * 7), 2) if has_fit else None,
+                    "trend": _classify_trend(slope, fit["confidence"][i, j]) if has_fit else None
                 })
+            rolling[stype] = windows
 
-        return patterns
+        return rolling
 
     def _generate_correlation_insights(self, correlations: Dict) -> List[str]:
         """Genera insights dalle correlazioni"""
         insights = []
 
         phase_dist = correlations.get("phase_distribution", {})
-        intensity_by_phase = correlations.get("symptom_intensity_by_phase", {})
 
         if not phase_dist:
             insights.append("📊 Dati insufficienti per identificare correlazioni ciclo-sintomi.")
@@ -456,25 +833,36 @@ class PatternAnalyzer:
         # Most symptomatic phase
         if phase_dist:
             max_phase = max(phase_dist, key=phase_dist.get)
-            phase_names = {
-                "early": "mestruazione (giorni 1-5)",
-                "mid": "fase follicolare/ovulazione (giorni 6-14)",
-                "late": "fase luteale (giorni 15+)",
-                "pre_menstrual": "pre-mestruale (2-3 giorni prima)"
-            }
-
             insights.append(
-                f"📈 La fase del ciclo con più sintomi è: {phase_names.get(max_phase, max_phase)} "
+                f"📈 La fase del ciclo con più sintomi è: {PHASE_NAMES.get(max_phase, max_phase)} "
                 f"({phase_dist[max_phase]} sintomi registrati)"
             )
 
-        # High intensity phases
-        for phase, symptoms_dict in intensity_by_phase.items():
-            for symptom, avg_intensity in symptoms_dict.items():
-                if avg_intensity >= 7:
+        significance = correlations.get("significance")
+        if not significance:
+            return insights
+
+        chi_square = significance["chi_square"]
+        if chi_square["dof"] > 0:
+            if chi_square["p_value"] < SIGNIFICANCE_ALPHA:
+                insights.append(
+                    f"🔗 I tipi di sintomo dipendono dalla fase del ciclo "
+                    f"(χ²={chi_square['statistic']:.1f}, p={chi_square['p_value']:.3g})"
+                )
+            else:
+                insights.append(
+                    f"📊 Nessuna associazione significativa tra tipi di sintomo e fasi "
+                    f"(χ² p={chi_square['p_value']:.3g})"
+                )
+
+        # Fasi con intensità significativamente più alta che nel resto del ciclo
+        for symptom, test in significance["intensity_by_phase"].items():
+            for phase, cell in test["phases"].items():
+                if cell["p_value"] < SIGNIFICANCE_ALPHA and cell["difference"] > 0:
                     insights.append(
-                        f"⚠️ {symptom} ha intensità alta (media {avg_intensity}/10) "
-                        f"durante fase {phase_names.get(phase, phase)}"
+                        f"⚠️ {symptom} è più intenso durante fase {PHASE_NAMES.get(phase, phase)} "
+                        f"(media {cell['avg_intensity']}/10, +{cell['difference']} rispetto alle "
+                        f"altre fasi, p={cell['p_value']:.3g})"
                     )
 
         return insights
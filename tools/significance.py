@@ -0,0 +1,303 @@
+"""
+Significance - Funzioni statistiche di base senza scipy
+Distribuzioni usate per p-value e livelli di confidenza delle analisi,
+test chi-quadro e test di permutazione vettoriali
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import math
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Celle (permutazioni × osservazioni) per blocco di permutazioni in memoria
+PERMUTATION_BATCH_CELLS = 2_000_000
+# Sotto questa soglia il costo di avvio dei processi supera il guadagno
+PARALLEL_MIN_CELLS = 50_000_000
+# Blocchi di permutazioni con seed propri, fissi: stesso seed, stesso
+# risultato con qualunque numero di worker
+PERMUTATION_CHUNKS = 16
+
+
+def _beta_continued_fraction(a: float, b: float, x: float) -> float:
+    """Frazione continua della beta incompleta (metodo di Lentz)"""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+
+        if abs(delta - 1.0) < 1e-12:
+            break
+
+    return h
+
+
+def regularized_beta(a: float, b: float, x: float) -> float:
+    """Beta incompleta regolarizzata I_x(a, b)"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+
+    log_front = (
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log1p(-x)
+    )
+
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_continued_fraction(b, a, 1.0 - x) / b
+
+
+def t_two_sided_pvalue(t: float, df: float) -> float:
+    """
+    P-value bilaterale di una statistica t di Student.
+
+    Args:
+        t: Statistica t
+        df: Gradi di libertà (> 0)
+
+    Returns:
+        P(|T| >= |t|)
+    """
+    if df <= 0 or math.isnan(t):
+        return 1.0
+    if math.isinf(t):
+        return 0.0
+    return regularized_beta(df / 2.0, 0.5, df / (df + t * t))
+
+
+if NUMPY_AVAILABLE:
+    t_two_sided_pvalues = np.vectorize(t_two_sided_pvalue, otypes=[float])
+
+
+def regularized_gamma_upper(a: float, x: float) -> float:
+    """Gamma incompleta superiore regolarizzata Q(a, x)"""
+    if x <= 0.0:
+        return 1.0
+
+    log_front = -x + a * math.log(x) - math.lgamma(a)
+
+    if x < a + 1.0:
+        # Serie per P(a, x)
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(1000):
+            ap += 1.0
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * 1e-14:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_front))
+
+    # Frazione continua per Q(a, x) (Lentz)
+    tiny = 1e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-14:
+            break
+    return min(1.0, math.exp(log_front) * h)
+
+
+def chi2_sf(statistic: float, dof: int) -> float:
+    """P-value di una statistica chi-quadro: P(X >= statistic)"""
+    if dof <= 0:
+        return 1.0
+    return regularized_gamma_upper(dof / 2.0, statistic / 2.0)
+
+
+def chi_square_independence(table) -> Dict[str, Any]:
+    """
+    Test chi-quadro di indipendenza su una tabella di contingenza.
+
+    Righe e colonne vuote vengono escluse prima del test.
+
+    Args:
+        table: Array 2D di conteggi (es. tipo di sintomo × fase)
+
+    Returns:
+        Dizionario con statistic, dof, p_value e cramers_v
+    """
+    table = np.asarray(table, dtype=np.float64)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+
+    n = table.sum()
+    rows, cols = table.shape
+    if n == 0 or rows < 2 or cols < 2:
+        return {"statistic": 0.0, "dof": 0, "p_value": 1.0, "cramers_v": 0.0}
+
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    dof = (rows - 1) * (cols - 1)
+
+    return {
+        "statistic": statistic,
+        "dof": dof,
+        "p_value": chi2_sf(statistic, dof),
+        "cramers_v": math.sqrt(statistic / (n * (min(rows, cols) - 1)))
+    }
+
+
+def _permutation_batch(
+    groups,
+    values,
+    n_groups: int,
+    n_permutations: int,
+    seed
+) -> Tuple["np.ndarray", int]:
+    """
+    Esegue un blocco di permutazioni come un'unica operazione su matrice.
+
+    I valori vengono permutati riga per riga (n_permutations × n) e le somme
+    per gruppo si ottengono con un solo prodotto matrice × one-hot.
+
+    Returns:
+        Tupla (superamenti per gruppo, superamenti della statistica globale)
+    """
+    rng = np.random.default_rng(seed)
+    one_hot = _one_hot(groups, n_groups)
+    observed_diff, observed_between = _group_statistics(
+        values[None, :] @ one_hot, groups, values, n_groups
+    )
+
+    exceed = np.zeros(n_groups, dtype=np.int64)
+    exceed_global = 0
+    batch = max(1, PERMUTATION_BATCH_CELLS // max(1, len(values)))
+
+    for start in range(0, n_permutations, batch):
+        size = min(batch, n_permutations - start)
+        shuffled = rng.permuted(np.broadcast_to(values, (size, len(values))), axis=1)
+        diff, between = _group_statistics(shuffled @ one_hot, groups, values, n_groups)
+
+        exceed += (np.abs(diff) >= np.abs(observed_diff) - 1e-12).sum(axis=0)
+        exceed_global += int((between >= observed_between - 1e-12).sum())
+
+    return exceed, exceed_global
+
+
+def _one_hot(groups, n_groups: int):
+    """Matrice n × gruppi con 1 nella colonna del gruppo di ogni osservazione"""
+    one_hot = np.zeros((len(groups), n_groups))
+    one_hot[np.arange(len(groups)), groups] = 1.0
+    return one_hot
+
+
+def _group_statistics(group_sums, groups, values, n_groups: int):
+    """
+    Statistiche per permutazione da somme per gruppo (righe = permutazioni).
+
+    Returns:
+        Tupla (media nel gruppo - media fuori dal gruppo, devianza tra gruppi)
+    """
+    counts = np.bincount(groups, minlength=n_groups).astype(np.float64)
+    n = len(values)
+    total = values.sum()
+    grand_mean = total / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_in = group_sums / counts
+        mean_out = (total - group_sums) / (n - counts)
+        diff = np.where((counts > 0) & (counts < n), mean_in - mean_out, 0.0)
+        between = np.where(counts > 0, counts * (mean_in - grand_mean) ** 2, 0.0).sum(axis=1)
+
+    return diff, between
+
+
+def permutation_group_test(
+    groups,
+    values,
+    n_groups: int,
+    n_permutations: int = 10_000,
+    seed: Optional[int] = None,
+    workers: int = 1
+) -> Dict[str, Any]:
+    """
+    Test di permutazione: i valori differiscono tra i gruppi?
+
+    Per ogni gruppo confronta la media nel gruppo con la media fuori
+    (p-value bilaterale); la statistica globale è la devianza tra gruppi
+    (equivalente all'F dell'ANOVA a una via). Le permutazioni sono divise
+    in PERMUTATION_CHUNKS blocchi, ognuno con un seed derivato con
+    SeedSequence.spawn e generato come matrice NumPy; con workers > 1 e
+    sopra PARALLEL_MIN_CELLS celle (osservazioni × permutazioni) i blocchi
+    vengono distribuiti su un ProcessPoolExecutor. Il risultato dipende
+    solo dal seed, non dal numero di worker.
+
+    Args:
+        groups: np.ndarray int con il gruppo (0..n_groups-1) di ogni osservazione
+        values: np.ndarray dei valori (es. intensità)
+        n_groups: Numero di gruppi
+        n_permutations: Numero di permutazioni
+        seed: Seed per la riproducibilità
+        workers: Processi per storici molto grandi (default: 1, nessun pool)
+
+    Returns:
+        Dizionario con diff e p_values per gruppo e p_value globale
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    one_hot = _one_hot(groups, n_groups)
+
+    observed_diff, _ = _group_statistics(values[None, :] @ one_hot, groups, values, n_groups)
+
+    cells = len(values) * n_permutations
+    n_chunks = max(1, min(PERMUTATION_CHUNKS, n_permutations))
+    shares = [n_permutations // n_chunks + (i < n_permutations % n_chunks) for i in range(n_chunks)]
+    chunk_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    if workers > 1 and cells >= PARALLEL_MIN_CELLS:
+        with ProcessPoolExecutor(max_workers=min(workers, n_chunks)) as pool:
+            results = list(pool.map(
+                _permutation_batch,
+                [groups] * n_chunks, [values] * n_chunks, [n_groups] * n_chunks,
+                shares, chunk_seeds
+            ))
+    else:
+        results = [
+            _permutation_batch(groups, values, n_groups, share, chunk_seed)
+            for share, chunk_seed in zip(shares, chunk_seeds)
+        ]
+
+    exceed = sum(r[0] for r in results)
+    exceed_global = sum(r[1] for r in results)
+
+    return {
+        "n_permutations": n_permutations,
+        "diff": observed_diff[0],
+        "p_values": (exceed + 1) / (n_permutations + 1),
+        "p_value": (exceed_global + 1) / (n_permutations + 1)
+    }
@@ -3,11 +3,11 @@ Symptom Tracker Tool
 Implementa la logica business per il tracking dei sintomi PCOS
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
 
-from database import DatabaseManager, SymptomEntry, SymptomType
+from database import DatabaseManager, SymptomEntry, SymptomType, validate_entries
 from pydantic import ValidationError
 
 logger = logging.getLogger("pcos-care-mcp.tools")
@@ -24,14 +24,23 @@ class SymptomTracker:
     - Analytics di base
     """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        user_id: Optional[int] = None,
+        note_index=None
+    ):
         """
         Inizializza symptom tracker.
         
         Args:
             db_manager: Istanza di DatabaseManager
+            user_id: Utente di cui gestire lo storico (None = storico locale)
+            note_index: NoteIndex per la ricerca nelle note (opzionale)
         """
         self.db = db_manager
+        self.user_id = user_id
+        self.note_index = note_index
         logger.info("SymptomTracker initialized")
     
     def track_symptom(
@@ -60,18 +69,31 @@ class SymptomTracker:
             )
             
             # Salva nel database
-            response = self.db.add_symptom(symptom_entry)
+            response = self.db.add_symptom(symptom_entry, user_id=self.user_id)
             
             if response.success:
+                # Embedding della nota in background (la risposta non lo attende)
+                if self.note_index is not None:
+                    self.note_index.add_note("symptom", response.entry_id, symptom_entry.notes, self.user_id)
+
                 # Genera messaggio contextual
                 context_msg = self._generate_context_message(symptom_type, intensity)
-                
+
+                # Anomalia rispetto allo storico personale (baseline EWMA)
+                anomaly = response.anomaly or {}
+                if anomaly.get("is_anomaly"):
+                    context_msg = (
+                        f"{self._generate_anomaly_message(symptom_type, intensity, anomaly)}\n"
+                        f"{context_msg}"
+                    )
+
                 return {
                     "success": True,
                     "message": response.message,
                     "entry_id": response.entry_id,
                     "timestamp": response.timestamp.isoformat(),
-                    "context": context_msg
+                    "context": context_msg,
+                    "anomaly": response.anomaly
                 }
             else:
                 return {
@@ -108,7 +130,69 @@ class SymptomTracker:
                 "message": "Errore inaspettato. Riprova più tardi.",
                 "error": str(e)
             }
-    
+
+    def track_symptoms(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Registra un batch di sintomi (sincronizzazione da app offline).
+
+        Il batch è validato con una sola chiamata Pydantic sulla lista: le
+        righe non valide sono riportate per indice senza bloccare le altre,
+        quelle già inviate (stesso tipo, timestamp e intensità) sono saltate.
+        Ogni riga inserita aggiorna lo stato derivato in O(1) come
+        track_symptom e riceve la valutazione di anomalia.
+
+        Args:
+            items: Sintomi come dizionari (symptom_type, intensity, notes, timestamp)
+
+        Returns:
+            Dizionario con conteggi, anomalie ed errori per riga
+        """
+        try:
+            entries, errors = validate_entries(SymptomEntry, items)
+
+            responses = self.db.add_symptoms(entries, user_id=self.user_id)
+            if responses is None:
+                return {
+                    "success": False,
+                    "message": "Errore nel salvare i sintomi",
+                    "error": "Database operation failed"
+                }
+
+            # Indici delle righe valide nel batch originale
+            valid_indices = [index for index in range(len(items)) if index not in errors]
+            inserted = sum(response is not None for response in responses)
+
+            if inserted and self.note_index is not None:
+                self.note_index.sync([self.user_id])
+
+            return {
+                "success": True,
+                "message": f"{inserted} sintomi registrati su {len(items)}",
+                "inserted": inserted,
+                "duplicates": len(entries) - inserted,
+                "invalid": len(errors),
+                "anomalies": {
+                    index: response.anomaly
+                    for index, response in zip(valid_indices, responses)
+                    if response is not None and (response.anomaly or {}).get("is_anomaly")
+                },
+                "errors": {
+                    index: [
+                        {"field": ".".join(map(str, e["loc"])), "message": e["msg"]}
+                        for e in row_errors
+                    ]
+                    for index, row_errors in sorted(errors.items())
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"Error tracking symptom batch: {e}")
+            return {
+                "success": False,
+                "message": "Errore inaspettato. Riprova più tardi.",
+                "error": str(e)
+            }
+
     def get_recent_symptoms(self, limit: int = 5) -> Dict[str, Any]:
         """
         Recupera sintomi recenti.
@@ -120,7 +204,7 @@ class SymptomTracker:
             Dizionario con lista sintomi
         """
         try:
-            symptoms = self.db.get_symptoms(limit=limit)
+            symptoms = self.db.get_symptoms(limit=limit, user_id=self.user_id)
             
             return {
                 "success": True,
@@ -147,7 +231,7 @@ class SymptomTracker:
             Dizionario con statistiche
         """
         try:
-            summary = self.db.get_symptom_summary(days=days)
+            summary = self.db.get_symptom_summary(days=days, user_id=self.user_id)
             
             # Genera insights
             insights = self._generate_insights(summary)
@@ -158,6 +242,7 @@ class SymptomTracker:
                 "total_entries": summary.total_entries,
                 "most_common_symptom": summary.most_common_symptom,
                 "average_intensity": summary.average_intensity,
+                "intensity_percentiles": summary.intensity_percentiles,
                 "insights": insights
             }
             
@@ -199,6 +284,35 @@ class SymptomTracker:
         
         return f"💡 Suggerimento: {tip}"
     
+    def _generate_anomaly_message(
+        self,
+        symptom_type: str,
+        intensity: int,
+        anomaly: Dict[str, Any]
+    ) -> str:
+        """
+        Messaggio per una registrazione fuori dalla norma personale.
+
+        Args:
+            symptom_type: Tipo di sintomo
+            intensity: Intensità registrata
+            anomaly: Esito del confronto con la baseline EWMA
+
+        Returns:
+            Messaggio di avviso
+        """
+        if anomaly["direction"] == "higher":
+            return (
+                f"🔔 Intensità insolitamente alta per te: {symptom_type} {intensity}/10, "
+                f"di solito intorno a {anomaly['baseline_mean']:.1f}/10 "
+                f"(z={anomaly['z_score']}). Annota eventuali cause e, se si ripete, "
+                "parlane con il medico."
+            )
+        return (
+            f"🔔 Intensità insolitamente bassa per te: {symptom_type} {intensity}/10, "
+            f"di solito intorno a {anomaly['baseline_mean']:.1f}/10 (z={anomaly['z_score']})."
+        )
+
     def _generate_insights(self, summary) -> List[str]:
         """
         Genera insights basati sul riepilogo.
@@ -0,0 +1,190 @@
+"""
+Trend Engine - Regressione lineare in forma chiusa per tutti i tipi di sintomo
+Somme per gruppo con np.bincount, fit vettoriale e trend a finestra mobile
+
+x = giorni trascorsi dall'inizio della finestra, y = intensità.
+Le somme (n, Σx, Σy, Σxy, Σx², Σy²) sono additive: si accumulano a blocchi
+durante lo streaming e bastano per pendenza, intercetta, R² e confidenza.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("Trend engine requires numpy. Run: pip install numpy")
+
+from tools.significance import t_two_sided_pvalues
+
+# Indici delle somme nell'ultima dimensione degli array
+N, SX, SY, SXY, SXX, SYY = range(6)
+SUM_FIELDS = 6
+
+
+class TrendSums:
+    """
+    Somme di regressione per tipo di sintomo e giorno.
+
+    Le somme giornaliere permettono sia il fit sull'intera finestra sia
+    i fit a finestra mobile (prefix sum lungo i giorni).
+    """
+
+    def __init__(self, n_days: int):
+        """
+        Args:
+            n_days: Giorni coperti dall'asse dei tempi (x in [0, n_days))
+        """
+        self.n_days = max(1, n_days)
+        self.types: Dict[str, int] = {}
+        self.daily = np.zeros((0, self.n_days, SUM_FIELDS))
+        self.total = 0
+
+    def add(self, points: Sequence[Tuple[float, str, int]]) -> None:
+        """
+        Aggiunge un blocco di punti (giorni trascorsi, tipo, intensità).
+        """
+        if not points:
+            return
+
+        x = np.fromiter((p[0] for p in points), dtype=np.float64, count=len(points))
+        y = np.fromiter((p[2] for p in points), dtype=np.float64, count=len(points))
+        rows = np.fromiter(
+            (self.types.setdefault(p[1], len(self.types)) for p in points),
+            dtype=np.int64, count=len(points)
+        )
+        self._accumulate(x, rows, y)
+
+    def add_series(self, series, origin: datetime) -> None:
+        """
+        Aggiunge una SymptomSeries; x = giorni trascorsi da origin.
+        """
+        if not len(series):
+            return
+
+        # Righe dei tipi nell'ordine di prima comparsa, come in add
+        codes, first = np.unique(series.type_codes, return_index=True)
+        row_of = np.zeros(256, dtype=np.int64)
+        for code in codes[np.argsort(first)]:
+            row_of[code] = self.types.setdefault(series.type_names[code], len(self.types))
+
+        self._accumulate(
+            series.elapsed_days(origin),
+            row_of[series.type_codes],
+            series.intensities.astype(np.float64)
+        )
+
+    def _accumulate(self, x, rows, y) -> None:
+        """Somme per (tipo, giorno) con np.bincount su un indice appiattito"""
+        if len(self.types) > len(self.daily):
+            grow = len(self.types) - len(self.daily)
+            self.daily = np.concatenate(
+                (self.daily, np.zeros((grow, self.n_days, SUM_FIELDS))), axis=0
+            )
+
+        day = np.clip(np.floor(x).astype(np.int64), 0, self.n_days - 1)
+        flat = rows * self.n_days + day
+        size = self.daily.shape[0] * self.n_days
+
+        sums = self.daily.reshape(size, SUM_FIELDS)
+        for field, weights in (
+            (N, None), (SX, x), (SY, y), (SXY, x * y), (SXX, x * x), (SYY, y * y)
+        ):
+            sums[:, field] += np.bincount(flat, weights=weights, minlength=size)
+
+        self.total += len(x)
+
+    @property
+    def type_names(self) -> List[str]:
+        """Tipi nell'ordine delle righe degli array"""
+        return sorted(self.types, key=self.types.get)
+
+    def totals(self):
+        """Somme sull'intera finestra, shape (tipi, SUM_FIELDS)"""
+        return self.daily.sum(axis=1)
+
+    def rolling(self, window_days: int, step_days: int):
+        """
+        Somme su finestre mobili di window_days giorni, una ogni step_days.
+
+        Le finestre terminano sull'ultimo giorno e procedono a ritroso;
+        ognuna costa O(1) grazie alle somme cumulative.
+
+        Returns:
+            Tupla (giorni finali delle finestre crescenti, somme di shape
+            (tipi, finestre, SUM_FIELDS))
+        """
+        cumulative = self._cumulative()
+
+        ends = np.arange(self.n_days, 0, -step_days)[::-1]
+        starts = np.maximum(ends - window_days, 0)
+        return ends - 1, cumulative[:, ends] - cumulative[:, starts]
+
+    def trailing(self, windows: Sequence[int]):
+        """
+        Somme sugli ultimi N giorni per ogni N in windows, O(1) per finestra.
+
+        Returns:
+            Array di shape (tipi, len(windows), SUM_FIELDS)
+        """
+        cumulative = self._cumulative()
+        starts = np.maximum(self.n_days - np.asarray(windows, dtype=np.int64), 0)
+        return cumulative[:, [self.n_days]] - cumulative[:, starts]
+
+    def _cumulative(self):
+        """Prefix sum lungo i giorni, con una colonna iniziale di zeri"""
+        return np.concatenate(
+            (np.zeros((self.daily.shape[0], 1, SUM_FIELDS)), np.cumsum(self.daily, axis=1)),
+            axis=1
+        )
+
+
+def fit_linear(sums) -> Dict[str, "np.ndarray"]:
+    """
+    Fit ai minimi quadrati in forma chiusa per ogni gruppo di somme.
+
+    Args:
+        sums: Array (..., SUM_FIELDS) di somme
+
+    Returns:
+        Dizionario di array con count, mean, slope, intercept, r_squared,
+        std (deviazione standard campionaria di y), p_value e confidence
+        (1 - p_value del test t sulla pendenza);
+        i gruppi con meno di 3 punti o x costante hanno slope NaN
+    """
+    n = sums[..., N]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = sums[..., SXX] - sums[..., SX] ** 2 / n
+        sxy = sums[..., SXY] - sums[..., SX] * sums[..., SY] / n
+        syy = sums[..., SYY] - sums[..., SY] ** 2 / n
+
+        valid = (n >= 3) & (sxx > 1e-12)
+        slope = np.where(valid, sxy / sxx, np.nan)
+        mean = sums[..., SY] / n
+        std = np.sqrt(np.maximum(syy, 0.0) / (n - 1))
+        intercept = mean - slope * sums[..., SX] / n
+
+        residual = np.maximum(syy - slope * sxy, 0.0)
+        r_squared = np.where(syy > 1e-12, 1.0 - residual / syy, 0.0)
+
+        df = n - 2
+        stderr = np.sqrt(residual / df / sxx)
+        t_stat = np.where(stderr > 0, slope / stderr, np.where(np.abs(slope) > 0, np.inf, 0.0))
+
+    p_value = np.ones_like(n, dtype=np.float64)
+    if valid.any():
+        p_value[valid] = t_two_sided_pvalues(t_stat[valid], df[valid])
+
+    return {
+        "count": n,
+        "mean": mean,
+        "std": np.where(n > 1, std, np.nan),
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": np.where(valid, r_squared, np.nan),
+        "p_value": p_value,
+        "confidence": 1.0 - p_value,
+    }
@@ -5,11 +5,11 @@ REST API per webapp che condivide lo stesso backend del MCP server.
 Usa gli stessi database/ e rag/ modules.
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Annotated, Any, Dict, Optional, List
 import sys
 from pathlib import Path
 from datetime import timedelta
@@ -20,6 +20,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from database import DatabaseManager
 from database.auth import User
 from tools import SymptomTracker, CycleTracker, PatternAnalyzer
+from tools.pattern_analyzer import MAX_REPORT_WINDOW_DAYS
+from tools.cycle_heatmap import DEFAULT_MAX_CYCLE_DAY, MAX_CYCLE_DAY
+from tools.cohort_analytics import CohortAnalytics
+from tools.history_importer import HistoryImporter, FORMATS, detect_format
+from tools.note_search import NoteIndex, SOURCES
 # Import RAG conditionally to avoid loading heavy dependencies when disabled
 
 # Import auth utilities
@@ -57,16 +62,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Disable RAG on Render free tier to save memory
+import os
+ENABLE_RAG = os.getenv("ENABLE_RAG", "false").lower() == "true"
+# La ricerca nelle note carica sentence-transformers: segue ENABLE_RAG se non impostata
+ENABLE_NOTE_SEARCH = os.getenv("ENABLE_NOTE_SEARCH", str(ENABLE_RAG)).lower() == "true"
+
 # Initialize shared components (stessi del MCP server)
 db_manager = DatabaseManager()
-symptom_tracker = SymptomTracker(db_manager)
-cycle_tracker = CycleTracker(db_manager)
+note_index = NoteIndex(db_manager) if ENABLE_NOTE_SEARCH else None
+symptom_tracker = SymptomTracker(db_manager, note_index=note_index)
+cycle_tracker = CycleTracker(db_manager, note_index=note_index)
 pattern_analyzer = PatternAnalyzer(db_manager)
+cohort_analytics = CohortAnalytics(db_manager)
+history_importer = HistoryImporter(db_manager)
+if note_index is not None:
+    note_index.sync()
+else:
+    print("Note search disabled (set ENABLE_NOTE_SEARCH=true to enable)")
 
 # Initialize RAG (con try/except per fallback)
-# Disable RAG on Render free tier to save memory
-import os
-ENABLE_RAG = os.getenv("ENABLE_RAG", "false").lower() == "true"
 
 if ENABLE_RAG:
     try:
@@ -215,6 +230,16 @@ async def create_symptom(symptom: SymptomCreate):
 
     return result
 
+@app.post("/api/symptoms/batch")
+def create_symptoms_batch(symptoms: List[Dict[str, Any]]):
+    """Registra un batch di sintomi, con errori per riga"""
+    result = symptom_tracker.track_symptoms(symptoms)
+
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+
+    return result
+
 @app.get("/api/symptoms")
 async def get_symptoms(limit: int = 10):
     """Recupera ultimi sintomi"""
@@ -288,6 +313,70 @@ async def get_cycle_analytics(months: int = 6):
 
     return result
 
+@app.get("/api/cycles/forecast")
+async def get_cycle_forecast(months: int = Query(3, ge=1, le=12)):
+    """Calendario previsto di mestruazioni e fasi"""
+    result = cycle_tracker.get_cycle_forecast(months=months)
+
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    return result
+
+
+# ============================================================================
+# Import Routes
+# ============================================================================
+
+@app.post("/api/import")
+def import_history(file: UploadFile = File(...), format: Optional[str] = Query(None)):
+    """Importa storico cicli/sintomi da export CSV/JSON di altre app"""
+    # Endpoint sincrono: FastAPI lo esegue nel threadpool, l'import non blocca l'event loop
+    try:
+        file_format = format or detect_format(file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if file_format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato non supportato: {file_format}")
+
+    result = history_importer.import_stream(file.file, file_format)
+
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+
+    return result
+
+
+# ============================================================================
+# Note Search Routes
+# ============================================================================
+
+@app.get("/api/notes/search")
+def search_notes(
+    q: Optional[str] = None,
+    source: Optional[str] = Query(None, pattern=f"^({'|'.join(SOURCES)})$"),
+    entry_id: Optional[int] = None,
+    top_k: int = Query(5, ge=1, le=20)
+):
+    """Ricerca semantica nelle note (per testo o simili a una registrazione)"""
+    if note_index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Note search not enabled. Set ENABLE_NOTE_SEARCH=true"
+        )
+
+    # Endpoint sincrono: l'embedding della query gira nel threadpool
+    if entry_id is not None:
+        result = note_index.find_similar(source or "symptom", entry_id, top_k=top_k)
+    else:
+        result = note_index.search(q or "", top_k=top_k, source=source)
+
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+
+    return result
+
 
 # ============================================================================
 # Analytics Routes
@@ -304,11 +393,28 @@ async def analyze_correlation(months: int = 3):
     return result
 
 @app.get("/api/analytics/trends")
-async def analyze_trends(symptom_type: Optional[str] = None, days: int = 90):
-    """Trend sintomi nel tempo"""
+async def analyze_trends(symptom_type: Optional[str] = None, days: int = 90, weekly: bool = False):
+    """Trend sintomi nel tempo (weekly=true aggiunge i trend settimanali)"""
     result = pattern_analyzer.analyze_symptom_trends(
         symptom_type=symptom_type,
-        days=days
+        days=days,
+        weekly=weekly
+    )
+
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    return result
+
+@app.get("/api/analytics/report")
+async def multi_window_report(
+    windows: List[Annotated[int, Field(ge=1, le=MAX_REPORT_WINDOW_DAYS)]] = Query([30, 90, 180, 365]),
+    symptom_type: Optional[str] = None
+):
+    """Riepilogo e trend per più finestre (es. ?windows=30&windows=90) con una sola lettura"""
+    result = pattern_analyzer.multi_window_report(
+        windows=windows,
+        symptom_type=symptom_type
     )
 
     if not result["success"]:
@@ -316,6 +422,33 @@ async def analyze_trends(symptom_type: Optional[str] = None, days: int = 90):
 
     return result
 
+@app.get("/api/analytics/heatmap")
+async def cycle_day_heatmap(
+    months: int = 6,
+    max_day: int = Query(DEFAULT_MAX_CYCLE_DAY, ge=1, le=MAX_CYCLE_DAY)
+):
+    """Heatmap giorno del ciclo × tipo di sintomo (matrici conteggi e intensità media)"""
+    result = pattern_analyzer.cycle_day_heatmap(months=months, max_day=max_day)
+
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    return result
+
+@app.get("/api/analytics/cohort")
+def cohort_report(
+    months: int = 12,
+    refresh: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Distribuzioni anonime di popolazione (in cache, refresh=true per ricalcolare)"""
+    result = cohort_analytics.get_cohort_report(months=months, refresh=refresh)
+
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    return result
+
 @app.get("/api/analytics/patterns")
 async def identify_patterns(min_occurrences: int = 2):
     """Pattern ricorrenti"""